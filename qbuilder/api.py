@@ -3,6 +3,7 @@ QBuilder API — Public interface for MCP tools and external callers.
 
 This module provides the canonical API for:
 - Enqueuing files for processing (flash updates and batch)
+- Flash-building a single edited file synchronously (flash_build)
 - Checking build status
 - Waiting for completion
 - Starting background builds
@@ -15,6 +16,8 @@ Priority levels:
 
 Hard rules (from spec):
 - No parallel "immediate pipeline" — all work goes through queue
+  (flash_build enqueues first, then claims and builds its own queue item;
+  anything it cannot finish quickly stays queued for the worker)
 - No stage-scan scheduling — no "missing AST/symbol/ref" decisions
 - Correctness is fingerprint-based, not row-existence-based
 """
@@ -30,6 +33,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from ck3raven.db.content import register_content_functions
 from qbuilder.schema import init_qbuilder_schema
 from qbuilder.discovery import get_envelope_for_file, get_routing_table
 
@@ -56,6 +60,17 @@ class EnqueueResult:
     already_queued: bool = False
 
 
+@dataclass
+class FlashBuildResult:
+    """Result of flash_build operation."""
+    success: bool  # True if the file was built (status completed) before returning
+    build_id: Optional[int]
+    file_id: Optional[int]
+    status: str  # completed, error, or the queue status it was left in
+    message: str
+    elapsed_ms: float = 0.0
+
+
 @dataclass
 class BuildStatus:
     """Status of a build queue item."""
@@ -75,6 +90,7 @@ def get_connection(db_path: Optional[Path] = None) -> sqlite3.Connection:
     conn.execute("PRAGMA foreign_keys = ON")
     conn.execute("PRAGMA journal_mode = WAL")
     conn.execute("PRAGMA synchronous = NORMAL")
+    register_content_functions(conn)
     return conn
 
 
@@ -306,6 +322,77 @@ def delete_file(
         conn.close()
 
 
+def flash_build(
+    mod_name: str,
+    rel_path: str,
+    content: Optional[str] = None,
+    timeout: Optional[float] = None,
+    db_path: Optional[Path] = None,
+) -> FlashBuildResult:
+    """
+    Enqueue a file with flash priority and build it before returning.
+    
+    The queue row is written first (enqueue_file), then claimed and built
+    right away: parsed and extracted in the standing flash process (see
+    qbuilder.pipeline.compute_flash_item), and everything written in one
+    transaction from this process. Typical
+    files return in well under a second, and search reflects the edit
+    immediately.
+    
+    If the parse takes longer than `timeout` (default FLASH_PARSE_TIMEOUT),
+    or a worker already claimed the item, the durable queue finishes the
+    build as usual; the result then carries that queue status.
+    
+    Args:
+        mod_name: Mod name (maps to content_version directly)
+        rel_path: Relative path within the mod
+        content: Optional file content (if None, reads from disk)
+        timeout: Flash parse budget in seconds
+        db_path: Optional database path override
+    
+    Returns:
+        FlashBuildResult
+    """
+    from qbuilder.worker import BuildWorker, FLASH_PARSE_TIMEOUT
+    from src.ck3raven.db.conflicts import refresh_playset_conflicts
+    
+    start = time.time()
+    enqueued = enqueue_file(mod_name, rel_path, content, priority=PRIORITY_FLASH, db_path=db_path)
+    if not enqueued.success or enqueued.build_id is None:
+        return FlashBuildResult(
+            success=False,
+            build_id=enqueued.build_id,
+            file_id=enqueued.file_id,
+            status='error',
+            message=enqueued.message,
+            elapsed_ms=(time.time() - start) * 1000,
+        )
+    
+    conn = get_connection(db_path)
+    try:
+        worker = BuildWorker(conn, worker_id=f"flash-{os.getpid()}")
+        result = worker.flash_build(enqueued.build_id, timeout or FLASH_PARSE_TIMEOUT)
+        if result['flash']:
+            # Conflict views reflect the edit as immediately as search does
+            refresh_playset_conflicts(conn)
+    finally:
+        conn.close()
+    
+    if result['flash']:
+        message = result.get('error') or f"Built ({', '.join(result.get('steps', []))})"
+    else:
+        message = f"Left to build queue (status={result['status']})"
+    
+    return FlashBuildResult(
+        success=result['status'] == 'completed',
+        build_id=enqueued.build_id,
+        file_id=enqueued.file_id,
+        status=result['status'],
+        message=message,
+        elapsed_ms=(time.time() - start) * 1000,
+    )
+
+
 def get_build_status(build_id: int, db_path: Optional[Path] = None) -> Optional[BuildStatus]:
     """
     Get status of a specific build queue item.
@@ -9,6 +9,8 @@ Commands:
     run       Run complete pipeline (discover + build)
     status    Show queue status
     reset     Reset queues for fresh build
+    migrate-asts  Re-encode stored ASTs into another ast_format
+    bench-build   Measure build throughput versus --batch-size on synthetic files
 
 SINGLE-WRITER ARCHITECTURE (January 2026):
     The `daemon` command is the ONLY process that writes to the database.
@@ -26,6 +28,7 @@ from typing import Optional
 
 from .schema import init_qbuilder_schema, reset_qbuilder_tables, get_queue_counts
 from ck3raven.db.schema import BuilderSession, init_database, get_schema_version, DATABASE_VERSION
+from ck3raven.db.content import register_content_functions
 from .discovery import enqueue_playset_roots, run_discovery
 from .worker import run_build_worker
 
@@ -88,6 +91,7 @@ def get_connection(auto_init: bool = True) -> sqlite3.Connection:
     # Connect
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    register_content_functions(conn)
     
     # Check if schema exists and is current version
     if auto_init:
@@ -208,12 +212,15 @@ def cmd_daemon(args: argparse.Namespace) -> int:
             """Called by IPC server when shutdown command received."""
             shutdown_event.set()
         
-        # Create shared activity tracker for IPC status queries
-        from qbuilder.ipc_server import RunActivity
+        # Create shared activity tracker for IPC status queries, and the
+        # signal IPC enqueues use to wake the idle build worker
+        from qbuilder.ipc_server import RunActivity, WorkSignal
         run_activity = RunActivity()
         run_activity.set_run_id(run_id)
+        work_signal = WorkSignal()
         
-        ipc_server = DaemonIPCServer(conn, port=port, db_path=db_path, shutdown_callback=shutdown_callback, run_activity=run_activity)
+        ipc_server = DaemonIPCServer(conn, port=port, db_path=db_path, shutdown_callback=shutdown_callback,
+                                     run_activity=run_activity, work_signal=work_signal)
         ipc_server.start()
         print(f"[OK] IPC server listening on port {port}")
         
@@ -221,6 +228,7 @@ def cmd_daemon(args: argparse.Namespace) -> int:
         def handle_signal(signum, frame):
             print(f"\nReceived signal {signum}, shutting down...")
             shutdown_event.set()
+            work_signal.notify()
         
         signal.signal(signal.SIGINT, handle_signal)
         signal.signal(signal.SIGTERM, handle_signal)
@@ -234,6 +242,8 @@ def cmd_daemon(args: argparse.Namespace) -> int:
         print(f"  ipc_port: {port}")
         print(f"  pending: {pending}")
         print(f"  poll_interval: {args.poll_interval}s")
+        print(f"  batch_size: {args.batch_size}")
+        print(f"  processes: {args.processes}")
         print(f"  log: {logger.log_file}")
         print(f"\nPress Ctrl+C to stop\n")
         
@@ -262,6 +272,10 @@ def cmd_daemon(args: argparse.Namespace) -> int:
             poll_interval=args.poll_interval,
             shutdown_event=shutdown_event,
             run_activity=run_activity,
+            work_signal=work_signal,
+            batch_size=args.batch_size,
+            defer_fts=args.defer_fts,
+            processes=args.processes,
         )
         
         elapsed = time.time() - start_time
@@ -329,11 +343,13 @@ def cmd_discover(args: argparse.Namespace) -> int:
         # Run discovery unless --enqueue-only
         if not args.enqueue_only:
             print("\nRunning discovery workers...")
-            result = run_discovery(conn, max_tasks=args.max_tasks)
+            result = run_discovery(conn, max_tasks=args.max_tasks, workers=args.workers)
             
             print(f"\n[OK] Discovery complete:")
             print(f"  Tasks processed: {result['tasks_processed']}")
             print(f"  Files discovered: {result['files_discovered']}")
+            print(f"  Files hashed: {result['files_hashed']} "
+                  f"(unchanged: {result['files_skipped']}, deleted: {result['files_deleted']})")
         
         return 0
     finally:
@@ -369,6 +385,8 @@ def cmd_build(args: argparse.Namespace) -> int:
         print(f"  run_id: {run_id}")
         print(f"  log: {logger.log_file}")
         print(f"  pending: {pending}")
+        print(f"  batch_size: {args.batch_size}")
+        print(f"  processes: {args.processes}")
         if continuous:
             print(f"  poll_interval: {args.poll_interval}s")
             print(f"  mode: CONTINUOUS (Ctrl+C to stop)")
@@ -382,6 +400,9 @@ def cmd_build(args: argparse.Namespace) -> int:
             logger=logger,
             continuous=continuous,
             poll_interval=args.poll_interval,
+            batch_size=args.batch_size,
+            defer_fts=args.defer_fts,
+            processes=args.processes,
         )
         
         elapsed = time.time() - start
@@ -398,6 +419,8 @@ def cmd_build(args: argparse.Namespace) -> int:
         print(f"  Completed: {result['completed']}")
         print(f"  Errors: {result['errors']}")
         print(f"  Time: {elapsed:.1f}s ({rate:.1f} items/sec)")
+        print(f"  Busy throughput: {result['items_per_sec']:.1f} items/sec "
+              f"(batch_size={result['batch_size']}, processes={result['processes']})")
         
         return 0
         
@@ -522,6 +545,169 @@ def cmd_reset(args: argparse.Namespace) -> int:
         conn.close()
 
 
+def cmd_migrate_asts(args: argparse.Namespace) -> int:
+    """Re-encode stored ASTs into another ast_format ('json' or 'binary')."""
+    from ck3raven.db.ast_cache import reencode_asts
+    from .writer_lock import WriterLock
+    
+    db_path = get_db_path()
+    lock = WriterLock(db_path)
+    if not lock.acquire():
+        print("[ERROR] Daemon is running - stop it first (qbuilder stop)")
+        return 1
+    
+    conn = get_connection()
+    try:
+        def db_bytes() -> int:
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            return page_count * page_size
+        
+        def progress(done: int, total: int) -> None:
+            print(f"  {done:,}/{total:,} rows", end='\r')
+        
+        size_before = db_bytes()
+        print(f"Re-encoding ASTs to '{args.format}'...")
+        stats = reencode_asts(conn, args.format, batch_size=args.batch_size,
+                              progress_callback=progress)
+        
+        if args.vacuum:
+            print("\nVacuuming database...")
+            conn.execute("VACUUM")
+        size_after = db_bytes()
+        
+        converted = stats['converted']
+        print("\n[OK] Migration complete:")
+        print(f"  Converted: {converted:,} / {stats['total']:,} (skipped {stats['skipped']:,})")
+        if converted:
+            ratio = stats['bytes_after'] / stats['bytes_before'] if stats['bytes_before'] else 0
+            print(f"  AST bytes: {stats['bytes_before']:,} -> {stats['bytes_after']:,} ({ratio:.0%})")
+            print(f"  Decode:    {stats['decode_sec_before']:.2f}s -> {stats['decode_sec_after']:.2f}s "
+                  f"(all converted rows, old -> new format)")
+        print(f"  DB size:   {size_before:,} -> {size_after:,} bytes"
+              + ("" if args.vacuum else " (run with --vacuum to reclaim free pages)"))
+        return 0
+    finally:
+        conn.close()
+        lock.release()
+
+
+def cmd_index_content(args: argparse.Namespace) -> int:
+    """Build the line index (content_line_index), and optionally the trigram index."""
+    from ck3raven.db.content import index_content_lines
+    from ck3raven.db.schema import close_all_connections, create_trigram_index
+    from .writer_lock import WriterLock
+    
+    db_path = get_db_path()
+    lock = WriterLock(db_path)
+    if not lock.acquire():
+        print("[ERROR] Daemon is running - stop it first (qbuilder stop)")
+        return 1
+    
+    # init_database() brings the schema up to date and registers the SQL
+    # functions that decode compressed contents
+    conn = init_database(db_path)
+    try:
+        start = time.time()
+        print("Indexing content lines...")
+        indexed = index_content_lines(conn, batch_size=args.batch_size)
+        print(f"[OK] Indexed {indexed:,} file contents in {time.time() - start:.1f}s")
+        
+        if args.trigram:
+            start = time.time()
+            print("Building trigram index...")
+            if create_trigram_index(conn):
+                print(f"[OK] Trigram index built in {time.time() - start:.1f}s")
+            else:
+                print("[OK] Trigram index already exists (kept in sync by triggers)")
+        return 0
+    finally:
+        close_all_connections()
+        lock.release()
+
+
+def cmd_bench_build(args: argparse.Namespace) -> int:
+    """
+    Measure build throughput versus batch size.
+    
+    Builds a throwaway database in a temp directory with synthetic script
+    files (or copies of --source *.txt files), then runs the build worker
+    over the same queue once per batch size. The real database is never
+    touched.
+    """
+    import os
+    import shutil
+    import tempfile
+    
+    from .discovery import _ensure_cvid, _enqueue_discovery
+    from ck3raven.db.schema import close_all_connections
+    
+    sizes = sorted({int(size) for size in args.sizes.split(',') if size.strip()})
+    
+    with tempfile.TemporaryDirectory(prefix='qbuilder-bench-') as tmp:
+        root = Path(tmp) / 'mod'
+        target = root / 'common' / 'scripted_effects'
+        target.mkdir(parents=True)
+        
+        if args.source:
+            sources = sorted(Path(args.source).rglob('*.txt'))[:args.files]
+            for i, path in enumerate(sources):
+                shutil.copyfile(path, target / f"{i:05d}_{path.name}")
+        else:
+            for i in range(args.files):
+                effects = "\n".join(
+                    f"bench_effect_{i}_{j} = {{\n    add_gold = {j}\n"
+                    f"    if = {{ limit = {{ has_trait = brave }} add_trait = ambitious }}\n}}"
+                    for j in range(args.symbols)
+                )
+                (target / f"bench_{i:05d}.txt").write_text(effects, encoding='utf-8')
+        
+        conn = init_database(Path(tmp) / 'bench.db')
+        init_qbuilder_schema(conn)
+        cvid = _ensure_cvid(conn, name='bench', source_path=str(root), workshop_id=None)
+        _enqueue_discovery(conn, cvid, time.time())
+        conn.commit()
+        discovered = run_discovery(conn)['files_discovered']
+        
+        print(f"Files: {discovered}  sizes: {sizes}")
+        if args.processes > 1:
+            print(f"Parse mode: pipeline ({args.processes} processes)")
+        else:
+            print(f"Parse mode: {'persistent pool' if os.environ.get('QBUILDER_PERSISTENT_PARSE') == '1' else 'subprocess per file'}")
+        print()
+        print(f"{'batch_size':>10} {'items':>7} {'sec':>8} {'items/sec':>10} {'speedup':>8}")
+        print("-" * 48)
+        
+        baseline = None
+        for size in sizes:
+            # Same queue and empty derived tables for every run
+            with BuilderSession(conn, "bench_build_reset"):
+                for table in ('symbols', 'refs', 'asts'):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.execute("""
+                    UPDATE build_queue
+                    SET status = 'pending', started_at = NULL, completed_at = NULL,
+                        lease_expires_at = NULL, lease_holder = NULL,
+                        retry_count = 0, reclaim_count = 0, error_message = NULL
+                """)
+                conn.commit()
+            
+            start = time.time()
+            result = run_build_worker(conn, continuous=False, batch_size=size, verbose=False,
+                                      defer_fts=args.defer_fts, processes=args.processes)
+            elapsed = time.time() - start
+            
+            rate = result['items_processed'] / elapsed if elapsed > 0 else 0
+            baseline = baseline or rate
+            print(f"{size:>10} {result['items_processed']:>7} {elapsed:>8.2f} "
+                  f"{rate:>10.1f} {rate / baseline if baseline else 0:>7.2f}x")
+        
+        conn.close()
+        close_all_connections()
+    
+    return 0
+
+
 def cmd_enqueue_file(args: argparse.Namespace) -> int:
     """Enqueue a single file for processing (flash priority by default)."""
     from .api import enqueue_file, PRIORITY_FLASH, PRIORITY_NORMAL
@@ -646,6 +832,12 @@ def main():
                                help='Maximum build items to process (for testing)')
     daemon_parser.add_argument('--poll-interval', type=float, default=5.0,
                                help='Seconds between polls when queue empty (default: 5)')
+    daemon_parser.add_argument('--batch-size', type=int, default=1,
+                               help='Items claimed and committed together (default: 1)')
+    daemon_parser.add_argument('--defer-fts', action='store_true',
+                               help='Rebuild symbol/ref FTS once the queue drains instead of per row')
+    daemon_parser.add_argument('--processes', type=int, default=1,
+                               help='Parse/extract in N processes; this one stays the only writer (default: 1)')
     daemon_parser.set_defaults(func=cmd_daemon)
     
     # init
@@ -658,6 +850,8 @@ def main():
                                  help='Only enqueue tasks, do not run')
     discover_parser.add_argument('--max-tasks', type=int, default=None,
                                  help='Maximum discovery tasks to process')
+    discover_parser.add_argument('--workers', type=int, default=1,
+                                 help='Roots walked and files hashed concurrently (default: 1)')
     discover_parser.set_defaults(func=cmd_discover)
     
     # build
@@ -668,6 +862,12 @@ def main():
                               help='Exit when queue empty instead of polling (for testing)')
     build_parser.add_argument('--poll-interval', type=float, default=5.0,
                               help='Seconds between polls when queue empty (default: 5)')
+    build_parser.add_argument('--batch-size', type=int, default=1,
+                              help='Items claimed and committed together (default: 1)')
+    build_parser.add_argument('--defer-fts', action='store_true',
+                              help='Rebuild symbol/ref FTS once the queue drains instead of per row')
+    build_parser.add_argument('--processes', type=int, default=1,
+                              help='Parse/extract in N processes; this one stays the only writer (default: 1)')
     build_parser.set_defaults(func=cmd_build)
     
     # run
@@ -684,6 +884,43 @@ def main():
                               help='Clear ALL data for fresh build')
     reset_parser.set_defaults(func=cmd_reset)
     
+    # migrate-asts
+    migrate_parser = subparsers.add_parser('migrate-asts',
+                                           help='Re-encode stored ASTs into another format')
+    migrate_parser.add_argument('--format', choices=['json', 'binary'], default='binary',
+                                help='Target ast_format (default: binary)')
+    migrate_parser.add_argument('--batch-size', type=int, default=500,
+                                help='Rows per transaction (default: 500)')
+    migrate_parser.add_argument('--vacuum', action='store_true',
+                                help='VACUUM afterwards to reclaim space')
+    migrate_parser.set_defaults(func=cmd_migrate_asts)
+    
+    # index-content
+    index_parser = subparsers.add_parser('index-content',
+                                         help='Build the line index used by content search')
+    index_parser.add_argument('--batch-size', type=int, default=500,
+                              help='Contents per transaction (default: 500)')
+    index_parser.add_argument('--trigram', action='store_true',
+                              help='Also build the trigram index for substring/regex search')
+    index_parser.set_defaults(func=cmd_index_content)
+    
+    # bench-build
+    bench_parser = subparsers.add_parser('bench-build',
+                                         help='Measure build throughput versus batch size')
+    bench_parser.add_argument('--sizes', default='1,8,32,128',
+                              help='Comma-separated batch sizes (default: 1,8,32,128)')
+    bench_parser.add_argument('--files', type=int, default=500,
+                              help='Number of files to build (default: 500)')
+    bench_parser.add_argument('--symbols', type=int, default=20,
+                              help='Definitions per synthetic file (default: 20)')
+    bench_parser.add_argument('--source', default=None,
+                              help='Copy *.txt files from this directory instead of synthesizing')
+    bench_parser.add_argument('--defer-fts', action='store_true',
+                              help='Build with deferred symbol/ref FTS maintenance')
+    bench_parser.add_argument('--processes', type=int, default=1,
+                              help='Parse/extract processes for every run (default: 1)')
+    bench_parser.set_defaults(func=cmd_bench_build)
+    
     # enqueue-file (for MCP flash updates)
     enqueue_parser = subparsers.add_parser('enqueue-file', 
                                            help='Enqueue a single file for processing')
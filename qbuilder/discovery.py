@@ -6,10 +6,16 @@ Crash-safe file enumeration with fingerprint binding.
 Key behaviors:
 - discovery_queue references cvid ONLY (paths derived via joins)
 - Every file gets upserted with fingerprint (mtime, size, hash)
+- Stat-first: files whose (mtime, size) match the stored row are not re-read
+- Files gone from disk are soft-deleted (files.deleted = 1)
 - Every file gets build_queue row with fingerprint binding
 - Commits frequently for crash safety
 - Resume via last_path_processed
 
+Parallel discovery (ParallelDiscovery, run_discovery(workers=N)) walks
+several roots and hashes their files on threads; the calling thread still
+does every write, in the same order as the serial path.
+
 No parallel constructs:
 - No root_type/root_path/root_name in queue
 - No files_discovered/files_queued counters
@@ -20,9 +26,11 @@ import hashlib
 import json
 import os
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Iterable, Iterator, Optional
 import sqlite3
 
 from ck3lens.paths import ROOT_GAME
@@ -41,6 +49,7 @@ class FileRecord:
     mtime: float      # Unix timestamp (seconds)
     size: int         # Bytes
     hash: str         # SHA256 hex
+    file_id: Optional[int] = None  # Set when the stored fingerprint still matches (not rehashed)
 
 
 def get_routing_table() -> dict:
@@ -86,6 +95,70 @@ def get_file_type(relpath: str, routing_table: dict) -> str:
     return routing_table.get('extension_to_type', {}).get(ext, 'unknown')
 
 
+class DiscoveryRouter:
+    """
+    Memoized get_envelope_for_file() / get_file_type() for bulk discovery.
+    
+    Path rules ending in '/' can only match the folder part of a relpath,
+    so their outcome is cached per folder. Any other rule (file names such
+    as 'credits.txt' or 'README') is still checked against the full path,
+    and the first matching rule in table order wins, exactly as in
+    get_envelope_for_file(). Extension routing is cached per extension.
+    """
+    
+    def __init__(self, routing_table: dict):
+        self.routing_table = routing_table
+        rules = routing_table.get('path_rules', [])
+        # (table index, lowered match, envelope)
+        self._folder_rules = [(i, r['match'].lower(), r['envelope'])
+                              for i, r in enumerate(rules) if r['match'].endswith('/')]
+        self._path_rules = [(i, r['match'].lower(), r['envelope'])
+                            for i, r in enumerate(rules) if not r['match'].endswith('/')]
+        self._folder_cache: dict[str, tuple[int, Optional[str]]] = {}
+        self._ext_cache: dict[str, tuple[str, str]] = {}
+    
+    def _folder_match(self, folder: str) -> tuple[int, Optional[str]]:
+        """First folder rule matching folder ('' or ending in '/'), as (index, envelope)."""
+        cached = self._folder_cache.get(folder)
+        if cached is None:
+            cached = next(((i, env) for i, match, env in self._folder_rules if match in folder),
+                          (len(self._folder_rules) + len(self._path_rules), None))
+            self._folder_cache[folder] = cached
+        return cached
+    
+    def _by_extension(self, ext: str) -> tuple[str, str]:
+        """(file_type, envelope) from the extension alone."""
+        cached = self._ext_cache.get(ext)
+        if cached is None:
+            file_type = self.routing_table.get('extension_to_type', {}).get(ext, 'unknown')
+            if ext in self.routing_table.get('skip_extensions', []):
+                envelope = 'E_SKIP'
+            else:
+                envelope = self.routing_table.get('type_to_envelope', {}).get(file_type, 'E_SKIP')
+            cached = self._ext_cache[ext] = (file_type, envelope)
+        return cached
+    
+    def route(self, relpath: str) -> tuple[str, str]:
+        """(file_type, envelope) for relpath."""
+        normalized = relpath.replace('\\', '/').lower()
+        split = normalized.rfind('/') + 1
+        
+        index, envelope = self._folder_match(normalized[:split])
+        for i, match, env in self._path_rules:
+            if i > index:
+                break
+            if match in normalized:
+                index, envelope = i, env
+                break
+        
+        # Same rule as PurePath.suffix
+        dot = normalized.rfind('.', split)
+        ext = normalized[dot:] if split < dot < len(normalized) - 1 else ''
+        
+        file_type, ext_envelope = self._by_extension(ext)
+        return file_type, envelope or ext_envelope
+
+
 def compute_file_fingerprint(filepath: Path) -> Optional[FileRecord]:
     """
     Compute complete fingerprint for a file.
@@ -113,37 +186,113 @@ def compute_file_fingerprint(filepath: Path) -> Optional[FileRecord]:
         return None
 
 
-def enumerate_files(root_path: Path, resume_after: Optional[str] = None) -> Iterator[FileRecord]:
+def load_stored_fingerprints(conn: sqlite3.Connection, cvid: int) -> dict[str, FileRecord]:
     """
-    Enumerate all files under root_path with fingerprints.
+    Load the fingerprints discovery last recorded for cvid.
     
-    Yields FileRecord for each file, sorted by relpath for deterministic resume.
+    Returns {relpath: FileRecord} for live files with a file_hash, with
+    file_id set. Soft-deleted rows are left out, so a file that reappears
+    is rehashed and revived.
+    """
+    rows = conn.execute("""
+        SELECT relpath, file_id, file_mtime, file_size, file_hash
+        FROM files
+        WHERE content_version_id = ? AND deleted = 0 AND file_hash IS NOT NULL
+    """, (cvid,))
+    return {
+        relpath: FileRecord(relpath=relpath, mtime=mtime, size=size, hash=file_hash,
+                            file_id=file_id)
+        for relpath, file_id, mtime, size, file_hash in rows
+    }
+
+
+def list_files(root_path: Path) -> list[tuple[str, Path]]:
+    """
+    List (relpath, path) for all files under root_path, sorted by relpath.
+    
+    The sort gives discovery its deterministic resume order. Like os.walk(),
+    symlinked directories are not followed and unreadable directories are
+    skipped.
     """
-    # Collect and sort for deterministic order
     all_files = []
-    for dirpath, _, filenames in os.walk(root_path):
-        for filename in filenames:
-            filepath = Path(dirpath) / filename
-            relpath = str(filepath.relative_to(root_path)).replace('\\', '/')
-            all_files.append((relpath, filepath))
+    pending = [(str(root_path), '')]
+    while pending:
+        dirpath, prefix = pending.pop()
+        try:
+            with os.scandir(dirpath) as entries:
+                for entry in entries:
+                    relpath = prefix + entry.name
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        all_files.append((relpath, Path(entry.path)))
+                    elif not entry.is_symlink():
+                        pending.append((entry.path, relpath + '/'))
+        except OSError:
+            continue
     
     all_files.sort(key=lambda x: x[0])
+    return all_files
+
+
+def _files_after(all_files: list[tuple[str, Path]],
+                 resume_after: Optional[str]) -> list[tuple[str, Path]]:
+    """The part of a sorted file listing after resume_after (all if None)."""
+    if resume_after is None:
+        return all_files
+    for i, (relpath, _) in enumerate(all_files):
+        if relpath == resume_after:
+            return all_files[i + 1:]
+    return []
+
+
+def _fingerprint(relpath: str, filepath: Path,
+                 stored: Optional[FileRecord]) -> Optional[FileRecord]:
+    """Stored record if the stat still matches, else a fresh fingerprint."""
+    if stored is not None:
+        try:
+            stat = filepath.stat()
+        except OSError:
+            return None
+        if stat.st_mtime == stored.mtime and stat.st_size == stored.size:
+            return stored
+    
+    record = compute_file_fingerprint(filepath)
+    if record:
+        record.relpath = relpath
+    return record
+
+
+def fingerprint_files(all_files: list[tuple[str, Path]], resume_after: Optional[str] = None,
+                      known: Optional[dict[str, FileRecord]] = None) -> Iterator[FileRecord]:
+    """
+    Fingerprint listed files, skipping those up to and including resume_after.
     
-    # Resume logic
-    past_resume = resume_after is None
+    A file whose stat (mtime, size) matches its entry in known is not read:
+    the stored record is yielded as is, with file_id set. Everything else is
+    hashed and yielded with file_id None.
+    """
+    known = known or {}
     
-    for relpath, filepath in all_files:
-        if not past_resume:
-            if relpath == resume_after:
-                past_resume = True
-            continue
-        
-        record = compute_file_fingerprint(filepath)
+    for relpath, filepath in _files_after(all_files, resume_after):
+        record = _fingerprint(relpath, filepath, known.get(relpath))
         if record:
-            record.relpath = relpath
             yield record
 
 
+def enumerate_files(root_path: Path, resume_after: Optional[str] = None,
+                    known: Optional[dict[str, FileRecord]] = None) -> Iterator[FileRecord]:
+    """
+    Enumerate all files under root_path with fingerprints.
+    
+    Yields FileRecord for each file, sorted by relpath for deterministic resume.
+    Files matching their stored stat in known are not rehashed.
+    """
+    yield from fingerprint_files(list_files(root_path), resume_after, known)
+
+
 def enqueue_playset_roots(conn: sqlite3.Connection, playset_path: Path) -> int:
     """
     Read playset JSON and enqueue discovery tasks for all content sources.
@@ -239,16 +388,17 @@ class IncrementalDiscovery:
     Processes one discovery_queue task at a time:
     1. Claim task with lease (cvid only)
     2. Resolve root path via canonical join
-    3. Enumerate files with fingerprints
+    3. Enumerate files with fingerprints (hash only files whose stat changed)
     4. Upsert files and build_queue rows
     5. Commit frequently
-    6. Mark complete
+    6. Soft-delete files no longer on disk, mark complete
     """
     
     def __init__(self, conn: sqlite3.Connection, worker_id: Optional[str] = None):
         self.conn = conn
         self.worker_id = worker_id or f"worker-{os.getpid()}"
         self.routing_table = get_routing_table()
+        self.router = DiscoveryRouter(self.routing_table)
     
     def claim_task(self) -> Optional[dict]:
         """Claim next available discovery task."""
@@ -286,13 +436,40 @@ class IncrementalDiscovery:
         """
         Process discovery task: enumerate files and enqueue build work.
         
-        Returns summary with file count.
+        Returns summary with file count, and how many files were hashed,
+        skipped as unchanged, and marked deleted.
+        """
+        root_path, error = self._resolve_root(task)
+        if error:
+            return {'error': error}
+        
+        # Stored fingerprints: unchanged files are not re-read, and files
+        # missing from disk are the ones to soft-delete
+        known = load_stored_fingerprints(self.conn, task['cvid'])
+        all_files = list_files(root_path)
+        records = fingerprint_files(all_files, task.get('last_path_processed'), known)
+        return self._write_task(task, root_path, known, all_files, records)
+    
+    def run(self, max_tasks: Optional[int] = None) -> list[dict]:
+        """Claim and process tasks one at a time. Returns per-task summaries."""
+        results = []
+        while not max_tasks or len(results) < max_tasks:
+            task = self.claim_task()
+            if not task:
+                break
+            results.append(self.process_task(task))
+        return results
+    
+    def _resolve_root(self, task: dict) -> tuple[Optional[Path], Optional[str]]:
+        """
+        Resolve the task's root path from content_versions.source_path.
+        
+        Returns (root_path, None), or (None, error) after marking the task
+        as error.
         """
         discovery_id = task['discovery_id']
         cvid = task['cvid']
-        resume_after = task.get('last_path_processed')
         
-        # Resolve root path from content_versions.source_path
         row = self.conn.execute("""
             SELECT cv.source_path
             FROM content_versions cv
@@ -300,25 +477,49 @@ class IncrementalDiscovery:
         """, (cvid,)).fetchone()
         
         if not row or not row[0]:
-            self._mark_error(discovery_id, f"No source_path for cvid={cvid}")
-            return {'error': f"No source_path for cvid={cvid}"}
+            error = f"No source_path for cvid={cvid}"
+            self._mark_error(discovery_id, error)
+            return None, error
         
         root_path = Path(row[0])
         
         if not root_path or not root_path.exists():
-            self._mark_error(discovery_id, f"Root path does not exist: {root_path}")
-            return {'error': f"Root path does not exist: {root_path}"}
+            error = f"Root path does not exist: {root_path}"
+            self._mark_error(discovery_id, error)
+            return None, error
+        
+        return root_path, None
+    
+    def _write_task(self, task: dict, root_path: Path, known: dict[str, FileRecord],
+                    all_files: list[tuple[str, Path]],
+                    records: Iterable[FileRecord]) -> dict:
+        """
+        Write a task's fingerprinted files in batches and mark it complete.
+        
+        records must come in all_files order, so last_path_processed is a
+        valid resume point after every commit.
+        """
+        discovery_id = task['discovery_id']
+        cvid = task['cvid']
         
         # Get display name for logging
         display_name = self._get_display_name(cvid)
         print(f"Processing: {display_name} ({root_path})")
         
+        deleted_ids = [
+            known[relpath].file_id
+            for relpath in known.keys() - {relpath for relpath, _ in all_files}
+        ]
+        
         file_count = 0
+        hashed = 0
         batch = []
         
-        for record in enumerate_files(root_path, resume_after):
+        for record in records:
             batch.append(record)
             file_count += 1
+            if record.file_id is None:
+                hashed += 1
             
             if len(batch) >= COMMIT_BATCH_SIZE:
                 self._commit_batch(cvid, batch, record.relpath, discovery_id)
@@ -329,6 +530,9 @@ class IncrementalDiscovery:
         if batch:
             self._commit_batch(cvid, batch, batch[-1].relpath, discovery_id)
         
+        if deleted_ids:
+            self._mark_deleted(deleted_ids)
+        
         # Mark complete
         now = time.time()
         self.conn.execute("""
@@ -338,8 +542,16 @@ class IncrementalDiscovery:
         """, (now, discovery_id))
         self.conn.commit()
         
-        print(f"  Discovered: {file_count} files")
-        return {'cvid': cvid, 'file_count': file_count}
+        skipped = file_count - hashed
+        print(f"  Discovered: {file_count} files "
+              f"({hashed} hashed, {skipped} unchanged, {len(deleted_ids)} deleted)")
+        return {
+            'cvid': cvid,
+            'file_count': file_count,
+            'hashed': hashed,
+            'skipped': skipped,
+            'deleted': len(deleted_ids),
+        }
     
     def _get_display_name(self, cvid: int) -> str:
         """Get human-readable name for cvid from content_versions."""
@@ -358,49 +570,78 @@ class IncrementalDiscovery:
         """
         Commit a batch of files atomically.
         
-        For each file:
-        1. Upsert into files with fingerprint
-        2. Route to envelope
+        The batch is staged in a temp table, then written set-based:
+        1. Upsert into files with fingerprint (unless unchanged)
+        2. Route to envelope (memoized, while staging)
         3. Upsert into build_queue with fingerprint binding
         """
         now = time.time()
         
-        for record in batch:
-            # Upsert file with fingerprint
-            file_type = get_file_type(record.relpath, self.routing_table)
-            cursor = self.conn.execute("""
-                INSERT INTO files (content_version_id, relpath, content_hash, 
-                                   file_type, file_mtime, file_size, file_hash)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT (content_version_id, relpath) DO UPDATE SET
-                    content_hash = excluded.content_hash,
-                    file_type = excluded.file_type,
-                    file_mtime = excluded.file_mtime,
-                    file_size = excluded.file_size,
-                    file_hash = excluded.file_hash
-                RETURNING file_id
-            """, (cvid, record.relpath, record.hash, file_type,
-                  record.mtime, record.size, record.hash))
-            
-            file_id = cursor.fetchone()[0]
-            
-            # Route to envelope
-            envelope = get_envelope_for_file(record.relpath, self.routing_table)
-            
-            # Skip queueing files with no work to do
-            if envelope == 'E_SKIP':
-                continue
-            
-            # Upsert build_queue with fingerprint binding (priority=0 for batch discovery)
-            self.conn.execute("""
-                INSERT INTO build_queue 
-                    (file_id, envelope, priority, work_file_mtime, work_file_size, 
-                     work_file_hash, status, created_at)
-                VALUES (?, ?, 0, ?, ?, ?, 'pending', ?)
-                ON CONFLICT (file_id, envelope, work_file_mtime, work_file_size, 
-                             COALESCE(work_file_hash, '')) 
-                DO NOTHING
-            """, (file_id, envelope, record.mtime, record.size, record.hash, now))
+        self.conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS discovery_stage (
+                relpath TEXT NOT NULL,
+                file_id INTEGER,
+                file_type TEXT,
+                envelope TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                hash TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("DELETE FROM temp.discovery_stage")
+        
+        # file_id is set for files unchanged since last discovery: their
+        # files row is current and is not rewritten
+        route = self.router.route
+        self.conn.executemany("""
+            INSERT INTO temp.discovery_stage
+                (relpath, file_id, file_type, envelope, mtime, size, hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (record.relpath, record.file_id, *route(record.relpath),
+             record.mtime, record.size, record.hash)
+            for record in batch
+        ])
+        
+        # Upsert (re)hashed files with fingerprint
+        self.conn.execute("""
+            INSERT INTO files (content_version_id, relpath, content_hash, 
+                               file_type, file_mtime, file_size, file_hash)
+            SELECT ?, relpath, hash, file_type, mtime, size, hash
+            FROM temp.discovery_stage
+            WHERE file_id IS NULL
+            ORDER BY rowid
+            ON CONFLICT (content_version_id, relpath) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                file_type = excluded.file_type,
+                file_mtime = excluded.file_mtime,
+                file_size = excluded.file_size,
+                file_hash = excluded.file_hash,
+                deleted = 0
+        """, (cvid,))
+        self.conn.execute("""
+            UPDATE temp.discovery_stage SET file_id = (
+                SELECT f.file_id FROM files f
+                WHERE f.content_version_id = ? AND f.relpath = discovery_stage.relpath
+            )
+            WHERE file_id IS NULL
+        """, (cvid,))
+        
+        # Upsert build_queue with fingerprint binding (priority=0 for batch
+        # discovery). For unchanged files this is a no-op unless the queue
+        # was reset. E_SKIP files have no work to do.
+        self.conn.execute("""
+            INSERT INTO build_queue 
+                (file_id, envelope, priority, work_file_mtime, work_file_size, 
+                 work_file_hash, status, created_at)
+            SELECT file_id, envelope, 0, mtime, size, hash, 'pending', ?
+            FROM temp.discovery_stage
+            WHERE envelope != 'E_SKIP'
+            ORDER BY rowid
+            ON CONFLICT (file_id, envelope, work_file_mtime, work_file_size, 
+                         COALESCE(work_file_hash, '')) 
+            DO NOTHING
+        """, (now,))
         
         # Update progress
         self.conn.execute("""
@@ -411,6 +652,19 @@ class IncrementalDiscovery:
         
         self.conn.commit()
     
+    def _mark_deleted(self, file_ids: list[int]) -> None:
+        """Soft-delete files that are gone from disk and drop their pending builds."""
+        for start in range(0, len(file_ids), COMMIT_BATCH_SIZE):
+            chunk = file_ids[start:start + COMMIT_BATCH_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            self.conn.execute(
+                f"UPDATE files SET deleted = 1 WHERE file_id IN ({placeholders})", chunk)
+            self.conn.execute(f"""
+                DELETE FROM build_queue
+                WHERE status = 'pending' AND file_id IN ({placeholders})
+            """, chunk)
+        self.conn.commit()
+    
     def _renew_lease(self, discovery_id: int) -> None:
         """Renew lease to prevent timeout."""
         lease_until = time.time() + DISCOVERY_LEASE_SECONDS
@@ -430,36 +684,113 @@ class IncrementalDiscovery:
         self.conn.commit()
 
 
-def run_discovery(conn: sqlite3.Connection, max_tasks: Optional[int] = None) -> dict:
+class ParallelDiscovery(IncrementalDiscovery):
+    """
+    Discovery over several roots at once.
+    
+    Up to `workers` tasks are claimed together. Their roots are walked on a
+    thread pool, and each file is fingerprinted on a second pool (hashlib
+    releases the GIL, so hashing scales with threads). This thread, the
+    only one using the connection, writes each root's results in relpath
+    order through _commit_batch(), so batching and last_path_processed
+    resume behave exactly as in the serial path.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, workers: int,
+                 worker_id: Optional[str] = None):
+        super().__init__(conn, worker_id)
+        self.workers = max(1, workers)
+        self._claimed: set[int] = set()
+    
+    @staticmethod
+    def _scan_root(root_path: Path, resume_after: Optional[str],
+                   known: dict[str, FileRecord],
+                   hash_pool: ThreadPoolExecutor) -> tuple[list, list[Future]]:
+        """Walk a root and queue its files for fingerprinting, in relpath order."""
+        all_files = list_files(root_path)
+        futures = [
+            hash_pool.submit(_fingerprint, relpath, filepath, known.get(relpath))
+            for relpath, filepath in _files_after(all_files, resume_after)
+        ]
+        return all_files, futures
+    
+    def run(self, max_tasks: Optional[int] = None) -> list[dict]:
+        """Claim and process tasks, `workers` roots in flight. Returns per-task summaries."""
+        results = []
+        claimed = 0
+        in_flight = deque()
+        
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='discovery-walk') as walk_pool, \
+             ThreadPoolExecutor(self.workers, thread_name_prefix='discovery-hash') as hash_pool:
+            try:
+                while True:
+                    while len(in_flight) < self.workers and (not max_tasks or claimed < max_tasks):
+                        task = self.claim_task()
+                        if not task:
+                            break
+                        claimed += 1
+                        root_path, error = self._resolve_root(task)
+                        if error:
+                            results.append({'error': error})
+                            continue
+                        known = load_stored_fingerprints(self.conn, task['cvid'])
+                        scan = walk_pool.submit(self._scan_root, root_path,
+                                                task.get('last_path_processed'), known, hash_pool)
+                        self._claimed.add(task['discovery_id'])
+                        in_flight.append((task, root_path, known, scan))
+                    
+                    if not in_flight:
+                        break
+                    
+                    task, root_path, known, scan = in_flight.popleft()
+                    all_files, futures = scan.result()
+                    records = (r for r in (f.result() for f in futures) if r)
+                    results.append(self._write_task(task, root_path, known, all_files, records))
+                    self._claimed.discard(task['discovery_id'])
+            finally:
+                # Don't hash roots nobody will write; their leases expire
+                for _, _, _, scan in in_flight:
+                    scan.cancel()
+                    if scan.done() and not scan.cancelled() and scan.exception() is None:
+                        for future in scan.result()[1]:
+                            future.cancel()
+        
+        return results
+    
+    def _renew_lease(self, discovery_id: int) -> None:
+        """Renew the lease of every claimed task, including those waiting to be written."""
+        lease_until = time.time() + DISCOVERY_LEASE_SECONDS
+        self.conn.executemany("""
+            UPDATE discovery_queue SET lease_expires_at = ?
+            WHERE discovery_id = ?
+        """, [(lease_until, i) for i in self._claimed | {discovery_id}])
+        self.conn.commit()
+
+
+def run_discovery(conn: sqlite3.Connection, max_tasks: Optional[int] = None,
+                  workers: int = 1) -> dict:
     """
     Run discovery worker until no more tasks.
     
     Args:
         conn: Database connection
         max_tasks: Maximum tasks to process (None = unlimited)
+        workers: Roots walked and files hashed concurrently (1 = serial)
     
     Returns summary of work done.
     """
-    discovery = IncrementalDiscovery(conn)
-    
-    tasks_processed = 0
-    total_files = 0
+    if workers > 1:
+        discovery = ParallelDiscovery(conn, workers)
+    else:
+        discovery = IncrementalDiscovery(conn)
     
-    while True:
-        if max_tasks and tasks_processed >= max_tasks:
-            break
-        
-        task = discovery.claim_task()
-        if not task:
-            break
-        
-        result = discovery.process_task(task)
-        tasks_processed += 1
-        
-        if 'file_count' in result:
-            total_files += result['file_count']
+    results = discovery.run(max_tasks)
+    completed = [result for result in results if 'file_count' in result]
     
     return {
-        'tasks_processed': tasks_processed,
-        'files_discovered': total_files,
+        'tasks_processed': len(results),
+        'files_discovered': sum(r['file_count'] for r in completed),
+        'files_hashed': sum(r['hashed'] for r in completed),
+        'files_skipped': sum(r['skipped'] for r in completed),
+        'files_deleted': sum(r['deleted'] for r in completed),
     }
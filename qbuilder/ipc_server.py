@@ -34,6 +34,8 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable, Optional
 
+from ck3raven.db.content import register_content_functions
+
 # Default port for daemon IPC
 DEFAULT_IPC_PORT = 19876  # High port, unlikely to conflict
 
@@ -130,6 +132,34 @@ class RunActivity:
                 result["mods_discovered"] = list(self._mods_discovered)
             return result
 
+
+class WorkSignal:
+    """
+    Wakes the build worker when new work is enqueued.
+    
+    Shared between the IPC server (handler threads, notify) and the build
+    worker (main thread, wait). An idle worker sleeps until notified, so
+    flash-priority edits are claimed immediately instead of on the next
+    poll; poll_interval remains only as a fallback for work enqueued by
+    other processes.
+    
+    A notify() that arrives while the worker is busy is kept, so the next
+    wait() returns at once and the worker re-checks the queue.
+    """
+    
+    def __init__(self) -> None:
+        self._event = threading.Event()
+    
+    def notify(self) -> None:
+        """Signal that work was enqueued (or that the worker should re-check shutdown)."""
+        self._event.set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep until notified or timeout. Returns True if notified."""
+        notified = self._event.wait(timeout)
+        self._event.clear()
+        return notified
+
 # Socket file for Unix domain sockets (alternative to TCP)
 DEFAULT_SOCKET_PATH = Path.home() / ".ck3raven" / "daemon.sock"
 
@@ -181,6 +211,7 @@ class DaemonIPCServer:
         db_path: Optional[Path] = None,
         shutdown_callback: Optional[Callable[[], None]] = None,
         run_activity: Optional[RunActivity] = None,
+        work_signal: Optional[WorkSignal] = None,
     ):
         self.conn = conn  # Main thread connection (not used in handlers)
         self.port = port
@@ -188,6 +219,7 @@ class DaemonIPCServer:
         self.db_path = db_path  # Store for thread-local connections
         self.shutdown_callback = shutdown_callback  # Called on shutdown request
         self.run_activity = run_activity  # Shared activity tracker (thread-safe)
+        self.work_signal = work_signal  # Wakes the build worker after enqueues
         
         self._server_socket: Optional[socket.socket] = None
         self._running = False
@@ -210,6 +242,7 @@ class DaemonIPCServer:
                 # Open read-only - handlers only query, never write
                 db_uri = f"file:{self.db_path}?mode=ro"
                 self._thread_local.conn = sqlite3.connect(db_uri, uri=True, timeout=30.0)
+                register_content_functions(self._thread_local.conn)
             else:
                 # Fallback: try to get path from main conn (may not work)
                 raise RuntimeError("db_path not set - cannot create handler connection")
@@ -231,6 +264,7 @@ class DaemonIPCServer:
         
         conn = sqlite3.connect(str(self.db_path), timeout=30.0)
         conn.execute("PRAGMA busy_timeout = 30000")  # 30 second busy wait
+        register_content_functions(conn)
         return conn
     
     def _register_handlers(self) -> None:
@@ -241,6 +275,7 @@ class DaemonIPCServer:
             "enqueue_files": self._handle_enqueue_files,
             "enqueue_scan": self._handle_enqueue_scan,
             "await_idle": self._handle_await_idle,
+            "register_conflict_playset": self._handle_register_conflict_playset,
             "shutdown": self._handle_shutdown,
         }
     
@@ -271,6 +306,9 @@ class DaemonIPCServer:
                 pass
         if self._thread:
             self._thread.join(timeout=5.0)
+        
+        from qbuilder.pipeline import stop_flash_process
+        stop_flash_process()
     
     def _accept_loop(self) -> None:
         """Main accept loop running in background thread."""
@@ -423,8 +461,12 @@ class DaemonIPCServer:
         return result
     
     def _handle_enqueue_files(self, request: IPCRequest) -> dict:
-        """Handle file enqueue request."""
-        from qbuilder.api import enqueue_file
+        """Handle file enqueue request.
+        
+        High-priority files (agent edits) are flash-built before responding;
+        any that cannot be built quickly stay queued for the worker.
+        """
+        from qbuilder.api import enqueue_file, flash_build
         
         paths = request.params.get("paths", [])
         priority = request.params.get("priority", "normal")
@@ -434,12 +476,27 @@ class DaemonIPCServer:
         
         enqueued = 0
         deduped = 0
+        built = 0
+        queued = 0
         
         for path_str in paths:
             path = Path(path_str)
             # For now, we need mod_name and rel_path
             # The client should provide these, or we derive from path
             # This is a simplification - real impl would resolve path to mod
+            if priority_int:
+                flash = flash_build(
+                    mod_name=request.params.get("mod_name", "unknown"),
+                    rel_path=str(path.name),  # Simplified
+                )
+                if flash.build_id is not None:
+                    enqueued += 1
+                    if flash.status in ('completed', 'error'):
+                        built += 1
+                    else:
+                        queued += 1
+                continue
+            
             result = enqueue_file(
                 mod_name=request.params.get("mod_name", "unknown"),
                 rel_path=str(path.name),  # Simplified
@@ -450,8 +507,12 @@ class DaemonIPCServer:
                     deduped += 1
                 else:
                     enqueued += 1
+                    queued += 1
+        
+        if queued and self.work_signal:
+            self.work_signal.notify()
         
-        return {"enqueued": enqueued, "deduped": deduped}
+        return {"enqueued": enqueued, "deduped": deduped, "built": built}
     
     def _handle_enqueue_scan(self, request: IPCRequest) -> dict:
         """Handle discovery scan request."""
@@ -484,6 +545,9 @@ class DaemonIPCServer:
             discovery_result = run_discovery(write_conn)
             files_discovered = discovery_result.get('files_discovered', 0)
             
+            if self.work_signal:
+                self.work_signal.notify()
+            
             return {
                 "scheduled": True, 
                 "discovery_tasks_enqueued": count,
@@ -515,6 +579,34 @@ class DaemonIPCServer:
         pending = counts.get('build', {}).get('pending', 0)
         return {"idle": False, "queue_pending": pending, "timeout": True}
     
+    def _handle_register_conflict_playset(self, request: IPCRequest) -> dict:
+        """Handle conflict index registration for a playset's content versions.
+        
+        A new playset is indexed in full before responding; an indexed one is
+        brought up to date. The build worker keeps it current afterwards.
+        """
+        from src.ck3raven.db.conflicts import register_conflict_playset
+        
+        cvids = request.params.get("cvids", [])
+        if not cvids:
+            return {"error": "cvids required"}
+        
+        start = time.time()
+        write_conn = self._get_handler_write_conn()
+        try:
+            playset_id = register_conflict_playset(write_conn, cvids)
+            row_count = write_conn.execute(
+                "SELECT COUNT(*) FROM playset_symbol_conflicts WHERE playset_id = ?",
+                (playset_id,),
+            ).fetchone()[0]
+            return {
+                "playset_id": playset_id,
+                "conflict_rows": row_count,
+                "elapsed_ms": (time.time() - start) * 1000,
+            }
+        finally:
+            write_conn.close()
+    
     def _handle_shutdown(self, request: IPCRequest) -> dict:
         """Handle shutdown request."""
         graceful = request.params.get("graceful", True)
@@ -526,6 +618,10 @@ class DaemonIPCServer:
         if self.shutdown_callback:
             self.shutdown_callback()
         
+        # Wake an idle worker so it sees the shutdown now
+        if self.work_signal:
+            self.work_signal.notify()
+        
         return {"acknowledged": True, "graceful": graceful}
 
 
@@ -0,0 +1,412 @@
+"""
+QBuilder Build Pipeline — parse/extract fan-out with a single writer.
+
+The build worker's CPU time goes to parsing and symbol/ref extraction; its
+database time is a few bulk INSERTs per file. This module moves the CPU part
+into N long-lived processes while the database stays with the one process
+holding the writer lock (see docs/SINGLE_WRITER_ARCHITECTURE.md):
+
+    writer (run_build_worker)          pipeline processes (N)
+    -------------------------          ----------------------
+    claim_batch()  ── task ──────────> read file, parse, encode AST,
+                                       extract symbols + refs
+    process_batch() <── result ─────── (ast_blob, symbol rows, ref rows)
+      INSERT asts / symbols / refs
+      group commit
+
+Pipeline processes never open the database. Results are plain bytes and
+tuples (symbols_to_rows() / refs_to_rows() layout), which are cheap to
+pickle, and the writer applies them through the normal envelope steps, so
+content dedup, error isolation and group commit behave exactly as in the
+single-process worker.
+
+Each process has one task in flight at a time. A task that outlives the
+parse timeout gets its process killed and replaced, and the item fails with
+ParseTimeoutError (permanent, same as the subprocess parser runtime).
+
+Usage:
+    pipeline = BuildPipeline(processes=4)
+    pipeline.start()
+    try:
+        worker.process_batch(worker.claim_batch(64), pipeline=pipeline)
+    finally:
+        pipeline.shutdown()
+
+Or simply run_build_worker(conn, processes=4).
+"""
+
+from __future__ import annotations
+
+import importlib
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Steps a pipeline process can run; envelopes with any other step are built
+# by the writer itself
+PIPELINE_STEPS = frozenset({'parse', 'extract_symbols', 'extract_refs'})
+
+# run_build_worker() claims at least this many items per process per batch
+PIPELINE_ITEMS_PER_PROCESS = 8
+
+# Seconds to wait for a new process to import the parser and report ready
+STARTUP_TIMEOUT_SECONDS = 30.0
+
+# Seconds to wait for a process to exit on shutdown before killing it
+SHUTDOWN_GRACE_SECONDS = 5.0
+
+
+class PipelineStartupError(Exception):
+    """Raised when a pipeline process does not come up.
+
+    Typically a script that starts the build without an
+    ``if __name__ == "__main__":`` guard (processes are spawned, which
+    re-imports the main module).
+    """
+    pass
+
+
+def _universal_newlines(text: str) -> str:
+    """Translate \\r\\n and lone \\r to \\n, like text-mode open()."""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def compute_item(task: dict) -> dict:
+    """
+    Parse and extract one file. Runs in a pipeline process.
+
+    Args:
+        task: {'abspath', 'relpath', 'work_hash', 'ast_format', 'extract'}
+
+    Returns:
+        {'ok': True, 'ast_blob', 'ast_format', 'node_count', 'symbol_rows', 'ref_rows'}
+        or {'ok': False, 'error_type', 'error'}
+    """
+    try:
+        # Same package path as ast_serde's own parser import, so its
+        # isinstance() checks see the parser's node classes
+        from ck3raven.db.symbols import (
+            extract_symbols_and_refs_from_ast,
+            refs_to_rows,
+            symbols_to_rows,
+        )
+        from ck3raven.parser.ast_serde import ast_to_dict, count_ast_nodes, encode_ast
+        from ck3raven.parser.parser import parse_source
+
+        path = Path(task['abspath'])
+        if not path.exists():
+            return {'ok': False, 'error_type': 'FileNotFoundError',
+                    'error': f"File not found: {path}"}
+
+        # One read serves both the parser and span extraction. The decodes
+        # match parser.parse_file() and worker._read_ck3_text() respectively;
+        # both read in text mode, so newlines are translated as open() does.
+        data = path.read_bytes()
+        try:
+            parse_text = source_text = _universal_newlines(data.decode('utf-8-sig'))
+        except UnicodeDecodeError:
+            parse_text = _universal_newlines(data.decode('utf-8-sig', errors='replace'))
+            source_text = _universal_newlines(data.decode('latin-1'))
+
+        ast_dict = ast_to_dict(parse_source(parse_text, str(path)))
+        result = {
+            'ok': True,
+            'ast_blob': encode_ast(ast_dict, task['ast_format']),
+            'ast_format': task['ast_format'],
+            'node_count': count_ast_nodes(ast_dict),
+            'symbol_rows': None,
+            'ref_rows': None,
+        }
+
+        if task['extract']:
+            symbols, refs = extract_symbols_and_refs_from_ast(
+                ast_dict, task['relpath'], task['work_hash'] or '', source_text
+            )
+            result['symbol_rows'] = symbols_to_rows(symbols)
+            result['ref_rows'] = refs_to_rows(refs)
+
+        return result
+
+    except Exception as e:
+        return {'ok': False, 'error_type': type(e).__name__, 'error': str(e)}
+
+
+def _process_main(conn) -> None:
+    """Pipeline process loop: one task in, one result out, until None or EOF."""
+    try:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # The writer handles Ctrl+C
+    except (ValueError, OSError):
+        pass
+
+    # Import the parser and extractors once, before reporting ready
+    # (ck3raven.db.symbols imports the parser through ast_serde)
+    importlib.import_module('ck3raven.db.symbols')
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            break
+        if task is None:
+            break
+        conn.send(compute_item(task))
+
+
+class _PipelineProcess:
+    """One pipeline process and the task it is working on."""
+
+    def __init__(self, ctx, index: int, name: Optional[str] = None):
+        self.index = index
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_process_main, args=(child_conn,),
+            name=name or f"qbuilder-pipeline-{index}", daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.item: Optional[dict] = None
+        self.deadline = 0.0
+
+        try:
+            ready = self.conn.poll(STARTUP_TIMEOUT_SECONDS) and self.conn.recv()
+        except (EOFError, OSError):
+            ready = None
+        if not ready or ready[0] != 'ready':
+            self.kill()
+            raise PipelineStartupError(
+                f"Pipeline process {index} did not start (exit code {self.process.exitcode})")
+
+    def submit(self, item: dict, task: dict, timeout: float) -> None:
+        self.conn.send(task)
+        self.item = item
+        self.deadline = time.time() + timeout
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(SHUTDOWN_GRACE_SECONDS)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+# Standing process for flash builds (BuildWorker.flash_build), started on
+# first use and replaced after a timeout
+_flash_process: Optional[_PipelineProcess] = None
+_flash_lock = threading.Lock()
+
+
+def start_flash_process() -> None:
+    """Start the flash build process now rather than on the first flash build."""
+    global _flash_process
+    with _flash_lock:
+        if _flash_process is None or not _flash_process.process.is_alive():
+            _flash_process = _PipelineProcess(
+                multiprocessing.get_context('spawn'), 0, name="qbuilder-flash")
+
+
+def stop_flash_process() -> None:
+    """Stop the flash build process, if one is running."""
+    global _flash_process
+    with _flash_lock:
+        if _flash_process is not None:
+            _flash_process.stop()
+            _flash_process = None
+
+
+def compute_flash_item(task: dict, timeout: float) -> Optional[dict]:
+    """
+    Run compute_item(task) in the flash build process, within `timeout` seconds.
+
+    The process is spawned once and kept, so a flash build pays for the
+    parser import only on first use. A task that outlives the timeout gets
+    the process killed (the next call starts a fresh one) and returns None,
+    as does a process that cannot be started.
+    """
+    global _flash_process
+    try:
+        start_flash_process()
+    except PipelineStartupError:
+        return None
+
+    with _flash_lock:
+        worker = _flash_process
+        try:
+            worker.conn.send(task)
+            if worker.conn.poll(timeout):
+                return worker.conn.recv()
+        except (EOFError, OSError, ValueError):
+            worker.kill()
+            _flash_process = None
+            return {'ok': False, 'error_type': 'PipelineProcessError',
+                    'error': "flash build process exited while building"}
+
+        worker.kill()
+        _flash_process = None
+        return None
+
+
+class BuildPipeline:
+    """
+    Pool of parse/extract processes feeding one writer connection.
+
+    Not thread-safe: use from the thread that owns the writer connection.
+    """
+
+    def __init__(self, processes: int, timeout: Optional[float] = None):
+        from src.ck3raven.parser.runtime import DEFAULT_PARSE_TIMEOUT
+
+        self.num_processes = max(1, processes)
+        self.timeout = timeout or DEFAULT_PARSE_TIMEOUT
+        # spawn everywhere: no inherited SQLite handles, same behavior as Windows
+        self._ctx = multiprocessing.get_context('spawn')
+        self._workers: list[_PipelineProcess] = []
+        self._envelope_steps: dict = {}
+        self.stats = {'computed': 0, 'timeouts': 0, 'crashes': 0}
+
+    def start(self) -> None:
+        """Spawn the pipeline processes."""
+        from qbuilder.worker import EnvelopeExecutor
+
+        self._envelope_steps = EnvelopeExecutor.load_envelope_steps()
+        self._workers = [_PipelineProcess(self._ctx, i) for i in range(self.num_processes)]
+
+    def shutdown(self) -> None:
+        """Stop all processes (idle ones exit cleanly, busy ones are killed)."""
+        for worker in self._workers:
+            if worker.item is not None:
+                worker.kill()
+            else:
+                worker.stop()
+        self._workers = []
+
+    def __enter__(self) -> "BuildPipeline":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def _replace(self, worker: _PipelineProcess) -> None:
+        """Kill a process (hung or dead) and start a fresh one in its slot."""
+        worker.kill()
+        self._workers[worker.index] = _PipelineProcess(self._ctx, worker.index)
+
+    def _wants_pipeline(self, item: dict) -> bool:
+        steps = self._envelope_steps.get(item['envelope'], [])
+        return 'parse' in steps and PIPELINE_STEPS.issuperset(steps)
+
+    def prepare(self, conn: sqlite3.Connection, items: list[dict]) -> Iterator[dict]:
+        """
+        Yield items ready for BuildWorker.process_item(), in completion order.
+
+        Items whose envelope the pipeline can build, and whose content has
+        no AST yet, are computed in the pipeline processes and yielded with
+        item['prepared'] set. Everything else (lookup envelopes, content
+        already parsed, repeats of content in flight) is yielded for the
+        writer to build itself while the processes are busy.
+
+        The writer works between yields, so processes stay busy while it
+        writes the previous result.
+        """
+        from src.ck3raven.parser.ast_serde import get_ast_format
+        from src.ck3raven.parser.runtime import ParseTimeoutError
+        from qbuilder.worker import PreparedItem, partition_parse_work
+
+        ast_format = get_ast_format()
+
+        queued, local, repeats = partition_parse_work(conn, items, self._wants_pipeline)
+        # Largest first, so a big file never starts last and holds up the batch;
+        # pop() takes from the end
+        queued.sort(key=lambda item: item['work_size'] or 0)
+
+        def fill() -> None:
+            for worker in self._workers:
+                if worker.item is None and queued:
+                    item = queued.pop()
+                    task = {
+                        'abspath': str(item['abspath']),
+                        'relpath': item['relpath'],
+                        'work_hash': item['work_hash'],
+                        'ast_format': ast_format,
+                        'extract': 'extract_symbols' in self._envelope_steps[item['envelope']],
+                    }
+                    try:
+                        worker.submit(item, task, self.timeout)
+                    except (OSError, ValueError):
+                        self.stats['crashes'] += 1
+                        self._replace(worker)
+                        queued.append(item)
+
+        def fail(item: dict, error: Exception) -> dict:
+            return {**item, 'prepared': PreparedItem(error=error)}
+
+        try:
+            fill()
+            yield from local
+
+            while True:
+                busy = [w for w in self._workers if w.item is not None]
+                if not busy:
+                    break
+
+                now = time.time()
+                ready = wait([w.conn for w in busy],
+                             timeout=max(0.0, min(w.deadline for w in busy) - now))
+
+                finished = []
+                for worker in busy:
+                    item = worker.item
+                    if worker.conn in ready:
+                        try:
+                            result = worker.conn.recv()
+                        except (EOFError, OSError):
+                            # Process died mid-item (e.g. killed, out of memory)
+                            self.stats['crashes'] += 1
+                            self._replace(worker)
+                            finished.append(fail(item, RuntimeError(
+                                "PipelineProcessError: pipeline process exited while building")))
+                            continue
+                        worker.item = None
+                        self.stats['computed'] += 1
+                        finished.append({**item, 'prepared': PreparedItem.from_result(result)})
+                    elif time.time() >= worker.deadline:
+                        self.stats['timeouts'] += 1
+                        self._replace(worker)
+                        finished.append(fail(item, ParseTimeoutError(
+                            str(item['abspath']), int(self.timeout))))
+
+                # Hand out new work before the writer takes over
+                fill()
+                yield from finished
+
+            yield from repeats
+
+        finally:
+            # Abandoned mid-batch: results still in flight belong to nobody
+            for worker in self._workers:
+                if worker.item is not None:
+                    self._replace(worker)
+
+    def get_stats(self) -> dict:
+        """Process count and counters since start."""
+        return {
+            'processes': self.num_processes,
+            'alive': sum(1 for w in self._workers if w.process.is_alive()),
+            **self.stats,
+        }
@@ -108,8 +108,13 @@ CREATE UNIQUE INDEX IF NOT EXISTS idx_build_unique_work
     ON build_queue(file_id, envelope, work_file_mtime, work_file_size, COALESCE(work_file_hash, ''));
 
 -- Claim order: priority DESC (flash first), then build_id ASC (FIFO within priority)
-CREATE INDEX IF NOT EXISTS idx_build_claim 
-    ON build_queue(status, priority DESC, build_id);
+-- Partial: only pending rows, so the index stays small however many rows
+-- have been built
+CREATE INDEX IF NOT EXISTS idx_build_pending
+    ON build_queue(priority DESC, build_id) WHERE status = 'pending';
+-- Expired-lease recovery looks at processing rows only
+CREATE INDEX IF NOT EXISTS idx_build_leased
+    ON build_queue(lease_expires_at) WHERE status = 'processing';
 CREATE INDEX IF NOT EXISTS idx_build_file 
     ON build_queue(file_id);
 """
@@ -120,6 +125,9 @@ def init_qbuilder_schema(conn: sqlite3.Connection) -> None:
     # Create queue tables
     conn.executescript(QBUILDER_SCHEMA_SQL)
     
+    # Full-table claim index, replaced by the partial idx_build_pending
+    conn.execute("DROP INDEX IF EXISTS idx_build_claim")
+    
     # Add fingerprint columns to files table if they don't exist
     _add_column_if_missing(conn, 'files', 'file_mtime', 'REAL')
     _add_column_if_missing(conn, 'files', 'file_size', 'INTEGER')
@@ -164,6 +172,8 @@ def reset_qbuilder_tables(conn: sqlite3.Connection) -> None:
     drop_sql = """
         DROP INDEX IF EXISTS idx_build_unique_work;
         DROP INDEX IF EXISTS idx_build_claim;
+        DROP INDEX IF EXISTS idx_build_pending;
+        DROP INDEX IF EXISTS idx_build_leased;
         DROP INDEX IF EXISTS idx_build_file;
         DROP INDEX IF EXISTS idx_discovery_claim;
         DROP TABLE IF EXISTS build_queue;
@@ -173,6 +183,37 @@ def reset_qbuilder_tables(conn: sqlite3.Connection) -> None:
     init_qbuilder_schema(conn)
 
 
+def compact_build_queue(conn: sqlite3.Connection) -> int:
+    """
+    Delete finished build_queue rows that no longer carry information.
+    
+    A completed or error row is kept while it is the newest row for its
+    (file_id, envelope): its fingerprint is what stops rediscovery from
+    enqueueing unchanged files again. Older finished rows for the same
+    file and envelope, and finished rows whose file no longer exists or
+    is marked deleted, are removed. The queue then stays proportional to the number of files
+    instead of growing with every edit.
+    
+    Returns count of rows deleted.
+    """
+    cursor = conn.execute("""
+        DELETE FROM build_queue
+        WHERE status IN ('completed', 'error')
+          AND (EXISTS (
+                  SELECT 1 FROM build_queue newer
+                  WHERE newer.file_id = build_queue.file_id
+                    AND newer.envelope = build_queue.envelope
+                    AND newer.build_id > build_queue.build_id
+              )
+              OR NOT EXISTS (
+                  SELECT 1 FROM files f
+                  WHERE f.file_id = build_queue.file_id AND f.deleted = 0
+              ))
+    """)
+    conn.commit()
+    return cursor.rowcount
+
+
 def get_queue_counts(conn: sqlite3.Connection) -> dict:
     """Get current queue status counts."""
     discovery = {}
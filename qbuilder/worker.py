@@ -25,10 +25,14 @@ import sys
 import threading
 import time
 import traceback
-from dataclasses import dataclass
+from contextlib import nullcontext
+from dataclasses import dataclass, field
 from qbuilder.lookup_extractors import LOOKUP_EXECUTORS
 from pathlib import Path
-from typing import Callable, Optional
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from qbuilder.pipeline import BuildPipeline
 
 # Lease duration in seconds
 BUILD_LEASE_SECONDS = 180  # 3 minutes
@@ -43,6 +47,22 @@ MAX_RECLAIMS = 3
 # Timeout for processing a single item (seconds)
 ITEM_TIMEOUT_SECONDS = 120  # 2 minutes
 
+# Expired leases are recovered at most this often (seconds), not per claim
+LEASE_RECOVERY_INTERVAL = 30.0
+
+# Finished build_queue rows are compacted at most this often (seconds)
+QUEUE_COMPACT_INTERVAL = 3600.0
+
+# Seconds a flash build may parse in the flash process before the item is
+# handed back to the queue (and its subprocess parse timeout)
+FLASH_PARSE_TIMEOUT = 2.0
+
+# Playset conflict indexes are refreshed at most this often (seconds) while
+# building, and whenever the queue drains. Mid-build refreshes are
+# incremental only; a playset whose backlog needs a full rebuild waits for
+# the drain.
+CONFLICT_REFRESH_INTERVAL = 30.0
+
 
 def _safe_print(msg: str) -> None:
     """Print a message safely, handling Unicode encoding errors on Windows.
@@ -77,6 +97,35 @@ def _read_ck3_text(path: Path) -> str:
         return path.read_text(encoding='latin-1')
 
 
+@dataclass
+class PreparedItem:
+    """Parse/extract output computed off the writer (see qbuilder.pipeline).
+    
+    Symbol and ref rows are plain tuples in symbols_to_rows()/refs_to_rows()
+    layout; None when the envelope has no extract steps.
+    """
+    ast_blob: Optional[bytes] = None
+    ast_format: str = 'json'
+    node_count: int = 0
+    symbol_rows: Optional[list] = field(default=None, repr=False)
+    ref_rows: Optional[list] = field(default=None, repr=False)
+    # Raised by the parse step in place of parsing
+    error: Optional[Exception] = None
+    
+    @classmethod
+    def from_result(cls, result: dict) -> "PreparedItem":
+        """From a qbuilder.pipeline.compute_item() result."""
+        if not result['ok']:
+            return cls(error=RuntimeError(f"{result['error_type']}: {result['error']}"))
+        return cls(
+            ast_blob=result['ast_blob'],
+            ast_format=result['ast_format'],
+            node_count=result['node_count'],
+            symbol_rows=result['symbol_rows'],
+            ref_rows=result['ref_rows'],
+        )
+
+
 @dataclass
 class BuildContext:
     """Context for envelope execution, derived via canonical joins."""
@@ -90,6 +139,51 @@ class BuildContext:
     work_mtime: float
     work_size: int
     work_hash: Optional[str]
+    # Per-item state shared between steps, so each file costs one AST
+    # decode, one source read and one traversal
+    ast_id: Optional[int] = None
+    ast_data: Optional[dict] = None
+    source_text: Optional[str] = None
+    pending_ref_rows: Optional[list] = field(default=None, repr=False)
+    prepared: Optional[PreparedItem] = None
+
+
+def partition_parse_work(
+    conn: sqlite3.Connection,
+    items: list[dict],
+    wants_parse: Callable[[dict], bool],
+) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    Split claimed items for parsing outside the writer's own steps.
+    
+    Returns (to_parse, local, repeats):
+        to_parse: items to parse elsewhere, one per distinct content hash
+        local: items the writer builds itself (wants_parse is False, or an
+            AST for the content already exists)
+        repeats: items whose content is also in to_parse; build them after
+            it, when the AST exists (content dedup)
+    """
+    hashes = list({item['work_hash'] for item in items if item['work_hash']})
+    parsed = set()
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        parsed.update(row[0] for row in conn.execute(f"""
+            SELECT content_hash FROM asts
+            WHERE parser_version_id = 1 AND content_hash IN ({','.join('?' * len(chunk))})
+        """, chunk))
+    
+    to_parse, local, repeats = [], [], []
+    in_flight = set()
+    for item in items:
+        content_hash = item['work_hash']
+        if not wants_parse(item) or content_hash in parsed:
+            local.append(item)
+        elif content_hash and content_hash in in_flight:
+            repeats.append(item)
+        else:
+            in_flight.add(content_hash)
+            to_parse.append(item)
+    return to_parse, local, repeats
 
 
 class EnvelopeExecutor:
@@ -103,23 +197,31 @@ class EnvelopeExecutor:
     def __init__(self, conn: sqlite3.Connection):
         self.conn = conn
         
+        # When True, steps neither commit nor open their own BuilderSession;
+        # BuildWorker.process_batch() owns the transaction and the session
+        self.group_commit = False
+        
         # Load routing table for envelope definitions
         self._load_envelope_steps()
     
     def _load_envelope_steps(self) -> None:
         """Load envelope step definitions from routing table."""
+        self.envelope_steps = self.load_envelope_steps()
+    
+    @staticmethod
+    def load_envelope_steps() -> dict:
+        """Envelope name -> step names, from routing_table.json."""
         routing_path = Path(__file__).parent / "routing_table.json"
         if routing_path.exists():
             with open(routing_path, 'r', encoding='utf-8') as f:
                 routing = json.load(f)
-            self.envelope_steps = routing.get('envelope_steps', {})
-        else:
-            self.envelope_steps = {
-                'E_SCRIPT': ['parse', 'extract_symbols', 'extract_refs'],
-                'E_LOC': ['parse_loc', 'extract_loc_entries'],
-                'E_GUI': ['parse'],
-                'E_SKIP': [],
-            }
+            return routing.get('envelope_steps', {})
+        return {
+            'E_SCRIPT': ['parse', 'extract_symbols', 'extract_refs'],
+            'E_LOC': ['parse_loc', 'extract_loc_entries'],
+            'E_GUI': ['parse'],
+            'E_SKIP': [],
+        }
     
     def execute(self, ctx: BuildContext) -> list[str]:
         """
@@ -145,6 +247,18 @@ class EnvelopeExecutor:
             # Unknown step - log but don't fail
             pass
     
+    def _commit(self) -> None:
+        """Commit step writes, unless a group commit is in progress."""
+        if not self.group_commit:
+            self.conn.commit()
+    
+    def _builder_session(self, purpose: str):
+        """BuilderSession for protected-table writes (the batch's own in group mode)."""
+        if self.group_commit:
+            return nullcontext()
+        from src.ck3raven.db.schema import BuilderSession
+        return BuilderSession(self.conn, purpose)
+    
     # =========================================================================
     # Step implementations
     # =========================================================================
@@ -161,6 +275,9 @@ class EnvelopeExecutor:
         which amortizes subprocess spawn + import overhead across many files.
         """
         from src.ck3raven.parser.parse_pool import is_pool_enabled, get_pool
+        from src.ck3raven.parser.ast_serde import (
+            AST_FORMAT_JSON, deserialize_ast, encode_ast, get_ast_format,
+        )
         from src.ck3raven.parser.runtime import (
             parse_file as runtime_parse_file,
             ParseTimeoutError,
@@ -182,13 +299,27 @@ class EnvelopeExecutor:
         if existing:
             # AST already exists for identical content - skip parsing
             # Symbol/ref extraction will use the existing AST
+            ctx.ast_id = existing[0]
             return
         
+        if ctx.prepared is not None:
+            # Already parsed by a pipeline process (run_build_worker(processes=N))
+            # or by a parse pool batch (BuildWorker._pool_prepare)
+            if ctx.prepared.error is not None:
+                raise ctx.prepared.error
+            self._insert_ast(ctx, ctx.prepared.ast_blob, ctx.prepared.ast_format,
+                             ctx.prepared.node_count)
+            return
+        
+        ast_format = get_ast_format()
+        
         # Choose parse method based on environment flag
         if is_pool_enabled():
             # Persistent worker pool - amortizes spawn overhead
+            # Workers encode in the configured ast_format directly
             pool = get_pool()
-            result = pool.parse_file(ctx.abspath, timeout_ms=DEFAULT_PARSE_TIMEOUT * 1000)
+            result = pool.parse_file(ctx.abspath, timeout_ms=DEFAULT_PARSE_TIMEOUT * 1000,
+                                     ast_format=ast_format)
         else:
             # Legacy subprocess-per-file (default until pool is proven)
             result = runtime_parse_file(ctx.abspath, timeout=DEFAULT_PARSE_TIMEOUT)
@@ -199,41 +330,91 @@ class EnvelopeExecutor:
             error_msg = result.error or "Unknown parse error"
             raise RuntimeError(f"{error_type}: {error_msg}")
         
+        # Pool results arrive as a blob (shared memory transport), subprocess
+        # results as inline JSON. Decode once and hand the dict to later
+        # steps, re-encoding if the result is not in the configured ast_format
+        if result.ast_blob is not None:
+            ast_blob, result_format = result.ast_blob, result.ast_format
+        else:
+            ast_blob, result_format = result.ast_json, AST_FORMAT_JSON
+        ctx.ast_data = deserialize_ast(ast_blob, result_format)
+        if ast_format != result_format:
+            ast_blob = encode_ast(ctx.ast_data, ast_format)
+        self._insert_ast(ctx, ast_blob, ast_format, result.node_count)
+    
+    def _insert_ast(self, ctx: BuildContext, ast_blob, ast_format: str, node_count: int) -> None:
+        """Store a freshly parsed AST and record its ast_id on ctx."""
         # Store AST - content deduplication means one AST per unique content_hash
         # Use INSERT OR IGNORE because UNIQUE(content_hash, parser_version_id) constraint
         # means identical content from different files shares one AST row.
         # The file_id column is vestigial (records which file triggered the parse)
         # and is NOT part of AST identity - see docs/CANONICAL_ARCHITECTURE.md Section 13.
-        self.conn.execute("""
+        cursor = self.conn.execute("""
             INSERT OR IGNORE INTO asts (file_id, content_hash, parser_version_id, ast_blob, 
                               ast_format, parse_ok, node_count, created_at)
-            VALUES (?, ?, 1, ?, 'json', 1, ?, datetime('now'))
-        """, (ctx.file_id, ctx.work_hash or '', result.ast_json, result.node_count))
+            VALUES (?, ?, 1, ?, ?, 1, ?, datetime('now'))
+        """, (ctx.file_id, ctx.work_hash or '', ast_blob, ast_format, node_count))
+        if cursor.rowcount == 1:
+            ctx.ast_id = cursor.lastrowid
+    
+    def _load_ast(self, ctx: BuildContext) -> Optional[int]:
+        """
+        Resolve ctx.ast_id for this content, fetching from asts if needed.
+        
+        The decoded AST is not loaded here; see _ensure_ast_data().
+        """
+        if ctx.ast_id is None:
+            # Get AST by content_hash (may be from different file_id due to deduplication)
+            row = self.conn.execute(
+                "SELECT ast_id FROM asts WHERE content_hash = ? AND parser_version_id = 1",
+                (ctx.work_hash or '',)
+            ).fetchone()
+            if row:
+                ctx.ast_id = row[0]
+        return ctx.ast_id
+    
+    def _ensure_ast_data(self, ctx: BuildContext) -> dict:
+        """Decode the AST for ctx.ast_id once per item (reused across steps)."""
+        if ctx.ast_data is None:
+            from src.ck3raven.parser.ast_serde import deserialize_ast
+            
+            ast_blob, ast_format = self.conn.execute(
+                "SELECT ast_blob, ast_format FROM asts WHERE ast_id = ?",
+                (ctx.ast_id,)
+            ).fetchone()
+            ctx.ast_data = deserialize_ast(ast_blob, ast_format)
+        return ctx.ast_data
+    
+    def _source_text(self, ctx: BuildContext) -> str:
+        """Read the file text once per item (reused across steps)."""
+        if ctx.source_text is None:
+            ctx.source_text = _read_ck3_text(ctx.abspath)
+        return ctx.source_text
     
     def _step_extract_symbols(self, ctx: BuildContext) -> None:
         """Extract symbols from AST with content-keyed storage.
         
         FLAG-DAY MIGRATION: Symbols bind to ast_id ONLY.
         File association derived via Golden Join: symbols → asts → files (via content_hash).
+        
+        Symbols and refs come from one fused traversal; the ref rows are kept
+        on ctx.pending_ref_rows for _step_extract_refs. Items prepared by a
+        pipeline process arrive with both row lists already built.
         """
         try:
-            from src.ck3raven.db.symbols import extract_symbols_from_ast
-            from src.ck3raven.db.schema import BuilderSession
+            from src.ck3raven.db.symbols import (
+                extract_symbols_and_refs_from_ast,
+                refs_to_rows,
+                store_symbol_rows,
+                symbols_to_rows,
+            )
         except ImportError:
             return
         
-        # Get AST by content_hash (may be from different file_id due to deduplication)
-        row = self.conn.execute(
-            "SELECT ast_id, ast_blob FROM asts WHERE content_hash = ? AND parser_version_id = 1",
-            (ctx.work_hash or '',)
-        ).fetchone()
-        
-        if not row:
+        ast_id = self._load_ast(ctx)
+        if ast_id is None:
             return
         
-        ast_id, ast_blob = row
-        ast_data = json.loads(ast_blob)
-        
         # Check if symbols already extracted for this AST (content deduplication)
         existing = self.conn.execute(
             "SELECT 1 FROM symbols WHERE ast_id = ? LIMIT 1", (ast_id,)
@@ -243,52 +424,48 @@ class EnvelopeExecutor:
             # Symbols already extracted for this AST - skip (content dedup)
             return
         
-        # Read source text for node span extraction and hashing
-        source_text = ""
-        if ctx.abspath.exists():
-            source_text = _read_ck3_text(ctx.abspath)
-        
-        # extract_symbols_from_ast returns iterator of ExtractedSymbol dataclass
-        # Signature: (ast_dict, relpath, content_hash, source_text) -> Iterator[ExtractedSymbol]
-        symbols = list(extract_symbols_from_ast(ast_data, ctx.relpath, ctx.work_hash or '', source_text))
+        if ctx.prepared is not None and ctx.prepared.symbol_rows is not None:
+            rows = ctx.prepared.symbol_rows
+            ctx.pending_ref_rows = ctx.prepared.ref_rows
+        else:
+            ast_data = self._ensure_ast_data(ctx)
+            
+            # Read source text for node span extraction and hashing
+            source_text = self._source_text(ctx) if ctx.abspath.exists() else ""
+            
+            # Signature: (ast_dict, relpath, content_hash, source_text)
+            #   -> (List[ExtractedSymbol], List[ExtractedRef])
+            symbols, refs = extract_symbols_and_refs_from_ast(
+                ast_data, ctx.relpath, ctx.work_hash or '', source_text
+            )
+            rows = symbols_to_rows(symbols)
+            ctx.pending_ref_rows = refs_to_rows(refs)
         
         # Use BuilderSession to allow writes to protected symbols table
-        with BuilderSession(self.conn, f"extract_symbols:{ast_id}"):
+        with self._builder_session(f"extract_symbols:{ast_id}"):
             # Insert symbols bound to ast_id ONLY (content identity)
-            for sym in symbols:
-                self.conn.execute("""
-                    INSERT INTO symbols (ast_id, name, symbol_type, 
-                                         line_number, column_number,
-                                         node_hash_norm, node_start_offset, node_end_offset)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (ast_id, sym.name, sym.kind, sym.line, sym.column,
-                      sym.node_hash_norm, sym.node_start_offset, sym.node_end_offset))
-            self.conn.commit()
+            # No existing rows (checked above), so skip the replace DELETE
+            store_symbol_rows(self.conn, ast_id, rows, replace=False, commit=False)
+            self._commit()
     
     def _step_extract_refs(self, ctx: BuildContext) -> None:
         """Extract references from AST with content-keyed storage.
         
         FLAG-DAY MIGRATION: Refs bind to ast_id ONLY.
         File association derived via Golden Join: refs → asts → files (via content_hash).
+        
+        Uses the refs collected by _step_extract_symbols when it ran; walks
+        the AST only when symbols were already present (content dedup).
         """
         try:
-            from src.ck3raven.db.symbols import extract_refs_from_ast
-            from src.ck3raven.db.schema import BuilderSession
+            from src.ck3raven.db.symbols import extract_refs_from_ast, refs_to_rows, store_ref_rows
         except ImportError:
             return
         
-        # Get AST by content_hash (may be from different file_id due to deduplication)
-        row = self.conn.execute(
-            "SELECT ast_id, ast_blob FROM asts WHERE content_hash = ? AND parser_version_id = 1",
-            (ctx.work_hash or '',)
-        ).fetchone()
-        
-        if not row:
+        ast_id = self._load_ast(ctx)
+        if ast_id is None:
             return
         
-        ast_id, ast_blob = row
-        ast_data = json.loads(ast_blob)
-        
         # Check if refs already extracted for this AST (content deduplication)
         existing = self.conn.execute(
             "SELECT 1 FROM refs WHERE ast_id = ? LIMIT 1", (ast_id,)
@@ -298,20 +475,20 @@ class EnvelopeExecutor:
             # Refs already extracted for this AST - skip (content dedup)
             return
         
-        # extract_refs_from_ast returns iterator of ExtractedRef dataclass
-        # Signature: (ast_dict, relpath, content_hash) -> Iterator[ExtractedRef]
-        refs = list(extract_refs_from_ast(ast_data, ctx.relpath, ctx.work_hash or ''))
+        rows = ctx.pending_ref_rows
+        if rows is None and ctx.prepared is not None:
+            rows = ctx.prepared.ref_rows
+        if rows is None:
+            # Signature: (ast_dict, relpath, content_hash) -> Iterator[ExtractedRef]
+            rows = refs_to_rows(extract_refs_from_ast(
+                self._ensure_ast_data(ctx), ctx.relpath, ctx.work_hash or ''
+            ))
         
         # Use BuilderSession to allow writes to protected refs table
-        with BuilderSession(self.conn, f"extract_refs:{ast_id}"):
+        with self._builder_session(f"extract_refs:{ast_id}"):
             # Insert refs bound to ast_id ONLY (content identity)
-            for ref in refs:
-                self.conn.execute("""
-                    INSERT INTO refs (ast_id, name, ref_type, 
-                                      line_number, column_number)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (ast_id, ref.name, ref.kind, ref.line, ref.column))
-            self.conn.commit()
+            store_ref_rows(self.conn, ast_id, rows, replace=False, commit=False)
+            self._commit()
     
     def _step_parse_loc(self, ctx: BuildContext) -> None:
         """Parse YAML localization file."""
@@ -329,33 +506,33 @@ class EnvelopeExecutor:
     
     def _step_extract_characters(self, ctx: BuildContext) -> None:
         """Extract characters to character_lookup table."""
-        content = _read_ck3_text(ctx.abspath)
+        content = self._source_text(ctx)
         LOOKUP_EXECUTORS['extract_characters'](content, ctx.file_id, ctx.cvid, self.conn)
-        self.conn.commit()
+        self._commit()
     
     def _step_extract_provinces(self, ctx: BuildContext) -> None:
         """Extract provinces to province_lookup table."""
-        content = _read_ck3_text(ctx.abspath)
+        content = self._source_text(ctx)
         LOOKUP_EXECUTORS['extract_provinces'](content, ctx.file_id, ctx.cvid, self.conn)
-        self.conn.commit()
+        self._commit()
     
     def _step_extract_names(self, ctx: BuildContext) -> None:
         """Extract names to name_lookup table."""
-        content = _read_ck3_text(ctx.abspath)
+        content = self._source_text(ctx)
         LOOKUP_EXECUTORS['extract_names'](content, ctx.file_id, ctx.cvid, self.conn)
-        self.conn.commit()
+        self._commit()
     
     def _step_extract_holy_sites(self, ctx: BuildContext) -> None:
         """Extract holy sites to holy_site_lookup table."""
-        content = _read_ck3_text(ctx.abspath)
+        content = self._source_text(ctx)
         LOOKUP_EXECUTORS['extract_holy_sites'](content, ctx.file_id, ctx.cvid, self.conn)
-        self.conn.commit()
+        self._commit()
     
     def _step_extract_dynasties(self, ctx: BuildContext) -> None:
         """Extract dynasties to dynasty_lookup table."""
-        content = _read_ck3_text(ctx.abspath)
+        content = self._source_text(ctx)
         LOOKUP_EXECUTORS['extract_dynasties'](content, ctx.file_id, ctx.cvid, self.conn)
-        self.conn.commit()
+        self._commit()
 
 
 class BuildWorker:
@@ -367,10 +544,25 @@ class BuildWorker:
     Automatically recovers from crashed workers via lease expiration.
     """
     
+    # Claimed columns plus file context via canonical joins:
+    # build_queue.file_id → files → content_versions.source_path
+    _CLAIM_RETURNING = """build_id, file_id, envelope, priority,
+                      work_file_mtime, work_file_size, work_file_hash,
+                      (SELECT f.content_version_id FROM files f
+                       WHERE f.file_id = build_queue.file_id),
+                      (SELECT f.relpath FROM files f
+                       WHERE f.file_id = build_queue.file_id),
+                      (SELECT cv.source_path FROM files f
+                       JOIN content_versions cv ON f.content_version_id = cv.content_version_id
+                       WHERE f.file_id = build_queue.file_id)"""
+    
     def __init__(self, conn: sqlite3.Connection, worker_id: Optional[str] = None):
         self.conn = conn
         self.worker_id = worker_id or f"worker-{os.getpid()}"
         self.executor = EnvelopeExecutor(conn)
+        # Queue maintenance timers (run on the first claim, then periodically)
+        self._next_lease_recovery = 0.0
+        self._next_compaction = 0.0
     
     def recover_expired_leases(self) -> int:
         """
@@ -418,6 +610,34 @@ class BuildWorker:
         
         return recovered + marked_as_error
     
+    def run_maintenance(self, force: bool = False) -> dict:
+        """
+        Periodic queue upkeep, called from claim_batch().
+        
+        Recovers expired leases every LEASE_RECOVERY_INTERVAL and compacts
+        finished rows (schema.compact_build_queue) every
+        QUEUE_COMPACT_INTERVAL, instead of scanning on every claim. With
+        force=True both run now.
+        
+        Returns {'recovered', 'compacted'} counts (0 for tasks not due).
+        """
+        from qbuilder.schema import compact_build_queue
+        
+        now = time.time()
+        recovered = compacted = 0
+        
+        if force or now >= self._next_lease_recovery:
+            recovered = self.recover_expired_leases()
+            self._next_lease_recovery = now + LEASE_RECOVERY_INTERVAL
+        
+        if force or now >= self._next_compaction:
+            compacted = compact_build_queue(self.conn)
+            self._next_compaction = now + QUEUE_COMPACT_INTERVAL
+            if compacted:
+                _safe_print(f"[Maintenance] Compacted {compacted} finished build_queue rows")
+        
+        return {'recovered': recovered, 'compacted': compacted}
+    
     def claim_work(self) -> Optional[dict]:
         """
         Claim highest-priority pending work item.
@@ -425,73 +645,159 @@ class BuildWorker:
         Order: priority DESC (flash=1 first), then build_id ASC (FIFO within priority).
         Returns work item with all context resolved via joins.
         
-        Automatically recovers expired leases before claiming.
+        Expired leases are recovered periodically (see run_maintenance).
         """
-        now = time.time()
+        items = self.claim_batch(1)
+        return items[0] if items else None
+    
+    def claim_batch(self, limit: int) -> list[dict]:
+        """
+        Claim up to `limit` pending work items in one UPDATE ... RETURNING.
         
-        # First, recover any expired leases
-        self.recover_expired_leases()
+        Same order and lease semantics as claim_work(); every claimed item
+        gets its own lease. File context (cvid, relpath, root path) is
+        resolved inside the RETURNING clause, so a batch costs one statement
+        and one commit. Items whose file context cannot be resolved are
+        marked as errors and left out of the result.
+        """
+        self.run_maintenance()
         
+        now = time.time()
         lease_until = now + BUILD_LEASE_SECONDS
         
-        # Claim pending item (expired items already reset to pending above)
-        cursor = self.conn.execute("""
+        # Claim pending items (expired items are reset to pending by maintenance)
+        # Served by the partial index idx_build_pending
+        # Canonical join: build_queue.file_id → files → content_versions.source_path
+        rows = self.conn.execute(f"""
             UPDATE build_queue
             SET status = 'processing',
                 lease_expires_at = ?,
                 lease_holder = ?,
                 started_at = COALESCE(started_at, ?)
-            WHERE build_id = (
+            WHERE build_id IN (
                 SELECT build_id FROM build_queue
                 WHERE status = 'pending'
                 ORDER BY priority DESC, build_id ASC
-                LIMIT 1
+                LIMIT ?
             )
-            RETURNING build_id, file_id, envelope, priority,
-                      work_file_mtime, work_file_size, work_file_hash
-        """, (lease_until, self.worker_id, now))
-        
-        row = cursor.fetchone()
+            RETURNING {self._CLAIM_RETURNING}
+        """, (lease_until, self.worker_id, now, limit)).fetchall()
         self.conn.commit()
         
-        if not row:
-            return None
+        # RETURNING order is unspecified - restore claim order
+        rows.sort(key=lambda row: (-row[3], row[0]))
+        return self._claimed_items(rows)
+    
+    def claim_build(self, build_id: int) -> Optional[dict]:
+        """
+        Claim one specific item, if it is still pending.
+        
+        Same lease and file context as claim_batch(). Returns None when the
+        item is not pending (already claimed, completed or failed).
+        """
+        now = time.time()
+        rows = self.conn.execute(f"""
+            UPDATE build_queue
+            SET status = 'processing',
+                lease_expires_at = ?,
+                lease_holder = ?,
+                started_at = COALESCE(started_at, ?)
+            WHERE build_id = ? AND status = 'pending'
+            RETURNING {self._CLAIM_RETURNING}
+        """, (now + BUILD_LEASE_SECONDS, self.worker_id, now, build_id)).fetchall()
+        self.conn.commit()
         
-        build_id, file_id, envelope, priority, work_mtime, work_size, work_hash = row
+        items = self._claimed_items(rows)
+        return items[0] if items else None
+    
+    def _claimed_items(self, rows: list) -> list[dict]:
+        """Work item dicts for claimed rows (in _CLAIM_RETURNING layout)."""
+        items = []
+        for row in rows:
+            (build_id, file_id, envelope, priority, work_mtime, work_size, work_hash,
+             cvid, relpath, source_path) = row
+            
+            if relpath is None:
+                self._mark_error(build_id, f"File not found: file_id={file_id}", None)
+                continue
+            
+            # source_path is always populated (vanilla and mods both have it on content_versions)
+            root_path = source_path
+            
+            if not root_path:
+                self._mark_error(build_id, f"Cannot resolve root for cvid={cvid}", None)
+                continue
+            
+            items.append({
+                'build_id': build_id,
+                'file_id': file_id,
+                'cvid': cvid,
+                'relpath': relpath,
+                'envelope': envelope,
+                'abspath': Path(root_path) / relpath,
+                'work_mtime': work_mtime,
+                'work_size': work_size,
+                'work_hash': work_hash,
+            })
         
-        # Resolve file context via canonical join
-        file_row = self.conn.execute("""
-            SELECT f.content_version_id, f.relpath, mp.source_path
-            FROM files f
-            JOIN content_versions cv ON f.content_version_id = cv.content_version_id
-            LEFT JOIN mod_packages mp ON cv.mod_package_id = mp.mod_package_id
-            WHERE f.file_id = ?
-        """, (file_id,)).fetchone()
+        return items
+    
+    def flash_build(self, build_id: int, timeout: float = FLASH_PARSE_TIMEOUT) -> dict:
+        """
+        Build one pending item now, in this thread, instead of via the worker loop.
         
-        if not file_row:
-            self._mark_error(build_id, f"File not found: file_id={file_id}", None)
-            return None
+        The item is claimed like any other, so a running worker cannot build
+        it twice. It is parsed and extracted in the standing flash process,
+        which has the parser already imported (qbuilder.pipeline.
+        compute_flash_item), and written in one transaction through
+        process_batch(). If parsing outlives `timeout`, the flash process is
+        killed and the item is released back to the queue, where the worker
+        builds it under the normal subprocess timeout.
         
-        cvid, relpath, source_path = file_row
+        Returns the process_item() result dict, with 'flash': True. If the
+        item was not built here, returns {'build_id', 'status', 'flash': False}
+        with status 'pending' (handed back) or whatever state the queue
+        already had it in.
+        """
+        from src.ck3raven.parser.ast_serde import get_ast_format
+        from qbuilder.pipeline import compute_flash_item
         
-        # source_path is always populated (vanilla and mods both have it on mod_packages)
-        root_path = source_path
+        item = self.claim_build(build_id)
+        if item is None:
+            row = self.conn.execute(
+                "SELECT status FROM build_queue WHERE build_id = ?", (build_id,)).fetchone()
+            return {'build_id': build_id, 'status': row[0] if row else 'missing', 'flash': False}
         
-        if not root_path:
-            self._mark_error(build_id, f"Cannot resolve root for cvid={cvid}", None)
-            return None
+        steps = self.executor.envelope_steps.get(item['envelope'], [])
+        to_parse, _, _ = partition_parse_work(self.conn, [item], lambda i: 'parse' in steps)
+        if to_parse:
+            result = compute_flash_item({
+                'abspath': str(item['abspath']),
+                'relpath': item['relpath'],
+                'work_hash': item['work_hash'],
+                'ast_format': get_ast_format(),
+                'extract': 'extract_symbols' in steps,
+            }, timeout)
+            if result is None:
+                self.conn.execute("""
+                    UPDATE build_queue
+                    SET status = 'pending', lease_expires_at = NULL, lease_holder = NULL
+                    WHERE build_id = ? AND lease_holder = ?
+                """, (build_id, self.worker_id))
+                self.conn.commit()
+                return {'build_id': build_id, 'status': 'pending', 'flash': False}
+            item = {**item, 'prepared': PreparedItem.from_result(result)}
         
-        return {
-            'build_id': build_id,
-            'file_id': file_id,
-            'cvid': cvid,
-            'relpath': relpath,
-            'envelope': envelope,
-            'abspath': Path(root_path) / relpath,
-            'work_mtime': work_mtime,
-            'work_size': work_size,
-            'work_hash': work_hash,
-        }
+        return {**self.process_batch([item])[0], 'flash': True}
+    
+    def _renew_leases(self, build_ids: list[int]) -> None:
+        """Extend the leases of items this worker is still holding."""
+        lease_until = time.time() + BUILD_LEASE_SECONDS
+        self.conn.executemany("""
+            UPDATE build_queue SET lease_expires_at = ?
+            WHERE build_id = ? AND status = 'processing' AND lease_holder = ?
+        """, [(lease_until, build_id, self.worker_id) for build_id in build_ids])
+        self.conn.commit()
     
     def _get_vanilla_path(self) -> Optional[str]:
         """Get vanilla path from active playset."""
@@ -508,10 +814,14 @@ class BuildWorker:
                     return playset.get('vanilla_path')
         return None
     
-    def process_item(self, item: dict) -> dict:
+    def process_item(self, item: dict, group_commit: bool = False) -> dict:
         """
         Process a build queue item.
         
+        With group_commit=True the item runs inside a SAVEPOINT of the
+        caller's transaction (see process_batch): a failure rolls back only
+        this item's writes, and nothing is committed here.
+        
         Returns result dict with status.
         """
         build_id = item['build_id']
@@ -526,8 +836,12 @@ class BuildWorker:
             work_mtime=item['work_mtime'],
             work_size=item['work_size'],
             work_hash=item['work_hash'],
+            prepared=item.get('prepared'),
         )
         
+        if group_commit:
+            self.conn.execute("SAVEPOINT build_item")
+        
         try:
             completed_steps = self.executor.execute(ctx)
             
@@ -537,24 +851,138 @@ class BuildWorker:
                 SET status = 'completed', completed_at = ?
                 WHERE build_id = ?
             """, (now, build_id))
-            self.conn.commit()
+            if group_commit:
+                self.conn.execute("RELEASE build_item")
+            else:
+                self.conn.commit()
             
             return {'build_id': build_id, 'status': 'completed', 'steps': completed_steps}
         
         except Exception as e:
             from src.ck3raven.parser.runtime import ParseTimeoutError
             
+            if group_commit:
+                # Discard this item's partial writes; the rest of the group is kept
+                self.conn.execute("ROLLBACK TO build_item")
+                self.conn.execute("RELEASE build_item")
+            
             error_msg = f"{type(e).__name__}: {str(e)}"
             
             # Timeouts are permanent failures - no retry
             if isinstance(e, ParseTimeoutError):
-                self._mark_error(build_id, error_msg, 'parse', permanent=True)
+                self._mark_error(build_id, error_msg, 'parse', permanent=True, commit=not group_commit)
             else:
-                self._mark_error(build_id, error_msg, None)
+                self._mark_error(build_id, error_msg, None, commit=not group_commit)
             
             return {'build_id': build_id, 'status': 'error', 'error': error_msg}
     
-    def _mark_error(self, build_id: int, message: str, step: Optional[str], permanent: bool = False) -> None:
+    def process_batch(self, items: list[dict],
+                      on_result: Optional[Callable[[dict, dict], None]] = None,
+                      pipeline: Optional["BuildPipeline"] = None) -> list[dict]:
+        """
+        Process claimed items with one transaction and one BuilderSession.
+        
+        Each item runs in its own SAVEPOINT, so errors stay isolated per item
+        while AST/symbol/ref rows and queue status updates for the whole batch
+        reach disk in a single commit. If the batch runs for more than half
+        the lease, the work so far is committed and the remaining leases are
+        renewed.
+        
+        Args:
+            items: Work items from claim_batch()
+            on_result: Optional callback(item, result) after each item
+            pipeline: Optional started BuildPipeline. Items are then parsed
+                and extracted in its processes, and this connection only
+                writes the results as they complete. Without one, the
+                persistent parse pool (if enabled) parses the batch while
+                items are written (see _pool_prepare).
+        
+        Returns list of result dicts (in the order items were written).
+        """
+        from src.ck3raven.parser.parse_pool import is_pool_enabled
+        from src.ck3raven.db.schema import BuilderSession
+        
+        results = []
+        written = set()
+        renew_at = time.time() + BUILD_LEASE_SECONDS / 2
+        
+        with BuilderSession(self.conn, f"build_batch:{len(items)}"):
+            self.executor.group_commit = True
+            try:
+                if pipeline:
+                    ordered = pipeline.prepare(self.conn, items)
+                elif len(items) > 1 and is_pool_enabled():
+                    ordered = self._pool_prepare(items)
+                else:
+                    ordered = items
+                for item in ordered:
+                    if time.time() > renew_at:
+                        self.conn.commit()
+                        self._renew_leases([i['build_id'] for i in items
+                                            if i['build_id'] not in written])
+                        renew_at = time.time() + BUILD_LEASE_SECONDS / 2
+                    
+                    if not self.conn.in_transaction:
+                        # Outer transaction, so releasing an item's savepoint never commits
+                        self.conn.execute("BEGIN")
+                    
+                    result = self.process_item(item, group_commit=True)
+                    written.add(item['build_id'])
+                    results.append(result)
+                    if on_result:
+                        on_result(item, result)
+            finally:
+                self.executor.group_commit = False
+                self.conn.commit()
+        
+        return results
+    
+    def _pool_prepare(self, items: list[dict]) -> Iterator[dict]:
+        """
+        Parse a batch on the persistent parse pool, yielding items as they complete.
+        
+        Files are scheduled by work_file_size (largest first, with work
+        stealing; see ParsePool.parse_batch), and parsed items carry their
+        AST in item['prepared']. Items that need no parse are yielded first,
+        while the pool works.
+        """
+        from src.ck3raven.parser.parse_pool import get_pool
+        from src.ck3raven.parser.ast_serde import AST_FORMAT_JSON, get_ast_format
+        from src.ck3raven.parser.runtime import DEFAULT_PARSE_TIMEOUT
+        
+        steps = self.executor.envelope_steps
+        to_parse, local, repeats = partition_parse_work(
+            self.conn, items, lambda item: 'parse' in steps.get(item['envelope'], [])
+        )
+        if len(to_parse) < 2:
+            # Nothing to overlap - the parse step handles it
+            yield from items
+            return
+        
+        completions = get_pool().parse_batch(
+            [(item['abspath'], item['work_size']) for item in to_parse],
+            timeout_ms=DEFAULT_PARSE_TIMEOUT * 1000,
+            ast_format=get_ast_format(),
+        )
+        yield from local
+        
+        for index, result in completions:
+            if not result.success:
+                error_type = result.error_type or "ParseError"
+                error_msg = result.error or "Unknown parse error"
+                prepared = PreparedItem(error=RuntimeError(f"{error_type}: {error_msg}"))
+            elif result.ast_blob is not None:
+                prepared = PreparedItem(ast_blob=result.ast_blob, ast_format=result.ast_format,
+                                        node_count=result.node_count)
+            else:
+                prepared = PreparedItem(ast_blob=result.ast_json, ast_format=AST_FORMAT_JSON,
+                                        node_count=result.node_count)
+            yield {**to_parse[index], 'prepared': prepared}
+        
+        yield from repeats
+    
+    def _mark_error(self, build_id: int, message: str, step: Optional[str], permanent: bool = False,
+                    commit: bool = True) -> None:
         """
         Mark work item as error.
         
@@ -563,6 +991,7 @@ class BuildWorker:
             message: Error message
             step: The step that failed (optional)
             permanent: If True, mark as error immediately (no retry)
+            commit: If False, leave the update to the caller's transaction
         """
         retry = self.conn.execute(
             "SELECT retry_count FROM build_queue WHERE build_id = ?",
@@ -583,7 +1012,8 @@ class BuildWorker:
                 lease_expires_at = NULL, lease_holder = NULL
             WHERE build_id = ?
         """, (status, retry_count, message, step, build_id))
-        self.conn.commit()
+        if commit:
+            self.conn.commit()
 
 
 def run_build_worker(
@@ -594,14 +1024,21 @@ def run_build_worker(
     poll_interval: float = 5.0,
     shutdown_event: Optional[threading.Event] = None,
     run_activity: Optional[object] = None,  # RunActivity from ipc_server (thread-safe)
+    work_signal: Optional[object] = None,  # WorkSignal from ipc_server (thread-safe)
+    batch_size: int = 1,
+    verbose: bool = True,
+    defer_fts: bool = False,
+    processes: int = 1,
 ) -> dict:
     """
     Run build worker as a continuous daemon.
     
     CRASH-PROOF DESIGN:
-    - Commits after every item (success or error)
+    - Commits after every item (success or error), or once per batch
+      with per-item savepoints when batch_size > 1
     - Catches all exceptions at top level (logs + continues)
-    - Polls indefinitely when queue empty (no arbitrary timeouts)
+    - Waits indefinitely when queue empty (no arbitrary timeouts); with a
+      work_signal it wakes as soon as work is enqueued
     - Uses file-based logging (no stdout buffer blocking)
     
     Args:
@@ -609,22 +1046,112 @@ def run_build_worker(
         max_items: Max items to process (execution throttle only, rarely used)
         logger: Optional JSONL logger for structured logging
         continuous: If True (default), keep polling forever. Only False for testing.
-        poll_interval: Seconds between polls when queue empty
-        shutdown_event: If set, check this event to trigger graceful shutdown
+        poll_interval: Seconds between polls when queue empty. With a
+            work_signal this is only a fallback for work enqueued outside it.
+        shutdown_event: If set, check this event to trigger graceful shutdown.
+            With a work_signal, notify it after setting the event to stop an
+            idle worker immediately.
+        work_signal: Wakes the idle worker when work is enqueued
+        batch_size: Items claimed and committed together (1 = per-item commits)
+        verbose: If False, skip the per-item "Building:" lines
+        defer_fts: Suspend symbols_fts/refs_fts triggers while building and
+            rebuild both indexes once the queue drains (or on exit)
+        processes: Parse/extract in this many processes (qbuilder.pipeline)
+            while this connection stays the only writer. Values > 1 always
+            run batched, with at least PIPELINE_ITEMS_PER_PROCESS items per
+            process in each batch.
     
     Returns summary.
     """
+    from src.ck3raven.db.conflicts import refresh_playset_conflicts
+    from src.ck3raven.db.schema import defer_fts_sync, restore_fts_sync
+    
     worker = BuildWorker(conn)
     
+    pipeline = None
+    if processes > 1:
+        from qbuilder.pipeline import BuildPipeline, PIPELINE_ITEMS_PER_PROCESS
+        
+        batch_size = max(batch_size, processes * PIPELINE_ITEMS_PER_PROCESS)
+        pipeline = BuildPipeline(processes)
+        pipeline.start()
+    
+    # Finish an FTS deferral left behind by a crashed run
+    if restore_fts_sync(conn):
+        _safe_print("[Worker] Rebuilt FTS indexes left deferred by a previous run")
+    fts_deferred = False
+    
     items_processed = 0
     completed = 0
     errors = 0
     consecutive_idle_polls = 0
+    idle_since = 0.0
+    last_idle_log = 0.0
+    busy_seconds = 0.0
+    batch_size = max(1, batch_size)
+    conflicts_refreshed_at = 0.0
+    conflicts_dirty = False
     
     if logger:
-        logger.log_event("worker_start", {"continuous": continuous, "max_items": max_items, "pid": os.getpid()})
+        logger.log_event("worker_start", {"continuous": continuous, "max_items": max_items,
+                                          "batch_size": batch_size, "processes": processes,
+                                          "pid": os.getpid()})
+    
+    _safe_print(f"[Worker] Starting (continuous={continuous}, max_items={max_items}, "
+                f"batch_size={batch_size}, processes={processes})")
+    
+    def record_result(item: dict, result: dict) -> None:
+        nonlocal items_processed, completed, errors
+        
+        relpath = item['relpath']
+        file_id = item['file_id']
+        
+        items_processed += 1
+        if result['status'] == 'completed':
+            completed += 1
+            if logger:
+                logger.item_complete(file_id, relpath)
+        else:
+            errors += 1
+            err_msg = result.get('error', 'unknown')
+            _safe_print(f"  Error: {relpath}: {err_msg}")
+            if logger:
+                logger.item_error(file_id, relpath, err_msg, result.get('step'))
+        
+        # Update RunActivity tracker (thread-safe, visible via IPC)
+        if run_activity:
+            run_activity.record_item(result['status'])
+        
+        # Periodic progress logging (every 100 items)
+        if items_processed % 100 == 0:
+            if logger:
+                logger.log_event("worker_progress", {
+                    "processed": items_processed,
+                    "completed": completed,
+                    "errors": errors,
+                })
+            _safe_print(f"[Worker] Progress: {items_processed} processed, {completed} completed, {errors} errors")
     
-    _safe_print(f"[Worker] Starting (continuous={continuous}, max_items={max_items})")
+    def finish_deferred_fts() -> None:
+        nonlocal fts_deferred
+        if fts_deferred:
+            start = time.time()
+            rebuilt = restore_fts_sync(conn)
+            fts_deferred = False
+            if logger:
+                logger.log_event("fts_rebuilt", {"tables": rebuilt, "sec": time.time() - start})
+            _safe_print(f"[Worker] Rebuilt FTS for {', '.join(rebuilt)} in {time.time() - start:.1f}s")
+    
+    def refresh_conflicts(incremental_only: bool = False) -> None:
+        nonlocal conflicts_refreshed_at, conflicts_dirty
+        start = time.time()
+        refreshed = refresh_playset_conflicts(conn, incremental_only=incremental_only)
+        conflicts_refreshed_at = time.time()
+        # Playsets skipped for a full rebuild are still behind
+        conflicts_dirty = incremental_only
+        if refreshed and logger:
+            logger.log_event("conflicts_refreshed", {"playsets": refreshed,
+                                                     "sec": conflicts_refreshed_at - start})
     
     while True:
         try:
@@ -644,14 +1171,27 @@ def run_build_worker(
                 _safe_print(f"[Worker] Exiting: {exit_reason}")
                 break
             
-            item = worker.claim_work()
+            limit = batch_size
+            if max_items:
+                limit = min(limit, max_items - items_processed)
+            
+            batch_start = time.time()
+            items = worker.claim_batch(limit)
             
-            if not item:
+            if not items:
                 consecutive_idle_polls += 1
                 
+                # Queue drained - bring FTS and conflict indexes back in sync
+                # before idling/exiting
+                finish_deferred_fts()
+                if conflicts_dirty:
+                    refresh_conflicts()
+                
                 # Signal idle state on first idle poll
-                if consecutive_idle_polls == 1 and run_activity:
-                    run_activity.set_idle()
+                if consecutive_idle_polls == 1:
+                    idle_since = last_idle_log = time.time()
+                    if run_activity:
+                        run_activity.set_idle()
                 
                 if not continuous:
                     # Non-continuous mode: exit immediately when queue empty
@@ -661,59 +1201,51 @@ def run_build_worker(
                     _safe_print(f"[Worker] Exiting: {exit_reason}")
                     break
                 
-                # Continuous mode: poll forever (this is a daemon)
-                # Log status every ~1 minute (12 polls at 5s interval)
-                if consecutive_idle_polls % 12 == 1:
+                # Continuous mode: wait forever (this is a daemon)
+                # Log status on going idle, then every ~1 minute
+                now = time.time()
+                if consecutive_idle_polls == 1 or now - last_idle_log >= 60:
+                    last_idle_log = now
                     if logger:
                         logger.log_event("worker_idle", {"polls": consecutive_idle_polls, "processed": items_processed})
-                    _safe_print(f"[Worker] Waiting for work... ({items_processed} processed, idle for {consecutive_idle_polls * poll_interval:.0f}s)")
+                    _safe_print(f"[Worker] Waiting for work... ({items_processed} processed, idle for {now - idle_since:.0f}s)")
                 
-                time.sleep(poll_interval)
+                if work_signal:
+                    work_signal.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
                 continue
             
             # Reset idle counter when we get work
             consecutive_idle_polls = 0
+            if defer_fts and not fts_deferred:
+                defer_fts_sync(conn)
+                fts_deferred = True
             if run_activity:
                 run_activity.set_state("building")
             
-            relpath = item['relpath']
-            envelope = item['envelope']
-            file_id = item['file_id']
-            
-            _safe_print(f"Building: {relpath} [{envelope}]")
-            
-            # Log item claimed
-            if logger:
-                steps = worker.executor.envelope_steps.get(envelope, [])
-                logger.item_claimed(file_id, relpath, envelope, tuple(steps))
-            
-            result = worker.process_item(item)
-            
-            items_processed += 1
-            if result['status'] == 'completed':
-                completed += 1
+            for item in items:
+                envelope = item['envelope']
+                
+                if verbose:
+                    _safe_print(f"Building: {item['relpath']} [{envelope}]")
+                
+                # Log item claimed
                 if logger:
-                    logger.item_complete(file_id, relpath)
+                    steps = worker.executor.envelope_steps.get(envelope, [])
+                    logger.item_claimed(item['file_id'], item['relpath'], envelope, tuple(steps))
+            
+            if batch_size == 1:
+                for item in items:
+                    record_result(item, worker.process_item(item))
             else:
-                errors += 1
-                err_msg = result.get('error', 'unknown')
-                _safe_print(f"  Error: {err_msg}")
-                if logger:
-                    logger.item_error(file_id, relpath, err_msg, result.get('step'))
+                worker.process_batch(items, on_result=record_result, pipeline=pipeline)
             
-            # Update RunActivity tracker (thread-safe, visible via IPC)
-            if run_activity:
-                run_activity.record_item(result['status'])
+            conflicts_dirty = True
+            if time.time() - conflicts_refreshed_at >= CONFLICT_REFRESH_INTERVAL:
+                refresh_conflicts(incremental_only=True)
             
-            # Periodic progress logging (every 100 items)
-            if items_processed % 100 == 0:
-                if logger:
-                    logger.log_event("worker_progress", {
-                        "processed": items_processed,
-                        "completed": completed,
-                        "errors": errors,
-                    })
-                _safe_print(f"[Worker] Progress: {items_processed} processed, {completed} completed, {errors} errors")
+            busy_seconds += time.time() - batch_start
         
         except KeyboardInterrupt:
             # Clean shutdown on Ctrl+C
@@ -739,8 +1271,19 @@ def run_build_worker(
             # Brief backoff before retrying
             time.sleep(2.0)
     
+    finish_deferred_fts()
+    if conflicts_dirty:
+        refresh_conflicts()
+    if pipeline:
+        pipeline.shutdown()
+    
     return {
         'items_processed': items_processed,
         'completed': completed,
         'errors': errors,
+        'batch_size': batch_size,
+        'processes': processes,
+        # Time spent claiming and building (excludes idle polling)
+        'busy_seconds': busy_seconds,
+        'items_per_sec': items_processed / busy_seconds if busy_seconds > 0 else 0.0,
     }
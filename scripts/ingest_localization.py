@@ -26,6 +26,7 @@ from typing import Optional, Iterator, Tuple
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import sqlite3
+from ck3raven.db.content import register_content_functions
 from ck3raven.db.schema import DEFAULT_DB_PATH
 from ck3raven.parser.localization import parse_localization, LocalizationEntry
 
@@ -85,11 +86,12 @@ def iter_localization_files(conn: sqlite3.Connection, language_filter: Optional[
     # Use a separate read-only connection
     read_conn = sqlite3.connect(str(DEFAULT_DB_PATH), timeout=30.0)
     read_conn.execute("PRAGMA query_only = ON")  # Read-only mode
+    register_content_functions(read_conn)
     
     query = """
         SELECT f.content_hash, f.relpath, fc.content_text
         FROM files f
-        JOIN file_contents fc ON f.content_hash = fc.content_hash
+        JOIN file_content_text fc ON f.content_hash = fc.content_hash
         WHERE f.relpath LIKE 'localization/%'
         AND f.relpath LIKE '%.yml'
         AND f.deleted = 0
@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 """Visual inspection of the database: ASTs, symbols, refs."""
 import sqlite3
-import json
+import sys
 from pathlib import Path
 
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from ck3raven.parser.ast_serde import deserialize_ast
+
 DB_PATH = Path.home() / ".ck3raven" / "ck3raven.db"
 
 def main():
@@ -91,7 +96,7 @@ def main():
     if row:
         print(f"File: {row['relpath']}")
         print()
-        ast = json.loads(row['ast_blob'])
+        ast = deserialize_ast(row['ast_blob'])
         
         # Show top-level structure
         print(f"Root type: {ast.get('_type')}")
@@ -32,6 +32,10 @@ from ck3raven.db.content import (
     scan_directory,
     store_file_content,
     store_file_record,
+    get_content_text,
+    delete_file_contents,
+    compress_file_contents,
+    get_content_storage_stats,
 )
 # NOTE: ingest.py archived - qbuilder/discovery.py is the canonical ingestion path
 from ck3raven.db.parser_version import (
@@ -55,8 +59,13 @@ from ck3raven.db.ast_cache import (
 from ck3raven.db.symbols import (
     extract_symbols_from_ast,
     extract_refs_from_ast,
+    extract_symbols_and_refs_from_ast,
     store_symbols_batch,
     store_refs_batch,
+    symbols_to_rows,
+    refs_to_rows,
+    store_symbol_rows,
+    store_ref_rows,
     extract_and_store,
     find_symbol_by_name,
     find_symbols_fts,
@@ -117,6 +126,10 @@ __all__ = [
     "scan_directory",
     "store_file_content",
     "store_file_record",
+    "get_content_text",
+    "delete_file_contents",
+    "compress_file_contents",
+    "get_content_storage_stats",
     # Ingest - ARCHIVED: use qbuilder/discovery.py instead
     # Parser Version
     "PARSER_VERSION",
@@ -137,8 +150,13 @@ __all__ = [
     # Symbols
     "extract_symbols_from_ast",
     "extract_refs_from_ast",
+    "extract_symbols_and_refs_from_ast",
     "store_symbols_batch",
     "store_refs_batch",
+    "symbols_to_rows",
+    "refs_to_rows",
+    "store_symbol_rows",
+    "store_ref_rows",
     "extract_and_store",
     "find_symbol_by_name",
     "find_symbols_fts",
@@ -13,6 +13,7 @@ without loading the heavy database layer.
 import sqlite3
 import json
 import logging
+import time
 from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
@@ -28,6 +29,9 @@ from ck3raven.parser.ast_serde import (
     serialize_ast,
     deserialize_ast,
     count_ast_nodes,
+    encode_ast,
+    get_ast_format,
+    AST_FORMATS,
 )
 
 logger = logging.getLogger(__name__)
@@ -44,6 +48,7 @@ __all__ = [
     'parse_file_cached',
     'get_ast_stats',
     'clear_ast_cache_for_parser',
+    'reencode_asts',
 ]
 
 
@@ -101,9 +106,10 @@ def store_ast(
         parser_version = get_current_parser_version(conn)
         parser_version_id = parser_version.parser_version_id
     
-    # Serialize AST
-    ast_blob = serialize_ast(ast)
-    ast_dict = deserialize_ast(ast_blob)
+    # Serialize AST in the configured format
+    ast_format = get_ast_format()
+    ast_blob = serialize_ast(ast, ast_format)
+    ast_dict = deserialize_ast(ast_blob, ast_format)
     node_count = count_ast_nodes(ast_dict)
     
     diagnostics = diagnostics or []
@@ -112,8 +118,8 @@ def store_ast(
     cursor = conn.execute("""
         INSERT OR REPLACE INTO asts 
         (content_hash, parser_version_id, ast_blob, ast_format, parse_ok, node_count, diagnostics_json)
-        VALUES (?, ?, ?, 'json', 1, ?, ?)
-    """, (content_hash, parser_version_id, ast_blob, node_count, diagnostics_json))
+        VALUES (?, ?, ?, ?, 1, ?, ?)
+    """, (content_hash, parser_version_id, ast_blob, ast_format, node_count, diagnostics_json))
     
     conn.commit()
     
@@ -289,3 +295,101 @@ def clear_ast_cache_for_parser(
     )
     conn.commit()
     return cursor.rowcount
+
+
+def reencode_asts(
+    conn: sqlite3.Connection,
+    target_format: str,
+    batch_size: int = 500,
+    progress_callback: Optional[callable] = None,
+) -> Dict[str, Any]:
+    """
+    Re-encode stored ASTs into target_format (migration between ast_formats).
+    
+    Every converted row is verified to decode to the same dict as before;
+    rows that do not round-trip (e.g. legacy node shapes) keep their format.
+    Failed parses (parse_ok = 0) are left alone. Commits per batch, so the
+    migration can be interrupted and re-run.
+    
+    Args:
+        conn: Database connection
+        target_format: 'json' or 'binary'
+        batch_size: Rows per transaction
+        progress_callback: Optional callable(done, total)
+    
+    Returns:
+        Stats: converted/skipped counts, total blob bytes before and after,
+        and total decode seconds in the old and new formats.
+    """
+    if target_format not in AST_FORMATS:
+        raise ValueError(f"Unknown AST format: {target_format!r}")
+    
+    total = conn.execute(
+        "SELECT COUNT(*) FROM asts WHERE parse_ok = 1 AND ast_format != ?",
+        (target_format,)
+    ).fetchone()[0]
+    
+    stats = {
+        'total': total,
+        'converted': 0,
+        'skipped': 0,
+        'bytes_before': 0,
+        'bytes_after': 0,
+        'decode_sec_before': 0.0,
+        'decode_sec_after': 0.0,
+    }
+    
+    last_id = 0
+    done = 0
+    while True:
+        rows = conn.execute("""
+            SELECT ast_id, ast_blob, ast_format FROM asts
+            WHERE parse_ok = 1 AND ast_format != ? AND ast_id > ?
+            ORDER BY ast_id
+            LIMIT ?
+        """, (target_format, last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        
+        updates = []
+        for ast_id, ast_blob, ast_format in rows:
+            last_id = ast_id
+            done += 1
+            try:
+                start = time.perf_counter()
+                ast_dict = deserialize_ast(ast_blob, ast_format)
+                decode_before = time.perf_counter() - start
+                
+                new_blob = encode_ast(ast_dict, target_format)
+                
+                start = time.perf_counter()
+                roundtrip = deserialize_ast(new_blob, target_format)
+                decode_after = time.perf_counter() - start
+            except (ValueError, UnicodeDecodeError, UnicodeEncodeError, OverflowError) as e:
+                # e.g. lone surrogates (no UTF-8 string table) or positions
+                # beyond the binary format's int32
+                logger.debug("AST %s not re-encoded: %s", ast_id, e)
+                stats['skipped'] += 1
+                continue
+            
+            if roundtrip != ast_dict:
+                stats['skipped'] += 1
+                continue
+            
+            updates.append((new_blob, target_format, ast_id))
+            stats['converted'] += 1
+            stats['bytes_before'] += len(ast_blob)
+            stats['bytes_after'] += len(new_blob)
+            stats['decode_sec_before'] += decode_before
+            stats['decode_sec_after'] += decode_after
+        
+        conn.executemany(
+            "UPDATE asts SET ast_blob = ?, ast_format = ? WHERE ast_id = ?",
+            updates
+        )
+        conn.commit()
+        
+        if progress_callback:
+            progress_callback(done, total)
+    
+    return stats
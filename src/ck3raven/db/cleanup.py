@@ -12,6 +12,8 @@ import logging
 from typing import Tuple
 from dataclasses import dataclass
 
+from ck3raven.db.content import delete_file_contents
+
 logger = logging.getLogger(__name__)
 
 
@@ -142,13 +144,13 @@ def cleanup_orphaned_content(conn: sqlite3.Connection) -> int:
     Returns:
         Number of content records deleted
     """
-    cursor = conn.execute("""
-        DELETE FROM file_contents
+    orphans = [row[0] for row in conn.execute("""
+        SELECT content_hash FROM file_contents
         WHERE content_hash NOT IN (
             SELECT DISTINCT content_hash FROM files
         )
-    """)
-    return cursor.rowcount
+    """)]
+    return delete_file_contents(conn, orphans)
 
 
 def purge_deleted_files(conn: sqlite3.Connection) -> int:
@@ -0,0 +1,343 @@
+"""
+Playset Conflict Index
+
+Materialized symbol conflicts per playset: for every (symbol_type, name)
+defined by more than one content version of the playset, the definition
+sites (content version, file, first line) are stored in
+playset_symbol_conflicts. Conflict queries read these rows by key instead
+of aggregating the whole symbols table through the Golden Join.
+
+A playset is identified by its set of content versions. Load order is not
+part of the index - it only decides the winner, which readers compute from
+their own load order - so reordering mods needs no update, and switching
+playsets only needs the new set registered.
+
+Maintenance is incremental and runs on the writer (the qbuilder):
+- symbols are append-only (AUTOINCREMENT), so names written since the last
+  refresh are those above the playset's symbol_watermark
+- file mapping changes and symbol deletes are logged per content hash in
+  conflict_changes by triggers (schema.py); the names they touch are
+  looked up from both the live symbols and the indexed rows
+
+Only the affected names are recomputed. Large backlogs (full builds)
+rebuild the playset's rows in one pass instead.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+# Playsets kept indexed; registering another drops the least recently registered
+MAX_CONFLICT_PLAYSETS = 4
+
+# New symbols or changed content hashes past which a refresh rebuilds the
+# playset instead of recomputing names one by one
+FULL_REBUILD_THRESHOLD = 20000
+
+
+def playset_key(cvids: Iterable[int]) -> str:
+    """Canonical conflict_playsets.cvids value for a content version set."""
+    return ",".join(str(cv) for cv in sorted(set(int(cv) for cv in cvids)))
+
+
+def find_conflict_playset(conn: sqlite3.Connection, cvids: Iterable[int]) -> Optional[int]:
+    """
+    playset_id of an indexed content version set, or None.
+
+    Safe on read-only connections and on databases without the tables.
+    """
+    try:
+        row = conn.execute(
+            "SELECT playset_id FROM conflict_playsets WHERE cvids = ?", (playset_key(cvids),)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _insert_conflicts(conn: sqlite3.Connection, playset_id: int, cvids: str,
+                      names_only: bool) -> None:
+    """
+    Insert definition sites of conflicting names for a playset.
+
+    With names_only, only names in temp.conflict_names are considered.
+    """
+    names_join = ""
+    if names_only:
+        names_join = ("JOIN temp.conflict_names n "
+                      "ON n.symbol_type = s.symbol_type AND n.name = s.name")
+
+    # GOLDEN JOIN: symbols → asts → files
+    # cvids is playset_key() output (integers only)
+    conn.execute(f"""
+        WITH defs AS (
+            SELECT
+                s.symbol_type,
+                s.name,
+                f.content_version_id,
+                f.relpath,
+                f.content_hash,
+                MIN(s.line_number) AS line_number
+            FROM symbols s
+            {names_join}
+            JOIN asts a ON s.ast_id = a.ast_id
+            JOIN files f ON a.content_hash = f.content_hash
+            WHERE f.content_version_id IN ({cvids})
+            GROUP BY s.symbol_type, s.name, f.content_version_id, f.relpath
+        )
+        INSERT INTO playset_symbol_conflicts
+            (playset_id, symbol_type, name, content_version_id, relpath, content_hash, line_number)
+        SELECT ?, symbol_type, name, content_version_id, relpath, content_hash, line_number
+        FROM defs
+        WHERE (symbol_type, name) IN (
+            SELECT symbol_type, name FROM defs
+            GROUP BY symbol_type, name
+            HAVING COUNT(DISTINCT content_version_id) > 1
+        )
+    """, (playset_id,))
+
+
+def _rebuild_playset(conn: sqlite3.Connection, playset_id: int, cvids: str) -> None:
+    conn.execute("DELETE FROM playset_symbol_conflicts WHERE playset_id = ?", (playset_id,))
+    if cvids:
+        _insert_conflicts(conn, playset_id, cvids, names_only=False)
+
+
+def _refresh_names(conn: sqlite3.Connection, playset_id: int, cvids: str,
+                   symbol_watermark: int, top_symbol: int,
+                   change_watermark: int, top_change: int) -> int:
+    """Recompute the names touched since the watermarks. Returns their count."""
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS conflict_names (
+            symbol_type TEXT NOT NULL,
+            name TEXT NOT NULL,
+            PRIMARY KEY (symbol_type, name)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("DELETE FROM temp.conflict_names")
+
+    # New symbols
+    conn.execute("""
+        INSERT OR IGNORE INTO temp.conflict_names
+        SELECT symbol_type, name FROM symbols WHERE symbol_id > ? AND symbol_id <= ?
+    """, (symbol_watermark, top_symbol))
+
+    if top_change > change_watermark:
+        # Names defined by changed contents now...
+        conn.execute("""
+            INSERT OR IGNORE INTO temp.conflict_names
+            SELECT s.symbol_type, s.name
+            FROM conflict_changes c
+            JOIN asts a ON a.content_hash = c.content_hash
+            JOIN symbols s ON s.ast_id = a.ast_id
+            WHERE c.change_id > ? AND c.change_id <= ?
+        """, (change_watermark, top_change))
+        # ...and names the index had from them (covers deleted files/symbols)
+        conn.execute("""
+            INSERT OR IGNORE INTO temp.conflict_names
+            SELECT p.symbol_type, p.name
+            FROM conflict_changes c
+            JOIN playset_symbol_conflicts p
+              ON p.playset_id = ? AND p.content_hash = c.content_hash
+            WHERE c.change_id > ? AND c.change_id <= ?
+        """, (playset_id, change_watermark, top_change))
+
+    count = conn.execute("SELECT COUNT(*) FROM temp.conflict_names").fetchone()[0]
+    if count:
+        conn.execute("""
+            DELETE FROM playset_symbol_conflicts
+            WHERE playset_id = ?
+              AND (symbol_type, name) IN (SELECT symbol_type, name FROM temp.conflict_names)
+        """, (playset_id,))
+        _insert_conflicts(conn, playset_id, cvids, names_only=True)
+    conn.execute("DELETE FROM temp.conflict_names")
+    return count
+
+
+def _top_ids(conn: sqlite3.Connection) -> tuple:
+    """
+    Highest symbol_id and change_id ever assigned.
+
+    Read from sqlite_sequence, so deleted or pruned rows do not move them
+    back; they only go down when a table is recreated.
+    """
+    seq = dict(conn.execute("""
+        SELECT name, seq FROM sqlite_sequence WHERE name IN ('symbols', 'conflict_changes')
+    """).fetchall())
+    return seq.get('symbols', 0), seq.get('conflict_changes', 0)
+
+
+def refresh_playset_conflicts(conn: sqlite3.Connection, playset_id: Optional[int] = None,
+                              commit: bool = True,
+                              incremental_only: bool = False) -> Dict[int, int]:
+    """
+    Bring indexed playsets up to date with symbols and files.
+
+    Args:
+        playset_id: Refresh only this playset (default: all indexed playsets)
+        commit: Commit afterwards. Pass False inside a larger transaction.
+        incremental_only: Leave playsets that need a full rebuild as they
+            are (mid-build refreshes; the rebuild happens once the build ends)
+
+    Returns:
+        {playset_id: names recomputed}; -1 marks a full rebuild
+    """
+    sql = "SELECT playset_id, cvids, symbol_watermark, change_watermark FROM conflict_playsets"
+    params: tuple = ()
+    if playset_id is not None:
+        sql += " WHERE playset_id = ?"
+        params = (playset_id,)
+    try:
+        playsets = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        return {}  # Database predates the conflict index
+    if not playsets:
+        return {}
+
+    top_symbol, top_change = _top_ids(conn)
+    refreshed: Dict[int, int] = {}
+
+    for pid, cvids, symbol_watermark, change_watermark in playsets:
+        if top_symbol == symbol_watermark and top_change == change_watermark:
+            continue
+
+        backlog = (top_symbol - symbol_watermark) + (top_change - change_watermark)
+        recreated = top_symbol < symbol_watermark or top_change < change_watermark
+        if recreated or backlog > FULL_REBUILD_THRESHOLD:
+            if incremental_only:
+                continue
+            # Tables recreated, or too much to recompute name by name
+            _rebuild_playset(conn, pid, cvids)
+            refreshed[pid] = -1
+        else:
+            refreshed[pid] = _refresh_names(conn, pid, cvids, symbol_watermark, top_symbol,
+                                            change_watermark, top_change)
+
+        conn.execute("""
+            UPDATE conflict_playsets
+            SET symbol_watermark = ?, change_watermark = ?, refreshed_at = datetime('now')
+            WHERE playset_id = ?
+        """, (top_symbol, top_change, pid))
+
+    # Changes every playset has folded in are no longer needed
+    conn.execute("""
+        DELETE FROM conflict_changes
+        WHERE change_id <= (SELECT MIN(change_watermark) FROM conflict_playsets)
+    """)
+
+    if commit:
+        conn.commit()
+    return refreshed
+
+
+def register_conflict_playset(conn: sqlite3.Connection, cvids: Iterable[int]) -> int:
+    """
+    Index a content version set, or refresh it if already indexed.
+
+    A new playset is built in full. Beyond MAX_CONFLICT_PLAYSETS, the least
+    recently registered playsets are dropped.
+
+    Returns:
+        playset_id
+    """
+    key = playset_key(cvids)
+    playset_id = find_conflict_playset(conn, cvids)
+
+    if playset_id is not None:
+        conn.execute(
+            "UPDATE conflict_playsets SET registered_at = datetime('now') WHERE playset_id = ?",
+            (playset_id,),
+        )
+        refresh_playset_conflicts(conn, playset_id)
+        return playset_id
+
+    top_symbol, top_change = _top_ids(conn)
+    cursor = conn.execute("""
+        INSERT INTO conflict_playsets
+            (cvids, symbol_watermark, change_watermark, refreshed_at)
+        VALUES (?, ?, ?, datetime('now'))
+    """, (key, top_symbol, top_change))
+    playset_id = cursor.lastrowid
+    _rebuild_playset(conn, playset_id, key)
+
+    stale = [row[0] for row in conn.execute("""
+        SELECT playset_id FROM conflict_playsets
+        ORDER BY registered_at DESC, playset_id DESC
+        LIMIT -1 OFFSET ?
+    """, (MAX_CONFLICT_PLAYSETS,))]
+    for pid in stale:
+        drop_conflict_playset(conn, pid, commit=False)
+
+    conn.commit()
+    return playset_id
+
+
+def drop_conflict_playset(conn: sqlite3.Connection, playset_id: int, commit: bool = True) -> None:
+    """Remove a playset and its rows from the conflict index."""
+    conn.execute("DELETE FROM playset_symbol_conflicts WHERE playset_id = ?", (playset_id,))
+    conn.execute("DELETE FROM conflict_playsets WHERE playset_id = ?", (playset_id,))
+    if commit:
+        conn.commit()
+
+
+def query_playset_conflicts(
+    conn: sqlite3.Connection,
+    playset_id: int,
+    symbol_type: Optional[str] = None,
+    game_folder: Optional[str] = None,
+    limit: int = 100,
+) -> List[dict]:
+    """
+    Conflicting symbols of an indexed playset, most sources first.
+
+    Returns:
+        [{symbol_type, name, source_count,
+          sources: [{content_version_id, relpath, line_number}]}]
+        with one source per content version (its first file by path)
+    """
+    filters = ""
+    params: list = [playset_id]
+    if symbol_type:
+        filters += " AND symbol_type = ?"
+        params.append(symbol_type)
+    if game_folder:
+        filters += " AND relpath LIKE ?"
+        params.append(f"{game_folder}%")
+
+    rows = conn.execute(f"""
+        SELECT symbol_type, name, COUNT(DISTINCT content_version_id) AS source_count
+        FROM playset_symbol_conflicts
+        WHERE playset_id = ? {filters}
+        GROUP BY symbol_type, name
+        HAVING source_count > 1
+        ORDER BY source_count DESC, symbol_type, name
+        LIMIT ?
+    """, params + [limit]).fetchall()
+
+    detail_filter = " AND relpath LIKE ?" if game_folder else ""
+    detail_params = [f"{game_folder}%"] if game_folder else []
+
+    conflicts = []
+    for type_val, name, source_count in rows:
+        sources = []
+        seen_cvids = set()
+        for cvid, relpath, line_number in conn.execute(f"""
+            SELECT content_version_id, relpath, line_number
+            FROM playset_symbol_conflicts
+            WHERE playset_id = ? AND symbol_type = ? AND name = ? {detail_filter}
+            ORDER BY content_version_id, relpath
+        """, [playset_id, type_val, name] + detail_params):
+            if cvid in seen_cvids:
+                continue
+            seen_cvids.add(cvid)
+            sources.append({
+                "content_version_id": cvid,
+                "relpath": relpath,
+                "line_number": line_number,
+            })
+        conflicts.append({
+            "symbol_type": type_val,
+            "name": name,
+            "source_count": source_count,
+            "sources": sources,
+        })
+    return conflicts
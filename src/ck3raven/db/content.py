@@ -7,15 +7,34 @@ All content is stored once and referenced by SHA256 hash.
 
 import hashlib
 import sqlite3
+import sys
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, List, Tuple, Dict, Iterator
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import os
 
-from ck3raven.db.schema import get_connection
+from ck3raven.db.schema import get_connection, has_trigram_index
 from ck3raven.db.models import FileContent, FileRecord, ContentVersion
 
 
+# Content storage modes for newly stored file_contents rows
+CONTENT_STORAGE_TEXT = 'text'              # content_blob raw + content_text decoded
+CONTENT_STORAGE_COMPRESSED = 'compressed'  # content_blob compressed, no content_text
+CONTENT_STORAGES = (CONTENT_STORAGE_TEXT, CONTENT_STORAGE_COMPRESSED)
+
+# Codec recorded in file_contents.compression for compressed rows
+CONTENT_CODEC_ZLIB = 'zlib'
+CONTENT_ZLIB_LEVEL = 6
+
+# Decoded texts of compressed rows kept in memory (entries, total characters)
+CONTENT_TEXT_CACHE_ENTRIES = 256
+CONTENT_TEXT_CACHE_CHARS = 32 * 1024 * 1024
+
+
 def compute_content_hash(data: bytes) -> str:
     """Compute SHA256 hash of content."""
     return hashlib.sha256(data).hexdigest()
@@ -162,6 +181,132 @@ def scan_directory(root_path: Path, include_patterns: Optional[List[str]] = None
             continue
 
 
+def get_content_storage() -> str:
+    """Storage mode for newly stored file contents (default: 'text').
+    
+    Set CK3RAVEN_CONTENT_STORAGE=compressed to store text files as a single
+    compressed blob, decoded on read (see get_content_text()).
+    """
+    storage = os.environ.get("CK3RAVEN_CONTENT_STORAGE", CONTENT_STORAGE_TEXT).lower()
+    return storage if storage in CONTENT_STORAGES else CONTENT_STORAGE_TEXT
+
+
+class _TextCache:
+    """Thread-safe LRU of decoded texts, keyed by content hash.
+    
+    Content is addressed by hash, so an entry never goes stale and one
+    cache serves every connection and database.
+    """
+    
+    def __init__(self, max_entries: int, max_chars: int):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+    
+    def get(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            text = self._texts.get(content_hash)
+            if text is not None:
+                self._texts.move_to_end(content_hash)
+            return text
+    
+    def put(self, content_hash: str, text: str) -> None:
+        if len(text) > self.max_chars:
+            return
+        with self._lock:
+            if content_hash in self._texts:
+                return
+            self._texts[content_hash] = text
+            self._chars += len(text)
+            while len(self._texts) > self.max_entries or self._chars > self.max_chars:
+                _, evicted = self._texts.popitem(last=False)
+                self._chars -= len(evicted)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._texts.clear()
+            self._chars = 0
+
+
+_text_cache = _TextCache(CONTENT_TEXT_CACHE_ENTRIES, CONTENT_TEXT_CACHE_CHARS)
+
+
+def compress_content(data: bytes) -> Tuple[bytes, str]:
+    """Compress raw file bytes for storage. Returns (blob, codec)."""
+    return zlib.compress(data, CONTENT_ZLIB_LEVEL), CONTENT_CODEC_ZLIB
+
+
+def decompress_content(blob: bytes, compression: Optional[str]) -> bytes:
+    """Raw file bytes of a stored content_blob."""
+    if compression is None:
+        return blob
+    if compression == CONTENT_CODEC_ZLIB:
+        return zlib.decompress(blob)
+    raise ValueError(f"Unknown content compression: {compression}")
+
+
+def decode_content_text(
+    content_hash: str,
+    blob: bytes,
+    compression: Optional[str],
+    encoding: Optional[str],
+) -> Optional[str]:
+    """
+    Text of a compressed file_contents row, through the decoded-text LRU.
+    
+    Returns None for rows stored uncompressed (their text is in
+    content_text) and for rows without an encoding.
+    """
+    if compression is None or not encoding:
+        return None
+    text = _text_cache.get(content_hash)
+    if text is None:
+        text = decompress_content(blob, compression).decode(encoding)
+        _text_cache.put(content_hash, text)
+    return text
+
+
+def register_content_functions(conn: sqlite3.Connection) -> None:
+    """
+    Register the SQL functions compressed content storage relies on.
+    
+    ck3_content_text(content_hash, content_blob, compression, encoding_guess)
+    is used by the file_content_text view (and the FTS 'rebuild' commands
+    that read it). Every connection that reads that view needs it;
+    get_connection() registers it automatically.
+    """
+    conn.create_function(
+        "ck3_content_text", 4, decode_content_text, deterministic=True
+    )
+
+
+def _index_compressed_text(
+    conn: sqlite3.Connection,
+    rowid: int,
+    text: str,
+    delete: bool = False
+) -> None:
+    """
+    Add (or with delete=True, remove) a compressed row's text in the content indexes.
+    
+    The file_contents triggers only index uncompressed rows, so that they
+    need no application function; compressed rows are indexed here, by
+    the code that has their text.
+    """
+    tables = ['file_content_fts']
+    if has_trigram_index(conn):
+        tables.append('file_content_trigram')
+    for table in tables:
+        if delete:
+            conn.execute(f"""
+                INSERT INTO {table}({table}, rowid, content_text) VALUES ('delete', ?, ?)
+            """, (rowid, text))
+        else:
+            conn.execute(f"INSERT INTO {table}(rowid, content_text) VALUES (?, ?)", (rowid, text))
+
+
 def store_file_content(
     conn: sqlite3.Connection,
     data: bytes,
@@ -170,6 +315,9 @@ def store_file_content(
     """
     Store file content with deduplication.
     
+    Text files are stored according to get_content_storage(). Binary files
+    are always stored raw.
+    
     Args:
         conn: Database connection
         data: Raw file bytes
@@ -202,24 +350,266 @@ def store_file_content(
         except (UnicodeDecodeError, LookupError):
             pass
     
-    conn.execute("""
-        INSERT INTO file_contents (content_hash, content_blob, content_text, size, encoding_guess, is_binary)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (content_hash, data, content_text, len(data), encoding, int(is_binary)))
+    if content_text is not None:
+        store_line_index(conn, content_hash, content_text)
+    
+    blob, compression, text = data, None, content_text
+    if content_text is not None and get_content_storage() == CONTENT_STORAGE_COMPRESSED:
+        blob, compression = compress_content(data)
+        _text_cache.put(content_hash, content_text)
+        content_text = None
+    
+    cursor = conn.execute("""
+        INSERT INTO file_contents (content_hash, content_blob, content_text, size,
+                                   encoding_guess, is_binary, compression)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (content_hash, blob, content_text, len(data), encoding, int(is_binary), compression))
+    if compression is not None:
+        _index_compressed_text(conn, cursor.lastrowid, text)
     
     return content_hash
 
 
+def delete_file_contents(conn: sqlite3.Connection, content_hashes: List[str]) -> int:
+    """
+    Delete file_contents rows, removing compressed rows from the content indexes.
+    
+    Returns count of rows deleted.
+    """
+    deleted = 0
+    for start in range(0, len(content_hashes), 500):
+        chunk = content_hashes[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        for rowid, content_hash, blob, compression, encoding in conn.execute(f"""
+            SELECT rowid, content_hash, content_blob, compression, encoding_guess
+            FROM file_contents
+            WHERE content_hash IN ({placeholders}) AND compression IS NOT NULL
+        """, chunk).fetchall():
+            text = decode_content_text(content_hash, blob, compression, encoding)
+            if text is not None:
+                _index_compressed_text(conn, rowid, text, delete=True)
+        deleted += conn.execute(
+            f"DELETE FROM file_contents WHERE content_hash IN ({placeholders})", chunk
+        ).rowcount
+    return deleted
+
+
 def get_file_content(conn: sqlite3.Connection, content_hash: str) -> Optional[FileContent]:
-    """Retrieve file content by hash."""
+    """Retrieve file content by hash (raw bytes and text, however stored)."""
     row = conn.execute(
         "SELECT * FROM file_contents WHERE content_hash = ?",
         (content_hash,)
     ).fetchone()
     
-    if row:
-        return FileContent.from_row(row)
-    return None
+    if not row:
+        return None
+    
+    content = FileContent.from_row(row)
+    compression = row['compression']
+    if compression is None:
+        return content
+    return replace(
+        content,
+        content_blob=decompress_content(row['content_blob'], compression),
+        content_text=decode_content_text(
+            content_hash, row['content_blob'], compression, row['encoding_guess']),
+    )
+
+
+def get_content_text(conn: sqlite3.Connection, content_hash: str) -> Optional[str]:
+    """
+    Decoded text of a file's content, or None for binary/unknown content.
+    
+    Hot texts of compressed rows come from an in-memory LRU, so repeated
+    reads of the same file do not decompress it again.
+    """
+    text = _text_cache.get(content_hash)
+    if text is not None:
+        return text
+    
+    row = conn.execute("""
+        SELECT content_text, content_blob, compression, encoding_guess
+        FROM file_contents WHERE content_hash = ?
+    """, (content_hash,)).fetchone()
+    
+    if not row:
+        return None
+    if row[2] is None:
+        return row[0]
+    return decode_content_text(content_hash, row[1], row[2], row[3])
+
+
+def compute_line_starts(text: str) -> array:
+    """Character offset at which each line of text starts (first is 0)."""
+    starts = array('I', [0])
+    find = text.find
+    pos = find('\n')
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = find('\n', pos + 1)
+    return starts
+
+
+def store_line_index(conn: sqlite3.Connection, content_hash: str, text: str) -> None:
+    """Persist the line index of a text content (content_line_index)."""
+    starts = compute_line_starts(text)
+    if sys.byteorder != 'little':
+        starts.byteswap()
+    conn.execute("""
+        INSERT OR REPLACE INTO content_line_index (content_hash, line_count, line_starts)
+        VALUES (?, ?, ?)
+    """, (content_hash, len(starts), starts.tobytes()))
+
+
+def get_line_starts(conn: sqlite3.Connection, content_hash: str, text: str) -> array:
+    """
+    Line start offsets of a text content.
+    
+    Read from content_line_index; computed from text (not stored, so this
+    also works on read-only connections) when the content is not indexed.
+    """
+    row = conn.execute(
+        "SELECT line_starts FROM content_line_index WHERE content_hash = ?",
+        (content_hash,)
+    ).fetchone()
+    if row is None:
+        return compute_line_starts(text)
+    
+    starts = array('I')
+    starts.frombytes(row[0])
+    if sys.byteorder != 'little':
+        starts.byteswap()
+    return starts
+
+
+def index_content_lines(conn: sqlite3.Connection, batch_size: int = 500) -> int:
+    """
+    Build the line index for text contents stored without one.
+    
+    Contents stored through store_file_content() are indexed on insert;
+    this backfills databases built before content_line_index existed.
+    Commits per batch.
+    
+    Returns count of contents indexed.
+    """
+    indexed = 0
+    last_rowid = 0
+    
+    while True:
+        rows = conn.execute("""
+            SELECT fc.rowid, fc.content_hash, fc.content_text
+            FROM file_content_text fc
+            WHERE fc.rowid > ? AND fc.is_binary = 0
+              AND NOT EXISTS (
+                  SELECT 1 FROM content_line_index li WHERE li.content_hash = fc.content_hash
+              )
+            ORDER BY fc.rowid
+            LIMIT ?
+        """, (last_rowid, batch_size)).fetchall()
+        if not rows:
+            break
+        
+        for _rowid, content_hash, text in rows:
+            if text is not None:
+                store_line_index(conn, content_hash, text)
+                indexed += 1
+        conn.commit()
+        last_rowid = rows[-1][0]
+    
+    return indexed
+
+
+def compress_file_contents(conn: sqlite3.Connection, batch_size: int = 500) -> int:
+    """
+    Convert stored text rows to compressed storage, in place.
+    
+    Rewrites every uncompressed text row as a single compressed blob with
+    no content_text copy, and moves its file_content_fts entry (the text
+    does not change) to the compressed row. A row is only converted if its
+    blob decodes back to exactly its content_text; rows written without an
+    encoding_guess get 'utf-8' when that round-trips, and are left
+    uncompressed otherwise. Commits per batch, so an interrupted run can
+    simply be restarted. Run VACUUM afterwards to return the freed pages
+    to the file system.
+    
+    Returns count of rows converted.
+    """
+    converted = 0
+    last_rowid = 0
+    
+    while True:
+        rows = conn.execute("""
+            SELECT rowid, content_hash, content_blob, content_text, encoding_guess
+            FROM file_contents
+            WHERE rowid > ? AND compression IS NULL AND content_text IS NOT NULL
+            ORDER BY rowid
+            LIMIT ?
+        """, (last_rowid, batch_size)).fetchall()
+        if not rows:
+            break
+        
+        updates = []
+        texts = []
+        for rowid, _content_hash, data, text, encoding in rows:
+            encoding = encoding or 'utf-8'
+            try:
+                if data.decode(encoding) != text:
+                    continue
+            except (UnicodeDecodeError, LookupError):
+                continue
+            blob, compression = compress_content(data)
+            updates.append((blob, compression, encoding, rowid))
+            texts.append((rowid, text))
+        conn.executemany("""
+            UPDATE file_contents
+            SET content_blob = ?, compression = ?, encoding_guess = ?, content_text = NULL
+            WHERE rowid = ?
+        """, updates)
+        for rowid, text in texts:
+            _index_compressed_text(conn, rowid, text)
+        conn.commit()
+        
+        converted += len(updates)
+        last_rowid = rows[-1][0]
+    
+    return converted
+
+
+def get_content_storage_stats(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Storage used by file contents, and what compression saves.
+    
+    Returns:
+        Dict with rows, compressed_rows, raw_bytes (file sizes),
+        stored_bytes (blobs + text copies as stored), text_storage_bytes
+        (what 'text' storage needs for the same rows: raw blob plus a text
+        copy of each text file), saved_bytes and db_bytes (database file).
+    """
+    row = conn.execute("""
+        SELECT COUNT(*),
+               COALESCE(SUM(compression IS NOT NULL), 0),
+               COALESCE(SUM(size), 0),
+               COALESCE(SUM(length(content_blob)), 0)
+                 + COALESCE(SUM(length(CAST(content_text AS BLOB))), 0),
+               COALESCE(SUM(CASE WHEN content_text IS NOT NULL OR compression IS NOT NULL
+                                 THEN size ELSE 0 END), 0)
+        FROM file_contents
+    """).fetchone()
+    rows, compressed_rows, raw_bytes, stored_bytes, text_bytes = row
+    text_storage_bytes = raw_bytes + text_bytes
+    
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    
+    return {
+        'rows': rows,
+        'compressed_rows': compressed_rows,
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored_bytes,
+        'text_storage_bytes': text_storage_bytes,
+        'saved_bytes': text_storage_bytes - stored_bytes,
+        'db_bytes': page_count * page_size,
+    }
 
 
 def store_file_record(
@@ -15,6 +15,7 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 
 from ck3raven.db.models import Snapshot
+from ck3raven.parser.ast_serde import deserialize_ast
 
 
 @dataclass
@@ -214,7 +215,7 @@ def export_snapshot_to_file(
         rows = conn.execute("""
             SELECT f.*, fc.content_text, fc.size
             FROM files f
-            JOIN file_contents fc ON f.content_hash = fc.content_hash
+            JOIN file_content_text fc ON f.content_hash = fc.content_hash
             WHERE f.content_version_id = ?
         """, (cvid,)).fetchall()
         
@@ -246,7 +247,8 @@ def export_snapshot_to_file(
                 export_data['asts'].append({
                     'content_hash': row['content_hash'],
                     'parser_version_id': row['parser_version_id'],
-                    'ast_blob': row['ast_blob'].decode('utf-8') if row['ast_blob'] else None,
+                    # Always exported as JSON text, whatever the stored ast_format
+                    'ast_blob': json.dumps(deserialize_ast(row['ast_blob']), separators=(',', ':')) if row['ast_blob'] else None,
                     'parse_ok': row['parse_ok'],
                     'node_count': row['node_count'],
                 })
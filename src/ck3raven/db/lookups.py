@@ -28,6 +28,8 @@ import sqlite3
 from typing import Dict, Any, List, Optional, Iterator
 from dataclasses import dataclass, field
 
+from ck3raven.parser.ast_serde import deserialize_ast
+
 
 @dataclass
 class TraitLookup:
@@ -259,7 +261,7 @@ def extract_lookups_from_symbols(
         
         try:
             # Parse the full AST
-            ast_dict = json.loads(ast_blob.decode('utf-8'))
+            ast_dict = deserialize_ast(ast_blob)
             
             # Find the block for this symbol in the AST
             symbol_block = None
@@ -19,7 +19,7 @@ Previous revision:
 
 import sqlite3
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import threading
 import time
 
@@ -68,14 +68,28 @@ CREATE TABLE IF NOT EXISTS content_versions (
 -- Same content appearing in multiple mods/versions stored once
 CREATE TABLE IF NOT EXISTS file_contents (
     content_hash TEXT PRIMARY KEY,           -- SHA256 of raw bytes
-    content_blob BLOB NOT NULL,              -- Raw file content
-    content_text TEXT,                       -- Text content (if text file)
+    content_blob BLOB NOT NULL,              -- Raw file content (compressed if compression set)
+    content_text TEXT,                       -- Text content (if text file, uncompressed storage)
     size INTEGER NOT NULL,
     encoding_guess TEXT,                     -- 'utf-8', 'latin-1', etc.
     is_binary INTEGER NOT NULL DEFAULT 0,
-    created_at TEXT NOT NULL DEFAULT (datetime('now'))
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    compression TEXT                         -- NULL = raw; 'zlib' = compressed text, no content_text
+);
+
+-- Line index - character offset of each line start, per text content
+-- Line numbers and snippets are sliced from offsets instead of splitting
+-- whole files (content.get_line_starts())
+CREATE TABLE IF NOT EXISTS content_line_index (
+    content_hash TEXT PRIMARY KEY,           -- FK to file_contents
+    line_count INTEGER NOT NULL,
+    line_starts BLOB NOT NULL                -- uint32 little-endian, one per line
 );
 
+CREATE TRIGGER IF NOT EXISTS file_contents_line_index_ad AFTER DELETE ON file_contents BEGIN
+    DELETE FROM content_line_index WHERE content_hash = OLD.content_hash;
+END;
+
 -- File records - maps files to content versions
 -- Links a specific file path in a version to its content
 CREATE TABLE IF NOT EXISTS files (
@@ -119,8 +133,8 @@ CREATE TABLE IF NOT EXISTS asts (
     ast_id INTEGER PRIMARY KEY AUTOINCREMENT,
     content_hash TEXT NOT NULL,              -- SHA256 of source content (not FK)
     parser_version_id INTEGER NOT NULL,      -- FK to parsers
-    ast_blob BLOB NOT NULL,                  -- Serialized AST (JSON or msgpack)
-    ast_format TEXT NOT NULL DEFAULT 'json', -- 'json', 'msgpack'
+    ast_blob BLOB NOT NULL,                  -- Serialized AST (see parser/ast_serde.py)
+    ast_format TEXT NOT NULL DEFAULT 'json', -- 'json', 'binary'
     parse_ok INTEGER NOT NULL DEFAULT 1,     -- 1 = success, 0 = failed
     node_count INTEGER,                      -- Number of AST nodes
     diagnostics_json TEXT,                   -- Parse errors/warnings as JSON
@@ -206,14 +220,77 @@ CREATE INDEX IF NOT EXISTS idx_refs_ast ON refs(ast_id);
 CREATE INDEX IF NOT EXISTS idx_refs_lookup ON refs(ref_type, name);
 CREATE INDEX IF NOT EXISTS idx_refs_name ON refs(name);
 
+-- ============================================================================
+-- PLAYSET CONFLICT INDEX (maintained by the builder, see db/conflicts.py)
+-- ============================================================================
+
+-- Playsets with a materialized conflict index, keyed by their content
+-- version set (load order is applied when conflicts are read)
+CREATE TABLE IF NOT EXISTS conflict_playsets (
+    playset_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cvids TEXT NOT NULL UNIQUE,              -- Sorted content_version_ids, comma-separated
+    symbol_watermark INTEGER NOT NULL DEFAULT 0,  -- Highest symbol_id folded in
+    change_watermark INTEGER NOT NULL DEFAULT 0,  -- Highest conflict_changes.change_id folded in
+    registered_at TEXT NOT NULL DEFAULT (datetime('now')),
+    refreshed_at TEXT
+);
+
+-- Definition sites of symbols defined by more than one content version of a
+-- playset - one row per (content version, file)
+CREATE TABLE IF NOT EXISTS playset_symbol_conflicts (
+    playset_id INTEGER NOT NULL,             -- FK to conflict_playsets
+    symbol_type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    content_version_id INTEGER NOT NULL,
+    relpath TEXT NOT NULL,
+    content_hash TEXT NOT NULL,              -- For invalidation via conflict_changes
+    line_number INTEGER,                     -- First definition in the file
+    PRIMARY KEY (playset_id, symbol_type, name, content_version_id, relpath)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_psc_content_hash ON playset_symbol_conflicts(playset_id, content_hash);
+
+-- Content hashes whose file mapping or symbols changed since the conflict
+-- index last saw them (new symbols are found by symbol_id instead).
+-- Only logged while some playset is indexed; pruned once every playset
+-- has folded a change in.
+CREATE TABLE IF NOT EXISTS conflict_changes (
+    change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT NOT NULL UNIQUE
+);
+
+CREATE TRIGGER IF NOT EXISTS files_conflicts_ai AFTER INSERT ON files
+WHEN EXISTS (SELECT 1 FROM conflict_playsets) BEGIN
+    INSERT OR REPLACE INTO conflict_changes(content_hash) VALUES (NEW.content_hash);
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_conflicts_ad AFTER DELETE ON files
+WHEN EXISTS (SELECT 1 FROM conflict_playsets) BEGIN
+    INSERT OR REPLACE INTO conflict_changes(content_hash) VALUES (OLD.content_hash);
+END;
+
+CREATE TRIGGER IF NOT EXISTS files_conflicts_au
+AFTER UPDATE OF content_hash, relpath, content_version_id ON files
+WHEN EXISTS (SELECT 1 FROM conflict_playsets) BEGIN
+    INSERT OR REPLACE INTO conflict_changes(content_hash) VALUES (OLD.content_hash);
+    INSERT OR REPLACE INTO conflict_changes(content_hash) VALUES (NEW.content_hash);
+END;
+
+CREATE TRIGGER IF NOT EXISTS symbols_conflicts_ad AFTER DELETE ON symbols
+WHEN EXISTS (SELECT 1 FROM conflict_playsets) BEGIN
+    INSERT OR REPLACE INTO conflict_changes(content_hash)
+    SELECT content_hash FROM asts WHERE ast_id = OLD.ast_id;
+END;
+
 -- ============================================================================
 -- FULL-TEXT SEARCH
 -- ============================================================================
 
--- FTS for file content
+-- FTS for file content (external content: the text view, which decodes
+-- compressed rows, so no copy of the text is stored for the index)
 CREATE VIRTUAL TABLE IF NOT EXISTS file_content_fts USING fts5(
     content_text,
-    content=file_contents,
+    content=file_content_text,
     content_rowid=rowid
 );
 
@@ -539,22 +616,44 @@ SELECT CASE
 END AS has_active_session;
 """
 
+# Text of every file_contents row, however it is stored. Compressed rows
+# are decoded by ck3_content_text() (content.register_content_functions(),
+# registered by get_connection() and the other ck3raven/qbuilder
+# connections). Read text through this view, not file_contents.content_text.
+# Connections without the function (e.g. the sqlite3 shell) can still read
+# and write file_contents; only this view needs it.
+CONTENT_TEXT_VIEW_SQL = """
+CREATE VIEW IF NOT EXISTS file_content_text AS
+SELECT rowid AS rowid, content_hash, content_blob, size, encoding_guess, is_binary,
+       CASE WHEN compression IS NULL THEN content_text
+            ELSE ck3_content_text(content_hash, content_blob, compression, encoding_guess)
+       END AS content_text
+FROM file_contents;
+"""
+
 # FTS triggers for keeping indexes in sync
 FTS_TRIGGERS_SQL = """
 -- Triggers to keep FTS indexes synchronized
 
--- file_content_fts triggers
-CREATE TRIGGER IF NOT EXISTS file_contents_ai AFTER INSERT ON file_contents BEGIN
+-- file_content_fts triggers. They use no application functions, so any
+-- connection can write file_contents. They index uncompressed rows only;
+-- content.py indexes compressed rows itself, from the text it decoded
+-- (store_file_content, compress_file_contents, delete_file_contents).
+CREATE TRIGGER IF NOT EXISTS file_contents_ai AFTER INSERT ON file_contents
+WHEN NEW.compression IS NULL BEGIN
     INSERT INTO file_content_fts(rowid, content_text) VALUES (NEW.rowid, NEW.content_text);
 END;
 
-CREATE TRIGGER IF NOT EXISTS file_contents_ad AFTER DELETE ON file_contents BEGIN
+CREATE TRIGGER IF NOT EXISTS file_contents_ad AFTER DELETE ON file_contents
+WHEN OLD.compression IS NULL BEGIN
     INSERT INTO file_content_fts(file_content_fts, rowid, content_text) VALUES('delete', OLD.rowid, OLD.content_text);
 END;
 
 CREATE TRIGGER IF NOT EXISTS file_contents_au AFTER UPDATE ON file_contents BEGIN
-    INSERT INTO file_content_fts(file_content_fts, rowid, content_text) VALUES('delete', OLD.rowid, OLD.content_text);
-    INSERT INTO file_content_fts(rowid, content_text) VALUES (NEW.rowid, NEW.content_text);
+    INSERT INTO file_content_fts(file_content_fts, rowid, content_text)
+        SELECT 'delete', OLD.rowid, OLD.content_text WHERE OLD.compression IS NULL;
+    INSERT INTO file_content_fts(rowid, content_text)
+        SELECT NEW.rowid, NEW.content_text WHERE NEW.compression IS NULL;
 END;
 
 -- symbols_fts triggers
@@ -749,6 +848,8 @@ def get_connection(db_path: Optional[Path] = None) -> sqlite3.Connection:
         conn.execute("PRAGMA journal_mode = WAL")
         conn.execute("PRAGMA synchronous = NORMAL")
         conn.execute("PRAGMA busy_timeout = 5000")
+        from ck3raven.db.content import register_content_functions
+        register_content_functions(conn)
         _local.connections[key] = conn
     
     return _local.connections[key]
@@ -773,6 +874,9 @@ def init_database(db_path: Optional[Path] = None, force: bool = False) -> sqlite
             -- Core tables (order matters for FKs)
             DROP TABLE IF EXISTS localization_refs;
             DROP TABLE IF EXISTS localization_entries;
+            DROP TABLE IF EXISTS playset_symbol_conflicts;
+            DROP TABLE IF EXISTS conflict_playsets;
+            DROP TABLE IF EXISTS conflict_changes;
             DROP TABLE IF EXISTS refs;
             DROP TABLE IF EXISTS symbols;
             DROP TABLE IF EXISTS trait_lookups;
@@ -785,6 +889,7 @@ def init_database(db_path: Optional[Path] = None, force: bool = False) -> sqlite
             DROP TABLE IF EXISTS asts;
             DROP TABLE IF EXISTS parsers;
             DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS content_line_index;
             DROP TABLE IF EXISTS file_contents;
             DROP TABLE IF EXISTS content_versions;
             DROP TABLE IF EXISTS db_metadata;
@@ -799,11 +904,13 @@ def init_database(db_path: Optional[Path] = None, force: bool = False) -> sqlite
             
             -- FTS tables
             DROP TABLE IF EXISTS file_content_fts;
+            DROP TABLE IF EXISTS file_content_trigram;
             DROP TABLE IF EXISTS symbols_fts;
             DROP TABLE IF EXISTS refs_fts;
             
             -- Views
             DROP VIEW IF EXISTS v_builder_session_active;
+            DROP VIEW IF EXISTS file_content_text;
             
             -- DEPRECATED TABLES (to be removed)
             DROP TABLE IF EXISTS ingest_blocks;
@@ -831,6 +938,9 @@ def init_database(db_path: Optional[Path] = None, force: bool = False) -> sqlite
     
     # Create schema
     conn.executescript(SCHEMA_SQL)
+    _migrate_content_storage(conn)
+    _migrate_content_triggers(conn)
+    conn.executescript(CONTENT_TEXT_VIEW_SQL)
     conn.executescript(FTS_TRIGGERS_SQL)
     
     # Apply write protection triggers (optional)
@@ -850,6 +960,62 @@ def init_database(db_path: Optional[Path] = None, force: bool = False) -> sqlite
     return conn
 
 
+def _migrate_content_storage(conn: sqlite3.Connection) -> None:
+    """
+    Bring a pre-compression file_contents table up to date.
+    
+    Adds the compression column, replaces the file_contents FTS triggers
+    with the ones that leave compressed rows to content.py, and recreates
+    file_content_fts over the file_content_text view. The external content
+    table is fixed when an FTS table is created, so this reindexes all
+    file contents once.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(file_contents)")}
+    if 'compression' in columns:
+        return
+    
+    conn.execute("ALTER TABLE file_contents ADD COLUMN compression TEXT")
+    for trigger in ('file_contents_ai', 'file_contents_ad', 'file_contents_au'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS file_content_fts")
+    conn.executescript(CONTENT_TEXT_VIEW_SQL)
+    conn.execute("""
+        CREATE VIRTUAL TABLE file_content_fts USING fts5(
+            content_text,
+            content=file_content_text,
+            content_rowid=rowid
+        )
+    """)
+    conn.execute("INSERT INTO file_content_fts(file_content_fts) VALUES('rebuild')")
+    conn.commit()
+
+
+def _migrate_content_triggers(conn: sqlite3.Connection) -> None:
+    """
+    Replace file_contents triggers that call ck3_content_text().
+    
+    Earlier compressed-storage databases decoded compressed rows inside the
+    FTS triggers, so connections without the function could not write
+    file_contents. The index entries are the same either way; only the
+    triggers are recreated.
+    """
+    stale = [row[0] for row in conn.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'trigger' AND tbl_name = 'file_contents'
+          AND sql LIKE '%ck3_content_text%'
+    """)]
+    if not stale:
+        return
+    
+    for trigger in stale:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.commit()
+    conn.executescript(FTS_TRIGGERS_SQL)
+    if has_trigram_index(conn):
+        conn.executescript(TRIGRAM_INDEX_SQL)
+    conn.commit()
+
+
 def get_schema_version(conn: sqlite3.Connection) -> Optional[int]:
     """Get the current schema version from the database."""
     try:
@@ -861,6 +1027,144 @@ def get_schema_version(conn: sqlite3.Connection) -> Optional[int]:
         return None
 
 
+# ============================================================================
+# Deferred FTS Maintenance
+# ============================================================================
+
+# FTS indexes whose sync triggers can be suspended during bulk builds
+DEFERRABLE_FTS = {
+    'symbols': ('symbols_fts', ('symbols_ai', 'symbols_ad', 'symbols_au')),
+    'refs': ('refs_fts', ('refs_ai', 'refs_ad', 'refs_au')),
+}
+
+_FTS_DEFERRED_KEY = 'fts_deferred'
+
+
+def get_deferred_fts(conn: sqlite3.Connection) -> List[str]:
+    """Return the tables whose FTS sync is currently deferred."""
+    try:
+        row = conn.execute(
+            "SELECT value FROM db_metadata WHERE key = ?", (_FTS_DEFERRED_KEY,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return []
+    return [t for t in row[0].split(',') if t] if row else []
+
+
+def defer_fts_sync(conn: sqlite3.Connection, tables: Tuple[str, ...] = ('symbols', 'refs')) -> None:
+    """
+    Suspend per-row FTS maintenance for bulk inserts.
+
+    Drops the FTS sync triggers of `tables` and records the deferral in
+    db_metadata, so restore_fts_sync() can finish the job even after a
+    crash. While deferred, symbols_fts/refs_fts miss new rows.
+    """
+    deferred = get_deferred_fts(conn)
+    for table in tables:
+        _, triggers = DEFERRABLE_FTS[table]
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        if table not in deferred:
+            deferred.append(table)
+
+    conn.execute("""
+        INSERT OR REPLACE INTO db_metadata (key, value, updated_at)
+        VALUES (?, ?, datetime('now'))
+    """, (_FTS_DEFERRED_KEY, ','.join(deferred)))
+    conn.commit()
+
+
+def restore_fts_sync(conn: sqlite3.Connection) -> List[str]:
+    """
+    Recreate deferred FTS triggers and rebuild the affected FTS indexes.
+
+    No-op unless defer_fts_sync() was called. Safe to call on startup.
+
+    Returns the tables whose FTS index was rebuilt.
+    """
+    deferred = get_deferred_fts(conn)
+    if not deferred:
+        return []
+
+    conn.commit()
+    conn.executescript(FTS_TRIGGERS_SQL)
+    for table in deferred:
+        fts_table, _ = DEFERRABLE_FTS[table]
+        conn.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES('rebuild')")
+    conn.execute("DELETE FROM db_metadata WHERE key = ?", (_FTS_DEFERRED_KEY,))
+    conn.commit()
+    return deferred
+
+
+# ============================================================================
+# Trigram Index (substring / regex search)
+# ============================================================================
+
+# Opt-in: a trigram index is several times the size of the text it covers.
+# search.grep_content() uses it when present and scans otherwise. Like
+# file_content_fts, compressed rows are indexed by content.py.
+TRIGRAM_INDEX_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS file_content_trigram USING fts5(
+    content_text,
+    content=file_content_text,
+    content_rowid=rowid,
+    tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS file_contents_tri_ai AFTER INSERT ON file_contents
+WHEN NEW.compression IS NULL BEGIN
+    INSERT INTO file_content_trigram(rowid, content_text) VALUES (NEW.rowid, NEW.content_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS file_contents_tri_ad AFTER DELETE ON file_contents
+WHEN OLD.compression IS NULL BEGIN
+    INSERT INTO file_content_trigram(file_content_trigram, rowid, content_text) VALUES('delete', OLD.rowid, OLD.content_text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS file_contents_tri_au AFTER UPDATE ON file_contents BEGIN
+    INSERT INTO file_content_trigram(file_content_trigram, rowid, content_text)
+        SELECT 'delete', OLD.rowid, OLD.content_text WHERE OLD.compression IS NULL;
+    INSERT INTO file_content_trigram(rowid, content_text)
+        SELECT NEW.rowid, NEW.content_text WHERE NEW.compression IS NULL;
+END;
+"""
+
+
+def has_trigram_index(conn: sqlite3.Connection) -> bool:
+    """Whether file_content_trigram exists (see create_trigram_index())."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'file_content_trigram'"
+    ).fetchone()
+    return row is not None
+
+
+def create_trigram_index(conn: sqlite3.Connection) -> bool:
+    """
+    Create and fill the trigram index over file contents.
+    
+    Kept in sync by triggers from then on. Needs SQLite 3.34+ (trigram
+    tokenizer). No-op if the index already exists.
+    
+    Returns True if the index was created.
+    """
+    if has_trigram_index(conn):
+        return False
+    
+    conn.commit()
+    conn.executescript(TRIGRAM_INDEX_SQL)
+    conn.execute("INSERT INTO file_content_trigram(file_content_trigram) VALUES('rebuild')")
+    conn.commit()
+    return True
+
+
+def drop_trigram_index(conn: sqlite3.Connection) -> None:
+    """Remove the trigram index and its triggers."""
+    for trigger in ('file_contents_tri_ai', 'file_contents_tri_ad', 'file_contents_tri_au'):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("DROP TABLE IF EXISTS file_content_trigram")
+    conn.commit()
+
+
 def close_all_connections():
     """Close all thread-local connections."""
     if hasattr(_local, 'connections'):
@@ -5,11 +5,21 @@ Context-aware search across content, symbols, and references.
 Uses SQLite FTS5 for full-text search with ranking.
 """
 
+import re
 import sqlite3
-from typing import Optional, List, Dict, Any, Tuple
+from array import array
+from bisect import bisect_right
+from fnmatch import fnmatch
+from typing import Optional, List, Dict, Any, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 
+try:
+    from re import _constants as _sre, _parser as _sre_parse
+except ImportError:  # Python 3.10
+    import sre_constants as _sre
+    import sre_parse as _sre_parse
+
 from ck3raven.db.models import Symbol, Reference, FileRecord
 
 
@@ -49,6 +59,276 @@ def escape_fts_query(query: str) -> str:
     return escaped
 
 
+# Token characters of file_content_fts (unicode61: letters and digits;
+# '_' and all punctuation separate tokens)
+_FTS_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def fts_substring_query(terms: List[str]) -> Optional[str]:
+    """
+    FTS5 query narrowing files to candidates for case-insensitive
+    substring terms (all terms must occur).
+    
+    Each term becomes a phrase of its tokens with the last one as a prefix,
+    so 'has_trait' matches has_trait, has_traits, ... A term is found when
+    it starts at a token boundary; the caller verifies candidates against
+    the text (the phrase also matches e.g. 'has trait'). Terms without any
+    token characters ('=', '{') cannot narrow the search and are skipped.
+    
+    Returns None when no term has tokens (the caller must scan).
+    """
+    phrases = []
+    for term in terms:
+        tokens = _FTS_TOKEN_RE.findall(term)
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '" *')
+    return ' AND '.join(phrases) if phrases else None
+
+
+def find_term_matches(
+    text: str,
+    line_starts: array,
+    terms: List[str],
+    max_matches: int,
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Lines containing any term (case-insensitive), grep-style.
+    
+    Line numbers and snippets are sliced from line_starts
+    (content.get_line_starts()) instead of splitting the text. A line
+    reports the first term in `terms` that occurs on it, at its first
+    occurrence.
+    
+    Returns:
+        (matches, term_counts): up to max_matches {'line', 'snippet'} dicts
+        in line order, and the number of occurrences of each term
+    """
+    # line index -> (term index, column) of the match it reports
+    first_hits: Dict[int, Tuple[int, int]] = {}
+    term_counts = [0] * len(terms)
+    for term_index, term in enumerate(terms):
+        for m in re.finditer(re.escape(term), text, re.IGNORECASE):
+            term_counts[term_index] += 1
+            line = bisect_right(line_starts, m.start()) - 1
+            hit = (term_index, m.start() - line_starts[line])
+            if line not in first_hits or hit < first_hits[line]:
+                first_hits[line] = hit
+    
+    matches = []
+    for line in sorted(first_hits)[:max_matches]:
+        term_index, pos = first_hits[line]
+        line_start = line_starts[line]
+        line_end = line_starts[line + 1] - 1 if line + 1 < len(line_starts) else len(text)
+        line_length = line_end - line_start
+        
+        # Snippet with context around the match
+        start = max(0, pos - 30)
+        end = min(line_length, pos + len(terms[term_index]) + 50)
+        snippet = text[line_start + start:line_start + end].strip()
+        if start > 0:
+            snippet = "..." + snippet
+        if end < line_length:
+            snippet = snippet + "..."
+        
+        matches.append({"line": line + 1, "snippet": snippet})
+    
+    return matches, term_counts
+
+
+# Trigram query plan: None (no requirement), a literal, or ('and'|'or', [plans])
+TrigramPlan = Union[None, str, Tuple[str, list]]
+
+_REPEATS = {_sre.MAX_REPEAT, _sre.MIN_REPEAT}
+if hasattr(_sre, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(_sre.POSSESSIVE_REPEAT)
+
+
+def _plan_all(plans: list) -> TrigramPlan:
+    plans = [p for p in plans if p is not None]
+    if not plans:
+        return None
+    return plans[0] if len(plans) == 1 else ('and', plans)
+
+
+def _plan_regex_items(items) -> TrigramPlan:
+    """Plan for a parsed regex sequence: every literal run it must contain."""
+    plans = []
+    run: List[str] = []
+    
+    def flush() -> None:
+        if len(run) >= 3:
+            plans.append(''.join(run))
+        run.clear()
+    
+    for op, av in items:
+        if op is _sre.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is _sre.AT:
+            continue  # Zero-width anchor: the literals around it are still adjacent
+        flush()
+        if op is _sre.SUBPATTERN:
+            plans.append(_plan_regex_items(av[-1]))
+        elif op in _REPEATS:
+            low, _high, item = av
+            if low >= 1:
+                plans.append(_plan_regex_items(item))
+        elif op is _sre.BRANCH:
+            branches = [_plan_regex_items(b) for b in av[1]]
+            if all(b is not None for b in branches):
+                plans.append(('or', branches))
+        elif getattr(_sre, 'ATOMIC_GROUP', None) is op:
+            plans.append(_plan_regex_items(av))
+        # Anything else (classes, '.', backreferences, lookarounds) requires
+        # no particular literal
+    flush()
+    return _plan_all(plans)
+
+
+def plan_trigram_query(pattern: str, is_regex: bool = False) -> TrigramPlan:
+    """
+    Literal substrings any match of `pattern` must contain.
+    
+    A literal pattern is itself the requirement. For a regex, runs of
+    literal characters are required where the regex cannot skip them:
+    'has_(trait|flag)_x' needs 'has_' and one of 'trait' / 'flag'. Runs
+    shorter than three characters carry no trigram and are dropped.
+    
+    Returns None when nothing is required (the caller must scan).
+    """
+    if not is_regex:
+        return pattern if len(pattern) >= 3 else None
+    try:
+        parsed = _sre_parse.parse(pattern)
+    except re.error:
+        return None
+    return _plan_regex_items(parsed)
+
+
+def trigram_match_query(plan: TrigramPlan) -> Optional[str]:
+    """file_content_trigram MATCH expression for a plan."""
+    if plan is None:
+        return None
+    if isinstance(plan, str):
+        return '"' + plan.replace('"', '""') + '"'
+    op, plans = plan
+    joined = f" {op.upper()} ".join(trigram_match_query(p) for p in plans)
+    return f"({joined})"
+
+
+def grep_content(
+    conn: sqlite3.Connection,
+    pattern: str,
+    is_regex: bool = False,
+    content_version_ids: Optional[List[int]] = None,
+    relpath_prefix: Optional[str] = None,
+    include_pattern: Optional[str] = None,
+    max_matches: int = 50,
+) -> Dict[str, Any]:
+    """
+    Substring or regex search over file contents, grep-style.
+    
+    Case-insensitive. Regexes run in MULTILINE mode over the whole text, so
+    ^ and $ anchor at line boundaries as when searching line by line. With
+    the trigram index (schema.create_trigram_index()) candidate files come
+    from the literals plan_trigram_query() extracts; without it, or when a
+    pattern has no usable literal, every text file in scope is scanned.
+    
+    Args:
+        conn: Database connection
+        pattern: Text or regex
+        is_regex: Treat pattern as a regex
+        content_version_ids: Restrict to these content versions
+        relpath_prefix: Restrict to one relpath, or to a folder if it ends
+            with '/' (case-insensitive, like CK3 paths)
+        include_pattern: Glob on the file name (or relpath, if it has a '/')
+        max_matches: Stop after this many matching lines
+    
+    Returns:
+        Dict with matches ([{content_version_id, relpath, line, content}]),
+        files_searched, indexed (trigram index used) and truncated
+    """
+    from ck3raven.db.content import get_line_starts
+    from ck3raven.db.schema import has_trigram_index
+    
+    regex = re.compile(pattern if is_regex else re.escape(pattern),
+                       re.IGNORECASE | re.MULTILINE)
+    
+    match_query = None
+    if has_trigram_index(conn):
+        match_query = trigram_match_query(plan_trigram_query(pattern, is_regex))
+    
+    params: List[Any] = []
+    if match_query is not None:
+        sql = """
+            SELECT f.content_version_id, f.relpath, fc.content_hash, fc.content_text
+            FROM file_content_trigram tri
+            JOIN file_content_text fc ON fc.rowid = tri.rowid
+            JOIN files f ON f.content_hash = fc.content_hash
+            WHERE file_content_trigram MATCH ? AND f.deleted = 0
+        """
+        params.append(match_query)
+    else:
+        sql = """
+            SELECT f.content_version_id, f.relpath, fc.content_hash, fc.content_text
+            FROM files f
+            JOIN file_content_text fc ON fc.content_hash = f.content_hash
+            WHERE f.deleted = 0 AND fc.content_text IS NOT NULL
+        """
+    
+    if content_version_ids is not None:
+        sql += f" AND f.content_version_id IN ({','.join('?' * len(content_version_ids))})"
+        params.extend(content_version_ids)
+    if relpath_prefix:
+        if relpath_prefix.endswith('/'):
+            sql += " AND lower(substr(f.relpath, 1, ?)) = ?"
+            params.extend((len(relpath_prefix), relpath_prefix.lower()))
+        else:
+            sql += " AND lower(f.relpath) = ?"
+            params.append(relpath_prefix.lower())
+    sql += " ORDER BY f.content_version_id, f.relpath"
+    
+    matches = []
+    files_searched = 0
+    truncated = False
+    for cvid, relpath, content_hash, text in conn.execute(sql, params):
+        if include_pattern:
+            target = relpath if '/' in include_pattern else relpath.rsplit('/', 1)[-1]
+            if not fnmatch(target, include_pattern):
+                continue
+        files_searched += 1
+        
+        line_starts = None
+        last_line = -1
+        for m in regex.finditer(text or ''):
+            if line_starts is None:
+                line_starts = get_line_starts(conn, content_hash, text)
+            line = bisect_right(line_starts, m.start()) - 1
+            if line == last_line:
+                continue  # One result per line
+            last_line = line
+            
+            line_end = line_starts[line + 1] - 1 if line + 1 < len(line_starts) else len(text)
+            matches.append({
+                "content_version_id": cvid,
+                "relpath": relpath,
+                "line": line + 1,
+                "content": text[line_starts[line]:line_end].rstrip()[:200],
+            })
+            if len(matches) >= max_matches:
+                truncated = True
+                break
+        if truncated:
+            break
+    
+    return {
+        "matches": matches,
+        "files_searched": files_searched,
+        "indexed": match_query is not None,
+        "truncated": truncated,
+    }
+
+
 def search_symbols(
     conn: sqlite3.Connection,
     query: str,
@@ -205,7 +485,7 @@ def search_content(
         SELECT fc.content_hash, fc.content_text, f.relpath, f.file_type, 
                f.content_version_id, rank
         FROM file_content_fts fts
-        JOIN file_contents fc ON fc.rowid = fts.rowid
+        JOIN file_content_text fc ON fc.rowid = fts.rowid
         JOIN files f ON f.content_hash = fc.content_hash
         WHERE file_content_fts MATCH ?
     """
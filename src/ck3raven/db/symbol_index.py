@@ -0,0 +1,245 @@
+"""
+Symbol Name Index
+
+In-memory index over the distinct names in the symbols table, for adjacency
+search (exact / prefix / suffix / contains / token patterns and fuzzy
+matches) without LIKE scans of every symbol row.
+
+Structures, all keyed by the lowercased name:
+- sorted names, for prefix ranges (bisect)
+- sorted reversed names, for suffix ranges
+- trigram postings (name ordinals), for infix candidates
+- names by length, for fuzzy matches of short queries
+
+Matching returns names only; the caller fetches the symbol rows with
+``symbols.name IN (...)`` (idx_symbols_name), which also applies the
+content-version and type filters.
+
+The index is refreshed from a symbol_id watermark: symbols are append-only
+(AUTOINCREMENT), so rows written by the builder since the last refresh are
+exactly those above the watermark. Names whose symbols were deleted stay in
+the index until the next full build; they match no rows.
+"""
+
+import re
+import sqlite3
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+
+# Names per IN (...) statement when fetching rows for matched names
+NAME_BATCH_SIZE = 500
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix_range(keys: List[str], prefix: str) -> List[str]:
+    """Slice of sorted keys starting with prefix."""
+    start = bisect_left(keys, prefix)
+    end = start
+    while end < len(keys) and keys[end].startswith(prefix):
+        end += 1
+    return keys[start:end]
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Levenshtein distance between a and b, or None if it exceeds
+    max_distance (rows stop as soon as every cell is over the bound).
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class SymbolNameIndex:
+    """
+    Name index for one database.
+
+    Usage:
+        index = SymbolNameIndex()
+        index.refresh(conn)                       # full build, then incremental
+        keys = index.match_like('has_%')          # lowercased names
+        names = index.variants(keys)              # names as stored, sorted
+    """
+
+    def __init__(self):
+        self.watermark = 0  # Highest symbol_id indexed
+        self._variants: Dict[str, Set[str]] = {}  # key -> stored spellings
+        self._ordinals: List[str] = []  # key per ordinal (posting id)
+        self._keys: List[str] = []
+        self._reversed: List[str] = []
+        self._grams: Dict[str, array] = {}
+        self._by_length: Dict[int, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def refresh(self, conn: sqlite3.Connection) -> int:
+        """
+        Index names of symbols written since the last refresh.
+
+        Rebuilds from scratch if the table was emptied or recreated (its
+        highest symbol_id went below the watermark).
+
+        Returns:
+            Number of new distinct names
+        """
+        top = conn.execute("SELECT MAX(symbol_id) FROM symbols").fetchone()[0] or 0
+        if top == self.watermark:
+            return 0
+        if top < self.watermark:
+            self.clear()
+
+        rows = conn.execute(
+            "SELECT DISTINCT name FROM symbols WHERE symbol_id > ? AND symbol_id <= ?",
+            (self.watermark, top),
+        )
+        added = self.add_names(row[0] for row in rows)
+        self.watermark = top
+        return added
+
+    def add_names(self, names: Iterable[str]) -> int:
+        """Add names to the index. Returns the number of new distinct names."""
+        new_keys = []
+        for name in names:
+            if not name:
+                continue
+            key = name.lower()
+            spellings = self._variants.get(key)
+            if spellings is None:
+                self._variants[key] = {name}
+                new_keys.append(key)
+            else:
+                spellings.add(name)
+
+        if not new_keys:
+            return 0
+
+        for key in new_keys:
+            ordinal = len(self._ordinals)
+            self._ordinals.append(key)
+            for gram in _trigrams(key):
+                postings = self._grams.get(gram)
+                if postings is None:
+                    postings = self._grams[gram] = array('I')
+                postings.append(ordinal)  # Ordinals only grow: postings stay sorted
+            self._by_length.setdefault(len(key), []).append(key)
+
+        # Timsort merges the sorted run with the new one
+        self._keys = sorted(self._keys + new_keys)
+        self._reversed = sorted(self._reversed + [key[::-1] for key in new_keys])
+        return len(new_keys)
+
+    # =========================================================================
+    # MATCHING (lowercased keys)
+    # =========================================================================
+
+    def _rarest_postings(self, grams: Iterable[str]) -> Optional[array]:
+        """Shortest posting list among grams (empty if any gram is unknown)."""
+        best = None
+        for gram in grams:
+            postings = self._grams.get(gram)
+            if postings is None:
+                return array('I')
+            if best is None or len(postings) < len(best):
+                best = postings
+        return best
+
+    def match_like(self, pattern: str) -> List[str]:
+        """
+        Keys matching a LIKE pattern built from literals and '%'
+        (expand_query_patterns() output), sorted.
+
+        '_' is matched literally: symbol names use it as a separator, not
+        as a wildcard. The pattern is lowercased.
+        """
+        pattern = pattern.lower()
+        segments = pattern.split('%')
+        if len(segments) == 1:
+            return [pattern] if pattern in self._variants else []
+
+        head, tail = segments[0], segments[-1]
+        inner = [s for s in segments if s]
+
+        # Candidates: prefix range if anchored at the start, else suffix range,
+        # else the rarest trigram posting of the literals
+        if head:
+            candidates: Iterable[str] = _prefix_range(self._keys, head)
+        elif tail:
+            candidates = [rev[::-1] for rev in _prefix_range(self._reversed, tail[::-1])]
+        else:
+            postings = self._rarest_postings(
+                gram for segment in inner for gram in _trigrams(segment))
+            if postings is None:
+                candidates = self._keys
+            else:
+                candidates = [self._ordinals[i] for i in postings]
+
+        if len(segments) == 2 and (head or tail):
+            # Plain prefix / suffix: every candidate matches
+            return sorted(candidates)
+
+        regex = re.compile('.*'.join(re.escape(s) for s in segments), re.DOTALL)
+        return sorted(key for key in candidates if regex.fullmatch(key))
+
+    def match_fuzzy(self, query: str, max_distance: Optional[int] = None) -> List[str]:
+        """
+        Keys within an edit distance of query, sorted by (distance, key).
+
+        max_distance defaults to 1 for queries up to 8 characters and 2
+        beyond. Query trigrams filter candidates: an edit touches at most
+        three trigrams, so a match shares at least g - 3d of the query's
+        g distinct trigrams and, when that is positive, contains one of its
+        3d + 1 rarest. Shorter queries scan names of nearby lengths.
+        """
+        query = query.lower().strip()
+        if max_distance is None:
+            max_distance = 1 if len(query) <= 8 else 2
+
+        grams = _trigrams(query)
+        if len(grams) - 3 * max_distance >= 1:
+            postings = sorted((self._grams.get(gram, array('I')) for gram in grams), key=len)
+            ordinals: Set[int] = set()
+            for posting in postings[:3 * max_distance + 1]:
+                ordinals.update(posting)
+            candidates: Iterable[str] = (self._ordinals[i] for i in ordinals)
+        else:
+            candidates = (
+                key
+                for length in range(len(query) - max_distance, len(query) + max_distance + 1)
+                for key in self._by_length.get(length, ())
+            )
+
+        scored = []
+        for key in candidates:
+            distance = edit_distance(query, key, max_distance)
+            if distance is not None:
+                scored.append((distance, key))
+        scored.sort()
+        return [key for _, key in scored]
+
+    def variants(self, keys: Iterable[str]) -> List[str]:
+        """Stored spellings of keys, sorted as SQLite sorts s.name."""
+        names = []
+        for key in keys:
+            names.extend(self._variants.get(key, ()))
+        names.sort()
+        return names
@@ -21,11 +21,12 @@ import json
 import logging
 import re
 import hashlib
-from typing import Optional, List, Dict, Any, Tuple, Set, Iterator, Callable
+from typing import Optional, List, Dict, Any, Tuple, Set, Iterable, Iterator, Callable
 from dataclasses import dataclass
 from pathlib import Path
 
 from ck3raven.db.models import Symbol, Reference
+from ck3raven.parser.ast_serde import deserialize_ast
 
 logger = logging.getLogger(__name__)
 
@@ -531,6 +532,113 @@ def _extract_title_hierarchy(
                     )
 
 
+# Non-game-content files that produce no symbols (refs are still extracted)
+_SKIP_SYMBOL_PATTERNS = (
+    'checksum_manifest.txt',
+    'credit_portraits.txt',  # Credits metadata
+    'gfx/court_scene/',  # All court scene files (settings, environment, etc.)
+    'gfx/portraits/accessory_variations/',  # Anonymous texture blocks
+    'gfx/map/environment/',  # Map lighting/shader settings
+    'gfx/map/map_object_data/',  # Map object locators (anonymous repeated blocks)
+    'gfx/map/post_effects/',  # Post-effect settings (anonymous configuration)
+)
+
+
+def _is_symbol_skipped_path(relpath: str) -> bool:
+    """True if relpath is a non-game-content file that defines no symbols."""
+    relpath_lower = relpath.replace('\\', '/').lower()
+    return any(pattern in relpath_lower for pattern in _SKIP_SYMBOL_PATTERNS)
+
+
+def _node_identity(
+    node: Dict[str, Any],
+    source_text: str,
+    content_hash: str
+) -> Tuple[str, int, int]:
+    """Return (node_hash_norm, start_offset, end_offset) for an AST node."""
+    start_offset = node.get('start_offset', 0)
+    end_offset = node.get('end_offset', 0)
+    
+    if source_text and end_offset > start_offset:
+        node_hash = compute_node_hash(source_text[start_offset:end_offset])
+    else:
+        # Fallback: use content_hash as placeholder
+        node_hash = content_hash
+    
+    return node_hash, start_offset, end_offset
+
+
+def _top_level_symbol(
+    child: Dict[str, Any],
+    kind: str,
+    source_text: str,
+    content_hash: str
+) -> Optional[ExtractedSymbol]:
+    """Build the symbol for a top-level block or assignment, if it defines one."""
+    child_type = child.get('_type')
+    
+    if child_type == 'block':
+        # Use _name (the block's identifier) not 'name' (which can be overwritten
+        # by nested name = {...} assignments creating a list collision)
+        name = child.get('_name') or child.get('name')
+        
+        if not (name and _is_valid_symbol_name(name)):
+            return None
+        
+        # Try to extract doc from children
+        doc = None
+        for bc in child.get('children', []):
+            if bc.get('_type') == 'assignment':
+                key = bc.get('key')
+                if key in ('desc', 'description', 'title'):
+                    val = bc.get('value', {})
+                    if val.get('_type') == 'value':
+                        doc = str(val.get('value', ''))
+                        break
+        
+        node_hash, start_offset, end_offset = _node_identity(child, source_text, content_hash)
+        return ExtractedSymbol(
+            name=name,
+            kind=kind,
+            line=child.get('line', 0),
+            column=child.get('column', 0),
+            signature=None,
+            doc=doc,
+            node_hash_norm=node_hash,
+            node_start_offset=start_offset,
+            node_end_offset=end_offset
+        )
+    
+    if child_type == 'assignment':
+        # Top-level assignments are symbols too
+        key = child.get('key')
+        
+        # Skip @scripted_values - these are FILE-LOCAL constants, not global symbols
+        # Each file can define @my_var = 5 without conflicting with other files
+        if not (key and _is_valid_symbol_name(key)) or key.startswith('@'):
+            return None
+        
+        # Get value as signature if it's simple
+        value = child.get('value', {})
+        val_str = None
+        if value.get('_type') == 'value':
+            val_str = str(value.get('value', ''))
+        
+        node_hash, start_offset, end_offset = _node_identity(child, source_text, content_hash)
+        return ExtractedSymbol(
+            name=key,
+            kind=kind,
+            line=child.get('line', 0),
+            column=child.get('column', 0),
+            signature=val_str,
+            node_hash_norm=node_hash,
+            node_start_offset=start_offset,
+            node_end_offset=end_offset
+        )
+    
+    return None
+
+
 def extract_symbols_from_ast(
     ast_dict: Dict[str, Any],
     relpath: str,
@@ -552,19 +660,8 @@ def extract_symbols_from_ast(
         source_text: Original source text for node span extraction and hashing
     """
     # Skip non-game-content files
-    relpath_lower = relpath.replace('\\', '/').lower()
-    skip_patterns = [
-        'checksum_manifest.txt',
-        'credit_portraits.txt',  # Credits metadata
-        'gfx/court_scene/',  # All court scene files (settings, environment, etc.)
-        'gfx/portraits/accessory_variations/',  # Anonymous texture blocks
-        'gfx/map/environment/',  # Map lighting/shader settings
-        'gfx/map/map_object_data/',  # Map object locators (anonymous repeated blocks)
-        'gfx/map/post_effects/',  # Post-effect settings (anonymous configuration)
-    ]
-    for pattern in skip_patterns:
-        if pattern in relpath_lower:
-            return  # Skip this file entirely
+    if _is_symbol_skipped_path(relpath):
+        return
     
     # Get type hint from path (never None)
     kind = get_symbol_kind_from_path(relpath)
@@ -573,105 +670,9 @@ def extract_symbols_from_ast(
     children = ast_dict.get('children', [])
     
     for child in children:
-        child_type = child.get('_type')
-        
-        if child_type == 'block':
-            # Use _name (the block's identifier) not 'name' (which can be overwritten
-            # by nested name = {...} assignments creating a list collision)
-            name = child.get('_name') or child.get('name')
-            line = child.get('line', 0)
-            column = child.get('column', 0)
-            
-            if name and _is_valid_symbol_name(name):
-                # Skip internal/namespace blocks that aren't real definitions
-                # (blocks inside other blocks are handled by reference extraction)
-                
-                # Try to extract signature/doc from children
-                signature = None
-                doc = None
-                
-                block_children = child.get('children', [])
-                for bc in block_children:
-                    if bc.get('_type') == 'assignment':
-                        key = bc.get('key')
-                        if key in ('desc', 'description', 'title'):
-                            val = bc.get('value', {})
-                            if val.get('_type') == 'value':
-                                doc = str(val.get('value', ''))
-                                break
-                
-                # Extract offsets and compute hash
-                start_offset = child.get('start_offset', 0)
-                end_offset = child.get('end_offset', 0)
-                
-                if source_text and end_offset > start_offset:
-                    node_span = source_text[start_offset:end_offset]
-                    node_hash = compute_node_hash(node_span)
-                else:
-                    # Fallback: use content_hash as placeholder
-                    node_hash = content_hash
-                
-                yield ExtractedSymbol(
-                    name=name,
-                    kind=kind,
-                    line=line,
-                    column=column,
-                    signature=signature,
-                    doc=doc,
-                    node_hash_norm=node_hash,
-                    node_start_offset=start_offset,
-                    node_end_offset=end_offset
-                )
-        
-        elif child_type == 'assignment':
-            # Top-level assignments are symbols too
-            key = child.get('key')
-            line = child.get('line', 0)
-            column = child.get('column', 0)
-            
-            if key and _is_valid_symbol_name(key):
-                value = child.get('value', {})
-                
-                # Skip @scripted_values - these are FILE-LOCAL constants, not global symbols
-                # Each file can define @my_var = 5 without conflicting with other files
-                if key.startswith('@'):
-                    continue
-                
-                # Determine specific type
-                if kind == 'define':
-                    sym_kind = 'define'
-                    sym_name = key
-                else:
-                    # Could be namespace assignment, variable, etc.
-                    sym_kind = kind
-                    sym_name = key
-                
-                # Get value as signature if it's simple
-                val_str = None
-                if value.get('_type') == 'value':
-                    val_str = str(value.get('value', ''))
-                
-                # Extract offsets and compute hash
-                start_offset = child.get('start_offset', 0)
-                end_offset = child.get('end_offset', 0)
-                
-                if source_text and end_offset > start_offset:
-                    node_span = source_text[start_offset:end_offset]
-                    node_hash = compute_node_hash(node_span)
-                else:
-                    # Fallback: use content_hash as placeholder
-                    node_hash = content_hash
-                
-                yield ExtractedSymbol(
-                    name=sym_name,
-                    kind=sym_kind,
-                    line=line,
-                    column=column,
-                    signature=val_str,
-                    node_hash_norm=node_hash,
-                    node_start_offset=start_offset,
-                    node_end_offset=end_offset
-                )
+        symbol = _top_level_symbol(child, kind, source_text, content_hash)
+        if symbol is not None:
+            yield symbol
     
     # ==========================================================================
     # NESTED SYMBOL EXTRACTION
@@ -705,6 +706,41 @@ def extract_symbols_from_ast(
                 )
 
 
+def _assignment_ref(
+    key: str,
+    value: Dict[str, Any],
+    line: int,
+    column: int,
+    context: str
+) -> Optional[ExtractedRef]:
+    """Build the reference made by ``key = value``, if key is a reference key."""
+    if key in REFERENCE_KEYS:
+        if value.get('_type') == 'value':
+            ref_name = str(value.get('value', ''))
+            if ref_name and not ref_name.startswith('$'):  # Skip variables
+                return ExtractedRef(
+                    name=ref_name,
+                    kind=REFERENCE_KEYS[key],
+                    line=value.get('line', line),
+                    column=value.get('column', column),
+                    context=context or key
+                )
+    
+    elif key in SCRIPT_REFERENCE_KEYS:
+        if value.get('_type') == 'value':
+            ref_name = str(value.get('value', ''))
+            if ref_name:
+                return ExtractedRef(
+                    name=ref_name,
+                    kind=SCRIPT_REFERENCE_KEYS[key],
+                    line=value.get('line', line),
+                    column=value.get('column', column),
+                    context=context or key
+                )
+    
+    return None
+
+
 def extract_refs_from_ast(
     ast_dict: Dict[str, Any],
     relpath: str,
@@ -721,36 +757,12 @@ def extract_refs_from_ast(
         
         if node_type == 'assignment':
             key = node.get('key', '')
-            line = node.get('line', 0)
-            column = node.get('column', 0)
             value = node.get('value', {})
             
             # Check if this key references another symbol
-            if key in REFERENCE_KEYS:
-                ref_kind = REFERENCE_KEYS[key]
-                if value.get('_type') == 'value':
-                    ref_name = str(value.get('value', ''))
-                    if ref_name and not ref_name.startswith('$'):  # Skip variables
-                        yield ExtractedRef(
-                            name=ref_name,
-                            kind=ref_kind,
-                            line=value.get('line', line),
-                            column=value.get('column', column),
-                            context=context or key
-                        )
-            
-            elif key in SCRIPT_REFERENCE_KEYS:
-                ref_kind = SCRIPT_REFERENCE_KEYS[key]
-                if value.get('_type') == 'value':
-                    ref_name = str(value.get('value', ''))
-                    if ref_name:
-                        yield ExtractedRef(
-                            name=ref_name,
-                            kind=ref_kind,
-                            line=value.get('line', line),
-                            column=value.get('column', column),
-                            context=context or key
-                        )
+            ref = _assignment_ref(key, value, node.get('line', 0), node.get('column', 0), context)
+            if ref is not None:
+                yield ref
             
             # Update context for nested structures
             new_context = key if key in EFFECT_TRIGGER_KEYS else context
@@ -776,87 +788,254 @@ def extract_refs_from_ast(
     yield from walk_node(ast_dict)
 
 
-def store_symbols_batch(
+def extract_symbols_and_refs_from_ast(
+    ast_dict: Dict[str, Any],
+    relpath: str,
+    content_hash: str,
+    source_text: str = ""
+) -> Tuple[List[ExtractedSymbol], List[ExtractedRef]]:
+    """
+    Extract symbols and references in a single traversal of the AST.
+    
+    Returns the same lists as ``extract_symbols_from_ast()`` and
+    ``extract_refs_from_ast()`` (same order), but every node is visited
+    once. The build worker uses this so a file costs one AST walk.
+    
+    Args:
+        ast_dict: Serialized AST (from RootNode.to_dict())
+        relpath: Relative path of the source file
+        content_hash: Hash of the original content
+        source_text: Original source text for node span extraction and hashing
+    
+    Returns:
+        (symbols, refs)
+    """
+    want_symbols = not _is_symbol_skipped_path(relpath)
+    kind = get_symbol_kind_from_path(relpath)
+    
+    symbols: List[ExtractedSymbol] = []
+    nested_symbols: List[ExtractedSymbol] = []
+    refs: List[ExtractedRef] = []
+    
+    def walk(node: Dict[str, Any], context: str, title_depth: int) -> None:
+        # title_depth > 0: node is a landed_titles block whose child blocks
+        # are titles at that depth (see _extract_title_hierarchy)
+        node_type = node.get('_type')
+        
+        if node_type == 'assignment':
+            key = node.get('key', '')
+            value = node.get('value', {})
+            
+            ref = _assignment_ref(key, value, node.get('line', 0), node.get('column', 0), context)
+            if ref is not None:
+                refs.append(ref)
+            
+            walk(value, key if key in EFFECT_TRIGGER_KEYS else context, 0)
+        
+        elif node_type == 'block':
+            name = node.get('name', '')
+            new_context = name if name in EFFECT_TRIGGER_KEYS else context
+            
+            for child in node.get('children', []):
+                child_depth = 0
+                if title_depth and title_depth <= 6 and child.get('_type') == 'block':
+                    title_name = child.get('_name') or child.get('name')
+                    if title_name and _is_valid_symbol_name(title_name):
+                        node_hash, start_offset, end_offset = _node_identity(
+                            child, source_text, content_hash
+                        )
+                        nested_symbols.append(ExtractedSymbol(
+                            name=title_name,
+                            kind='title',
+                            line=child.get('line', 0),
+                            column=child.get('column', 0),
+                            signature=None,
+                            doc=None,
+                            node_hash_norm=node_hash,
+                            node_start_offset=start_offset,
+                            node_end_offset=end_offset
+                        ))
+                        child_depth = title_depth + 1
+                walk(child, new_context, child_depth)
+        
+        elif node_type == 'list':
+            for item in node.get('items', []):
+                walk(item, context, 0)
+    
+    for child in ast_dict.get('children', []):
+        title_depth = 0
+        if want_symbols:
+            symbol = _top_level_symbol(child, kind, source_text, content_hash)
+            if symbol is not None:
+                symbols.append(symbol)
+            
+            if child.get('_type') == 'block':
+                if kind == 'religion':
+                    # Faith containers sit directly under the religion block
+                    nested_symbols.extend(_extract_nested_block_symbols(
+                        parent_block=child,
+                        nested_block_name='faiths',
+                        symbol_kind='faith',
+                        source_text=source_text,
+                        content_hash=content_hash
+                    ))
+                elif kind == 'title':
+                    title_depth = 1
+        
+        walk(child, '', title_depth)
+    
+    symbols.extend(nested_symbols)
+    return symbols, refs
+
+
+def symbols_to_rows(symbols: List[ExtractedSymbol]) -> List[tuple]:
+    """
+    Convert extracted symbols to plain row tuples for store_symbol_rows().
+    
+    Rows carry no ast_id, so they can be produced away from the database
+    (e.g. in a build process) and shipped cheaply to the writer.
+    """
+    return [
+        (s.line, s.column,
+         s.name, s.kind, s.scope,
+         json.dumps({"signature": s.signature, "doc": s.doc}) if s.signature or s.doc else None,
+         s.node_hash_norm, s.node_start_offset, s.node_end_offset)
+        for s in symbols
+    ]
+
+
+def refs_to_rows(refs: Iterable[ExtractedRef]) -> List[tuple]:
+    """Convert extracted refs to plain row tuples for store_ref_rows()."""
+    return [(r.line, r.column, r.name, r.kind, r.context) for r in refs]
+
+
+def store_symbol_rows(
     conn: sqlite3.Connection,
     ast_id: int,
-    symbols: List[ExtractedSymbol]
+    rows: List[tuple],
+    replace: bool = True,
+    commit: bool = True
 ) -> int:
     """
-    Store multiple symbols in batch, keyed to AST (content identity).
+    Store symbol row tuples (from symbols_to_rows()) for an AST.
     
-    CONTENT-KEYED (January 2026 Flag Day):
-    - Binds to ast_id ONLY
-    - NO file_id or content_version_id
-    - Deletes existing symbols for this AST before inserting
+    This is the shared bulk writer for symbols: one executemany over
+    prepared tuples. Callers writing protected tables must hold a
+    BuilderSession.
+    
+    Args:
+        replace: Delete existing symbols for ast_id first. Pass False when
+            the caller already knows there are none.
+        commit: Commit afterwards. Pass False inside a larger transaction.
     
     Returns:
         Number of symbols stored
     """
-    if not symbols:
+    if not rows:
         return 0
     
-    # Delete existing symbols for this AST (content)
-    conn.execute("DELETE FROM symbols WHERE ast_id = ?", (ast_id,))
-    
-    # Insert new symbols
-    rows = [
-        (ast_id, s.line, s.column,
-         s.name, s.kind, s.scope,
-         json.dumps({"signature": s.signature, "doc": s.doc}) if s.signature or s.doc else None)
-        for s in symbols
-    ]
+    if replace:
+        # Delete existing symbols for this AST (content)
+        conn.execute("DELETE FROM symbols WHERE ast_id = ?", (ast_id,))
     
     conn.executemany("""
         INSERT INTO symbols 
         (ast_id, line_number, column_number,
-         name, symbol_type, scope, metadata_json)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, rows)
+         name, symbol_type, scope, metadata_json,
+         node_hash_norm, node_start_offset, node_end_offset)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [(ast_id, *row) for row in rows])
     
-    conn.commit()
+    if commit:
+        conn.commit()
     return len(rows)
 
 
-def store_refs_batch(
+def store_ref_rows(
     conn: sqlite3.Connection,
     ast_id: int,
-    refs: List[ExtractedRef]
+    rows: List[tuple],
+    replace: bool = True,
+    commit: bool = True
 ) -> int:
     """
-    Store multiple references in batch, keyed to AST (content identity).
+    Store ref row tuples (from refs_to_rows()) for an AST.
     
-    CONTENT-KEYED (January 2026 Flag Day):
-    - Binds to ast_id ONLY
-    - NO file_id or content_version_id
-    - Deletes existing refs for this AST before inserting
+    Shared bulk writer for refs; same conventions as store_symbol_rows().
     
     Returns:
         Number of refs stored
     """
-    if not refs:
+    if not rows:
         return 0
     
-    # Delete existing refs for this AST (content)
-    conn.execute("DELETE FROM refs WHERE ast_id = ?", (ast_id,))
-    
-    # Insert new refs
-    rows = [
-        (ast_id, r.line, r.column,
-         r.name, r.kind, r.context, 'unresolved')
-        for r in refs
-    ]
+    if replace:
+        # Delete existing refs for this AST (content)
+        conn.execute("DELETE FROM refs WHERE ast_id = ?", (ast_id,))
     
     conn.executemany("""
         INSERT INTO refs 
         (ast_id, line_number, column_number,
          name, ref_type, context, resolution_status)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, rows)
+        VALUES (?, ?, ?, ?, ?, ?, 'unresolved')
+    """, [(ast_id, *row) for row in rows])
     
-    conn.commit()
+    if commit:
+        conn.commit()
     return len(rows)
 
 
+def store_symbols_batch(
+    conn: sqlite3.Connection,
+    ast_id: int,
+    symbols: List[ExtractedSymbol],
+    replace: bool = True,
+    commit: bool = True
+) -> int:
+    """
+    Store multiple symbols in batch, keyed to AST (content identity).
+    
+    Callers writing protected tables must hold a BuilderSession.
+    
+    CONTENT-KEYED (January 2026 Flag Day):
+    - Binds to ast_id ONLY
+    - NO file_id or content_version_id
+    - Deletes existing symbols for this AST before inserting (replace=True)
+    
+    Args:
+        replace: Delete existing symbols for ast_id first. Pass False when
+            the caller already knows there are none.
+        commit: Commit afterwards. Pass False inside a larger transaction.
+    
+    Returns:
+        Number of symbols stored
+    """
+    return store_symbol_rows(conn, ast_id, symbols_to_rows(symbols), replace, commit)
+
+
+def store_refs_batch(
+    conn: sqlite3.Connection,
+    ast_id: int,
+    refs: List[ExtractedRef],
+    replace: bool = True,
+    commit: bool = True
+) -> int:
+    """
+    Store multiple references in batch, keyed to AST (content identity).
+    
+    Same conventions as store_symbols_batch().
+    
+    CONTENT-KEYED (January 2026 Flag Day):
+    - Binds to ast_id ONLY
+    - NO file_id or content_version_id
+    - Deletes existing refs for this AST before inserting (replace=True)
+    
+    Returns:
+        Number of refs stored
+    """
+    return store_ref_rows(conn, ast_id, refs_to_rows(refs), replace, commit)
+
+
 def extract_and_store(
     conn: sqlite3.Connection,
     ast_id: int,
@@ -873,8 +1052,7 @@ def extract_and_store(
     Returns:
         (symbol_count, ref_count)
     """
-    symbols = list(extract_symbols_from_ast(ast_dict, relpath, ""))
-    refs = list(extract_refs_from_ast(ast_dict, relpath, ""))
+    symbols, refs = extract_symbols_and_refs_from_ast(ast_dict, relpath, "")
     
     sym_count = store_symbols_batch(conn, ast_id, symbols)
     ref_count = store_refs_batch(conn, ast_id, refs)
@@ -1136,8 +1314,8 @@ def extract_symbols_incremental(
                 continue
 
             try:
-                # Decode AST
-                ast_dict = json.loads(ast_blob.decode('utf-8'))
+                # Decode AST (JSON or binary)
+                ast_dict = deserialize_ast(ast_blob)
 
                 # Extract symbols
                 symbols = list(extract_symbols_from_ast(ast_dict, relpath, content_hash))
@@ -1288,7 +1466,7 @@ def extract_refs_incremental(
             content_version_id = row[5]
             
             try:
-                ast_dict = json.loads(ast_blob.decode('utf-8'))
+                ast_dict = deserialize_ast(ast_blob)
                 refs = list(extract_refs_from_ast(ast_dict, relpath, content_hash))
                 
                 for ref in refs:
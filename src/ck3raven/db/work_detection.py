@@ -237,7 +237,7 @@ def get_files_needing_ast(
         WHERE f.deleted = 0
         AND f.relpath LIKE '%.txt'
         AND f.relpath NOT LIKE 'localization/%'
-        AND fc.content_text IS NOT NULL
+        AND (fc.content_text IS NOT NULL OR fc.compression IS NOT NULL)
         AND NOT EXISTS (
             SELECT 1 FROM asts a
             WHERE a.content_hash = fc.content_hash
@@ -299,7 +299,7 @@ def get_ast_coverage(conn: sqlite3.Connection, parser_version_id: int) -> Dict[s
         WHERE f.deleted = 0
         AND f.relpath LIKE '%.txt'
         AND f.relpath NOT LIKE 'localization/%'
-        AND fc.content_text IS NOT NULL
+        AND (fc.content_text IS NOT NULL OR fc.compression IS NOT NULL)
     """).fetchone()
     total_script = total_row[0]
     
@@ -449,7 +449,7 @@ def get_loc_files_needing_parse(
         JOIN file_contents fc ON f.content_hash = fc.content_hash
         WHERE f.deleted = 0
         AND f.relpath LIKE 'localization/%.yml'
-        AND fc.content_text IS NOT NULL
+        AND (fc.content_text IS NOT NULL OR fc.compression IS NOT NULL)
         AND NOT EXISTS (
             SELECT 1 FROM localization_entries le
             WHERE le.content_hash = fc.content_hash
@@ -478,7 +478,7 @@ def get_loc_coverage(conn: sqlite3.Connection, parser_version_id: int) -> Dict[s
         JOIN file_contents fc ON f.content_hash = fc.content_hash
         WHERE f.deleted = 0
         AND f.relpath LIKE 'localization/%.yml'
-        AND fc.content_text IS NOT NULL
+        AND (fc.content_text IS NOT NULL OR fc.compression IS NOT NULL)
     """).fetchone()
     total_loc = total_row[0]
     
@@ -17,11 +17,12 @@ LoadedPlayset, load_playset_from_db, get_files_for_folder are not currently avai
 
 from .state import (
     GameState, FolderState, ResolvedDefinition, 
-    DefinitionSource, ConflictRecord, get_source_name
+    DefinitionSource, ConflictRecord, MergedContainer, FolderInput, get_source_name
 )
 from .builder import (
     build_game_state, build_folder_state, 
-    resolve_folder_from_db, extract_definitions_from_ast
+    resolve_folder_from_db, extract_definitions_from_ast,
+    update_folder_state, update_game_state
 )
 from .exporter import GameStateExporter, ExportOptions
 
@@ -36,12 +37,16 @@ __all__ = [
     "ResolvedDefinition",
     "DefinitionSource", 
     "ConflictRecord",
+    "MergedContainer",
+    "FolderInput",
     "get_source_name",
     # Builder
     "build_game_state",
     "build_folder_state",
     "resolve_folder_from_db",
     "extract_definitions_from_ast",
+    "update_folder_state",
+    "update_game_state",
     # Exporter
     "GameStateExporter",
     "ExportOptions",
@@ -3,43 +3,59 @@ Game State Builder
 
 Builds complete game state from a playset by:
 1. Loading all files from the database for each content version
-2. Fetching cached ASTs
+2. Fetching cached ASTs (one query per folder)
 3. Applying merge policies per folder
 4. Tracking provenance (which mod contributed each definition)
 """
 
+import multiprocessing
+import posixpath
 import sqlite3
-from typing import List, Optional, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Mapping, Optional, Dict, Any, Set, Tuple
 from collections import OrderedDict
 import logging
 
-from ck3raven.db.models import FileRecord, ASTRecord
-from ck3raven.db.ast_cache import get_cached_ast, deserialize_ast
 from ck3raven.db.parser_version import get_current_parser_version
-from ck3raven.resolver.policies import MergePolicy, get_policy_for_folder
+from ck3raven.parser.ast_serde import LazyASTNode, deserialize_ast_lazy
+from ck3raven.resolver.policies import (
+    MergePolicy, SubBlockPolicy, get_policy_for_folder, get_sub_rules_for_folder
+)
 
-from ck3raven.emulator.loader import LoadedPlayset, get_files_for_folder
 from ck3raven.emulator.state import (
     GameState, FolderState, ResolvedDefinition, DefinitionSource, 
-    ConflictRecord, get_source_name
+    ConflictRecord, MergedContainer, FolderInput
 )
 
+if TYPE_CHECKING:
+    # Archived (see emulator/__init__.py); any object with playset_id, name
+    # and content_versions in load order will do
+    from ck3raven.emulator.loader import LoadedPlayset
+
 logger = logging.getLogger(__name__)
 
 
 def extract_definitions_from_ast(
-    ast_dict: Dict[str, Any]
-) -> List[Tuple[str, Dict[str, Any], int]]:
+    ast_dict: Mapping[str, Any]
+) -> List[Tuple[str, Mapping[str, Any], int]]:
     """
     Extract top-level block definitions from a deserialized AST.
     
-    Returns list of (key, node_dict, line) tuples.
+    Accepts a plain dict or a lazily decoded root (deserialize_ast_lazy);
+    for the latter only the root's children are decoded.
+    
+    Returns list of (key, node, line) tuples.
     """
     definitions = []
     
     if ast_dict.get('_type') != 'root':
         return definitions
     
+    if isinstance(ast_dict, LazyASTNode):
+        # Binary AST: names and lines without decoding the blocks
+        return [(key, node, line) for key, line, node in ast_dict.block_children() if key]
+    
     for child in ast_dict.get('children', []):
         if child.get('_type') == 'block':
             key = child.get('name', '')
@@ -50,6 +66,293 @@ def extract_definitions_from_ast(
     return definitions
 
 
+def _plain_node(node: Mapping[str, Any]) -> Dict[str, Any]:
+    """Fully decode a (possibly lazy) AST node to plain dicts."""
+    if isinstance(node, LazyASTNode):
+        return node.to_dict()
+    return node
+
+
+def get_source_names(
+    conn: sqlite3.Connection,
+    content_versions: List[int]
+) -> Dict[int, str]:
+    """Human-readable names for content versions, in one query."""
+    placeholders = ",".join("?" * len(content_versions))
+    names = {
+        row['content_version_id']: row['name']
+        for row in conn.execute(f"""
+            SELECT content_version_id, name
+            FROM content_versions
+            WHERE content_version_id IN ({placeholders})
+        """, list(content_versions))
+    }
+    return {cv_id: names.get(cv_id, f"unknown_{cv_id}") for cv_id in content_versions}
+
+
+def iter_folder_asts(
+    conn: sqlite3.Connection,
+    folder: str,
+    content_versions: List[int],
+    parser_version_id: int,
+    file_ids: Optional[Iterable[int]] = None,
+    blobs: bool = True
+) -> Iterator[sqlite3.Row]:
+    """
+    Stream the script files of a folder with their cached ASTs.
+    
+    One query across all content versions, ordered by load order and then
+    path. Rows carry load_order, content_version_id, file_id, relpath,
+    content_hash and the asts columns ast_id, ast_blob, ast_format,
+    parse_ok - all NULL when the file has no AST for parser_version_id.
+    
+    Args:
+        file_ids: Only these files (default: the whole folder)
+        blobs: False leaves ast_blob, ast_format and parse_ok NULL, for
+            checking what changed without reading ASTs
+    """
+    pattern = folder.replace("\\", "/")
+    if not pattern.endswith("/"):
+        pattern += "/"
+    
+    load = ",".join("(?, ?)" for _ in content_versions)
+    params: List[Any] = []
+    for load_order, cv_id in enumerate(content_versions):
+        params.extend((cv_id, load_order))
+    params.extend((parser_version_id, pattern + "%"))
+    
+    file_filter = ""
+    if file_ids is not None:
+        file_ids = list(file_ids)
+        file_filter = f"AND f.file_id IN ({','.join('?' * len(file_ids))})"
+        params.extend(file_ids)
+    
+    if blobs:
+        ast_columns = "a.ast_blob, a.ast_format, a.parse_ok"
+    else:
+        ast_columns = "NULL AS ast_blob, NULL AS ast_format, NULL AS parse_ok"
+    
+    return conn.execute(f"""
+        WITH load(content_version_id, load_order) AS (VALUES {load})
+        SELECT
+            l.load_order,
+            f.content_version_id,
+            f.file_id,
+            f.relpath,
+            f.content_hash,
+            a.ast_id,
+            {ast_columns}
+        FROM load l
+        JOIN files f ON f.content_version_id = l.content_version_id
+        LEFT JOIN asts a
+          ON a.content_hash = f.content_hash AND a.parser_version_id = ?
+        WHERE f.relpath LIKE ?
+          AND f.file_type = 'script'
+          AND f.deleted = 0
+          {file_filter}
+        ORDER BY l.load_order, f.relpath
+    """, params)
+
+
+def _collect_definitions(
+    conn: sqlite3.Connection,
+    folder: str,
+    content_versions: List[int],
+    errors: List[Tuple[int, str]],
+    inputs: Optional[Dict[Tuple[int, str], FolderInput]] = None,
+    file_ids: Optional[Iterable[int]] = None,
+    keys: Optional[Set[str]] = None
+) -> Dict[str, List[Tuple[DefinitionSource, Mapping[str, Any]]]]:
+    """
+    All top-level definitions of a folder: key -> [(source, node)].
+    
+    Rows arrive in load order, so each list is already sorted. Nodes are
+    lazy for binary ASTs. File errors are appended to errors.
+    
+    Args:
+        inputs: Record each file read, with the keys it defines
+        file_ids: Only read these files
+        keys: Only return these keys
+    """
+    # Get current parser version for AST lookup
+    parser_version = get_current_parser_version(conn)
+    source_names = get_source_names(conn, content_versions)
+    
+    all_defs: Dict[str, List[Tuple[DefinitionSource, Mapping[str, Any]]]] = {}
+    
+    for row in iter_folder_asts(conn, folder, content_versions,
+                                parser_version.parser_version_id, file_ids):
+        file_id = row['file_id']
+        relpath = row['relpath']
+        cv_id = row['content_version_id']
+        
+        file_input = None
+        if inputs is not None:
+            file_input = FolderInput(file_id, row['content_hash'], row['ast_id'])
+            inputs[(cv_id, relpath)] = file_input
+        
+        if row['ast_id'] is None:
+            errors.append((file_id, f"No cached AST for {relpath}"))
+            continue
+        
+        if not row['parse_ok']:
+            errors.append((file_id, f"Parse failed for {relpath}"))
+            continue
+        
+        try:
+            root = deserialize_ast_lazy(row['ast_blob'], row['ast_format'])
+            defs = extract_definitions_from_ast(root)
+        except Exception as e:
+            errors.append((file_id, f"AST deserialize failed: {e}"))
+            continue
+        
+        for key, node, line in defs:
+            if file_input is not None:
+                file_input.keys.append(key)
+            if keys is not None and key not in keys:
+                continue
+            source = DefinitionSource(
+                content_version_id=cv_id,
+                file_id=file_id,
+                relpath=relpath,
+                line=line,
+                load_order=row['load_order'],
+                source_name=source_names[cv_id]
+            )
+            all_defs.setdefault(key, []).append((source, node))
+    
+    return all_defs
+
+
+def _resolve_override(
+    result: FolderState,
+    all_defs: Dict[str, List[Tuple[DefinitionSource, Mapping[str, Any]]]]
+) -> None:
+    """OVERRIDE - last definition wins, FIOS - first definition wins."""
+    winner_index = 0 if result.policy == MergePolicy.FIOS else -1
+    
+    for key, sources in all_defs.items():
+        winner_source, winner_node = sources[winner_index]
+        
+        result.definitions[key] = ResolvedDefinition(
+            key=key,
+            ast_dict=_plain_node(winner_node),
+            source=winner_source
+        )
+        
+        # Record conflict if multiple sources
+        if len(sources) > 1:
+            if winner_index == 0:
+                loser_sources = [s for s, _ in sources[1:]]
+            else:
+                loser_sources = [s for s, _ in sources[:-1]]
+            result.conflicts.append(ConflictRecord(
+                key=key,
+                folder=result.folder,
+                policy=result.policy,
+                winner=winner_source,
+                losers=loser_sources
+            ))
+
+
+def _list_items(block: Mapping[str, Any]) -> List[str]:
+    """
+    Items of a list sub-block like events = { evt.1 evt.2 }.
+    
+    Weighted entries (100 = evt.1) become "100=evt.1".
+    """
+    items = []
+    for child in block.get('children', []):
+        node_type = child.get('_type')
+        if node_type == 'assignment':
+            value = child['value']
+            if value.get('_type') == 'value':
+                items.append(f"{child['key']}={value['value']}")
+            else:
+                items.append(child['key'])
+        elif node_type == 'value':
+            items.append(child['value'])
+        elif node_type == 'block':
+            items.append(child['name'])
+    return items
+
+
+def _resolve_container_merge(
+    result: FolderState,
+    all_defs: Dict[str, List[Tuple[DefinitionSource, Mapping[str, Any]]]]
+) -> None:
+    """
+    CONTAINER_MERGE (on_actions) - containers merge across sources.
+    
+    Per sub-block rule (policies.get_sub_rules_for_folder): list sub-blocks
+    are appended in load order, single-slot sub-blocks are won by the last
+    source, and SINGLE_SLOT_CONFLICT slots defined by several sources are
+    recorded as conflicts. Other children are last-wins by name.
+    
+    Each key's definition is the merged block, attributed to the last source.
+    """
+    sub_rules = get_sub_rules_for_folder(result.folder)
+    
+    for key, sources in all_defs.items():
+        merged = MergedContainer(key=key)
+        # Merged children by name, at the position of their first occurrence
+        children: Dict[str, Mapping[str, Any]] = {}
+        
+        for source, node in sources:
+            merged.sources.append(source)
+            
+            for child in node.get('children', []):
+                node_type = child.get('_type')
+                if node_type == 'block':
+                    name = child['name']
+                    rule = sub_rules.get(name)
+                elif node_type == 'assignment':
+                    name = child['key']
+                    rule = None
+                else:
+                    continue
+                
+                if rule == SubBlockPolicy.APPEND_LIST:
+                    merged.lists.setdefault(name, []).extend(_list_items(child))
+                    block = children.get(name)
+                    if block is None or block.get('_type') != 'block':
+                        block = children[name] = {
+                            '_type': 'block', 'name': name, 'operator': child['operator'],
+                            'line': child['line'], 'column': child['column'], 'children': [],
+                        }
+                    block['children'].extend(_plain_node(item) for item in child['children'])
+                else:
+                    if rule is not None:
+                        merged.slot_sources.setdefault(name, []).append(source)
+                    children[name] = child
+        
+        plain = {name: _plain_node(child) for name, child in children.items()}
+        merged.slot_blocks = {name: plain[name] for name in merged.slot_sources}
+        result.containers[key] = merged
+        
+        winner_source, winner_node = sources[-1]
+        result.definitions[key] = ResolvedDefinition(
+            key=key,
+            ast_dict={
+                '_type': 'block', 'name': key, 'operator': winner_node.get('operator', '='),
+                'line': winner_node.get('line', 0), 'column': winner_node.get('column', 0),
+                'children': list(plain.values()),
+            },
+            source=winner_source
+        )
+        
+        for name, slot_sources in merged.slot_sources.items():
+            if sub_rules[name] == SubBlockPolicy.SINGLE_SLOT_CONFLICT and len(slot_sources) > 1:
+                result.conflicts.append(ConflictRecord(
+                    key=key,
+                    folder=result.folder,
+                    policy=result.policy,
+                    winner=slot_sources[-1],
+                    losers=slot_sources[:-1],
+                    slot=name
+                ))
+
+
 def resolve_folder_from_db(
     conn: sqlite3.Connection,
     folder: str,
@@ -59,6 +362,11 @@ def resolve_folder_from_db(
     """
     Resolve a single folder using cached ASTs from the database.
     
+    Files and ASTs for all content versions come from one query
+    (iter_folder_asts). Binary ASTs are decoded lazily: only root children
+    are read to find definitions, and only winning definitions are fully
+    decoded.
+    
     Args:
         conn: Database connection
         folder: Folder path like "common/culture/traditions"
@@ -66,132 +374,288 @@ def resolve_folder_from_db(
         policy: Override merge policy (auto-detected if None)
     
     Returns:
-        FolderState with resolved definitions and conflicts
+        FolderState with resolved definitions and conflicts (and, for
+        CONTAINER_MERGE, the merge detail in containers)
     """
     if policy is None:
         policy = get_policy_for_folder(folder)
     
+    if policy == MergePolicy.PER_KEY_OVERRIDE:
+        # Same as OVERRIDE for now (defines, localization)
+        policy = MergePolicy.OVERRIDE
+    
     result = FolderState(folder=folder, policy=policy)
+    if not content_versions:
+        return result
     
-    # Get current parser version for AST lookup
+    all_defs = _collect_definitions(conn, folder, content_versions, result.errors,
+                                    inputs=result.inputs)
+    
+    # Apply merge policy
+    if policy == MergePolicy.CONTAINER_MERGE:
+        _resolve_container_merge(result, all_defs)
+    else:
+        _resolve_override(result, all_defs)
+    
+    return result
+
+
+def _key_sources(
+    folder_state: FolderState,
+    key: str,
+    conflicts_by_key: Dict[str, ConflictRecord]
+) -> List[DefinitionSource]:
+    """Every source a resolved key was merged from."""
+    container = folder_state.containers.get(key)
+    if container is not None:
+        return container.sources
+    definition = folder_state.definitions.get(key)
+    if definition is None:
+        return []
+    conflict = conflicts_by_key.get(key)
+    return [definition.source] + (conflict.losers if conflict else [])
+
+
+def update_folder_state(
+    conn: sqlite3.Connection,
+    folder_state: FolderState,
+    content_versions: List[int]
+) -> Set[str]:
+    """
+    Bring a resolved folder up to date with the database, in place.
+    
+    Files whose (file_id, content_hash, AST) differ from the state's inputs
+    - edited, added, removed or newly parsed - are re-read. Only the keys
+    they define, before (FolderInput.keys) or after the change, are merged
+    again, from the changed files plus the unchanged files that contributed
+    those keys. Finding the changes reads file metadata only, no ASTs.
+    
+    Args:
+        conn: Database connection
+        folder_state: State from resolve_folder_from_db
+        content_versions: The load order the state was resolved with
+    
+    Returns:
+        The recomputed keys (empty if nothing changed). Keys new to the
+        folder are appended to definitions, so key order can differ from a
+        full resolve; the resolved contents are the same.
+    """
+    folder = folder_state.folder
+    inputs = folder_state.inputs
     parser_version = get_current_parser_version(conn)
     
-    # Track all definitions by key: key -> list of (source, node_dict) in load order
-    all_defs: Dict[str, List[Tuple[DefinitionSource, Dict[str, Any]]]] = {}
+    current = {
+        (row['content_version_id'], row['relpath']): (row['file_id'], row['content_hash'], row['ast_id'])
+        for row in iter_folder_asts(conn, folder, content_versions,
+                                    parser_version.parser_version_id, blobs=False)
+    }
+    stale = {path: file_input for path, file_input in inputs.items()
+             if current.get(path) != file_input.identity}
+    fresh_ids = [identity[0] for path, identity in current.items()
+                 if path not in inputs or inputs[path].identity != identity]
+    if not stale and not fresh_ids:
+        return set()
     
-    # Process each content version in load order
-    for load_order, cv_id in enumerate(content_versions):
-        source_name = get_source_name(conn, cv_id)
-        
-        # Get all files in this folder for this content version
-        files = get_files_for_folder(conn, cv_id, folder)
-        
-        for file_rec in files:
-            # Get cached AST
-            ast_record = get_cached_ast(conn, file_rec.content_hash, parser_version.parser_version_id)
-            
-            if not ast_record:
-                result.errors.append((file_rec.file_id, f"No cached AST for {file_rec.relpath}"))
-                continue
-            
-            if not ast_record.parse_ok:
-                result.errors.append((file_rec.file_id, f"Parse failed for {file_rec.relpath}"))
-                continue
-            
-            # Deserialize AST
-            try:
-                ast_dict = deserialize_ast(ast_record.ast_blob)
-            except Exception as e:
-                result.errors.append((file_rec.file_id, f"AST deserialize failed: {e}"))
-                continue
-            
-            # Extract definitions
-            defs = extract_definitions_from_ast(ast_dict)
-            
-            for key, node_dict, line in defs:
-                source = DefinitionSource(
-                    content_version_id=cv_id,
-                    file_id=file_rec.file_id,
-                    relpath=file_rec.relpath,
-                    line=line,
-                    load_order=load_order,
-                    source_name=source_name
-                )
-                
-                if key not in all_defs:
-                    all_defs[key] = []
-                all_defs[key].append((source, node_dict))
+    # Re-read the changed files
+    fresh_inputs: Dict[Tuple[int, str], FolderInput] = {}
+    fresh_errors: List[Tuple[int, str]] = []
+    changed_defs = {}
+    if fresh_ids:
+        changed_defs = _collect_definitions(conn, folder, content_versions, fresh_errors,
+                                            inputs=fresh_inputs, file_ids=fresh_ids)
     
-    # Apply merge policy
-    if policy == MergePolicy.OVERRIDE:
-        # Last definition wins
-        for key, sources in all_defs.items():
-            if not sources:
-                continue
-            
-            # Sort by load order, last wins
-            sorted_sources = sorted(sources, key=lambda x: x[0].load_order)
-            winner_source, winner_ast = sorted_sources[-1]
-            
-            result.definitions[key] = ResolvedDefinition(
-                key=key,
-                ast_dict=winner_ast,
-                source=winner_source
-            )
-            
-            # Record conflict if multiple sources
-            if len(sources) > 1:
-                loser_sources = [s for s, _ in sorted_sources[:-1]]
-                result.conflicts.append(ConflictRecord(
-                    key=key,
-                    folder=folder,
-                    policy=policy,
-                    winner=winner_source,
-                    losers=loser_sources
-                ))
+    affected = set(changed_defs)
+    for file_input in stale.values():
+        affected.update(file_input.keys)
     
-    elif policy == MergePolicy.FIOS:
-        # First definition wins
-        for key, sources in all_defs.items():
-            if not sources:
-                continue
-            
-            sorted_sources = sorted(sources, key=lambda x: x[0].load_order)
-            winner_source, winner_ast = sorted_sources[0]
-            
-            result.definitions[key] = ResolvedDefinition(
-                key=key,
-                ast_dict=winner_ast,
-                source=winner_source
-            )
-            
-            if len(sources) > 1:
-                loser_sources = [s for s, _ in sorted_sources[1:]]
-                result.conflicts.append(ConflictRecord(
-                    key=key,
-                    folder=folder,
-                    policy=policy,
-                    winner=winner_source,
-                    losers=loser_sources
-                ))
+    # Unchanged files that contributed to the affected keys
+    stale_ids = {file_input.file_id for file_input in stale.values()}
+    conflicts_by_key = {c.key: c for c in folder_state.conflicts if c.slot is None}
+    other_ids = {
+        source.file_id
+        for key in affected
+        for source in _key_sources(folder_state, key, conflicts_by_key)
+    } - stale_ids
+    other_defs = {}
+    if other_ids:
+        other_defs = _collect_definitions(conn, folder, content_versions, [],
+                                          file_ids=other_ids, keys=affected)
     
-    elif policy == MergePolicy.CONTAINER_MERGE:
-        # TODO: Implement container merge (on_actions)
-        # For now, fall back to OVERRIDE
-        logger.warning(f"CONTAINER_MERGE not yet implemented for {folder}, using OVERRIDE")
-        return resolve_folder_from_db(conn, folder, content_versions, MergePolicy.OVERRIDE)
+    all_defs: Dict[str, List[Tuple[DefinitionSource, Mapping[str, Any]]]] = {}
+    for key in affected:
+        sources = other_defs.get(key, []) + changed_defs.get(key, [])
+        if sources:
+            # Same order as a full resolve (stable: keeps file order)
+            sources.sort(key=lambda entry: (entry[0].load_order, entry[0].relpath))
+            all_defs[key] = sources
     
-    elif policy == MergePolicy.PER_KEY_OVERRIDE:
-        # Same as OVERRIDE for now (defines, localization)
-        return resolve_folder_from_db(conn, folder, content_versions, MergePolicy.OVERRIDE)
+    partial = FolderState(folder=folder, policy=folder_state.policy)
+    if folder_state.policy == MergePolicy.CONTAINER_MERGE:
+        _resolve_container_merge(partial, all_defs)
+    else:
+        _resolve_override(partial, all_defs)
     
-    return result
+    # Splice the recomputed keys into the state
+    for key in affected:
+        if key in partial.definitions:
+            folder_state.definitions[key] = partial.definitions[key]
+        else:
+            folder_state.definitions.pop(key, None)
+        if key in partial.containers:
+            folder_state.containers[key] = partial.containers[key]
+        else:
+            folder_state.containers.pop(key, None)
+    folder_state.conflicts = [c for c in folder_state.conflicts if c.key not in affected]
+    folder_state.conflicts.extend(partial.conflicts)
+    folder_state.errors = [e for e in folder_state.errors if e[0] not in stale_ids]
+    folder_state.errors.extend(fresh_errors)
+    for path in stale:
+        del inputs[path]
+    inputs.update(fresh_inputs)
+    
+    return affected
+
+
+def update_game_state(
+    conn: sqlite3.Connection,
+    state: GameState,
+    relpaths: Optional[Iterable[str]] = None
+) -> Dict[str, Set[str]]:
+    """
+    Apply file changes to a built game state, in place.
+    
+    Meant to run after the qbuilder reports changed files (e.g. a flash
+    build): each affected folder is updated with update_folder_state
+    instead of being resolved again.
+    
+    Args:
+        conn: Database connection
+        state: State from build_game_state
+        relpaths: Changed files. Only folders containing them are checked;
+            a file outside every resolved folder has its folder resolved
+            and added. Default: check every folder.
+    
+    Returns:
+        {folder: recomputed keys} for the folders that changed
+    """
+    updated: Dict[str, Set[str]] = {}
+    
+    if relpaths is None:
+        folders = list(state.folders)
+    else:
+        folders = []
+        for relpath in relpaths:
+            relpath = relpath.replace("\\", "/")
+            matches = [f for f in state.folders if relpath.startswith(f.rstrip("/") + "/")]
+            folder = posixpath.dirname(relpath)
+            if not matches and folder and folder not in updated:
+                folder_state = resolve_folder_from_db(conn, folder, state.content_versions)
+                if folder_state.inputs:
+                    state.folders[folder] = folder_state
+                    updated[folder] = set(folder_state.definitions)
+            folders.extend(matches)
+        folders = list(dict.fromkeys(folders))
+    
+    for folder in folders:
+        keys = update_folder_state(conn, state.folders[folder], state.content_versions)
+        if keys:
+            updated[folder] = keys
+    
+    if updated:
+        state.update_stats()
+    return updated
+
+
+def _resolve_folder_in_process(
+    db_path: str,
+    folder: str,
+    content_versions: List[int]
+) -> FolderState:
+    """Process-pool entry point for build_game_state(processes=N)."""
+    from ck3raven.db.schema import get_connection
+    return resolve_folder_from_db(get_connection(Path(db_path)), folder, content_versions)
+
+
+def get_folder_sizes(
+    conn: sqlite3.Connection,
+    folders: List[str],
+    content_versions: List[int]
+) -> Dict[str, int]:
+    """
+    Total script bytes per folder across content versions (scheduling weight).
+    
+    A folder counts every file iter_folder_asts() reads for it, subfolders
+    included. Sizes come from files.file_size, which qbuilder discovery
+    records; databases without that column fall back to file_contents.size.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+    size = "COALESCE(f.file_size, fc.size, 0)" if 'file_size' in columns else "COALESCE(fc.size, 0)"
+    
+    # Matched case-insensitively, like iter_folder_asts()'s LIKE
+    wanted = {folder.replace("\\", "/").rstrip("/").lower(): folder for folder in folders}
+    sizes: Dict[str, int] = {folder: 0 for folder in folders}
+    placeholders = ",".join("?" * len(content_versions))
+    for relpath, file_size in conn.execute(f"""
+        SELECT f.relpath, {size}
+        FROM files f
+        LEFT JOIN file_contents fc ON fc.content_hash = f.content_hash
+        WHERE f.content_version_id IN ({placeholders})
+          AND f.file_type = 'script'
+          AND f.deleted = 0
+    """, list(content_versions)):
+        parent = posixpath.dirname(relpath.lower())
+        while parent:
+            if parent in wanted:
+                sizes[wanted[parent]] += file_size
+            parent = posixpath.dirname(parent)
+    return sizes
+
+
+def _database_file(conn: sqlite3.Connection) -> Optional[str]:
+    """Path of the connection's main database, or None for in-memory databases."""
+    for row in conn.execute("PRAGMA database_list"):
+        if row[1] == 'main':
+            return row[2] or None
+    return None
+
+
+def _resolve_folders_parallel(
+    conn: sqlite3.Connection,
+    folders: List[str],
+    content_versions: List[int],
+    processes: int,
+    progress_callback: Optional[Callable[[str, int, int], None]]
+) -> Dict[str, FolderState]:
+    """
+    Resolve folders across a process pool, largest first.
+    
+    Each process opens its own connection to the same database file.
+    """
+    db_path = _database_file(conn)
+    sizes = get_folder_sizes(conn, folders, content_versions)
+    by_size = sorted(folders, key=lambda f: (-sizes.get(f, 0), f))
+    
+    states: Dict[str, FolderState] = {}
+    with ProcessPoolExecutor(max_workers=min(processes, len(folders)),
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {
+            pool.submit(_resolve_folder_in_process, db_path, folder, content_versions): folder
+            for folder in by_size
+        }
+        for i, future in enumerate(as_completed(futures)):
+            folder = futures[future]
+            states[folder] = future.result()
+            if progress_callback:
+                progress_callback(folder, i, len(folders))
+    return states
 
 
 def build_game_state(
     conn: sqlite3.Connection,
-    loaded_playset: LoadedPlayset,
-    folders: Optional[List[str]] = None
+    loaded_playset: "LoadedPlayset",
+    folders: Optional[List[str]] = None,
+    progress_callback: Optional[Callable[[str, int, int], None]] = None,
+    processes: int = 1
 ) -> GameState:
     """
     Build complete game state from a loaded playset.
@@ -200,6 +664,11 @@ def build_game_state(
         conn: Database connection
         loaded_playset: Playset loaded from database
         folders: Specific folders to resolve (all if None)
+        progress_callback: Optional callback(folder, index, total), called as
+            each folder is resolved
+        processes: Resolve folders in this many processes (largest folders
+            first). Needs a file-backed database; in-memory connections
+            resolve serially.
     
     Returns:
         GameState with all resolved definitions
@@ -236,12 +705,22 @@ def build_game_state(
     
     logger.info(f"Building game state for {len(folders)} folders")
     
-    for folder in folders:
-        logger.debug(f"Resolving {folder}")
-        folder_state = resolve_folder_from_db(
-            conn, folder, loaded_playset.content_versions
+    if processes > 1 and len(folders) > 1 and _database_file(conn):
+        folder_states = _resolve_folders_parallel(
+            conn, folders, loaded_playset.content_versions, processes, progress_callback
         )
-        state.folders[folder] = folder_state
+        # Same folder order as a serial build
+        for folder in folders:
+            state.folders[folder] = folder_states[folder]
+    else:
+        for i, folder in enumerate(folders):
+            logger.debug(f"Resolving {folder}")
+            folder_state = resolve_folder_from_db(
+                conn, folder, loaded_playset.content_versions
+            )
+            state.folders[folder] = folder_state
+            if progress_callback:
+                progress_callback(folder, i, len(folders))
     
     state.update_stats()
     
@@ -253,7 +732,7 @@ def build_game_state(
 
 def build_folder_state(
     conn: sqlite3.Connection,
-    loaded_playset: LoadedPlayset,
+    loaded_playset: "LoadedPlayset",
     folder: str
 ) -> FolderState:
     """
@@ -45,9 +45,91 @@ class ConflictRecord:
     policy: MergePolicy
     winner: DefinitionSource
     losers: List[DefinitionSource]
+    slot: Optional[str] = None  # CONTAINER_MERGE: the contested sub-block (trigger, effect)
     
     def __repr__(self):
-        return f"Conflict({self.key}: {self.winner.source_name} wins over {len(self.losers)})"
+        key = f"{self.key}.{self.slot}" if self.slot else self.key
+        return f"Conflict({key}: {self.winner.source_name} wins over {len(self.losers)})"
+
+
+@dataclass
+class MergedContainer:
+    """
+    A CONTAINER_MERGE definition (on_action) merged across sources.
+    
+    List sub-blocks (events, on_actions, ...) are appended in load order;
+    single-slot sub-blocks (trigger, effect, ...) are won by the last source
+    that defines them.
+    """
+    key: str
+    sources: List[DefinitionSource] = field(default_factory=list)
+    
+    # Appended list items by sub-block name
+    lists: Dict[str, List[str]] = field(default_factory=dict)
+    
+    # Single-slot sub-blocks: every source that defined them, and the winning node
+    slot_sources: Dict[str, List[DefinitionSource]] = field(default_factory=dict)
+    slot_blocks: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    
+    @property
+    def events(self) -> List[str]:
+        return self.lists.get('events', [])
+    
+    @property
+    def on_actions(self) -> List[str]:
+        return self.lists.get('on_actions', [])
+    
+    @property
+    def random_events(self) -> List[str]:
+        return self.lists.get('random_events', [])
+    
+    @property
+    def trigger_sources(self) -> List[DefinitionSource]:
+        return self.slot_sources.get('trigger', [])
+    
+    @property
+    def effect_sources(self) -> List[DefinitionSource]:
+        return self.slot_sources.get('effect', [])
+    
+    @property
+    def trigger_block(self) -> Optional[Dict[str, Any]]:
+        return self.slot_blocks.get('trigger')
+    
+    @property
+    def effect_block(self) -> Optional[Dict[str, Any]]:
+        return self.slot_blocks.get('effect')
+    
+    @property
+    def has_trigger_conflict(self) -> bool:
+        return len(self.trigger_sources) > 1
+    
+    @property
+    def has_effect_conflict(self) -> bool:
+        return len(self.effect_sources) > 1
+    
+    @property
+    def trigger_winner(self) -> Optional[DefinitionSource]:
+        return self.trigger_sources[-1] if self.trigger_sources else None
+    
+    @property
+    def effect_winner(self) -> Optional[DefinitionSource]:
+        return self.effect_sources[-1] if self.effect_sources else None
+    
+    def __repr__(self):
+        return f"MergedContainer({self.key} from {len(self.sources)} sources)"
+
+
+@dataclass
+class FolderInput:
+    """A file a FolderState was resolved from (see builder.update_folder_state)."""
+    file_id: int
+    content_hash: str
+    ast_id: Optional[int]  # None if no AST was cached
+    keys: List[str] = field(default_factory=list)  # Definition keys it contributed
+    
+    @property
+    def identity(self) -> Tuple[int, str, Optional[int]]:
+        return (self.file_id, self.content_hash, self.ast_id)
 
 
 @dataclass
@@ -58,6 +140,10 @@ class FolderState:
     definitions: OrderedDict[str, ResolvedDefinition] = field(default_factory=OrderedDict)
     conflicts: List[ConflictRecord] = field(default_factory=list)
     errors: List[Tuple[int, str]] = field(default_factory=list)  # (file_id, error_msg)
+    # CONTAINER_MERGE only: merge detail per key (definitions hold the merged blocks)
+    containers: OrderedDict[str, MergedContainer] = field(default_factory=OrderedDict)
+    # Inputs by (content_version_id, relpath), for incremental updates
+    inputs: Dict[Tuple[int, str], FolderInput] = field(default_factory=dict)
     
     @property
     def definition_count(self) -> int:
@@ -70,6 +156,9 @@ class FolderState:
     def get_definition(self, key: str) -> Optional[ResolvedDefinition]:
         return self.definitions.get(key)
     
+    def get_container(self, key: str) -> Optional[MergedContainer]:
+        return self.containers.get(key)
+    
     def __repr__(self):
         return f"FolderState({self.folder}: {self.definition_count} defs, {self.conflict_count} conflicts)"
 
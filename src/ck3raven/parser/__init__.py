@@ -13,7 +13,7 @@ node types are needed (e.g., for ast_serde serialization).
 def __getattr__(name: str):
     """Lazy import - loads submodules only when accessed."""
     # Lexer exports
-    if name in ("Lexer", "Token", "TokenType", "LexerError", "tokenize_file"):
+    if name in ("Lexer", "Token", "TokenStream", "TokenType", "LexerError", "tokenize_file"):
         from ck3raven.parser import lexer
         return getattr(lexer, name)
     
@@ -31,7 +31,8 @@ def __getattr__(name: str):
 __all__ = [
     # Lexer
     "Lexer",
-    "Token", 
+    "Token",
+    "TokenStream",
     "TokenType",
     "LexerError",
     "tokenize_file",
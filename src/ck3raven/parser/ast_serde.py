@@ -2,7 +2,7 @@
 AST Serialization — Zero-dependency module for AST/JSON conversion.
 
 ARCHITECTURAL RULE: This module has STRICTLY LIMITED dependencies:
-- json (stdlib)
+- json, struct, array, os, sys (stdlib)
 - typing (stdlib)  
 - ck3raven.parser.parser (node types only)
 
@@ -13,10 +13,33 @@ loading the heavy database layer (~150ms import savings per subprocess).
 
 Usage:
     from ck3raven.parser.ast_serde import serialize_ast, deserialize_ast, count_ast_nodes
+
+FORMATS (asts.ast_format column):
+    'json'    Compact JSON of the dict form below (default)
+    'binary'  String table + packed node array (see BINARY FORMAT)
+
+Both formats decode to the same dict form, so readers only need to pass
+the row's ast_format (or let deserialize_ast sniff the magic bytes).
+
+BINARY FORMAT:
+    header   struct '<4sBxxxII': magic b'CK3B', version, n_strings, n_nodes
+    lengths  array('I') [n_strings]     - string lengths in code points
+    nodes    array('i') [n_nodes * 7]   - tag, s0, s1, line, column, first, count
+    strings  UTF-8 text of all strings concatenated
+
+    Nodes are laid out breadth-first so each node's children (or an
+    assignment's value) are contiguous at nodes[first:first + count].
+    s0/s1 are string table indices (-1 = unused). Root is node 0.
 """
 
 import json
-from typing import Dict, Any, Union
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from itertools import accumulate
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
 # Import ONLY the node type classes - no database dependencies
 from ck3raven.parser.parser import (
@@ -28,78 +51,395 @@ from ck3raven.parser.parser import (
 )
 
 
-def serialize_ast(ast: RootNode) -> bytes:
+AST_FORMAT_JSON = 'json'
+AST_FORMAT_BINARY = 'binary'
+AST_FORMATS = (AST_FORMAT_JSON, AST_FORMAT_BINARY)
+
+_BINARY_MAGIC = b'CK3B'
+_BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('<4sBxxxII')
+_NODE_WIDTH = 7
+
+# Node tags and the exact dict keys each node type serializes to
+_TAG_ROOT, _TAG_BLOCK, _TAG_ASSIGNMENT, _TAG_VALUE, _TAG_LIST, _TAG_UNKNOWN = range(6)
+_TAGS_BY_TYPE = {
+    'root': _TAG_ROOT,
+    'block': _TAG_BLOCK,
+    'assignment': _TAG_ASSIGNMENT,
+    'value': _TAG_VALUE,
+    'list': _TAG_LIST,
+    'unknown': _TAG_UNKNOWN,
+}
+_NODE_KEYS = {
+    _TAG_ROOT: frozenset(('_type', 'filename', 'children')),
+    _TAG_BLOCK: frozenset(('_type', 'name', 'operator', 'line', 'column', 'children')),
+    _TAG_ASSIGNMENT: frozenset(('_type', 'key', 'operator', 'line', 'column', 'value')),
+    _TAG_VALUE: frozenset(('_type', 'value', 'value_type', 'line', 'column')),
+    _TAG_LIST: frozenset(('_type', 'line', 'column', 'items')),
+    _TAG_UNKNOWN: frozenset(('_type', 'repr')),
+}
+
+
+def get_ast_format() -> str:
+    """AST format for newly stored ASTs (default: 'json').
+    
+    Set QBUILDER_AST_FORMAT=binary to store the packed binary format.
+    """
+    fmt = os.environ.get("QBUILDER_AST_FORMAT", AST_FORMAT_JSON).lower()
+    return fmt if fmt in AST_FORMATS else AST_FORMAT_JSON
+
+
+def serialize_ast(ast: RootNode, ast_format: str = AST_FORMAT_JSON) -> bytes:
     """
-    Serialize AST to JSON bytes.
+    Serialize AST to bytes.
     
     Args:
         ast: Parsed AST root node
+        ast_format: 'json' (default) or 'binary'
         
     Returns:
-        UTF-8 encoded JSON bytes
-    """
-    
-    def node_to_dict(node) -> Dict[str, Any]:
-        """Convert AST node to serializable dict."""
-        if isinstance(node, RootNode):
-            return {
-                '_type': 'root',
-                'filename': str(node.filename),  # Convert Path to string
-                'children': [node_to_dict(c) for c in node.children]
-            }
-        elif isinstance(node, BlockNode):
-            return {
-                '_type': 'block',
-                'name': node.name,
-                'operator': node.operator,
-                'line': node.line,
-                'column': node.column,
-                'children': [node_to_dict(c) for c in node.children]
-            }
-        elif isinstance(node, AssignmentNode):
-            return {
-                '_type': 'assignment',
-                'key': node.key,
-                'operator': node.operator,
-                'line': node.line,
-                'column': node.column,
-                'value': node_to_dict(node.value)
-            }
-        elif isinstance(node, ValueNode):
-            return {
-                '_type': 'value',
-                'value': node.value,
-                'value_type': node.value_type,
-                'line': node.line,
-                'column': node.column,
-            }
-        elif isinstance(node, ListNode):
-            return {
-                '_type': 'list',
-                'line': node.line,
-                'column': node.column,
-                'items': [node_to_dict(i) for i in node.items]
-            }
-        else:
-            return {'_type': 'unknown', 'repr': repr(node)}
+        UTF-8 encoded JSON bytes, or binary AST bytes
+    """
+    return encode_ast(ast_to_dict(ast), ast_format)
+
+
+def ast_to_dict(ast: RootNode) -> Dict[str, Any]:
+    """
+    Convert a parsed AST to the dict form deserialize_ast() returns.
     
-    data = node_to_dict(ast)
-    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+    Lets a caller that needs both the blob and the dict (parse + extract in
+    one process) skip decoding the blob it just encoded.
+    """
+    return _node_to_dict(ast)
 
 
-def deserialize_ast(data: Union[bytes, str]) -> Dict[str, Any]:
+def _node_to_dict(node) -> Dict[str, Any]:
+    """Convert AST node to serializable dict."""
+    if isinstance(node, RootNode):
+        return {
+            '_type': 'root',
+            'filename': str(node.filename),  # Convert Path to string
+            'children': [_node_to_dict(c) for c in node.children]
+        }
+    elif isinstance(node, BlockNode):
+        return {
+            '_type': 'block',
+            'name': node.name,
+            'operator': node.operator,
+            'line': node.line,
+            'column': node.column,
+            'children': [_node_to_dict(c) for c in node.children]
+        }
+    elif isinstance(node, AssignmentNode):
+        return {
+            '_type': 'assignment',
+            'key': node.key,
+            'operator': node.operator,
+            'line': node.line,
+            'column': node.column,
+            'value': _node_to_dict(node.value)
+        }
+    elif isinstance(node, ValueNode):
+        return {
+            '_type': 'value',
+            'value': node.value,
+            'value_type': node.value_type,
+            'line': node.line,
+            'column': node.column,
+        }
+    elif isinstance(node, ListNode):
+        return {
+            '_type': 'list',
+            'line': node.line,
+            'column': node.column,
+            'items': [_node_to_dict(i) for i in node.items]
+        }
+    else:
+        return {'_type': 'unknown', 'repr': repr(node)}
+
+
+def encode_ast(ast_dict: Dict[str, Any], ast_format: str = AST_FORMAT_JSON) -> bytes:
     """
-    Deserialize AST from JSON bytes or string.
+    Encode a dict-form AST (as produced by deserialize_ast) in ast_format.
+    
+    Raises:
+        ValueError: Unknown format, or the dict has a shape the binary
+            format cannot represent exactly.
+    """
+    if ast_format == AST_FORMAT_JSON:
+        return json.dumps(ast_dict, separators=(',', ':')).encode('utf-8')
+    if ast_format == AST_FORMAT_BINARY:
+        return _encode_binary(ast_dict)
+    raise ValueError(f"Unknown AST format: {ast_format!r}")
+
+
+def deserialize_ast(data: Union[bytes, str], ast_format: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Deserialize AST from JSON or binary bytes (or a JSON string).
     
     Args:
-        data: JSON bytes or string
+        data: Serialized AST (e.g. asts.ast_blob)
+        ast_format: The row's asts.ast_format. If None, sniffed from the data.
         
     Returns:
         Dict representation of AST
     """
-    if isinstance(data, bytes):
-        return json.loads(data.decode('utf-8'))
-    return json.loads(data)
+    if isinstance(data, str):
+        return json.loads(data)
+    if ast_format is None:
+        ast_format = AST_FORMAT_BINARY if is_binary_ast(data) else AST_FORMAT_JSON
+    if ast_format == AST_FORMAT_BINARY:
+        return BinaryAST(data).to_dict()
+    return json.loads(bytes(data).decode('utf-8'))
+
+
+def deserialize_ast_lazy(data: Union[bytes, str], ast_format: Optional[str] = None) -> Mapping:
+    """
+    Deserialize only as much of the AST as is accessed.
+    
+    For binary ASTs this returns a read-only LazyASTNode for the root: child
+    nodes are built on first access, so e.g. reading top-level names costs
+    O(top-level nodes) instead of O(all nodes). JSON has no random access,
+    so JSON data is fully decoded (plain dicts are Mappings too).
+    """
+    if isinstance(data, str):
+        return json.loads(data)
+    if ast_format is None:
+        ast_format = AST_FORMAT_BINARY if is_binary_ast(data) else AST_FORMAT_JSON
+    if ast_format == AST_FORMAT_BINARY:
+        return BinaryAST(data).root()
+    return json.loads(bytes(data).decode('utf-8'))
+
+
+def is_binary_ast(data: Union[bytes, memoryview]) -> bool:
+    """True if data starts with the binary AST magic."""
+    return bytes(data[:4]) == _BINARY_MAGIC
+
+
+# =============================================================================
+# Binary format
+# =============================================================================
+
+def _encode_binary(ast_dict: Dict[str, Any]) -> bytes:
+    """Encode a dict-form AST into the binary format."""
+    string_index: Dict[str, int] = {}
+    strings: List[str] = []
+    
+    def intern(value) -> int:
+        if not isinstance(value, str):
+            raise ValueError(f"Binary AST expects str, got {type(value).__name__}")
+        idx = string_index.get(value)
+        if idx is None:
+            idx = len(strings)
+            string_index[value] = idx
+            strings.append(value)
+        return idx
+    
+    def position(node: Dict[str, Any], key: str) -> int:
+        value = node[key]
+        if type(value) is not int:
+            raise ValueError(f"Binary AST expects int {key}, got {value!r}")
+        return value
+    
+    nodes = array('i')
+    pending = [ast_dict]  # Breadth-first: node i is pending[i]
+    i = 0
+    while i < len(pending):
+        node = pending[i]
+        i += 1
+        if not isinstance(node, dict):
+            raise ValueError(f"Binary AST expects dict nodes, got {type(node).__name__}")
+        tag = _TAGS_BY_TYPE.get(node.get('_type'))
+        if tag is None or node.keys() != _NODE_KEYS[tag]:
+            raise ValueError(f"Unsupported AST node shape: {sorted(node.keys())}")
+        
+        if tag == _TAG_ROOT:
+            kids = node['children']
+            record = (tag, intern(node['filename']), -1, 0, 0)
+        elif tag == _TAG_BLOCK:
+            kids = node['children']
+            record = (tag, intern(node['name']), intern(node['operator']),
+                      position(node, 'line'), position(node, 'column'))
+        elif tag == _TAG_ASSIGNMENT:
+            kids = [node['value']]
+            record = (tag, intern(node['key']), intern(node['operator']),
+                      position(node, 'line'), position(node, 'column'))
+        elif tag == _TAG_VALUE:
+            kids = ()
+            record = (tag, intern(node['value']), intern(node['value_type']),
+                      position(node, 'line'), position(node, 'column'))
+        elif tag == _TAG_LIST:
+            kids = node['items']
+            record = (tag, -1, -1, position(node, 'line'), position(node, 'column'))
+        else:
+            kids = ()
+            record = (tag, intern(node['repr']), -1, 0, 0)
+        
+        if not isinstance(kids, (list, tuple)):
+            raise ValueError("Binary AST expects list children")
+        nodes.extend(record)
+        nodes.append(len(pending))
+        nodes.append(len(kids))
+        pending.extend(kids)
+    
+    lengths = array('I', [len(s) for s in strings])
+    if sys.byteorder != 'little':
+        lengths.byteswap()
+        nodes.byteswap()
+    header = _BINARY_HEADER.pack(_BINARY_MAGIC, _BINARY_VERSION, len(strings), len(pending))
+    return b''.join((header, lengths.tobytes(), nodes.tobytes(), ''.join(strings).encode('utf-8')))
+
+
+class BinaryAST:
+    """
+    Decoded view of a binary AST blob.
+    
+    Decoding the view is two array copies and one UTF-8 decode; nodes are
+    only turned into dicts by to_dict() (everything) or node_dict() / the
+    LazyASTNode returned by root() (on demand).
+    """
+    
+    __slots__ = ('strings', 'nodes', 'node_count')
+    
+    def __init__(self, data: Union[bytes, memoryview]):
+        data = memoryview(data)
+        magic, version, n_strings, n_nodes = _BINARY_HEADER.unpack_from(data)
+        if magic != _BINARY_MAGIC:
+            raise ValueError("Not a binary AST (bad magic)")
+        if version != _BINARY_VERSION:
+            raise ValueError(f"Unsupported binary AST version: {version}")
+        
+        offset = _BINARY_HEADER.size
+        lengths = array('I')
+        lengths.frombytes(data[offset:offset + n_strings * lengths.itemsize])
+        offset += n_strings * lengths.itemsize
+        nodes = array('i')
+        nodes.frombytes(data[offset:offset + n_nodes * _NODE_WIDTH * nodes.itemsize])
+        offset += n_nodes * _NODE_WIDTH * nodes.itemsize
+        if sys.byteorder != 'little':
+            lengths.byteswap()
+            nodes.byteswap()
+        
+        text = str(data[offset:], 'utf-8')
+        ends = list(accumulate(lengths))
+        self.strings = [text[end - length:end] for end, length in zip(ends, lengths)]
+        self.nodes = nodes
+        self.node_count = n_nodes
+    
+    def node_dict(self, index: int, children: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """
+        Dict for node index. Child entries ('children', 'items', 'value')
+        are taken from children, which defaults to fully decoded subtrees.
+        """
+        base = index * _NODE_WIDTH
+        tag, s0, s1, line, column, first, count = self.nodes[base:base + _NODE_WIDTH]
+        if children is None:
+            children = [self.node_dict(first + k) for k in range(count)]
+        strings = self.strings
+        if tag == _TAG_VALUE:
+            return {'_type': 'value', 'value': strings[s0], 'value_type': strings[s1],
+                    'line': line, 'column': column}
+        if tag == _TAG_ASSIGNMENT:
+            return {'_type': 'assignment', 'key': strings[s0], 'operator': strings[s1],
+                    'line': line, 'column': column, 'value': children[0]}
+        if tag == _TAG_BLOCK:
+            return {'_type': 'block', 'name': strings[s0], 'operator': strings[s1],
+                    'line': line, 'column': column, 'children': children}
+        if tag == _TAG_LIST:
+            return {'_type': 'list', 'line': line, 'column': column, 'items': children}
+        if tag == _TAG_ROOT:
+            return {'_type': 'root', 'filename': strings[s0], 'children': children}
+        return {'_type': 'unknown', 'repr': strings[s0]}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Fully decode to the same dict form json.loads() gives for JSON."""
+        nodes = self.nodes
+        strings = self.strings
+        built: List[Any] = [None] * self.node_count
+        # Children always have higher indices than their parent, so a reverse
+        # sweep builds every subtree before the node that contains it.
+        # (Inlined node_dict - this loop is the whole cost of a full decode.)
+        for index in range(self.node_count - 1, -1, -1):
+            base = index * _NODE_WIDTH
+            tag, s0, s1, line, column, first, count = nodes[base:base + _NODE_WIDTH]
+            if tag == _TAG_VALUE:
+                built[index] = {'_type': 'value', 'value': strings[s0], 'value_type': strings[s1],
+                                'line': line, 'column': column}
+            elif tag == _TAG_ASSIGNMENT:
+                built[index] = {'_type': 'assignment', 'key': strings[s0], 'operator': strings[s1],
+                                'line': line, 'column': column, 'value': built[first]}
+            else:
+                built[index] = self.node_dict(index, built[first:first + count])
+        return built[0] if built else {}
+    
+    def root(self) -> "LazyASTNode":
+        """Lazily decoded root node."""
+        return LazyASTNode(self, 0)
+    
+    def count_nodes(self) -> int:
+        """Node count (same as count_ast_nodes on the decoded dict)."""
+        return self.node_count
+
+
+class LazyASTNode(Mapping):
+    """
+    Read-only Mapping over one node of a BinaryAST.
+    
+    Has the same keys and values as the node's dict form; nested nodes are
+    LazyASTNodes built on first access. Note: not a dict subclass, so code
+    that checks isinstance(node, dict) needs deserialize_ast() instead.
+    """
+    
+    __slots__ = ('_ast', '_index', '_dict')
+    
+    def __init__(self, ast: BinaryAST, index: int):
+        self._ast = ast
+        self._index = index
+        self._dict: Optional[Dict[str, Any]] = None
+    
+    def _materialize(self) -> Dict[str, Any]:
+        if self._dict is None:
+            nodes = self._ast.nodes
+            base = self._index * _NODE_WIDTH
+            first = nodes[base + 5]
+            children = [LazyASTNode(self._ast, first + k) for k in range(nodes[base + 6])]
+            self._dict = self._ast.node_dict(self._index, children)
+        return self._dict
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._materialize()[key]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._materialize())
+    
+    def __len__(self) -> int:
+        return len(self._materialize())
+    
+    def __repr__(self) -> str:
+        return f"LazyASTNode({self._index}, {self.get('_type')})"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Fully decode this subtree to plain dicts."""
+        return self._ast.node_dict(self._index)
+    
+    def block_children(self) -> List[Tuple[str, int, "LazyASTNode"]]:
+        """
+        (name, line, node) for each block child, in order.
+        
+        Names and lines are read straight from the node table, so children
+        that are only looked up by name are never decoded.
+        """
+        ast = self._ast
+        nodes = ast.nodes
+        base = self._index * _NODE_WIDTH
+        first, count = nodes[base + 5], nodes[base + 6]
+        blocks = []
+        for index in range(first, first + count):
+            child = index * _NODE_WIDTH
+            if nodes[child] == _TAG_BLOCK:
+                blocks.append((ast.strings[nodes[child + 1]], nodes[child + 3],
+                               LazyASTNode(ast, index)))
+        return blocks
 
 
 def count_ast_nodes(ast_dict: Dict[str, Any]) -> int:
@@ -5,9 +5,11 @@ Converts raw .txt script files into a stream of tokens.
 Handles: identifiers, operators, braces, strings, numbers, comments.
 """
 
+import re
+from array import array
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import Iterator, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 
 class TokenType(Enum):
@@ -69,6 +71,138 @@ class Token:
         return f"Token({self.type.name}, {self.value!r}, L{self.line}:{self.column}, [{self.start_offset}:{self.end_offset}])"
 
 
+# Run scanners for Lexer.tokenize_compact() / tokenize_fast().
+# _IDENT_RUN: \w is exactly str.isalnum() or '_', so this matches the same
+# characters as Lexer._is_ident_cont() (isdigit is a subset of isalnum).
+_WS_RUN = re.compile(r'[ \t\r]*')
+_IDENT_RUN = re.compile(r"[\w.|&'\-:/%]*")
+_NUMBER_RUN = re.compile(r'-?[0-9]*(?:\.[0-9]*)?%?')
+_PARAM_RUN = re.compile(r'[^$ \t\n\r={}]*')
+
+# Integer token type codes stored in TokenStream.types (TokenType.value)
+_TOKEN_TYPES_BY_CODE = {t.value: t for t in TokenType}
+_IDENTIFIER = TokenType.IDENTIFIER.value
+_STRING = TokenType.STRING.value
+_NUMBER = TokenType.NUMBER.value
+_BOOL = TokenType.BOOL.value
+_PARAM = TokenType.PARAM.value
+_MINUS = TokenType.MINUS.value
+_NOT_EQUAL = TokenType.NOT_EQUAL.value
+_COMMENT = TokenType.COMMENT.value
+_NEWLINE = TokenType.NEWLINE.value
+_EOF = TokenType.EOF.value
+
+# Single-character tokens that need no lookahead
+_SINGLE_CHAR_CODES = {
+    '{': TokenType.LBRACE.value,
+    '}': TokenType.RBRACE.value,
+    ':': TokenType.COLON.value,
+    '@': TokenType.AT.value,
+    '[': TokenType.LBRACKET.value,
+    ']': TokenType.RBRACKET.value,
+    '+': TokenType.PLUS.value,
+    '*': TokenType.STAR.value,
+    '/': TokenType.SLASH.value,
+    ',': TokenType.COMMA.value,
+    ';': TokenType.SEMICOLON.value,
+    '`': TokenType.BACKTICK.value,
+}
+
+# Operators that may be followed by '=' to form a two-character operator
+_OPERATOR_CODES = {
+    '<': (TokenType.LESS_THAN.value, TokenType.LESS_EQUAL.value),
+    '>': (TokenType.GREATER_THAN.value, TokenType.GREATER_EQUAL.value),
+    '=': (TokenType.EQUALS.value, TokenType.COMPARE_EQUAL.value),
+    '?': (TokenType.QUESTION.value, TokenType.QUESTION_EQUALS.value),
+}
+
+
+class TokenStream:
+    """
+    Compact token stream produced by Lexer.tokenize_compact().
+    
+    Tokens are stored in parallel array('i') columns (type code, start/end
+    offset, line) instead of one Token object each. Values are sliced from
+    the source on demand; the few tokens whose value is not a plain slice
+    (strings with escapes, unclosed $PARAM) are kept in `overrides`.
+    
+    Supports len() and integer indexing, so it can be passed to Parser in
+    place of a List[Token]. Indexing materializes a Token; the most recent
+    one is cached because the parser reads the current token repeatedly.
+    """
+    
+    __slots__ = ('source', 'types', 'starts', 'ends', 'lines', 'overrides',
+                 '_newlines', '_cached_index', '_cached_token')
+    
+    def __init__(self, source: str, newlines: List[int]):
+        self.source = source
+        self.types = array('i')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.lines = array('i')
+        self.overrides: Dict[int, str] = {}
+        self._newlines = array('i', newlines)
+        self._cached_index = -1
+        self._cached_token: Optional[Token] = None
+    
+    def __len__(self) -> int:
+        return len(self.types)
+    
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self.types)
+        if index == self._cached_index:
+            return self._cached_token
+        token = Token(
+            _TOKEN_TYPES_BY_CODE[self.types[index]],
+            self.value_at(index),
+            self.lines[index],
+            self.column_at(index),
+            self.starts[index],
+            self.ends[index],
+        )
+        self._cached_index = index
+        self._cached_token = token
+        return token
+    
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self.types)):
+            yield self[index]
+    
+    def type_at(self, index: int) -> TokenType:
+        """Token type without materializing a Token."""
+        return _TOKEN_TYPES_BY_CODE[self.types[index]]
+    
+    def value_at(self, index: int) -> str:
+        """Token value, sliced from the source."""
+        value = self.overrides.get(index)
+        if value is not None:
+            return value
+        code = self.types[index]
+        start = self.starts[index]
+        end = self.ends[index]
+        if code == _STRING:
+            return self.source[start + 1:end - 1]
+        if code == _COMMENT:
+            return self.source[start + 1:end]
+        return self.source[start:end]
+    
+    def column_for(self, offset: int, line: int) -> int:
+        """1-based column of offset, given its 1-based line."""
+        if line > 1:
+            return offset - self._newlines[line - 2]
+        return offset + 1
+    
+    def column_at(self, index: int) -> int:
+        """1-based column of the token at index."""
+        return self.column_for(self.starts[index], self.lines[index])
+    
+    def memory_size(self) -> int:
+        """Bytes used by the token arrays and newline table (excludes source)."""
+        arrays = (self.types, self.starts, self.ends, self.lines, self._newlines)
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+
+
 class LexerError(Exception):
     """Error during lexical analysis."""
     def __init__(self, message: str, line: int, column: int):
@@ -463,8 +597,245 @@ class Lexer:
             # Unknown character
             raise LexerError(f"Unexpected character {ch!r}", start_line, start_col)
     
-    def tokenize_all(self, include_comments: bool = False, include_newlines: bool = False) -> List[Token]:
-        """Convenience method to get all tokens as a list."""
+    def _newline_offsets(self) -> List[int]:
+        """Offsets of every '\\n' in the source, in ascending order."""
+        source = self.source
+        offsets = []
+        pos = source.find('\n')
+        while pos != -1:
+            offsets.append(pos)
+            pos = source.find('\n', pos + 1)
+        return offsets
+    
+    @staticmethod
+    def _scan_number(source: str, pos: int, length: int) -> int:
+        """Return the end offset of the number starting at pos (see _read_number)."""
+        end = _NUMBER_RUN.match(source, pos).end()
+        if end >= length or not source[end].isdigit():
+            return end
+        
+        # Non-ASCII digit (e.g. superscripts) - use the exact per-char rules
+        end = pos
+        if source[end] == '-':
+            end += 1
+        has_dot = False
+        while end < length:
+            ch = source[end]
+            if ch.isdigit():
+                end += 1
+            elif ch == '.' and not has_dot:
+                has_dot = True
+                end += 1
+            else:
+                break
+        if end < length and source[end] == '%':
+            end += 1
+        return end
+    
+    @staticmethod
+    def _scan_string(source: str, pos: int, quote_char: str) -> tuple:
+        """Scan a quoted string starting at the opening quote.
+        
+        Returns:
+            (value, end_offset), or (None, -1) if the string is unterminated.
+        """
+        start = pos + 1
+        close = source.find(quote_char, start)
+        if close == -1:
+            if source.find('\\', start) == -1:
+                return None, -1
+        elif source.find('\\', start, close) == -1:
+            # Common case: no escapes, value is a plain slice
+            return source[start:close], close + 1
+        
+        # Escapes present - same rules as _read_string()
+        length = len(source)
+        result = []
+        i = start
+        while True:
+            close = source.find(quote_char, i)
+            backslash = source.find('\\', i, close if close != -1 else length)
+            if backslash == -1:
+                if close == -1:
+                    return None, -1
+                result.append(source[i:close])
+                return ''.join(result), close + 1
+            result.append(source[i:backslash])
+            esc = source[backslash + 1] if backslash + 1 < length else None
+            if esc == 'n':
+                result.append('\n')
+            elif esc == 't':
+                result.append('\t')
+            elif esc == quote_char:
+                result.append(quote_char)
+            elif esc == '\\':
+                result.append('\\')
+            else:
+                result.append('\\')
+                if esc:
+                    result.append(esc)
+            i = min(backslash + 2, length)
+    
+    def tokenize_fast(self, include_comments: bool = False, include_newlines: bool = False) -> Iterator[Token]:
+        """
+        High-throughput variant of tokenize().
+        
+        Scans whole runs (whitespace, identifiers, comments, strings) with
+        regex/str.find/slicing instead of advancing one character at a time,
+        and derives line/column from a precomputed newline-offset table.
+        Emits exactly the same token stream (and LexerErrors) as tokenize(),
+        except that the whole source is scanned before the first token is
+        yielded.
+        """
+        yield from self.tokenize_compact(include_comments, include_newlines)
+    
+    def tokenize_compact(self, include_comments: bool = False, include_newlines: bool = False) -> "TokenStream":
+        """
+        Scan the whole source into a compact TokenStream.
+        
+        Same scanning rules as tokenize_fast(), but tokens are recorded in
+        parallel integer arrays instead of Token objects. The Parser can
+        consume the returned stream directly.
+        
+        Raises:
+            LexerError: On the same input and at the same position as tokenize().
+        """
+        source = self.source
+        length = self.length
+        newlines = self._newline_offsets()
+        newline_count = len(newlines)
+        line_idx = 0  # Number of newlines before the current token
+        
+        stream = TokenStream(source, newlines)
+        add_type = stream.types.append
+        add_start = stream.starts.append
+        add_end = stream.ends.append
+        add_line = stream.lines.append
+        overrides = stream.overrides
+        
+        ws_match = _WS_RUN.match
+        ident_match = _IDENT_RUN.match
+        single_char = _SINGLE_CHAR_CODES
+        operators = _OPERATOR_CODES
+        
+        pos = self.pos
+        while True:
+            pos = ws_match(source, pos).end()
+            start = pos
+            
+            # Lazy line/column: token starts are monotonic, so walk the table forward
+            while line_idx < newline_count and newlines[line_idx] < start:
+                line_idx += 1
+            line = line_idx + 1
+            
+            if start >= length:
+                self.pos, self.line = start, line
+                self.column = start - newlines[line_idx - 1] if line_idx else start + 1
+                add_type(_EOF); add_start(start); add_end(start); add_line(line)
+                break
+            
+            ch = source[start]
+            
+            if ch == '\n':
+                pos = start + 1
+                if include_newlines:
+                    add_type(_NEWLINE); add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            if ch == '#':
+                pos = source.find('\n', start)
+                if pos == -1:
+                    pos = length
+                if include_comments:
+                    add_type(_COMMENT); add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            if ch == '"' or ch == "'":
+                value, pos = self._scan_string(source, start, ch)
+                if value is None:
+                    raise LexerError("Unterminated string", line, stream.column_for(start, line))
+                if source.find('\\', start + 1, pos - 1) != -1:
+                    overrides[len(stream.types)] = value
+                add_type(_STRING); add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            code = single_char.get(ch)
+            if code is not None:
+                pos = start + 1
+                add_type(code); add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            pair = operators.get(ch)
+            if pair is not None:
+                if start + 1 < length and source[start + 1] == '=':
+                    pos = start + 2
+                    add_type(pair[1])
+                else:
+                    pos = start + 1
+                    add_type(pair[0])
+                add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            if ch == '!':
+                if start + 1 < length and source[start + 1] == '=':
+                    pos = start + 2
+                    add_type(_NOT_EQUAL); add_start(start); add_end(pos); add_line(line)
+                    continue
+                raise LexerError(f"Unexpected character '!'", line, stream.column_for(start, line))
+            
+            if ch == '-':
+                if start + 1 < length and source[start + 1].isdigit():
+                    pos = self._scan_number(source, start, length)
+                    add_type(_NUMBER)
+                else:
+                    pos = start + 1
+                    add_type(_MINUS)
+                add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            if ch == '$':
+                pos = _PARAM_RUN.match(source, start + 1).end()
+                if pos < length and source[pos] == '$':
+                    pos += 1
+                else:
+                    # Unclosed parameter: value still gets a closing '$'
+                    overrides[len(stream.types)] = source[start:pos] + '$'
+                add_type(_PARAM); add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            if ch.isdigit():
+                peek = source[start + 1] if start + 1 < length else None
+                if peek and (peek == '_' or peek.isalpha()):
+                    pos = ident_match(source, start).end()
+                    add_type(_IDENTIFIER)
+                else:
+                    pos = self._scan_number(source, start, length)
+                    add_type(_NUMBER)
+                add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            if ch == '_' or ch == '.' or ch.isalpha():
+                pos = ident_match(source, start).end()
+                if pos - start <= 3 and source[start:pos] in ('yes', 'no'):
+                    add_type(_BOOL)
+                else:
+                    add_type(_IDENTIFIER)
+                add_start(start); add_end(pos); add_line(line)
+                continue
+            
+            raise LexerError(f"Unexpected character {ch!r}", line, stream.column_for(start, line))
+        
+        return stream
+    
+    def tokenize_all(self, include_comments: bool = False, include_newlines: bool = False,
+                     fast: bool = False) -> List[Token]:
+        """Convenience method to get all tokens as a list.
+        
+        Args:
+            fast: Use tokenize_fast() (identical output, bulk scanning).
+        """
+        if fast:
+            return list(self.tokenize_compact(include_comments, include_newlines))
         return list(self.tokenize(include_comments, include_newlines))
 
 
@@ -4,6 +4,7 @@ Persistent Parse Pool — Supervisor for long-lived parse worker processes.
 This module manages a pool of parse_worker subprocesses that:
 - Import parser/serde ONCE at startup (amortizes ~115ms spawn + ~22ms import)
 - Process many files via JSON line protocol
+- Return ASTs through a per-worker shared memory block (see Transports)
 - Get killed on timeout, respawned automatically
 - Recycle after N parses to bound memory leaks
 
@@ -15,15 +16,28 @@ Usage:
     
     result = pool.parse_file(Path("/path/to/file.txt"), timeout=30)
     if result.success:
-        ast_json = result.ast_json
+        ast_dict = deserialize_ast(result.ast_blob, result.ast_format)
+    
+    # Batches: largest files first, work stealing, completions streamed
+    for index, result in pool.parse_batch([(path, size), ...]):
+        ...
     
     pool.shutdown()
 
+Transports (QBUILDER_PARSE_TRANSPORT):
+    shm  (default) The supervisor creates one shared memory block per
+         worker. The worker writes the serialized AST there and replies
+         with a small JSON descriptor; the supervisor copies the bytes out
+         once. ASTs larger than the block come back inline.
+    json The whole AST travels inline in the worker's stdout JSON line
+         (result.ast_json).
+
 Integration with qbuilder:
     Enable via QBUILDER_PERSISTENT_PARSE=1 environment variable.
     The pool is created once when qbuilder daemon starts.
 """
 
+import base64
 import json
 import os
 import subprocess
@@ -31,10 +45,11 @@ import sys
 import threading
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
 from queue import Queue, Empty
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import signal
 
 
@@ -44,15 +59,35 @@ DEFAULT_TIMEOUT_MS = 30000
 WORKER_STARTUP_TIMEOUT = 10.0  # seconds to wait for worker ready signal
 WORKER_RECYCLE_AFTER = 5000  # respawn worker after this many parses
 
+# Result transports
+TRANSPORT_SHM = "shm"
+TRANSPORT_JSON = "json"
+TRANSPORTS = (TRANSPORT_SHM, TRANSPORT_JSON)
+
+# Per-worker shared memory block; larger ASTs fall back to inline JSON
+DEFAULT_SHM_BYTES = 64 * 1024 * 1024
+
 
 @dataclass
 class ParseResult:
-    """Result from pool parse operation."""
+    """Result from pool parse operation.
+    
+    Successful parses set ast_blob (serialized in ast_format), except for
+    inline JSON replies, which set ast_json instead.
+    """
     success: bool
     ast_json: Optional[str] = None
     node_count: int = 0
     error: Optional[str] = None
     error_type: Optional[str] = None
+    ast_blob: Optional[bytes] = None
+    ast_format: str = "json"
+
+
+def get_transport() -> str:
+    """Result transport from QBUILDER_PARSE_TRANSPORT (default: shm)."""
+    transport = os.environ.get("QBUILDER_PARSE_TRANSPORT", TRANSPORT_SHM).lower()
+    return transport if transport in TRANSPORTS else TRANSPORT_SHM
 
 
 class WorkerProcess:
@@ -67,9 +102,13 @@ class WorkerProcess:
     - Detecting crashes and recycling
     """
     
-    def __init__(self, worker_id: int, repo_root: Path):
+    def __init__(self, worker_id: int, repo_root: Path,
+                 transport: str = TRANSPORT_SHM, shm_bytes: int = DEFAULT_SHM_BYTES):
         self.worker_id = worker_id
         self.repo_root = repo_root
+        self.transport = transport
+        self.shm_bytes = shm_bytes
+        self._arena = None  # SharedMemory owned by this supervisor-side wrapper
         self.process: Optional[subprocess.Popen] = None
         self.pid: Optional[int] = None
         self.parse_count = 0
@@ -93,6 +132,16 @@ class WorkerProcess:
             "CK3RAVEN_ROOT": str(self.repo_root),
             "PYTHONPATH": str(self.repo_root / "src"),
         }
+        env.pop("CK3RAVEN_PARSE_SHM", None)
+        
+        if self.transport == TRANSPORT_SHM:
+            try:
+                from multiprocessing import shared_memory
+                self._arena = shared_memory.SharedMemory(create=True, size=self.shm_bytes)
+                env["CK3RAVEN_PARSE_SHM"] = self._arena.name
+            except Exception as e:
+                print(f"[Pool] Worker {self.worker_id}: shared memory unavailable ({e}), using JSON transport")
+                self.transport = TRANSPORT_JSON
         
         try:
             self.process = subprocess.Popen(
@@ -107,6 +156,7 @@ class WorkerProcess:
             )
         except Exception as e:
             print(f"[Pool] Failed to spawn worker {self.worker_id}: {e}")
+            self._release_arena()
             return False
         
         # Wait for ready signal
@@ -174,13 +224,15 @@ class WorkerProcess:
         """Check if worker should be recycled due to parse count."""
         return self.parse_count >= WORKER_RECYCLE_AFTER
     
-    def parse_file(self, filepath: Path, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> ParseResult:
+    def parse_file(self, filepath: Path, timeout_ms: int = DEFAULT_TIMEOUT_MS,
+                   ast_format: str = "json") -> ParseResult:
         """
         Send a parse request to this worker.
         
         Args:
             filepath: Absolute path to file
             timeout_ms: Timeout in milliseconds
+            ast_format: Serialization the worker should produce
             
         Returns:
             ParseResult with AST or error
@@ -197,16 +249,30 @@ class WorkerProcess:
             "id": req_id,
             "path": str(filepath),
             "timeout_ms": timeout_ms,
+            "ast_format": ast_format,
         }
         
+        if self._arena is not None:
+            # The block holds one result, so the whole exchange is exclusive
+            with self.lock:
+                return self._exchange(req_id, request, filepath, timeout_ms)
+        return self._exchange(req_id, request, filepath, timeout_ms)
+    
+    def _exchange(self, req_id: str, request: dict, filepath: Path, timeout_ms: int) -> ParseResult:
+        """Send one request and wait for its response."""
         # Set up response event
         response_event = threading.Event()
         self._pending_requests[req_id] = response_event
         
         try:
-            with self.lock:
+            if self._arena is not None:
+                # Caller holds self.lock for the whole exchange
                 self.process.stdin.write(json.dumps(request) + "\n")
                 self.process.stdin.flush()
+            else:
+                with self.lock:
+                    self.process.stdin.write(json.dumps(request) + "\n")
+                    self.process.stdin.flush()
             
             # Wait for response with timeout
             timeout_sec = (timeout_ms / 1000) + 2.0  # Add buffer for IPC overhead
@@ -232,10 +298,17 @@ class WorkerProcess:
             self.parse_count += 1
             
             if response.get("ok"):
+                ast_blob = None
+                if "shm_size" in response:
+                    ast_blob = bytes(self._arena.buf[:response["shm_size"]])
+                elif "ast_b64" in response:
+                    ast_blob = base64.b64decode(response["ast_b64"])
                 return ParseResult(
                     success=True,
                     ast_json=response.get("ast_json"),
                     node_count=response.get("node_count", 0),
+                    ast_blob=ast_blob,
+                    ast_format=response.get("ast_format", "json"),
                 )
             else:
                 return ParseResult(
@@ -269,6 +342,7 @@ class WorkerProcess:
                 pass
             self.process = None
             self.pid = None
+        self._release_arena()
     
     def shutdown(self):
         """Gracefully shutdown the worker."""
@@ -281,6 +355,17 @@ class WorkerProcess:
             except Exception:
                 self.kill()
         self.process = None
+        self._release_arena()
+    
+    def _release_arena(self):
+        """Free the shared memory block (worker must be gone)."""
+        if self._arena is not None:
+            try:
+                self._arena.close()
+                self._arena.unlink()
+            except Exception:
+                pass
+            self._arena = None
 
 
 class ParsePool:
@@ -295,13 +380,16 @@ class ParsePool:
     - Shuts down cleanly on shutdown()
     """
     
-    def __init__(self, num_workers: int = DEFAULT_NUM_WORKERS):
+    def __init__(self, num_workers: int = DEFAULT_NUM_WORKERS, transport: Optional[str] = None):
         self.num_workers = num_workers
+        self.transport = transport or get_transport()
         self.repo_root = self._get_repo_root()
         self.workers: List[WorkerProcess] = []
         self._worker_lock = threading.Lock()
         self._next_worker = 0
         self._running = False
+        self._last_batch: Optional[dict] = None
+        self._batches = 0
     
     def _get_repo_root(self) -> Path:
         """Get ck3raven repo root."""
@@ -316,7 +404,7 @@ class ParsePool:
         self._running = True
         
         for i in range(self.num_workers):
-            worker = WorkerProcess(i, self.repo_root)
+            worker = WorkerProcess(i, self.repo_root, self.transport)
             if worker.start():
                 self.workers.append(worker)
                 print(f"[Pool] Started worker {i} (pid={worker.pid})")
@@ -335,34 +423,47 @@ class ParsePool:
                 return None
             
             # Round-robin selection
-            worker = self.workers[self._next_worker % len(self.workers)]
+            slot = self._next_worker % len(self.workers)
             self._next_worker += 1
+            return self._ready_worker(slot)
+    
+    def _slot_worker(self, slot: int) -> Optional[WorkerProcess]:
+        """Get the worker in a given slot (batch dispatch), respawning if needed."""
+        with self._worker_lock:
+            if slot >= len(self.workers):
+                return None
+            return self._ready_worker(slot)
+    
+    def _ready_worker(self, slot: int) -> Optional[WorkerProcess]:
+        """Worker in slot, respawned if dead or due for recycling. Hold _worker_lock."""
+        worker = self.workers[slot]
+        
+        # Check if worker needs respawn
+        if not worker.is_alive() or worker.needs_recycle():
+            worker_id = worker.worker_id
+            worker.kill()
             
-            # Check if worker needs respawn
-            if not worker.is_alive() or worker.needs_recycle():
-                worker_id = worker.worker_id
-                worker.kill()
-                
-                # Respawn
-                new_worker = WorkerProcess(worker_id, self.repo_root)
-                if new_worker.start():
-                    idx = self.workers.index(worker)
-                    self.workers[idx] = new_worker
-                    print(f"[Pool] Respawned worker {worker_id} (pid={new_worker.pid})")
-                    return new_worker
-                else:
-                    print(f"[Pool] Failed to respawn worker {worker_id}")
-                    return None
-            
-            return worker
+            # Respawn
+            new_worker = WorkerProcess(worker_id, self.repo_root, self.transport)
+            if new_worker.start():
+                self.workers[slot] = new_worker
+                print(f"[Pool] Respawned worker {worker_id} (pid={new_worker.pid})")
+                return new_worker
+            else:
+                print(f"[Pool] Failed to respawn worker {worker_id}")
+                return None
+        
+        return worker
     
-    def parse_file(self, filepath: Path, timeout_ms: int = DEFAULT_TIMEOUT_MS) -> ParseResult:
+    def parse_file(self, filepath: Path, timeout_ms: int = DEFAULT_TIMEOUT_MS,
+                   ast_format: str = "json") -> ParseResult:
         """
         Parse a file using the worker pool.
         
         Args:
             filepath: Absolute path to file
             timeout_ms: Timeout in milliseconds
+            ast_format: 'json' or 'binary' (see ast_serde)
             
         Returns:
             ParseResult with AST or error
@@ -382,11 +483,131 @@ class ParsePool:
                 error="No parse worker available",
             )
         
-        result = worker.parse_file(filepath, timeout_ms)
+        result = worker.parse_file(filepath, timeout_ms, ast_format)
         
         # If worker crashed/timed out, it was killed - next call will respawn
         return result
     
+    def parse_batch(self, files: Iterable[Tuple[Path, Optional[int]]],
+                    timeout_ms: int = DEFAULT_TIMEOUT_MS,
+                    ast_format: str = "json") -> Iterator[Tuple[int, ParseResult]]:
+        """
+        Parse many files across all workers, yielding results as they complete.
+        
+        Scheduling is size-aware: files are dealt largest-first onto the
+        least-loaded worker's deque (by bytes), and each worker runs its own
+        deque largest-first. A worker whose deque runs dry steals the
+        largest pending file of the worker with the most bytes left, so one
+        slow file never leaves the other workers idle while work remains.
+        
+        Dispatch starts immediately; results arrive in completion order.
+        Closing the iterator early stops handing out new files.
+        
+        Args:
+            files: (path, size in bytes) pairs; size may be None (treated as 0)
+            timeout_ms: Per-file timeout in milliseconds
+            ast_format: 'json' or 'binary' (see ast_serde)
+        
+        Yields:
+            (index into files, ParseResult)
+        
+        Batch makespan and balance are reported in get_stats()['last_batch'].
+        """
+        files = list(files)
+        sizes = [max(size or 0, 1) for _, size in files]
+        
+        if not self._running or not self.workers:
+            error = ParseResult(
+                success=False,
+                error_type="PoolNotRunning",
+                error="Parse pool is not running",
+            )
+            return iter([(index, error) for index in range(len(files))])
+        
+        slots = len(self.workers)
+        queues = [deque() for _ in range(slots)]
+        remaining = [0] * slots
+        for index in sorted(range(len(files)), key=sizes.__getitem__, reverse=True):
+            slot = min(range(slots), key=remaining.__getitem__)
+            queues[slot].append(index)
+            remaining[slot] += sizes[index]
+        
+        batch = {
+            "files": len(files),
+            "bytes": sum(sizes),
+            "workers": slots,
+            "steals": 0,
+            "busy_sec": [0.0] * slots,
+        }
+        queue_lock = threading.Lock()
+        cancelled = threading.Event()
+        completions: Queue = Queue()
+        
+        def next_index(slot: int) -> Optional[int]:
+            with queue_lock:
+                if cancelled.is_set():
+                    return None
+                if queues[slot]:
+                    index = queues[slot].popleft()
+                    remaining[slot] -= sizes[index]
+                    return index
+                victim = max(range(slots), key=remaining.__getitem__)
+                if not queues[victim]:
+                    return None
+                index = queues[victim].popleft()
+                remaining[victim] -= sizes[index]
+                batch["steals"] += 1
+                return index
+        
+        def dispatch(slot: int) -> None:
+            try:
+                while True:
+                    index = next_index(slot)
+                    if index is None:
+                        break
+                    started = time.perf_counter()
+                    worker = self._slot_worker(slot)
+                    if worker is None:
+                        result = ParseResult(
+                            success=False,
+                            error_type="NoWorkerAvailable",
+                            error="No parse worker available",
+                        )
+                    else:
+                        result = worker.parse_file(files[index][0], timeout_ms, ast_format)
+                    batch["busy_sec"][slot] += time.perf_counter() - started
+                    completions.put((index, result))
+            finally:
+                completions.put(None)
+        
+        start = time.perf_counter()
+        for slot in range(slots):
+            threading.Thread(
+                target=dispatch, args=(slot,), daemon=True,
+                name=f"ParsePool-batch-{slot}",
+            ).start()
+        
+        def results() -> Iterator[Tuple[int, ParseResult]]:
+            finished = 0
+            try:
+                while finished < slots:
+                    completion = completions.get()
+                    if completion is None:
+                        finished += 1
+                    else:
+                        yield completion
+            finally:
+                cancelled.set()
+                makespan = time.perf_counter() - start
+                busy = sum(batch["busy_sec"])
+                batch["makespan_sec"] = makespan
+                # 1.0 = every worker busy for the whole batch
+                batch["balance"] = busy / (slots * makespan) if makespan > 0 else 0.0
+                self._last_batch = batch
+                self._batches += 1
+        
+        return results()
+    
     def parse_text(self, content: str, filename: str = "<inline>", 
                    timeout_ms: int = DEFAULT_TIMEOUT_MS) -> ParseResult:
         """
@@ -435,12 +656,16 @@ class ParsePool:
             "num_workers": len(self.workers),
             "target_workers": self.num_workers,
             "running": self._running,
+            "transport": self.transport,
+            "batches": self._batches,
+            "last_batch": self._last_batch,
             "workers": [
                 {
                     "id": w.worker_id,
                     "pid": w.pid,
                     "alive": w.is_alive(),
                     "parse_count": w.parse_count,
+                    "transport": w.transport,
                 }
                 for w in self.workers
             ],
@@ -15,19 +15,34 @@ Request format (JSON line):
     
     OR for text content:
     {"id": "uuid", "content": "...", "filename": "inline.txt", "timeout_ms": 30000}
+    
+    Optional: "ast_format": "json" | "binary" (default "json")
 
 Response format (JSON line):
     Success:
     {"id": "uuid", "ok": true, "ast_json": "...", "node_count": 1234}
     
+    Success, shared-memory transport (see below):
+    {"id": "uuid", "ok": true, "shm_size": 56789, "ast_format": "json", "node_count": 1234}
+    
     Failure:
     {"id": "uuid", "ok": false, "error_type": "ParseError", "error": "message"}
 
+Shared-memory transport:
+    When the supervisor sets CK3RAVEN_PARSE_SHM to the name of a shared
+    memory block it owns, the worker writes each serialized AST into that
+    block and replies with its size only, so the AST never passes through
+    the pipe or a second JSON encoding. One request is in flight per worker,
+    so the block is reused for every result. ASTs larger than the block are
+    returned inline ("ast_json"/"ast_b64") as without the transport.
+
 Usage:
     python -m ck3raven.parser.parse_worker
 """
 
+import base64
 import json
+import os
 import sys
 import signal
 import traceback
@@ -39,6 +54,9 @@ MAX_PARSES_BEFORE_RECYCLE = 5000
 # Track parse count for recycling
 _parse_count = 0
 
+# Shared memory block owned by the supervisor (None = inline responses)
+_arena = None
+
 
 def _setup_signal_handlers():
     """Ignore SIGINT in worker - let supervisor handle it."""
@@ -48,6 +66,22 @@ def _setup_signal_handlers():
         pass  # Not supported on this platform/thread
 
 
+def _attach_arena(name: str):
+    """Attach to the supervisor's shared memory block without owning it."""
+    from multiprocessing import shared_memory
+    
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    
+    arena = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # Before 3.13 attaching registers the block with this process's
+        # resource tracker, which would unlink it when the worker recycles
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(arena._name, "shared_memory")
+    return arena
+
+
 def _read_ck3_text(path: Path) -> str:
     """Read a CK3 text file with encoding fallback."""
     try:
@@ -70,7 +104,7 @@ def handle_request(request: dict) -> dict:
         # Import parser lazily (but only once per worker lifetime)
         from ck3raven.parser.parser import parse_file as _parse_file
         from ck3raven.parser.parser import parse_source as _parse_source
-        from ck3raven.parser.ast_serde import serialize_ast, count_ast_nodes, deserialize_ast
+        from ck3raven.parser.ast_serde import ast_to_dict, count_ast_nodes, encode_ast
         
         if "path" in request:
             # File mode
@@ -100,20 +134,29 @@ def handle_request(request: dict) -> dict:
             }
         
         # Serialize AST
-        ast_blob = serialize_ast(ast_node)
-        ast_dict = deserialize_ast(ast_blob)
+        ast_format = request.get("ast_format", "json")
+        ast_dict = ast_to_dict(ast_node)
+        ast_blob = encode_ast(ast_dict, ast_format)
         node_count = count_ast_nodes(ast_dict)
         
-        ast_str = ast_blob.decode('utf-8') if isinstance(ast_blob, bytes) else ast_blob
-        
         _parse_count += 1
         
-        return {
+        response = {
             "id": req_id,
             "ok": True,
-            "ast_json": ast_str,
+            "ast_format": ast_format,
             "node_count": node_count,
         }
+        
+        if _arena is not None and len(ast_blob) <= _arena.size:
+            _arena.buf[:len(ast_blob)] = ast_blob
+            response["shm_size"] = len(ast_blob)
+        elif ast_format == "json":
+            response["ast_json"] = ast_blob.decode('utf-8')
+        else:
+            response["ast_b64"] = base64.b64encode(ast_blob).decode('ascii')
+        
+        return response
     
     except Exception as e:
         return {
@@ -128,12 +171,16 @@ def worker_main():
     """
     Main worker loop. Reads JSON lines from stdin, writes responses to stdout.
     """
-    global _parse_count
+    global _parse_count, _arena
     
     _setup_signal_handlers()
     
+    shm_name = os.environ.get("CK3RAVEN_PARSE_SHM")
+    if shm_name:
+        _arena = _attach_arena(shm_name)
+    
     # Signal ready to supervisor
-    sys.stdout.write(json.dumps({"ready": True, "pid": __import__("os").getpid()}) + "\n")
+    sys.stdout.write(json.dumps({"ready": True, "pid": os.getpid(), "shm": _arena is not None}) + "\n")
     sys.stdout.flush()
     
     for line in sys.stdin:
@@ -171,11 +218,13 @@ def worker_main():
             sys.stdout.write(json.dumps({"recycle": True, "parses": _parse_count}) + "\n")
             sys.stdout.flush()
             break
+    
+    if _arena is not None:
+        _arena.close()
 
 
 if __name__ == "__main__":
     # Add src to path if running directly
-    import os
     repo_root = Path(__file__).parent.parent.parent.parent
     sys.path.insert(0, str(repo_root / "src"))
     
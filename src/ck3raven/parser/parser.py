@@ -5,11 +5,12 @@ Converts a token stream from the lexer into an Abstract Syntax Tree (AST).
 Handles nested blocks, key-value pairs, and lists.
 """
 
+import sys
 from dataclasses import dataclass, field
 from typing import List, Optional, Union, Dict, Any
 from enum import Enum, auto
 
-from ck3raven.parser.lexer import Lexer, Token, TokenType, LexerError
+from ck3raven.parser.lexer import Lexer, Token, TokenStream, TokenType, LexerError
 
 
 class NodeType(Enum):
@@ -22,10 +23,13 @@ class NodeType(Enum):
     OPERATOR_EXPR = auto()  # key < value, key >= value, etc.
 
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
     """Base class for AST nodes.
     
+    Node classes use __slots__ (no per-instance __dict__): a full playset
+    parse creates millions of them.
+    
     Attributes:
         node_type: Type of node
         line: 1-based line number
@@ -40,7 +44,7 @@ class ASTNode:
     end_offset: int = 0    # Character index (exclusive) into source
 
 
-@dataclass
+@dataclass(slots=True)
 class ValueNode(ASTNode):
     """A simple value (string, number, identifier, boolean)."""
     value: str = ""
@@ -71,7 +75,7 @@ class ValueNode(ASTNode):
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class AssignmentNode(ASTNode):
     """A key = value assignment."""
     key: str = ""
@@ -123,7 +127,7 @@ class AssignmentNode(ASTNode):
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ListNode(ASTNode):
     """A list of values: { item1 item2 item3 }"""
     items: List[Union[ValueNode, 'AssignmentNode', 'BlockNode']] = field(default_factory=list)
@@ -176,7 +180,7 @@ class ListNode(ASTNode):
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockNode(ASTNode):
     """A named block: name = { contents }"""
     name: str = ""
@@ -249,7 +253,7 @@ class BlockNode(ASTNode):
         return str(node)
 
 
-@dataclass
+@dataclass(slots=True)
 class RootNode(ASTNode):
     """Root of the AST, contains all top-level definitions."""
     children: List[Union[BlockNode, AssignmentNode]] = field(default_factory=list)
@@ -365,6 +369,9 @@ class Parser:
     Usage:
         parser = Parser(tokens)
         ast = parser.parse()
+    
+    tokens may be a List[Token] or a compact TokenStream from
+    Lexer.tokenize_compact().
     """
     
     OPERATORS = {
@@ -378,7 +385,7 @@ class Parser:
         TokenType.QUESTION_EQUALS: '?=',  # null-safe equals
     }
     
-    def __init__(self, tokens: List[Token], filename: str = "<unknown>"):
+    def __init__(self, tokens: Union[List[Token], TokenStream], filename: str = "<unknown>"):
         self.tokens = tokens
         self.filename = filename
         self.pos = 0
@@ -489,7 +496,7 @@ class Parser:
             
             # Regular @identifier
             ident = self._expect(TokenType.IDENTIFIER, "Expected identifier after @")
-            scripted_name = f"@{ident.value}"
+            scripted_name = sys.intern(f"@{ident.value}")
             
             # Check if this is an assignment
             next_token = self._current()
@@ -533,7 +540,9 @@ class Parser:
     def _parse_assignment_or_value(self) -> Union[AssignmentNode, BlockNode, ValueNode]:
         """Parse an assignment (key = value) or standalone value."""
         key_token = self._advance()
-        key = key_token.value
+        # Keys repeat constantly (trigger, effect, limit, modifier, ...) -
+        # intern so every node shares one string object per distinct key
+        key = sys.intern(key_token.value)
         key_type = 'identifier'
         if key_token.type == TokenType.STRING:
             key_type = 'string'
@@ -782,7 +791,7 @@ class RecoveringParser(Parser):
     
     MAX_ERRORS = 100  # Prevent infinite error loops
     
-    def __init__(self, tokens: List[Token], filename: str = "<unknown>"):
+    def __init__(self, tokens: Union[List[Token], TokenStream], filename: str = "<unknown>"):
         super().__init__(tokens, filename)
         self.diagnostics: List[ParseDiagnostic] = []
         self.error_count = 0
@@ -939,7 +948,7 @@ class RecoveringParser(Parser):
 def parse_source(source: str, filename: str = "<unknown>") -> RootNode:
     """Parse source code string into AST."""
     lexer = Lexer(source, filename)
-    tokens = lexer.tokenize_all()
+    tokens = lexer.tokenize_compact()
     parser = Parser(tokens, filename)
     return parser.parse()
 
@@ -960,7 +969,7 @@ def parse_source_recovering(source: str, filename: str = "<unknown>") -> ParseRe
     """
     try:
         lexer = Lexer(source, filename)
-        tokens = lexer.tokenize_all()
+        tokens = lexer.tokenize_compact()
     except LexerError as e:
         # Lexer failed - return single error
         return ParseResult(
@@ -78,6 +78,9 @@ class ParseResult:
     error: Optional[str] = None
     error_type: Optional[str] = None
     diagnostics: Optional[List[ParseDiagnostic]] = None
+    # Same shape as parse_pool.ParseResult; subprocess results are inline JSON
+    ast_blob: Optional[bytes] = None
+    ast_format: str = "json"
 
 
 def _get_repo_root() -> Path:
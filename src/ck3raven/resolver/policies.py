@@ -170,3 +170,21 @@ def get_policy_for_folder(folder_path: str) -> MergePolicy:
     
     # Default for common/ and most other folders
     return MergePolicy.OVERRIDE
+
+
+def get_sub_rules_for_folder(folder_path: str) -> Dict[str, SubBlockPolicy]:
+    """
+    Sub-block rules for a CONTAINER_MERGE folder.
+    
+    Args:
+        folder_path: Relative path like "common/on_action"
+    
+    Returns:
+        {sub-block name: SubBlockPolicy}; the on_action rules if no
+        configured content type covers the folder
+    """
+    folder = folder_path.replace("\\", "/").strip("/")
+    for config in CONTENT_TYPE_CONFIGS.values():
+        if config.sub_rules and folder.startswith(config.folder_path):
+            return config.sub_rules
+    return CONTENT_TYPE_CONFIGS["on_action"].sub_rules
@@ -15,7 +15,9 @@ For production use, always use SQLResolver which queries the ingested
 database and respects playset load order.
 """
 
+import multiprocessing
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple, Set
@@ -436,6 +438,32 @@ def collect_folder_sources(
     return sources
 
 
+def folder_source_size(base_paths: List[Tuple[Path, str, int]], folder_rel_path: str) -> int:
+    """Total bytes of a folder's .txt files across all sources (scheduling weight)."""
+    total = 0
+    for base_path, _, _ in base_paths:
+        folder = base_path / folder_rel_path
+        if folder.exists():
+            total += sum(txt_file.stat().st_size for txt_file in folder.glob("*.txt"))
+    return total
+
+
+def _resolve_folder_task(
+    base_paths: List[Tuple[Path, str, int]],
+    folder_rel_path: str
+) -> Tuple[Any, bool]:
+    """
+    Process-pool entry point for Resolver.resolve_all(processes=N).
+    
+    Returns:
+        (result, had_sources) - as Resolver.resolve_folder() would produce
+    """
+    sources = collect_folder_sources(base_paths, folder_rel_path)
+    if not sources:
+        return ResolvedState(folder_path=folder_rel_path, policy=MergePolicy.OVERRIDE), False
+    return resolve_folder(sources, folder_rel_path), True
+
+
 # =============================================================================
 # RESOLVER CLASS
 # =============================================================================
@@ -557,17 +585,23 @@ class Resolver:
         
         return sorted(folders)
     
-    def resolve_all(self, progress_callback=None) -> Dict[str, Any]:
+    def resolve_all(self, progress_callback=None, processes: int = 1) -> Dict[str, Any]:
         """
         Resolve all content folders.
         
         Args:
             progress_callback: Optional callback(folder_path, index, total)
+            processes: Resolve folders in this many processes. Folders are
+                independent; the largest (by source bytes) are scheduled
+                first, and progress_callback is called as each one finishes.
         
         Returns:
-            Dict of {folder_path: result}
+            Dict of {folder_path: result}, in folder order either way
         """
         folders = self.get_all_content_folders()
+        if processes > 1 and len(folders) > 1:
+            return self._resolve_all_parallel(folders, progress_callback, processes)
+        
         results = {}
         
         for i, folder in enumerate(folders):
@@ -581,6 +615,37 @@ class Resolver:
         
         return results
     
+    def _resolve_all_parallel(self, folders: List[str], progress_callback,
+                              processes: int) -> Dict[str, Any]:
+        """resolve_all() across a process pool, largest folders first."""
+        base_paths = self.get_base_paths()
+        by_size = sorted(folders, key=lambda f: (-folder_source_size(base_paths, f), f))
+        
+        # folder -> (result, cache it); gathered as folders finish, then
+        # applied in folder order so _results matches the serial run
+        completed: Dict[str, Tuple[Any, bool]] = {}
+        with ProcessPoolExecutor(max_workers=min(processes, len(folders)),
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = {pool.submit(_resolve_folder_task, base_paths, folder): folder
+                       for folder in by_size}
+            for i, future in enumerate(as_completed(futures)):
+                folder = futures[future]
+                if progress_callback:
+                    progress_callback(folder, i, len(folders))
+                
+                try:
+                    completed[folder] = future.result()
+                except Exception as e:
+                    completed[folder] = ({"error": str(e)}, False)
+        
+        results = {}
+        for folder in folders:
+            result, had_sources = completed[folder]
+            if had_sources:
+                self._results[folder] = result
+            results[folder] = result
+        return results
+    
     def get_conflict_summary(self) -> Dict[str, Any]:
         """
         Get a summary of all conflicts across resolved folders.
@@ -0,0 +1,115 @@
+"""
+AST Memory Benchmark
+
+Measures how much memory parsed ASTs hold, to track the cost of the AST
+node classes (ValueNode, AssignmentNode, ListNode, BlockNode, RootNode).
+
+Run from ck3raven repo root:
+    python tests/benchmarks/benchmark_ast_memory.py [FILE_OR_DIR] [--copies N]
+
+FILE_OR_DIR defaults to the largest .txt file under tests/fixtures.
+--copies parses the input N times and keeps every AST alive, which
+approximates a parse worker that has accumulated many files.
+
+Reported:
+- AST node count
+- Retained bytes (tracemalloc, ASTs alive) and bytes per node
+- Peak traced bytes during parsing
+- Process peak RSS (Unix only, via resource.getrusage)
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Setup paths
+REPO_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+os.chdir(REPO_ROOT)
+
+from ck3raven.parser.parser import parse_source
+
+
+def collect_sources(target: Path) -> list:
+    """Return the list of source texts to parse."""
+    if target.is_file():
+        paths = [target]
+    else:
+        paths = sorted(target.rglob("*.txt"))
+    return [p.read_text(encoding="utf-8-sig", errors="replace") for p in paths]
+
+
+def count_nodes(node) -> int:
+    """Count nodes in a live AST."""
+    count = 1
+    for attr in ("children", "items"):
+        for child in getattr(node, attr, ()) or ():
+            count += count_nodes(child)
+    value = getattr(node, "value", None)
+    if value is not None and not isinstance(value, str):
+        count += count_nodes(value)
+    return count
+
+
+def peak_rss_kb() -> int:
+    """Process peak RSS in KB, or -1 where resource is unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return -1
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KB on Linux
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AST memory benchmark")
+    parser.add_argument("target", nargs="?", default=None)
+    parser.add_argument("--copies", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.target:
+        target = Path(args.target)
+    else:
+        fixtures = REPO_ROOT / "tests" / "fixtures"
+        target = max(fixtures.rglob("*.txt"), key=lambda p: p.stat().st_size)
+
+    sources = []
+    for source in collect_sources(target):
+        try:
+            parse_source(source)
+        except Exception:
+            continue
+        sources.append(source)
+
+    print("=" * 70)
+    print("AST MEMORY BENCHMARK")
+    print("=" * 70)
+    print(f"Target: {target}  files: {len(sources)}  copies: {args.copies}")
+
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    asts = [parse_source(source) for _ in range(args.copies) for source in sources]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = sum(count_nodes(ast) for ast in asts)
+    retained = current - baseline
+
+    print(f"\nAST nodes:            {nodes:,}")
+    print(f"Retained bytes:       {retained:,} ({retained / nodes:.1f} B/node)")
+    print(f"Peak traced bytes:    {peak - baseline:,}")
+    print(f"Peak RSS:             {peak_rss_kb():,} KB")
+    print(f"Parse time (traced):  {elapsed:.2f} sec")
+
+
+if __name__ == "__main__":
+    main()
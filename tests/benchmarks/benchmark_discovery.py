@@ -0,0 +1,108 @@
+"""
+Discovery write throughput: IncrementalDiscovery._commit_batch() rows/sec.
+
+Writes N synthetic file records (vanilla-like folder mix, no disk I/O) into
+a scratch database in COMMIT_BATCH_SIZE batches, three times:
+- fresh: every row is new
+- changed: every file's mtime changed (files upsert + new build item)
+- unchanged: stat matched (file_id set), only the build_queue no-op insert
+
+Run from ck3raven repo root:
+    python tests/benchmarks/benchmark_discovery.py [--files N]
+
+Reference (50k records, 1 CPU): per-row statements ran at ~18.5k rows/s
+fresh and ~16k rows/s changed; the staged set-based writes run at ~33k and
+~30k rows/s.
+"""
+
+import argparse
+import hashlib
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Setup paths
+REPO_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+sys.path.insert(0, str(REPO_ROOT))
+
+from ck3raven.db import init_database
+from ck3raven.db.schema import close_all_connections
+from qbuilder.discovery import (
+    COMMIT_BATCH_SIZE,
+    FileRecord,
+    IncrementalDiscovery,
+    _enqueue_discovery,
+    _ensure_cvid,
+)
+from qbuilder.schema import init_qbuilder_schema
+
+FOLDERS = [
+    "common/traits", "common/on_action", "common/culture/name_lists",
+    "events", "history/characters", "localization/english", "gfx/interface",
+]
+EXTENSIONS = [".txt", ".yml", ".dds", ".txt"]
+
+
+def make_records(n: int) -> list[FileRecord]:
+    records = [
+        FileRecord(
+            relpath=f"{FOLDERS[i % len(FOLDERS)]}/file_{i:06d}{EXTENSIONS[i % len(EXTENSIONS)]}",
+            mtime=1_700_000_000.0 + i,
+            size=1000 + i,
+            hash=hashlib.sha256(str(i).encode()).hexdigest(),
+        )
+        for i in range(n)
+    ]
+    records.sort(key=lambda r: r.relpath)
+    return records
+
+
+def write_all(discovery: IncrementalDiscovery, cvid: int, discovery_id: int,
+              records: list[FileRecord]) -> float:
+    """Write records in discovery-sized batches. Returns rows/sec."""
+    start = time.perf_counter()
+    for i in range(0, len(records), COMMIT_BATCH_SIZE):
+        batch = records[i:i + COMMIT_BATCH_SIZE]
+        discovery._commit_batch(cvid, batch, batch[-1].relpath, discovery_id)
+    return len(records) / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=50_000, help="Records to write")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = init_database(Path(tmpdir) / "bench.db")
+        init_qbuilder_schema(conn)
+        # Synthetic hashes have no file_contents rows
+        conn.execute("PRAGMA foreign_keys = OFF")
+
+        cvid = _ensure_cvid(conn, "bench", tmpdir, None)
+        _enqueue_discovery(conn, cvid, time.time())
+        conn.commit()
+        discovery = IncrementalDiscovery(conn)
+        discovery_id = discovery.claim_task()["discovery_id"]
+
+        records = make_records(args.files)
+        print(f"Records: {len(records):,} (batch size {COMMIT_BATCH_SIZE})")
+        print(f"  fresh:     {write_all(discovery, cvid, discovery_id, records):>10,.0f} rows/s")
+
+        for record in records:
+            record.mtime += 1
+        print(f"  changed:   {write_all(discovery, cvid, discovery_id, records):>10,.0f} rows/s")
+
+        file_ids = dict(conn.execute(
+            "SELECT relpath, file_id FROM files WHERE content_version_id = ?", (cvid,)))
+        for record in records:
+            record.file_id = file_ids[record.relpath]
+        print(f"  unchanged: {write_all(discovery, cvid, discovery_id, records):>10,.0f} rows/s")
+
+        close_all_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,15 +4,23 @@ A/B Throughput Benchmark: Legacy subprocess vs Persistent Pool
 This script compares:
 - Legacy: subprocess.run() per file (current default)
 - Pool: Persistent worker pool with JSON line protocol
+- Pool transports: AST inline in the JSON line vs shared memory block
 
 Run from ck3raven repo root:
-    python scripts/benchmark_parse_pool.py
+    python tests/benchmarks/benchmark_parse_pool.py [--dir DIR] [--files N] [--skip-legacy]
+
+Files come from the ck3raven database unless --dir is given (e.g.
+tests/fixtures or a vanilla game folder).
 
 Expected results:
 - Legacy: ~120-180ms per file (spawn + import dominated)
 - Pool: ~5-30ms per file (pure parse time)
+- Round-trip latency (request sent -> AST bytes in hand) is reported per
+  transport; shm avoids piping and double-encoding the AST, which matters
+  most for large files
 """
 
+import argparse
 import json
 import os
 import sqlite3
@@ -22,7 +30,7 @@ from pathlib import Path
 from statistics import mean, stdev, quantiles
 
 # Setup paths
-REPO_ROOT = Path(__file__).parent.parent
+REPO_ROOT = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(REPO_ROOT / "src"))
 os.chdir(REPO_ROOT)
 
@@ -68,6 +76,16 @@ def get_test_files(n: int = 100) -> list:
     return result
 
 
+def get_dir_files(root: Path, n: int) -> list:
+    """Get up to N .txt files under root, largest first."""
+    paths = sorted(root.rglob("*.txt"), key=lambda p: p.stat().st_size, reverse=True)[:n]
+    return [
+        {"file_id": None, "relpath": str(p.relative_to(root)), "abspath": p.resolve(),
+         "size": p.stat().st_size}
+        for p in paths
+    ]
+
+
 def benchmark_legacy(files: list) -> dict:
     """Benchmark legacy subprocess-per-file parsing."""
     from ck3raven.parser.runtime import parse_file, DEFAULT_PARSE_TIMEOUT
@@ -109,17 +127,26 @@ def benchmark_legacy(files: list) -> dict:
     }
 
 
-def benchmark_pool(files: list) -> dict:
-    """Benchmark persistent worker pool parsing."""
+def benchmark_pool(files: list, transport: str = "shm") -> dict:
+    """Benchmark persistent worker pool parsing.
+    
+    Each timing is one round trip: request written, AST bytes returned
+    to the caller.
+    """
     from ck3raven.parser.parse_pool import ParsePool
     
-    pool = ParsePool(num_workers=4)
+    pool = ParsePool(num_workers=4, transport=transport)
     pool.start()
     
     times = []
     errors = 0
+    ast_bytes = 0
+    
+    # Warm up: each worker imports the parser on its first request
+    for _ in range(len(pool.workers)):
+        pool.parse_file(files[-1]["abspath"], timeout_ms=30000)
     
-    print(f"[Pool] Parsing {len(files)} files...")
+    print(f"[Pool:{transport}] Parsing {len(files)} files...")
     start_total = time.perf_counter()
     
     for i, f in enumerate(files):
@@ -128,6 +155,8 @@ def benchmark_pool(files: list) -> dict:
             result = pool.parse_file(f["abspath"], timeout_ms=30000)
             if not result.success:
                 errors += 1
+            else:
+                ast_bytes += len(result.ast_blob if result.ast_blob is not None else result.ast_json)
         except Exception:
             errors += 1
         elapsed = (time.perf_counter() - start) * 1000
@@ -141,7 +170,8 @@ def benchmark_pool(files: list) -> dict:
     pool.shutdown()
     
     return {
-        "method": "pool",
+        "method": f"pool-{transport}",
+        "ast_bytes": ast_bytes,
         "files": len(files),
         "errors": errors,
         "total_sec": total_time,
@@ -197,13 +227,42 @@ def print_results(legacy: dict, pool: dict):
         print(f"  Pool:   {pool_hours:.1f} hours ({speedup:.1f}x faster)")
 
 
+def print_transport_results(json_res: dict, shm_res: dict):
+    """Print round-trip latency per pool transport."""
+    print()
+    print("=" * 70)
+    print("POOL TRANSPORT ROUND-TRIP LATENCY")
+    print("=" * 70)
+    print(f"AST bytes returned: {shm_res['ast_bytes']:,}")
+    print(f"\n{'Metric':<25} {'json':>12} {'shm':>12} {'Speedup':>10}")
+    print("-" * 62)
+    for key, label in (("avg_ms", "Avg ms/file"), ("p50_ms", "P50 ms/file"),
+                       ("p95_ms", "P95 ms/file"), ("max_ms", "Max ms/file"),
+                       ("total_sec", "Total sec")):
+        j_val, s_val = json_res[key], shm_res[key]
+        speedup = f"{j_val / s_val:.2f}x" if s_val > 0 else "-"
+        print(f"{label:<25} {j_val:>12.2f} {s_val:>12.2f} {speedup:>10}")
+    print(f"\nErrors: json={json_res['errors']}, shm={shm_res['errors']}")
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Parse pool benchmark")
+    parser.add_argument("--dir", default=None, help="Parse .txt files under DIR instead of DB files")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="Only compare pool transports")
+    args = parser.parse_args()
+    
     # Get test files
-    print("Loading test files from database...")
-    files = get_test_files(100)
+    if args.dir:
+        print(f"Loading test files from {args.dir}...")
+        files = get_dir_files(Path(args.dir), args.files)
+    else:
+        print("Loading test files from database...")
+        files = get_test_files(args.files)
     print(f"Found {len(files)} test files")
     
-    if len(files) < 50:
+    if not files or (not args.dir and len(files) < 50):
         print("ERROR: Not enough test files found")
         return
     
@@ -212,12 +271,17 @@ def main():
     print()
     
     # Run benchmarks
-    legacy_results = benchmark_legacy(files)
+    json_results = benchmark_pool(files, "json")
     print()
-    pool_results = benchmark_pool(files)
+    pool_results = benchmark_pool(files, "shm")
+    print_transport_results(json_results, pool_results)
     
-    # Print comparison
-    print_results(legacy_results, pool_results)
+    if not args.skip_legacy:
+        print()
+        legacy_results = benchmark_legacy(files)
+        
+        # Print comparison
+        print_results(legacy_results, pool_results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""
+A/B Benchmark: List[Token] vs compact TokenStream
+
+This script compares:
+- List: Lexer.tokenize_all() -> List[Token] -> Parser (one Token object per token)
+- Stream: Lexer.tokenize_compact() -> TokenStream -> Parser (parallel int arrays)
+
+Run from ck3raven repo root:
+    python tests/benchmarks/benchmark_token_stream.py [DIR] [--repeat N]
+
+DIR defaults to tests/fixtures. Point it at a vanilla game folder
+(e.g. .../game/common) for realistic numbers.
+
+Reported per path:
+- Peak traced memory while holding the tokens of the largest file
+- Tokenize time and tokenize+parse time over all files
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Setup paths
+REPO_ROOT = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+os.chdir(REPO_ROOT)
+
+from ck3raven.parser.lexer import Lexer, LexerError
+from ck3raven.parser.parser import Parser, ParseError
+
+
+def load_sources(root: Path) -> list:
+    """Read every .txt file under root that the lexer accepts."""
+    sources = []
+    for path in sorted(root.rglob("*.txt")):
+        source = path.read_text(encoding="utf-8-sig", errors="replace")
+        try:
+            Lexer(source).tokenize_compact()
+        except LexerError:
+            continue
+        sources.append((path, source))
+    return sources
+
+
+def tokenize_list(source: str):
+    return Lexer(source).tokenize_all()
+
+
+def tokenize_stream(source: str):
+    return Lexer(source).tokenize_compact()
+
+
+def measure_peak(tokenize, source: str) -> int:
+    """Peak traced bytes while the token container for source is alive."""
+    gc.collect()
+    tracemalloc.start()
+    tokens = tokenize(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tokens
+    return peak
+
+
+def measure_time(tokenize, sources: list, repeat: int, parse: bool) -> float:
+    """Best-of-repeat wall time over all sources."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, source in sources:
+            tokens = tokenize(source)
+            if parse:
+                try:
+                    Parser(tokens).parse()
+                except ParseError:
+                    pass
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("root", nargs="?", default=str(REPO_ROOT / "tests" / "fixtures"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("TOKEN STREAM A/B BENCHMARK")
+    print("=" * 70)
+
+    sources = load_sources(Path(args.root))
+    if not sources:
+        print(f"ERROR: No lexable .txt files under {args.root}")
+        return
+
+    total_chars = sum(len(s) for _, s in sources)
+    total_tokens = sum(len(tokenize_stream(s)) for _, s in sources)
+    largest_path, largest = max(sources, key=lambda item: len(item[1]))
+    print(f"Files: {len(sources)}  chars: {total_chars:,}  tokens: {total_tokens:,}")
+    print(f"Largest file: {largest_path} ({len(largest):,} chars)")
+    print()
+
+    results = {}
+    for name, tokenize in (("List", tokenize_list), ("Stream", tokenize_stream)):
+        results[name] = {
+            "peak_kb": measure_peak(tokenize, largest) / 1024,
+            "tokenize_sec": measure_time(tokenize, sources, args.repeat, parse=False),
+            "parse_sec": measure_time(tokenize, sources, args.repeat, parse=True),
+        }
+
+    print(f"{'Metric':<28} {'List':>14} {'Stream':>14} {'Ratio':>10}")
+    print("-" * 70)
+    for key, label in (
+        ("peak_kb", "Peak KB (largest file)"),
+        ("tokenize_sec", "Tokenize sec (all files)"),
+        ("parse_sec", "Tokenize+parse sec"),
+    ):
+        l_val = results["List"][key]
+        s_val = results["Stream"][key]
+        ratio = f"{l_val / s_val:.2f}x" if s_val else "-"
+        print(f"{label:<28} {l_val:>14.3f} {s_val:>14.3f} {ratio:>10}")
+
+    for name in ("List", "Stream"):
+        tokens_per_sec = total_tokens / results[name]["tokenize_sec"]
+        print(f"\n{name}: {tokens_per_sec:,.0f} tokens/sec tokenize")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Tests for AST serialization formats (ck3raven.parser.ast_serde).
+
+The 'binary' ast_format must decode to exactly the same dicts as 'json'.
+"""
+
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from ck3raven.parser.parser import parse_source, ParseError
+from ck3raven.parser.lexer import LexerError
+from ck3raven.parser.ast_serde import (
+    serialize_ast,
+    deserialize_ast,
+    deserialize_ast_lazy,
+    encode_ast,
+    count_ast_nodes,
+    is_binary_ast,
+    BinaryAST,
+)
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+FIXTURE_FILES = sorted(FIXTURES_DIR.rglob("*.txt"))
+
+SAMPLE = '''
+test_event.0001 = {
+    type = character_event
+    title = "Test \\"quoted\\" Event"
+    trigger = { has_trait = brave age >= 16 }
+    option = { name = "OK" add_gold = @[value + 10] }
+    flags = { a b c }
+}
+@cost = 100
+Linnéa = yes
+'''
+
+
+def _parse(path: Path):
+    try:
+        return parse_source(path.read_text(encoding="utf-8-sig", errors="replace"), str(path))
+    except (LexerError, ParseError):
+        pytest.skip("fixture is not parseable")
+
+
+class TestBinaryFormat:
+    """Binary format round-trips against JSON."""
+
+    @pytest.mark.parametrize(
+        "path", FIXTURE_FILES, ids=lambda p: str(p.relative_to(FIXTURES_DIR))
+    )
+    def test_fixture_roundtrip(self, path):
+        """Binary decodes to the same dict as JSON, and is smaller."""
+        ast = _parse(path)
+        json_blob = serialize_ast(ast)
+        binary_blob = serialize_ast(ast, "binary")
+        expected = json.loads(json_blob)
+        assert deserialize_ast(binary_blob, "binary") == expected
+        assert BinaryAST(binary_blob).count_nodes() == count_ast_nodes(expected)
+        if len(json_blob) > 1000:
+            assert len(binary_blob) < len(json_blob)
+
+    def test_encode_from_dict(self):
+        """encode_ast() re-encodes a decoded JSON AST (migration path)."""
+        ast_dict = json.loads(serialize_ast(parse_source(SAMPLE)))
+        assert deserialize_ast(encode_ast(ast_dict, "binary")) == ast_dict
+        assert json.loads(encode_ast(ast_dict, "json")) == ast_dict
+
+    def test_format_sniffing(self):
+        """Without ast_format, deserialize_ast detects the format."""
+        ast = parse_source(SAMPLE)
+        binary_blob = serialize_ast(ast, "binary")
+        json_blob = serialize_ast(ast)
+        assert is_binary_ast(binary_blob)
+        assert not is_binary_ast(json_blob)
+        assert deserialize_ast(binary_blob) == deserialize_ast(json_blob)
+        assert deserialize_ast(json_blob.decode("utf-8")) == deserialize_ast(json_blob)
+
+    def test_empty_ast(self):
+        """Empty files round-trip."""
+        blob = serialize_ast(parse_source(""), "binary")
+        assert deserialize_ast(blob) == json.loads(serialize_ast(parse_source("")))
+
+    def test_unsupported_shape_rejected(self):
+        """Dicts the binary format cannot represent exactly raise ValueError."""
+        with pytest.raises(ValueError):
+            encode_ast({"_type": "root", "filename": "x", "children": [],
+                        "line": 1}, "binary")
+        with pytest.raises(ValueError):
+            encode_ast({"_type": "value", "value": 5, "value_type": "number",
+                        "line": 1, "column": 1}, "binary")
+        with pytest.raises(ValueError):
+            encode_ast({}, "msgpack")
+
+
+class TestLazyDecode:
+    """deserialize_ast_lazy() only builds what is accessed."""
+
+    def test_lazy_matches_full(self):
+        """Lazy nodes expose the same data as the full decode."""
+        blob = serialize_ast(parse_source(SAMPLE), "binary")
+        full = deserialize_ast(blob)
+        lazy = deserialize_ast_lazy(blob)
+        assert [c["_type"] for c in lazy["children"]] == [c["_type"] for c in full["children"]]
+        assert lazy["children"][0]["name"] == "test_event.0001"
+        assert lazy["children"][0].to_dict() == full["children"][0]
+        assert dict(lazy)["filename"] == full["filename"]
+
+    def test_block_children(self):
+        """block_children() reads block headers without decoding the blocks."""
+        blob = serialize_ast(parse_source(SAMPLE), "binary")
+        full = deserialize_ast(blob)
+        blocks = deserialize_ast_lazy(blob).block_children()
+        expected = [c for c in full["children"] if c["_type"] == "block"]
+        assert [(name, line) for name, line, _ in blocks] == [(c["name"], c["line"]) for c in expected]
+        assert [node.to_dict() for _, _, node in blocks] == expected
+
+    def test_lazy_json_is_plain_dict(self):
+        """JSON input has no random access and is fully decoded."""
+        blob = serialize_ast(parse_source(SAMPLE))
+        assert deserialize_ast_lazy(blob) == json.loads(blob)
+
+
+def test_reencode_asts():
+    """reencode_asts() migrates rows between formats without changing content."""
+    from ck3raven.db import init_database
+    from ck3raven.db.ast_cache import reencode_asts
+    from ck3raven.db.schema import close_all_connections
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = init_database(Path(tmpdir) / "test.db")
+        conn.execute("INSERT OR IGNORE INTO parsers (parser_version_id, version_string) VALUES (1, 'test')")
+        blob = serialize_ast(parse_source(SAMPLE))
+        # Valid JSON the binary encoder rejects: a lone surrogate, an
+        # out-of-range line number
+        surrogate = blob.replace(b'"brave"', b'"\\ud800"', 1)
+        far_line = json.loads(blob)
+        far_line["children"][0]["line"] = 2 ** 40
+        conn.execute("""
+            INSERT INTO asts (content_hash, parser_version_id, ast_blob, ast_format, parse_ok)
+            VALUES ('h1', 1, ?, 'json', 1), ('h2', 1, ?, 'json', 1), ('h3', 1, ?, 'json', 0),
+                   ('h4', 1, ?, 'json', 1), ('h5', 1, ?, 'json', 1)
+        """, (blob, b'{"_type":"legacy"}', b'{"_type":"error"}',
+              surrogate, json.dumps(far_line).encode()))
+        conn.commit()
+
+        stats = reencode_asts(conn, "binary", batch_size=1)
+        assert stats["converted"] == 1
+        assert stats["skipped"] == 3
+        assert stats["bytes_after"] < stats["bytes_before"]
+
+        rows = {r[0]: (r[1], r[2]) for r in conn.execute(
+            "SELECT content_hash, ast_format, ast_blob FROM asts")}
+        assert rows["h1"][0] == "binary"
+        assert deserialize_ast(rows["h1"][1], "binary") == json.loads(blob)
+        assert rows["h2"][0] == "json"
+        assert rows["h3"][0] == "json"
+        assert rows["h4"] == ("json", surrogate)
+        assert rows["h5"][0] == "json"
+
+        stats = reencode_asts(conn, "json")
+        assert stats["converted"] == 1
+        row = conn.execute("SELECT ast_format, ast_blob FROM asts WHERE content_hash = 'h1'").fetchone()
+        assert row[0] == "json"
+        assert json.loads(row[1]) == json.loads(blob)
+        close_all_connections()
@@ -84,6 +84,359 @@ def test_content_hash():
     print("✓ Content hashing works")
 
 
+def test_compressed_content_storage():
+    """Test compressed content storage, text reads and FTS."""
+    import sqlite3
+    from ck3raven.db import (
+        init_database, store_file_content, get_content_text,
+        compress_file_contents, delete_file_contents, get_content_storage_stats,
+    )
+    from ck3raven.db.content import get_file_content, _text_cache
+    from ck3raven.db.schema import close_all_connections, create_trigram_index
+    from ck3raven.db.search import search_content
+    
+    text_data = ("trait_brave = { modifier = { prowess = 2 } }\n" * 200).encode('utf-8')
+    compressed_data = "# Ærø\ncrusader_kings = { }\n".encode('utf-8') * 200
+    binary_data = b"DDS \x00\x01\x02" * 100
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = init_database(Path(tmpdir) / "test.db")
+        
+        old_storage = os.environ.get("CK3RAVEN_CONTENT_STORAGE")
+        try:
+            text_hash = store_file_content(conn, text_data)
+            os.environ["CK3RAVEN_CONTENT_STORAGE"] = "compressed"
+            compressed_hash = store_file_content(conn, compressed_data)
+            binary_hash = store_file_content(conn, binary_data)
+        finally:
+            if old_storage is None:
+                os.environ.pop("CK3RAVEN_CONTENT_STORAGE", None)
+            else:
+                os.environ["CK3RAVEN_CONTENT_STORAGE"] = old_storage
+        conn.commit()
+        
+        row = conn.execute("""
+            SELECT compression, content_text, length(content_blob) FROM file_contents
+            WHERE content_hash = ?
+        """, (compressed_hash,)).fetchone()
+        assert row[0] == 'zlib' and row[1] is None
+        assert row[2] < len(compressed_data) / 10
+        
+        # Reads decode compressed rows, from the LRU or from the blob
+        _text_cache.clear()
+        for _ in range(2):
+            assert get_content_text(conn, compressed_hash) == compressed_data.decode('utf-8')
+        assert get_content_text(conn, text_hash) == text_data.decode('utf-8')
+        assert get_content_text(conn, binary_hash) is None
+        content = get_file_content(conn, compressed_hash)
+        assert content.content_blob == compressed_data
+        assert get_file_content(conn, binary_hash).content_blob == binary_data
+        
+        # FTS indexes compressed rows; snippets come through the text view
+        conn.execute("INSERT INTO content_versions (name, source_path, content_root_hash) "
+                     "VALUES ('test', ?, 'root')", (tmpdir,))
+        for relpath, content_hash in (("common/a.txt", text_hash), ("common/b.txt", compressed_hash)):
+            conn.execute("INSERT INTO files (content_version_id, relpath, content_hash) "
+                         "VALUES (1, ?, ?)", (relpath, content_hash))
+        conn.commit()
+        results = search_content(conn, "crusader_kings")
+        assert [r.name for r in results] == ["common/b.txt"]
+        assert "crusader_kings" in results[0].snippet
+        
+        # Converting the remaining text row keeps it searchable
+        assert compress_file_contents(conn) == 1
+        assert [r.name for r in search_content(conn, "prowess")] == ["common/a.txt"]
+        stats = get_content_storage_stats(conn)
+        assert stats['compressed_rows'] == 2
+        assert stats['stored_bytes'] < stats['raw_bytes'] < stats['text_storage_bytes']
+        assert stats['saved_bytes'] > len(text_data)
+        
+        # Connections without ck3_content_text() can write file_contents.
+        # Rows written without encoding_guess are only compressed when the
+        # blob decodes back to their text.
+        assert create_trigram_index(conn)
+        plain = sqlite3.connect(Path(tmpdir) / "test.db")
+        plain.execute("""
+            INSERT INTO file_contents (content_hash, content_blob, content_text, size)
+            VALUES ('utf8', ?, 'on_game_start = { }', 19), ('latin1', ?, 'Ærø = yes', 9)
+        """, ("on_game_start = { }".encode('utf-8'), "Ærø = yes".encode('latin-1')))
+        plain.commit()
+        assert compress_file_contents(conn) == 1
+        assert [tuple(row) for row in conn.execute("""
+            SELECT content_hash, fc.compression, fc.encoding_guess, t.content_text
+            FROM file_content_text t JOIN file_contents fc USING (content_hash)
+            WHERE content_hash IN ('utf8', 'latin1') ORDER BY content_hash
+        """)] == [
+            ('latin1', None, None, 'Ærø = yes'),
+            ('utf8', 'zlib', 'utf-8', 'on_game_start = { }'),
+        ]
+        for table in ('file_content_fts', 'file_content_trigram'):
+            conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)")
+        conn.commit()
+        
+        # Deletes keep both indexes in step with the table
+        plain.execute("DELETE FROM file_contents WHERE content_hash = 'latin1'")
+        plain.commit()
+        plain.close()
+        conn.execute("DELETE FROM files WHERE relpath = 'common/b.txt'")
+        assert delete_file_contents(conn, ['utf8', compressed_hash]) == 2
+        conn.commit()
+        for table in ('file_content_fts', 'file_content_trigram'):
+            conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)")
+        assert search_content(conn, "crusader_kings") == []
+        assert [r.name for r in search_content(conn, "prowess")] == ["common/a.txt"]
+        
+        close_all_connections()
+    
+    print("✓ Compressed content storage works")
+
+
+def test_indexed_content_search():
+    """Test FTS candidate queries and line-index grep matches."""
+    from ck3raven.db import init_database, store_file_content
+    from ck3raven.db.content import get_line_starts, index_content_lines
+    from ck3raven.db.schema import close_all_connections
+    from ck3raven.db.search import find_term_matches, fts_substring_query
+    
+    text = (
+        "trait_brave = {\n"
+        "\tmodifier = { prowess = 2 }  # Has_Trait check below\n"
+        "\tis_valid = { has_trait = brave has_trait = craven }\n"
+        "}\n"
+        "\n"
+        "has trait = no_underscore"
+    )
+    
+    assert fts_substring_query(["has_trait", "brave"]) == '"has trait" * AND "brave" *'
+    assert fts_substring_query(["=", "{"]) is None
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = init_database(Path(tmpdir) / "test.db")
+        content_hash = store_file_content(conn, text.encode('utf-8'))
+        other_hash = store_file_content(conn, b"has trait = yes\nbrave = no\n")
+        conn.commit()
+        
+        starts = get_line_starts(conn, content_hash, text)
+        assert list(starts) == [0, 16, 69, 122, 124, 125]
+        assert index_content_lines(conn) == 0  # Indexed on store
+        
+        # Candidates: both files have the tokens; only one has the substring
+        rows = conn.execute("""
+            SELECT fc.content_hash, fc.content_text FROM file_content_fts fts
+            JOIN file_content_text fc ON fc.rowid = fts.rowid
+            WHERE file_content_fts MATCH ?
+        """, (fts_substring_query(["has_trait", "brave"]),)).fetchall()
+        assert {row[0] for row in rows} == {content_hash, other_hash}
+        
+        matches, term_counts = find_term_matches(text, starts, ["has_trait", "brave"], 5)
+        assert term_counts == [3, 2]
+        assert matches == [
+            {"line": 1, "snippet": "trait_brave = {"},
+            {"line": 2, "snippet": "...modifier = { prowess = 2 }  # Has_Trait check below"},
+            {"line": 3, "snippet": "is_valid = { has_trait = brave has_trait = craven }"},
+        ]
+        other_text = conn.execute(
+            "SELECT content_text FROM file_content_text WHERE content_hash = ?",
+            (other_hash,)).fetchone()[0]
+        _, other_counts = find_term_matches(
+            other_text, get_line_starts(conn, other_hash, other_text), ["has_trait", "brave"], 5)
+        assert other_counts == [0, 1]
+        
+        # Unindexed content (older database) is indexed by the backfill
+        conn.execute("DELETE FROM content_line_index")
+        assert index_content_lines(conn) == 2
+        assert list(get_line_starts(conn, content_hash, "")) == list(starts)
+        
+        close_all_connections()
+    
+    print("✓ Indexed content search works")
+
+
+def test_trigram_grep():
+    """Test trigram query planning and index-backed grep."""
+    from ck3raven.db import init_database, store_file_content
+    from ck3raven.db.schema import close_all_connections, create_trigram_index
+    from ck3raven.db.search import grep_content, plan_trigram_query, trigram_match_query
+    
+    assert plan_trigram_query("_modifier_") == "_modifier_"
+    assert plan_trigram_query("ab") is None
+    assert plan_trigram_query(r"has_(trait|flag)\w*_x", is_regex=True) == (
+        'and', ['has_', ('or', ['trait', 'flag'])])
+    assert plan_trigram_query("a(bcd)?efg|[xyz]+", is_regex=True) is None
+    assert trigram_match_query(plan_trigram_query(r"abc.*d\"ef", is_regex=True)) == \
+        '("abc" AND "d""ef")'
+    
+    files = {
+        "common/modifiers/a.txt": "stress_modifier_gain = 1\nmonthly_prestige = 2\n",
+        "common/modifiers/b.txt": "MONTHLY_MODIFIER_VALUE = 3\n",
+        "common/traits/c.txt": "has_trait = brave\nhas_flag_x = yes\n",
+        "events/d.txt": "has_modifier = yes\n",
+    }
+    searches = [
+        ("_modifier_", False, None),
+        (r"has_(trait|flag)\w*", True, None),
+        (r"^monthly_\w+", True, None),
+        ("_modifier_", False, "common/modifiers/"),
+        ("yes", False, "events/d.txt"),
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = init_database(Path(tmpdir) / "test.db")
+        conn.execute("INSERT INTO content_versions (name, source_path, content_root_hash) "
+                     "VALUES ('test', ?, 'root')", (tmpdir,))
+        for relpath, text in files.items():
+            content_hash = store_file_content(conn, text.encode('utf-8'))
+            conn.execute("INSERT INTO files (content_version_id, relpath, content_hash) "
+                         "VALUES (1, ?, ?)", (relpath, content_hash))
+        conn.commit()
+        
+        scanned = [grep_content(conn, q, is_regex=r, relpath_prefix=p) for q, r, p in searches]
+        assert not any(result['indexed'] for result in scanned)
+        
+        assert create_trigram_index(conn)
+        indexed = [grep_content(conn, q, is_regex=r, relpath_prefix=p) for q, r, p in searches]
+        assert all(result['indexed'] for result in indexed)
+        assert [r['matches'] for r in indexed] == [r['matches'] for r in scanned]
+        
+        # Substrings inside identifiers, case-insensitive, from indexed candidates
+        assert [(m['relpath'], m['line']) for m in indexed[0]['matches']] == [
+            ("common/modifiers/a.txt", 1), ("common/modifiers/b.txt", 1)]
+        assert indexed[0]['files_searched'] == 2
+        assert [m['content'] for m in indexed[1]['matches']] == [
+            "has_trait = brave", "has_flag_x = yes"]
+        assert len(indexed[2]['matches']) == 2
+        assert [m['relpath'] for m in indexed[4]['matches']] == ["events/d.txt"]
+        
+        # New contents are indexed by the triggers
+        content_hash = store_file_content(conn, b"culture_modifier_bonus = 1")
+        conn.execute("INSERT INTO files (content_version_id, relpath, content_hash) "
+                     "VALUES (1, 'common/e.txt', ?)", (content_hash,))
+        conn.commit()
+        assert len(grep_content(conn, "re_modifier_b")['matches']) == 1
+        
+        close_all_connections()
+    
+    print("✓ Trigram grep works")
+
+
+def test_grep_path_stored_contents():
+    """Test that path grep only uses stored contents that match the disk."""
+    sys.path.insert(0, str(Path(__file__).parent.parent / "tools" / "ck3lens_mcp"))
+    from ck3raven.db import init_database, store_file_content
+    from ck3raven.db.content import compute_content_hash
+    from ck3raven.db.schema import close_all_connections
+    from ck3lens.db_queries import DBQueries
+    from qbuilder.schema import init_qbuilder_schema
+    
+    files = {
+        "common/traits/a.txt": b"brave = { monthly_prestige = 1 }\n",
+        "common/traits/b.txt": b"craven = { monthly_prestige = -1 }\n",
+    }
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = Path(tmpdir) / "mod"
+        for relpath, data in files.items():
+            (root / relpath).parent.mkdir(parents=True, exist_ok=True)
+            (root / relpath).write_bytes(data)
+        
+        db_path = Path(tmpdir) / "test.db"
+        conn = init_database(db_path)
+        init_qbuilder_schema(conn)
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute("INSERT INTO content_versions (name, source_path, content_root_hash) "
+                     "VALUES ('mod', ?, 'root')", (str(root),))
+        # As qbuilder writes them: files rows, no file_contents
+        for relpath, data in files.items():
+            conn.execute("INSERT INTO files (content_version_id, relpath, content_hash) "
+                         "VALUES (1, ?, ?)", (relpath, compute_content_hash(data)))
+        conn.commit()
+        
+        db = DBQueries(db_path)
+        folder = root / "common" / "traits"
+        assert db._grep_path_internal(folder, "monthly_prestige") is None
+        assert db._grep_path_internal(folder / "a.txt", "brave") is None
+        
+        for data in files.values():
+            store_file_content(conn, data)
+        conn.commit()
+        # Stored contents, but no discovery fingerprints yet
+        assert db._grep_path_internal(folder, "monthly_prestige") is None
+        
+        stats = {relpath: (root / relpath).stat() for relpath in files}
+        for relpath, stat in stats.items():
+            conn.execute("UPDATE files SET file_mtime = ?, file_size = ? WHERE relpath = ?",
+                         (stat.st_mtime, stat.st_size, relpath))
+        conn.commit()
+        result = db._grep_path_internal(folder, "monthly_prestige", include_pattern="*.txt")
+        assert [m["file"] for m in result["matches"]] == [
+            str(root / relpath) for relpath in files]
+        
+        # Edited, added and removed files on disk make the stored contents stale
+        a_path = root / "common/traits/a.txt"
+        a_path.write_bytes(b"brave = { }\n")
+        assert db._grep_path_internal(folder, "monthly_prestige") is None
+        a_stat = stats["common/traits/a.txt"]
+        a_path.write_bytes(files["common/traits/a.txt"])
+        os.utime(a_path, ns=(a_stat.st_atime_ns, a_stat.st_mtime_ns))
+        assert db._grep_path_internal(folder / "a.txt", "brave") is not None
+        (root / "common/traits/c.txt").write_bytes(b"shy = { }\n")
+        assert db._grep_path_internal(folder, "shy") is None
+        (root / "common/traits/c.txt").unlink()
+        (root / "common/traits/b.txt").unlink()
+        assert db._grep_path_internal(folder, "monthly_prestige") is None
+        
+        close_all_connections()
+    
+    print("✓ Path grep falls back to disk unless stored contents are current")
+
+
+def test_symbol_name_index():
+    """Test in-memory symbol name matching and watermark refresh."""
+    import sqlite3
+    from ck3raven.db.symbol_index import SymbolNameIndex, edit_distance
+    
+    assert edit_distance("brave", "brvae", 2) == 2
+    assert edit_distance("brave", "craven", 1) is None
+    
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE symbols (symbol_id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)")
+    names = ["tradition_warrior_culture", "Tradition_Warriors", "has_trait_brave",
+             "trait_brave", "trait_craven", "tradition_warrior_culture"]
+    conn.executemany("INSERT INTO symbols (name) VALUES (?)", [(n,) for n in names])
+    
+    index = SymbolNameIndex()
+    assert index.refresh(conn) == 5
+    assert index.refresh(conn) == 0
+    
+    assert index.match_like("trait_brave") == ["trait_brave"]
+    assert index.match_like("tradition_warrior%") == [
+        "tradition_warrior_culture", "tradition_warriors"]
+    assert index.match_like("%_brave") == ["has_trait_brave", "trait_brave"]
+    assert index.match_like("%trait%") == ["has_trait_brave", "trait_brave", "trait_craven"]
+    assert index.match_like("%tradition%culture%") == ["tradition_warrior_culture"]
+    # '_' is literal, not LIKE's any-character wildcard
+    assert index.match_like("trait_brav_") == []
+    assert index.variants(["tradition_warriors"]) == ["Tradition_Warriors"]
+    
+    assert index.match_fuzzy("trait_bzzzz") == []
+    assert index.match_fuzzy("trait_bave") == ["trait_brave"]
+    assert index.match_fuzzy("tradition_warior_culture") == ["tradition_warrior_culture"]
+    
+    # Symbols written later are picked up above the watermark
+    conn.execute("INSERT INTO symbols (name) VALUES ('trait_brave_plus')")
+    assert index.refresh(conn) == 1
+    assert index.match_like("trait_brave%") == ["trait_brave", "trait_brave_plus"]
+    
+    # An emptied table rebuilds from scratch
+    conn.execute("DELETE FROM symbols")
+    conn.execute("DELETE FROM sqlite_sequence")
+    conn.execute("INSERT INTO symbols (name) VALUES ('only_one')")
+    index.refresh(conn)
+    assert len(index) == 1 and index.match_like("%one") == ["only_one"]
+    
+    print("✓ Symbol name index works")
+
+
 def test_parser_version():
     """Test parser versioning."""
     from ck3raven.db import (
@@ -210,6 +563,53 @@ def test_symbol_extraction():
     print("✓ Symbol/reference extraction works")
 
 
+def test_fused_symbol_ref_extraction():
+    """Fused single-pass extraction matches the separate extractors."""
+    from ck3raven.db import (
+        serialize_ast, deserialize_ast,
+        extract_symbols_from_ast, extract_refs_from_ast,
+        extract_symbols_and_refs_from_ast,
+    )
+    from ck3raven.parser.parser import parse_source
+    
+    source = """
+    christianity_religion = {
+        faiths = {
+            catholic = { has_trait = pilgrim }
+            orthodox = { }
+        }
+    }
+    e_test = {
+        k_test = {
+            d_test = { c_test = { b_test = { } } }
+            capital = c_test
+        }
+        trigger = { has_trait = brave }
+    }
+    @cost = 100
+    """
+    ast_dict = deserialize_ast(serialize_ast(parse_source(source)))
+    
+    for relpath in ("common/religion/religions/test.txt",
+                    "common/landed_titles/test.txt",
+                    "events/test.txt",
+                    "checksum_manifest.txt"):
+        symbols, refs = extract_symbols_and_refs_from_ast(ast_dict, relpath, "h", source)
+        assert symbols == list(extract_symbols_from_ast(ast_dict, relpath, "h", source))
+        assert refs == list(extract_refs_from_ast(ast_dict, relpath, "h"))
+    
+    symbols, refs = extract_symbols_and_refs_from_ast(
+        ast_dict, "common/landed_titles/test.txt", "h", source)
+    title_names = [s.name for s in symbols if s.kind == "title"]
+    assert title_names[title_names.index("k_test"):] == [
+        "k_test", "d_test", "c_test", "b_test"]
+    assert {r.name for r in refs} >= {"pilgrim", "brave"}
+    
+    symbols, _ = extract_symbols_and_refs_from_ast(
+        ast_dict, "common/religion/religions/test.txt", "h", source)
+    assert [s.name for s in symbols if s.kind == "faith"] == ["catholic", "orthodox"]
+
+
 def test_file_scan():
     """Test directory scanning."""
     from ck3raven.db import scan_directory, compute_content_hash
@@ -243,6 +643,11 @@ def run_all_tests():
     
     test_database_init()
     test_content_hash()
+    test_compressed_content_storage()
+    test_indexed_content_search()
+    test_trigram_grep()
+    test_grep_path_stored_contents()
+    test_symbol_name_index()
     test_parser_version()
     test_ast_cache()
     test_symbol_extraction()
@@ -0,0 +1,279 @@
+"""
+Tests for the DB-backed emulator: incremental folder updates.
+"""
+
+import os
+import pytest
+from types import SimpleNamespace
+
+from ck3raven.db import init_database, get_or_create_parser_version, store_ast
+from ck3raven.db.content import store_file_content, store_file_record
+from ck3raven.db.schema import close_all_connections
+from ck3raven.emulator import (
+    build_game_state, resolve_folder_from_db, update_folder_state, update_game_state,
+)
+from ck3raven.parser.parser import parse_source
+from qbuilder.schema import init_qbuilder_schema
+
+
+@pytest.fixture(params=["json", "binary"])
+def db(request, tmp_path, monkeypatch):
+    monkeypatch.setenv("QBUILDER_AST_FORMAT", request.param)
+    conn = init_database(tmp_path / "test.db")
+    yield conn
+    close_all_connections()
+
+
+def _add_content_version(conn, name):
+    cursor = conn.execute(
+        "INSERT INTO content_versions (name, content_root_hash) VALUES (?, ?)", (name, name)
+    )
+    return cursor.lastrowid
+
+
+def _write_file(conn, cvid, relpath, text, parse=True):
+    """Store (or replace) a file and, unless parse=False, its AST."""
+    content_hash = store_file_content(conn, text.encode("utf-8"))
+    file_id = store_file_record(conn, cvid, relpath, content_hash)
+    if parse:
+        pv = get_or_create_parser_version(conn)
+        store_ast(conn, content_hash, parse_source(text, relpath), pv.parser_version_id)
+    conn.commit()
+    return file_id
+
+
+def _snapshot(folder_state):
+    """Order-independent view of a FolderState's resolved contents."""
+    return (
+        {k: (d.source.file_id, d.ast_dict) for k, d in folder_state.definitions.items()},
+        sorted((c.key, c.slot, c.winner.file_id, tuple(s.file_id for s in c.losers))
+               for c in folder_state.conflicts),
+        sorted(folder_state.errors),
+        {path: (i.identity, i.keys) for path, i in folder_state.inputs.items()},
+        dict(folder_state.containers),
+    )
+
+
+class TestFolderAsts:
+    """iter_folder_asts() rows, and lazy AST decoding in resolve_folder_from_db()."""
+
+    @pytest.fixture
+    def cvids(self, db, on_actions_dir):
+        vanilla = _add_content_version(db, "vanilla")
+        mod = _add_content_version(db, "mod")
+        _write_file(db, mod, "common/traits/zz_mod.txt", "brave = { a = 10 }\ncalm = { d = 4 }")
+        _write_file(db, vanilla, "common/traits/00_traits.txt",
+                    "brave = { a = 1 }\ncraven = { b = 2 }")
+        _write_file(db, vanilla, "common/traits/01_pending.txt", "late = { x = 1 }", parse=False)
+        _write_file(db, vanilla, "common/traits/sub/nested.txt", "shy = { c = 3 }")
+        _write_file(db, vanilla, "common/traits_extra/other.txt", "bold = { e = 5 }")
+        _write_file(db, mod, "common/traits/removed.txt", "gone = { }")
+        db.execute("UPDATE files SET deleted = 1 WHERE relpath = 'common/traits/removed.txt'")
+        for file_path in sorted(on_actions_dir.glob("*.txt")):
+            _write_file(db, mod if "mod" in file_path.name else vanilla,
+                        f"common/on_action/{file_path.name}", file_path.read_text())
+        db.commit()
+        return [vanilla, mod]
+
+    def test_iter_folder_asts(self, db, cvids):
+        from ck3raven.db.parser_version import get_current_parser_version
+        from ck3raven.emulator.builder import iter_folder_asts
+
+        pv = get_current_parser_version(db).parser_version_id
+        rows = list(iter_folder_asts(db, "common/traits", cvids, pv))
+
+        # Load order, then path; subfolders in, sibling prefixes and deleted files out
+        assert [(r['load_order'], r['relpath']) for r in rows] == [
+            (0, "common/traits/00_traits.txt"),
+            (0, "common/traits/01_pending.txt"),
+            (0, "common/traits/sub/nested.txt"),
+            (1, "common/traits/zz_mod.txt"),
+        ]
+        assert rows[1]['ast_id'] is None and rows[1]['ast_blob'] is None
+        assert {r['ast_format'] for r in rows if r['ast_id']} == {
+            os.environ["QBUILDER_AST_FORMAT"]}
+
+        headers = list(iter_folder_asts(db, "common/traits/", cvids, pv, blobs=False))
+        assert [r['ast_id'] for r in headers] == [r['ast_id'] for r in rows]
+        assert all(r['ast_blob'] is None and r['parse_ok'] is None for r in headers)
+
+        some = list(iter_folder_asts(db, "common/traits", cvids, pv,
+                                     file_ids=[rows[3]['file_id'], rows[0]['file_id']]))
+        assert [r['relpath'] for r in some] == [rows[0]['relpath'], rows[3]['relpath']]
+
+    @pytest.mark.parametrize("folder", ["common/traits", "common/on_action"])
+    def test_lazy_matches_eager(self, db, cvids, folder, monkeypatch):
+        import ck3raven.emulator.builder as builder
+        from ck3raven.parser.ast_serde import LazyASTNode, deserialize_ast
+
+        lazy_decode = builder.deserialize_ast_lazy
+        decoded = []
+
+        def recording(blob, ast_format=None):
+            root = lazy_decode(blob, ast_format)
+            decoded.append(root)
+            return root
+
+        monkeypatch.setattr(builder, "deserialize_ast_lazy", recording)
+        lazy = resolve_folder_from_db(db, folder, cvids)
+        binary = os.environ["QBUILDER_AST_FORMAT"] == "binary"
+        assert decoded and all(isinstance(root, LazyASTNode) == binary for root in decoded)
+
+        monkeypatch.setattr(builder, "deserialize_ast_lazy", deserialize_ast)
+        eager = resolve_folder_from_db(db, folder, cvids)
+
+        assert _snapshot(lazy) == _snapshot(eager)
+        assert lazy.conflicts and len(lazy.conflicts) == len(eager.conflicts)
+        for definition in lazy.definitions.values():
+            assert type(definition.ast_dict) is dict
+
+
+class TestUpdateFolderState:
+    """Incremental updates must equal a full resolve."""
+
+    FOLDER = "common/traits"
+
+    @pytest.fixture
+    def cvids(self, db):
+        vanilla = _add_content_version(db, "vanilla")
+        mod = _add_content_version(db, "mod")
+        _write_file(db, vanilla, "common/traits/00_traits.txt",
+                    "brave = { a = 1 }\ncraven = { b = 2 }\nshy = { c = 3 }")
+        _write_file(db, mod, "common/traits/mod_traits.txt", "brave = { a = 10 }")
+        _write_file(db, mod, "common/traits/zz_other.txt", "calm = { d = 4 }")
+        return [vanilla, mod]
+
+    def test_no_change(self, db, cvids):
+        state = resolve_folder_from_db(db, self.FOLDER, cvids)
+        assert update_folder_state(db, state, cvids) == set()
+
+    def test_edit_recomputes_affected_keys(self, db, cvids):
+        state = resolve_folder_from_db(db, self.FOLDER, cvids)
+
+        # brave dropped, shy overridden, new key added
+        _write_file(db, cvids[1], "common/traits/mod_traits.txt",
+                    "shy = { c = 30 }\nbold = { e = 5 }")
+
+        assert update_folder_state(db, state, cvids) == {"brave", "shy", "bold"}
+        assert _snapshot(state) == _snapshot(resolve_folder_from_db(db, self.FOLDER, cvids))
+        assert state.get_definition("brave").source.source_name == "vanilla"
+        assert state.get_definition("shy").ast_dict["children"][0]["value"]["value"] == "30"
+
+    def test_added_removed_and_unparsed_files(self, db, cvids):
+        state = resolve_folder_from_db(db, self.FOLDER, cvids)
+
+        _write_file(db, cvids[1], "common/traits/new.txt", "craven = { b = 20 }")
+        _write_file(db, cvids[1], "common/traits/pending.txt", "late = { x = 1 }", parse=False)
+        db.execute("UPDATE files SET deleted = 1 WHERE relpath = 'common/traits/zz_other.txt'")
+        db.commit()
+
+        assert update_folder_state(db, state, cvids) == {"craven", "calm"}
+        assert _snapshot(state) == _snapshot(resolve_folder_from_db(db, self.FOLDER, cvids))
+        assert len(state.errors) == 1
+
+        # The pending file's AST arrives later
+        pv = get_or_create_parser_version(db)
+        content_hash = db.execute(
+            "SELECT content_hash FROM files WHERE relpath = 'common/traits/pending.txt'"
+        ).fetchone()[0]
+        store_ast(db, content_hash, parse_source("late = { x = 1 }", "pending.txt"),
+                  pv.parser_version_id)
+        db.commit()
+
+        assert update_folder_state(db, state, cvids) == {"late"}
+        assert state.errors == []
+        assert _snapshot(state) == _snapshot(resolve_folder_from_db(db, self.FOLDER, cvids))
+
+
+class TestUpdateGameState:
+    """update_game_state routes changed files to their folders."""
+
+    def test_container_merge_edit(self, db, on_actions_dir):
+        cvids = []
+        for file_path in sorted(on_actions_dir.glob("*.txt")):
+            cvid = _add_content_version(db, file_path.name)
+            _write_file(db, cvid, f"common/on_action/{file_path.name}", file_path.read_text())
+            cvids.append(cvid)
+        _write_file(db, cvids[0], "common/traits/traits.txt", "brave = { a = 1 }")
+
+        playset = SimpleNamespace(playset_id=0, name="test", content_versions=cvids)
+        state = build_game_state(db, playset, folders=["common/on_action", "common/traits"])
+
+        # Mod B stops defining an effect for on_birthday
+        _write_file(db, cvids[2], "common/on_action/03_mod_b_on_actions.txt",
+                    "on_birthday = { events = { mod_b_birthday.0001 } }")
+        _write_file(db, cvids[1], "common/decisions/mod_a.txt", "decision_a = { }")
+
+        updated = update_game_state(db, state, [
+            "common/on_action/03_mod_b_on_actions.txt", "common/decisions/mod_a.txt",
+        ])
+
+        assert updated == {
+            "common/on_action": {"on_birthday", "on_war_started", "on_mod_b_unique"},
+            "common/decisions": {"decision_a"},
+        }
+        on_action = state.get_folder("common/on_action")
+        assert _snapshot(on_action) == _snapshot(
+            resolve_folder_from_db(db, "common/on_action", cvids))
+        birthday = on_action.get_container("on_birthday")
+        assert birthday.effect_winner.source_name == "02_mod_a_on_actions.txt"
+        assert "on_mod_b_unique" not in on_action.definitions
+        assert state.total_definitions == 4 + 1 + 1
+
+
+class TestBuildGameStateParallel:
+    """build_game_state(processes=N) matches the serial build."""
+
+    FOLDERS = ["common/decisions", "common/traits", "events"]
+
+    @pytest.fixture
+    def playset(self, db):
+        init_qbuilder_schema(db)
+        vanilla = _add_content_version(db, "vanilla")
+        mod = _add_content_version(db, "mod")
+        _write_file(db, vanilla, "common/decisions/00_decisions.txt",
+                    "decision_a = { }\n" * 50)
+        _write_file(db, vanilla, "common/traits/00_traits.txt", "brave = { a = 1 }")
+        _write_file(db, mod, "common/traits/mod_traits.txt", "brave = { a = 2 }")
+        _write_file(db, vanilla, "events/a.txt", "a.1 = { }")
+        _write_file(db, mod, "events/sub/b.txt", "b.1 = { }")
+        # Discovery's on-disk sizes, which the stored contents do not reflect
+        sizes = {"common/decisions/00_decisions.txt": 10, "common/traits/00_traits.txt": 20,
+                 "common/traits/mod_traits.txt": 20, "events/a.txt": 15, "events/sub/b.txt": 15}
+        db.executemany("UPDATE files SET file_size = ? WHERE relpath = ?",
+                       [(size, relpath) for relpath, size in sizes.items()])
+        db.commit()
+        return SimpleNamespace(playset_id=0, name="test", content_versions=[vanilla, mod])
+
+    def test_folder_sizes(self, db, playset):
+        from ck3raven.emulator.builder import get_folder_sizes
+
+        assert get_folder_sizes(db, self.FOLDERS + ["common"], playset.content_versions) == {
+            "common/decisions": 10, "common/traits": 40, "events": 30, "common": 50}
+
+    def test_matches_serial(self, db, playset, monkeypatch):
+        import ck3raven.emulator.builder as builder
+
+        submitted = []
+
+        class RecordingExecutor(builder.ProcessPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(args[1])
+                return super().submit(fn, *args, **kwargs)
+
+        monkeypatch.setattr(builder, "ProcessPoolExecutor", RecordingExecutor)
+
+        serial = build_game_state(db, playset, folders=self.FOLDERS)
+        progress = []
+        parallel = build_game_state(
+            db, playset, folders=self.FOLDERS, processes=2,
+            progress_callback=lambda folder, i, total: progress.append(folder),
+        )
+
+        assert submitted == ["common/traits", "events", "common/decisions"]
+        assert sorted(progress) == self.FOLDERS
+        assert list(parallel.folders) == list(serial.folders) == self.FOLDERS
+        for folder in self.FOLDERS:
+            assert _snapshot(parallel.get_folder(folder)) == _snapshot(serial.get_folder(folder))
+        assert parallel.total_definitions == serial.total_definitions == 4
+        assert parallel.total_conflicts == serial.total_conflicts
@@ -0,0 +1,129 @@
+"""
+Tests for the ck3raven lexer.
+
+Lexer.tokenize_fast() must emit exactly the same token stream as the
+reference per-character Lexer.tokenize().
+"""
+
+from pathlib import Path
+
+import pytest
+from ck3raven.parser.lexer import Lexer, LexerError
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+FIXTURE_FILES = sorted(FIXTURES_DIR.rglob("*.txt"))
+
+
+def _read(path: Path) -> str:
+    return path.read_text(encoding="utf-8-sig", errors="replace")
+
+
+def _tokens(source: str, fast: bool, **kwargs):
+    return Lexer(source, "<test>").tokenize_all(fast=fast, **kwargs)
+
+
+def _error(source: str, fast: bool):
+    with pytest.raises(LexerError) as exc_info:
+        _tokens(source, fast)
+    return (exc_info.value.line, exc_info.value.column, str(exc_info.value))
+
+
+class TestFastTokenizerParity:
+    """tokenize_fast() vs tokenize() on fixtures and edge cases."""
+
+    @pytest.mark.parametrize(
+        "path", FIXTURE_FILES, ids=lambda p: str(p.relative_to(FIXTURES_DIR))
+    )
+    @pytest.mark.parametrize("trivia", [False, True], ids=["plain", "trivia"])
+    def test_fixture_parity(self, path, trivia):
+        """Every fixture tokenizes identically in both modes."""
+        try:
+            expected = _tokens(_read(path), fast=False,
+                               include_comments=trivia, include_newlines=trivia)
+        except LexerError:
+            pytest.skip("fixture is not lexable")
+        actual = _tokens(_read(path), fast=True,
+                         include_comments=trivia, include_newlines=trivia)
+        assert actual == expected
+
+    @pytest.mark.parametrize("source", [
+        "",
+        "\n\n",
+        "key = value",
+        "a = { b = c }\r\n# comment\r\nd = -0.5",
+        'name = "multi\nline" after = yes',
+        r'escaped = "a\"b\\c\nd\te\q"',
+        "single = 'it''s'",
+        "x <= 1 y >= 2 z != 3 w == 4 v ?= 5 u < 6 t > 7",
+        "@[value + 10 * 2 / 3] @foo -@bar",
+        "$PARAM$ $UNCLOSED next = $A$.host",
+        "0_levels_above = 29% 1.2.3 -4",
+        "define:NGame|START_DATE b_mansa'l-kharaz eliminate_&_replace",
+        ".scope_chain . trailing",
+        "Linnéa = Θ sup = 1²3",
+        "list = { \"a\", \"b\"; `x` }",
+        "# comment at EOF",
+        "value = 1   \t  ",
+    ])
+    @pytest.mark.parametrize("trivia", [False, True], ids=["plain", "trivia"])
+    def test_edge_case_parity(self, source, trivia):
+        """Tricky constructs tokenize identically in both modes."""
+        expected = _tokens(source, fast=False,
+                           include_comments=trivia, include_newlines=trivia)
+        actual = _tokens(source, fast=True,
+                         include_comments=trivia, include_newlines=trivia)
+        assert actual == expected
+
+    @pytest.mark.parametrize("source", [
+        'a = "unterminated',
+        'a = "ends in backslash\\',
+        "a = { b ! c }",
+        "a = \n  ~",
+        'x = 1\ny = "ok"\nz = ^',
+    ])
+    def test_error_parity(self, source):
+        """Lexer errors are raised at the same position with the same message."""
+        assert _error(source, fast=True) == _error(source, fast=False)
+
+
+class TestTokenStream:
+    """Compact TokenStream vs materialized token lists."""
+
+    @pytest.mark.parametrize(
+        "path", FIXTURE_FILES, ids=lambda p: str(p.relative_to(FIXTURES_DIR))
+    )
+    def test_stream_matches_token_list(self, path):
+        """Indexing the stream yields the same tokens as tokenize()."""
+        source = _read(path)
+        try:
+            expected = _tokens(source, fast=False,
+                               include_comments=True, include_newlines=True)
+        except LexerError:
+            pytest.skip("fixture is not lexable")
+        stream = Lexer(source).tokenize_compact(include_comments=True,
+                                                include_newlines=True)
+        assert len(stream) == len(expected)
+        assert [stream[i] for i in range(len(stream))] == expected
+        assert stream[-1] == expected[-1]
+
+    def test_values_not_plain_slices(self):
+        """Escaped strings and unclosed params keep their lexed value."""
+        stream = Lexer(r'a = "x\"y" b = $P c').tokenize_compact()
+        values = [stream.value_at(i) for i in range(len(stream))]
+        assert values == ["a", "=", 'x"y', "b", "=", "$P$", "c", ""]
+
+    @pytest.mark.parametrize(
+        "path", FIXTURE_FILES, ids=lambda p: str(p.relative_to(FIXTURES_DIR))
+    )
+    def test_parser_consumes_stream(self, path):
+        """Parser produces the same AST from a stream as from a token list."""
+        from ck3raven.parser.parser import Parser, ParseError
+
+        source = _read(path)
+        try:
+            expected = Parser(Lexer(source).tokenize_all()).parse().to_dict()
+        except (LexerError, ParseError):
+            pytest.skip("fixture is not parseable")
+        actual = Parser(Lexer(source).tokenize_compact()).parse().to_dict()
+        assert actual == expected
@@ -0,0 +1,124 @@
+"""
+Tests for the persistent parse pool (ck3raven.parser.parse_pool).
+
+The shared memory transport must return exactly what the inline JSON
+transport returns; parse_batch() must complete every file exactly once.
+"""
+
+import time
+from pathlib import Path
+
+import pytest
+
+from ck3raven.parser.ast_serde import deserialize_ast
+from ck3raven.parser.parse_pool import ParsePool, WorkerProcess
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+LARGEST_FIXTURE = max(FIXTURES_DIR.rglob("*.txt"), key=lambda p: p.stat().st_size).resolve()
+
+
+def _ast(result) -> dict:
+    assert result.success, result.error
+    if result.ast_blob is not None:
+        return deserialize_ast(result.ast_blob, result.ast_format)
+    return deserialize_ast(result.ast_json)
+
+
+@pytest.fixture(scope="module")
+def json_ast():
+    pool = ParsePool(num_workers=1, transport="json")
+    pool.start()
+    try:
+        result = pool.parse_file(LARGEST_FIXTURE)
+        assert result.ast_json is not None and result.ast_blob is None
+        return _ast(result)
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.parametrize("ast_format", ["json", "binary"])
+def test_shm_transport_matches_json(json_ast, ast_format):
+    """The AST comes back through shared memory, identical to inline JSON."""
+    pool = ParsePool(num_workers=1, transport="shm")
+    pool.start()
+    try:
+        assert pool.get_stats()["workers"][0]["transport"] == "shm"
+        for _ in range(2):  # the block is reused between requests
+            result = pool.parse_file(LARGEST_FIXTURE, ast_format=ast_format)
+            assert result.ast_blob is not None and result.ast_json is None
+            assert result.ast_format == ast_format
+            assert _ast(result) == json_ast
+    finally:
+        pool.shutdown()
+
+
+def test_oversize_ast_falls_back_inline(json_ast):
+    """ASTs larger than the shared memory block are returned inline."""
+    worker = WorkerProcess(0, Path(__file__).parent.parent, "shm", shm_bytes=4096)
+    assert worker.start()
+    try:
+        result = worker.parse_file(LARGEST_FIXTURE)
+        assert result.ast_json is not None
+        assert _ast(result) == json_ast
+
+        result = worker.parse_file(LARGEST_FIXTURE, ast_format="binary")
+        assert result.ast_blob is not None
+        assert _ast(result) == json_ast
+    finally:
+        worker.shutdown()
+
+
+class TestParseBatch:
+    """parse_batch(): size-aware dispatch with streamed completions."""
+
+    def _files(self, count: int) -> list:
+        paths = sorted(FIXTURES_DIR.rglob("*.txt"), key=lambda p: p.stat().st_size)[-count:]
+        return [(p.resolve(), p.stat().st_size) for p in paths]
+
+    def test_largest_first_with_one_worker(self):
+        """A single worker runs the batch strictly largest-first."""
+        files = self._files(5)
+        pool = ParsePool(num_workers=1)
+        pool.start()
+        try:
+            completed = list(pool.parse_batch(files))
+            stats = pool.get_stats()
+        finally:
+            pool.shutdown()
+
+        assert [index for index, _ in completed] == [4, 3, 2, 1, 0]
+        assert all(result.success for _, result in completed)
+        assert stats["batches"] == 1
+        assert stats["last_batch"]["files"] == 5
+        assert stats["last_batch"]["makespan_sec"] > 0
+        assert 0 < stats["last_batch"]["balance"] <= 1.0
+
+    def test_batch_results_match_single_parses(self, json_ast):
+        """Every file completes once, with the same AST as parse_file()."""
+        files = self._files(6)
+        # Misreported sizes must not lose or duplicate work
+        files = [(path, None if i % 2 else 1) for i, (path, _) in enumerate(files)]
+        pool = ParsePool(num_workers=2)
+        pool.start()
+        try:
+            completed = dict(pool.parse_batch(files, ast_format="binary"))
+        finally:
+            pool.shutdown()
+
+        assert sorted(completed) == list(range(6))
+        assert _ast(completed[5]) == json_ast
+
+    def test_closing_early_stops_dispatch(self):
+        """Abandoning the iterator stops handing out new files."""
+        files = self._files(6)
+        pool = ParsePool(num_workers=1)
+        pool.start()
+        try:
+            results = pool.parse_batch(files)
+            next(results)
+            results.close()
+            time.sleep(0.5)
+            assert pool.get_stats()["workers"][0]["parse_count"] <= 2
+        finally:
+            pool.shutdown()
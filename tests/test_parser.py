@@ -176,5 +176,25 @@ class TestSerialization:
         assert "enabled = yes" in output
 
 
+class TestNodeLayout:
+    """Test memory layout of AST nodes."""
+    
+    def test_nodes_have_no_instance_dict(self):
+        """Node classes are slotted."""
+        ast = parse_source('a = { b = c d = { 1 2 } }\ne = f')
+        block = ast.children[0]
+        for node in (ast, block, block.children[0], block.children[0].value,
+                     block.children[1]):
+            assert not hasattr(node, '__dict__')
+    
+    def test_keys_are_interned(self):
+        """Repeated keys share a single string object."""
+        ast = parse_source('a = { trigger = { limit = { x = y } } }\n'
+                           'b = { trigger = { limit = { x = z } } }')
+        first, second = ast.children
+        assert first.children[0].name is second.children[0].name
+        assert first.children[0].children[0].name is second.children[0].children[0].name
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,278 @@
+"""
+Tests for QBuilder discovery (qbuilder/discovery.py).
+
+Discovery walks a content root, fingerprints its files and writes files and
+build_queue rows. Files whose stat is unchanged since the last run are not
+re-read, and files gone from disk are soft-deleted. ParallelDiscovery does
+the same over several roots at once.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# qbuilder.discovery resolves the game root through ck3lens (repo-relative)
+sys.path.insert(0, str(Path(__file__).parent.parent / "tools" / "ck3lens_mcp"))
+
+from ck3raven.db import init_database
+from ck3raven.db.schema import close_all_connections
+from qbuilder import discovery as discovery_module
+from qbuilder.discovery import (
+    IncrementalDiscovery, ParallelDiscovery, _enqueue_discovery, _ensure_cvid,
+)
+from qbuilder.schema import init_qbuilder_schema
+
+
+FILES = {
+    "common/traits/00_traits.txt": "brave = { }\n",
+    "common/traits/01_traits.txt": "craven = { }\n",
+    "events/birth.txt": "birth.1 = { type = character_event }\n",
+}
+
+
+@pytest.fixture
+def discovery_db(tmp_path):
+    """(conn, root, cvid) for a content root holding FILES, not yet discovered."""
+    root = tmp_path / "mod"
+    for relpath, text in FILES.items():
+        (root / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (root / relpath).write_text(text, encoding="utf-8")
+
+    conn = init_database(tmp_path / "test.db")
+    init_qbuilder_schema(conn)
+    # Discovery records hashes before any file_contents rows exist
+    conn.execute("PRAGMA foreign_keys = OFF")
+    cvid = _ensure_cvid(conn, "mod", str(root), None)
+    yield conn, root, cvid
+    close_all_connections()
+
+
+def _discover(conn, cvid, discovery_cls=IncrementalDiscovery, **kwargs):
+    """(Re)queue discovery of cvid and run it. Returns the task summary."""
+    _enqueue_discovery(conn, cvid, time.time())
+    conn.execute("""
+        UPDATE discovery_queue SET status = 'pending', last_path_processed = NULL
+        WHERE content_version_id = ?
+    """, (cvid,))
+    conn.commit()
+    [result] = discovery_cls(conn, **kwargs).run()
+    return result
+
+
+def _files(conn, cvid):
+    """{relpath: (file_id, content_hash, deleted)}"""
+    return {
+        relpath: (file_id, content_hash, deleted)
+        for relpath, file_id, content_hash, deleted in conn.execute("""
+            SELECT relpath, file_id, content_hash, deleted FROM files
+            WHERE content_version_id = ?
+        """, (cvid,))
+    }
+
+
+def _queue(conn):
+    """Sorted (file_id, envelope, work_file_hash, status) build_queue rows."""
+    return sorted(tuple(row) for row in conn.execute(
+        "SELECT file_id, envelope, work_file_hash, status FROM build_queue"))
+
+
+class TestIncrementalDiscovery:
+    """Stat-based skipping, re-hashing and soft deletes across runs."""
+
+    def test_first_run(self, discovery_db):
+        conn, root, cvid = discovery_db
+        result = _discover(conn, cvid)
+
+        assert (result['file_count'], result['hashed'], result['deleted']) == (3, 3, 0)
+        files = _files(conn, cvid)
+        assert sorted(files) == sorted(FILES)
+        assert not any(deleted for _, _, deleted in files.values())
+        assert sorted(file_id for file_id, _, _, _ in _queue(conn)) == sorted(
+            file_id for file_id, _, _ in files.values())
+
+    def test_unchanged_stat_skips_hashing(self, discovery_db, monkeypatch):
+        conn, root, cvid = discovery_db
+        _discover(conn, cvid)
+        files, queue = _files(conn, cvid), _queue(conn)
+
+        def fail(filepath):
+            raise AssertionError(f"{filepath} was re-hashed")
+
+        monkeypatch.setattr(discovery_module, "compute_file_fingerprint", fail)
+        result = _discover(conn, cvid)
+
+        assert (result['file_count'], result['hashed'], result['skipped']) == (3, 0, 3)
+        assert _files(conn, cvid) == files
+        assert _queue(conn) == queue
+
+    def test_changed_file_is_rehashed_and_enqueued(self, discovery_db):
+        conn, root, cvid = discovery_db
+        _discover(conn, cvid)
+        before = _files(conn, cvid)
+
+        changed = root / "common/traits/01_traits.txt"
+        changed.write_text("craven = { cowardly = yes }\n", encoding="utf-8")
+        result = _discover(conn, cvid)
+
+        assert (result['hashed'], result['skipped']) == (1, 2)
+        after = _files(conn, cvid)
+        file_id, content_hash, _ = after["common/traits/01_traits.txt"]
+        assert content_hash != before["common/traits/01_traits.txt"][1]
+        assert {r: v for r, v in after.items() if r != "common/traits/01_traits.txt"} == {
+            r: v for r, v in before.items() if r != "common/traits/01_traits.txt"}
+        assert (file_id, "E_SCRIPT", content_hash, "pending") in _queue(conn)
+
+    def test_removed_file_is_soft_deleted(self, discovery_db):
+        conn, root, cvid = discovery_db
+        _discover(conn, cvid)
+        file_id = _files(conn, cvid)["events/birth.txt"][0]
+        assert any(row[0] == file_id for row in _queue(conn))
+
+        (root / "events/birth.txt").unlink()
+        result = _discover(conn, cvid)
+
+        assert (result['file_count'], result['hashed'], result['deleted']) == (2, 0, 1)
+        assert _files(conn, cvid)["events/birth.txt"][2] == 1
+        assert not any(row[0] == file_id for row in _queue(conn))
+
+    def test_readded_file_is_undeleted(self, discovery_db):
+        conn, root, cvid = discovery_db
+        _discover(conn, cvid)
+        file_id, content_hash, _ = _files(conn, cvid)["events/birth.txt"]
+        path = root / "events/birth.txt"
+        path.unlink()
+        _discover(conn, cvid)
+
+        path.write_text(FILES["events/birth.txt"], encoding="utf-8")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        result = _discover(conn, cvid)
+
+        assert (result['hashed'], result['deleted']) == (1, 0)
+        assert _files(conn, cvid)["events/birth.txt"] == (file_id, content_hash, 0)
+        assert (file_id, "E_SCRIPT", content_hash, "pending") in _queue(conn)
+
+
+def _make_roots(tmp_path, name):
+    """Database plus three content roots of several files each. Returns (conn, cvids)."""
+    conn = init_database(tmp_path / f"{name}.db")
+    init_qbuilder_schema(conn)
+    conn.execute("PRAGMA foreign_keys = OFF")
+    cvids = []
+    for r in range(3):
+        root = tmp_path / f"root_{r}"
+        if not root.exists():
+            for i in range(5):
+                path = root / f"common/traits/{i:02d}_traits.txt"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(f"trait_{r}_{i} = {{ }}\n", encoding="utf-8")
+            (root / "events").mkdir()
+            (root / "events/e.txt").write_text(f"e.{r} = {{ }}\n", encoding="utf-8")
+        cvids.append(_ensure_cvid(conn, f"root_{r}", str(root), None))
+    for cvid in cvids:
+        _enqueue_discovery(conn, cvid, time.time())
+    conn.commit()
+    return conn, cvids
+
+
+def _rows(conn):
+    """Every files and build_queue row, keyed by path rather than file_id."""
+    files = sorted(tuple(row) for row in conn.execute("""
+        SELECT content_version_id, relpath, content_hash, file_type,
+               file_size, file_hash, deleted
+        FROM files
+    """))
+    queue = sorted(tuple(row) for row in conn.execute("""
+        SELECT f.content_version_id, f.relpath, q.envelope, q.work_file_size,
+               q.work_file_hash, q.status
+        FROM build_queue q JOIN files f ON f.file_id = q.file_id
+    """))
+    return files, queue
+
+
+class TestParallelDiscovery:
+    """ParallelDiscovery writes what the serial path writes."""
+
+    @pytest.fixture(autouse=True)
+    def small_batches(self, monkeypatch):
+        monkeypatch.setattr(discovery_module, "COMMIT_BATCH_SIZE", 2)
+
+    def test_matches_serial(self, tmp_path):
+        serial, _ = _make_roots(tmp_path, "serial")
+        serial_results = IncrementalDiscovery(serial).run()
+        parallel, _ = _make_roots(tmp_path, "parallel")
+        parallel_results = ParallelDiscovery(parallel, workers=2).run()
+
+        assert parallel_results == serial_results
+        assert [r['file_count'] for r in parallel_results] == [6, 6, 6]
+        assert _rows(parallel) == _rows(serial)
+        assert len(_rows(parallel)[1]) == 18
+        close_all_connections()
+
+    def test_resume_after_interrupted_batch(self, tmp_path, monkeypatch):
+        conn, cvids = _make_roots(tmp_path, "test")
+        commit_batch = ParallelDiscovery._commit_batch
+        calls = []
+
+        def crash_after_first(self, *args):
+            if calls:
+                raise KeyboardInterrupt
+            calls.append(args)
+            commit_batch(self, *args)
+
+        monkeypatch.setattr(ParallelDiscovery, "_commit_batch", crash_after_first)
+        with pytest.raises(KeyboardInterrupt):
+            ParallelDiscovery(conn, workers=2).run()
+        monkeypatch.setattr(ParallelDiscovery, "_commit_batch", commit_batch)
+
+        status, last_path = conn.execute("""
+            SELECT status, last_path_processed FROM discovery_queue
+            WHERE content_version_id = ?
+        """, (cvids[0],)).fetchone()
+        assert (status, last_path) == ("processing", "common/traits/01_traits.txt")
+
+        # The lease expires and the task is picked up where it stopped
+        conn.execute("UPDATE discovery_queue SET lease_expires_at = 0 WHERE status = 'processing'")
+        conn.commit()
+        results = ParallelDiscovery(conn, workers=2).run()
+
+        assert [r['file_count'] for r in results] == [4, 6, 6]
+        assert conn.execute(
+            "SELECT COUNT(*) FROM discovery_queue WHERE status != 'completed'").fetchone()[0] == 0
+        clean, _ = _make_roots(tmp_path, "clean")
+        IncrementalDiscovery(clean).run()
+        assert _rows(conn) == _rows(clean)
+        close_all_connections()
+
+    def test_file_id_backfill(self, tmp_path):
+        conn, cvids = _make_roots(tmp_path, "test")
+        ParallelDiscovery(conn, workers=2).run()
+
+        def queued():
+            return sorted(tuple(row) for row in conn.execute("""
+                SELECT q.file_id, f.file_id, q.work_file_hash, f.content_hash
+                FROM build_queue q LEFT JOIN files f ON f.file_id = q.file_id
+            """))
+
+        def check(rows):
+            assert len(rows) == 18
+            for queued_id, file_id, work_hash, content_hash in rows:
+                assert (queued_id, work_hash) == (file_id, content_hash)
+
+        # Newly hashed files: file_id filled in from the upserted files rows
+        check(queued())
+
+        # Unchanged files carry their stored file_id; a changed one is
+        # rewritten and filled in again
+        changed = tmp_path / "root_1/events/e.txt"
+        changed.write_text("e.1 = { changed = yes }\n", encoding="utf-8")
+        conn.execute("DELETE FROM build_queue")
+        conn.execute("UPDATE discovery_queue SET status = 'pending', last_path_processed = NULL")
+        conn.commit()
+        results = ParallelDiscovery(conn, workers=2).run()
+
+        assert [r['hashed'] for r in results] == [0, 1, 0]
+        check(queued())
+        close_all_connections()
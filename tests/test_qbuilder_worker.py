@@ -0,0 +1,483 @@
+"""
+Tests for the QBuilder build worker (qbuilder/worker.py).
+
+Most items are built from ASTs that already exist for their content hash,
+so the parse step short-circuits and no parser subprocess is spawned.
+The pipeline tests (qbuilder/pipeline.py) start from an empty asts table.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from ck3raven.db import init_database
+from ck3raven.db.schema import close_all_connections
+from ck3raven.parser.parser import parse_source
+from ck3raven.parser.ast_serde import serialize_ast
+from qbuilder.ipc_server import WorkSignal
+from qbuilder.schema import compact_build_queue, init_qbuilder_schema
+from qbuilder import pipeline
+from qbuilder.pipeline import BuildPipeline, compute_item
+from qbuilder.worker import BuildWorker, run_build_worker
+
+
+def _source(i: int) -> str:
+    return "\n".join(
+        f"effect_{i}_{j} = {{ add_gold = {j} if = {{ limit = {{ has_trait = brave }} }} }}"
+        for j in range(3)
+    )
+
+
+def _make_queue_db(tmp_path, sources=None, with_asts=True):
+    """Database with a content root, one script file and build item per source."""
+    sources = sources or [_source(i) for i in range(10)]
+    root = tmp_path / "mod"
+    (root / "common" / "scripted_effects").mkdir(parents=True)
+
+    conn = init_database(tmp_path / "test.db")
+    init_qbuilder_schema(conn)
+    conn.execute("INSERT OR IGNORE INTO parsers (parser_version_id, version_string) VALUES (1, 'test')")
+    cvid = conn.execute("""
+        INSERT INTO content_versions (name, source_path, content_root_hash)
+        VALUES ('test', ?, 'root')
+    """, (str(root),)).lastrowid
+
+    for i, text in enumerate(sources):
+        relpath = f"common/scripted_effects/effects_{i}.txt"
+        (root / relpath).write_text(text, encoding="utf-8")
+        content_hash = hashlib.sha256(text.encode()).hexdigest()
+
+        conn.execute("""
+            INSERT OR IGNORE INTO file_contents (content_hash, content_blob, size) VALUES (?, ?, ?)
+        """, (content_hash, text.encode(), len(text)))
+        file_id = conn.execute("""
+            INSERT INTO files (content_version_id, relpath, content_hash) VALUES (?, ?, ?)
+        """, (cvid, relpath, content_hash)).lastrowid
+        if with_asts:
+            blob = b"not an ast" if i == 4 else serialize_ast(parse_source(text))
+            conn.execute("""
+                INSERT INTO asts (content_hash, parser_version_id, ast_blob, ast_format, parse_ok)
+                VALUES (?, 1, ?, 'json', 1)
+            """, (content_hash, blob))
+        conn.execute("""
+            INSERT INTO build_queue (file_id, envelope, priority, work_file_mtime,
+                                     work_file_size, work_file_hash, created_at)
+            VALUES (?, 'E_SCRIPT', ?, 0, ?, ?, 0)
+        """, (file_id, 1 if i == 7 else 0, len(text), content_hash))
+    conn.commit()
+    return conn
+
+
+@pytest.fixture
+def queue_db(tmp_path):
+    """Database with a content root, 10 script files and their build items.
+
+    File 4 has a corrupt AST blob, so building it fails.
+    """
+    yield _make_queue_db(tmp_path)
+    close_all_connections()
+
+
+def _status(conn) -> dict:
+    return dict(conn.execute("SELECT status, COUNT(*) FROM build_queue GROUP BY status").fetchall())
+
+
+class TestBatchedWorker:
+    """claim_batch() / process_batch() group commits."""
+
+    def test_claim_batch_order_and_context(self, queue_db):
+        """Batch claims follow priority then FIFO and resolve file context."""
+        items = BuildWorker(queue_db).claim_batch(4)
+        assert [Path(item['relpath']).stem for item in items] == [
+            "effects_7", "effects_0", "effects_1", "effects_2"]
+        assert all(item['abspath'].exists() for item in items)
+        assert _status(queue_db) == {'processing': 4, 'pending': 6}
+
+    def test_process_batch_isolates_errors(self, queue_db):
+        """A failing item is rolled back alone; the rest of the batch commits."""
+        worker = BuildWorker(queue_db)
+        results = worker.process_batch(worker.claim_batch(10))
+
+        assert [r['status'] for r in results].count('error') == 1
+        assert _status(queue_db) == {'completed': 9, 'pending': 1}
+        assert queue_db.execute("SELECT COUNT(*) FROM symbols").fetchone()[0] == 27
+        assert queue_db.execute("SELECT COUNT(*) FROM refs").fetchone()[0] == 27
+        assert not queue_db.in_transaction
+
+    @pytest.mark.parametrize("batch_size", [1, 3])
+    def test_run_build_worker_batch_sizes(self, queue_db, batch_size):
+        """Per-item and batched runs leave the same rows behind."""
+        result = run_build_worker(queue_db, continuous=False, batch_size=batch_size, verbose=False)
+
+        # The corrupt item is retried until MAX_RETRIES, then marked as error
+        assert result['completed'] == 9
+        assert _status(queue_db) == {'completed': 9, 'error': 1}
+        assert queue_db.execute("SELECT COUNT(*) FROM symbols").fetchone()[0] == 27
+        assert result['batch_size'] == batch_size
+        assert result['items_per_sec'] > 0
+
+
+class TestQueueMaintenance:
+    """Lease recovery on a timer and compaction of finished rows."""
+
+    def test_lease_recovery_is_periodic(self, queue_db):
+        """Expired leases are recovered on the first claim, then per interval."""
+        queue_db.execute("""
+            UPDATE build_queue SET status = 'processing', lease_expires_at = 0
+            WHERE build_id IN (1, 2)
+        """)
+        queue_db.commit()
+        worker = BuildWorker(queue_db)
+
+        assert len(worker.claim_batch(10)) == 10
+        queue_db.execute("UPDATE build_queue SET lease_expires_at = 0 WHERE build_id = 3")
+        queue_db.commit()
+        # Not due yet: the expired lease stays put until the timer fires
+        assert worker.claim_batch(10) == []
+        assert worker.run_maintenance(force=True)['recovered'] == 1
+        assert [item['build_id'] for item in worker.claim_batch(10)] == [3]
+
+    def test_compaction_keeps_latest_row_per_file(self, queue_db):
+        """Superseded finished rows go; the newest row per file stays."""
+        run_build_worker(queue_db, continuous=False, verbose=False)
+        # Rebuild files 1 and 2, and delete file 3 from the index
+        queue_db.execute("""
+            INSERT INTO build_queue (file_id, envelope, work_file_mtime, work_file_size,
+                                     work_file_hash, created_at)
+            SELECT file_id, envelope, 1, work_file_size, work_file_hash, 0
+            FROM build_queue WHERE file_id IN (1, 2)
+        """)
+        queue_db.execute("DELETE FROM files WHERE file_id = 3")
+        queue_db.commit()
+
+        assert compact_build_queue(queue_db) == 3
+        rows = queue_db.execute(
+            "SELECT file_id, status FROM build_queue ORDER BY file_id").fetchall()
+        assert [tuple(row) for row in rows] == [
+            (1, 'pending'), (2, 'pending'), (4, 'completed'), (5, 'error'),
+            (6, 'completed'), (7, 'completed'), (8, 'completed'), (9, 'completed'),
+            (10, 'completed')]
+        assert compact_build_queue(queue_db) == 0
+
+    def test_compaction_drops_soft_deleted_files(self, queue_db):
+        """Finished rows of files marked deleted are compacted too."""
+        run_build_worker(queue_db, continuous=False, verbose=False)
+        queue_db.execute("UPDATE files SET deleted = 1 WHERE file_id IN (3, 4)")
+        queue_db.commit()
+
+        assert compact_build_queue(queue_db) == 2
+        assert {row[0] for row in queue_db.execute("SELECT file_id FROM build_queue")} == {
+            1, 2, 5, 6, 7, 8, 9, 10}
+
+
+class TestFlashBuild:
+    """BuildWorker.flash_build(): one item built in the flash process, right now."""
+
+    def test_flash_build_matches_queue_build(self, tmp_path):
+        """A flash build writes what the worker loop writes, in one call."""
+        sources = [_source(0), _source(1)]
+        flashed = _make_queue_db(tmp_path / "flash", sources, with_asts=False)
+        queued = _make_queue_db(tmp_path / "queue", sources, with_asts=False)
+
+        worker = BuildWorker(flashed)
+        # Timed from a warm flash process, as in the daemon after its first flash build
+        pipeline.start_flash_process()
+        start = time.time()
+        results = [worker.flash_build(build_id) for build_id in (1, 2)]
+        elapsed = time.time() - start
+        run_build_worker(queued, continuous=False, verbose=False)
+
+        assert [r['status'] for r in results] == ['completed', 'completed']
+        assert all(r['flash'] for r in results)
+        assert elapsed < 1.0
+        assert _built_rows(flashed) == _built_rows(queued)
+        # Already built: nothing to do, nothing claimed
+        assert worker.flash_build(1) == {'build_id': 1, 'status': 'completed', 'flash': False}
+        pipeline.stop_flash_process()
+        close_all_connections()
+
+    def test_slow_parse_falls_back_to_queue(self, tmp_path):
+        """A parse over the flash timeout is abandoned; the item stays queued."""
+        conn = _make_queue_db(tmp_path, ["broken = { { {"], with_asts=False)
+
+        start = time.time()
+        result = BuildWorker(conn).flash_build(1, timeout=0.5)
+
+        assert time.time() - start < 2
+        assert result == {'build_id': 1, 'status': 'pending', 'flash': False}
+        assert _status(conn) == {'pending': 1}
+        # The abandoned parse was killed with its process, not left spinning
+        assert pipeline._flash_process is None
+        assert not [p for p in multiprocessing.active_children() if p.name == "qbuilder-flash"]
+        close_all_connections()
+
+
+class TestWorkSignal:
+    """An idle continuous worker wakes on WorkSignal.notify(), not the poll."""
+
+    def test_enqueue_wakes_idle_worker(self, queue_db):
+        queue_db.execute("UPDATE build_queue SET status = 'completed' WHERE build_id != 8")
+        queue_db.execute("UPDATE build_queue SET status = 'error' WHERE build_id = 8")
+        queue_db.commit()
+
+        signal = WorkSignal()
+        shutdown = threading.Event()
+        results = {}
+        thread = threading.Thread(target=lambda: results.update(run_build_worker(
+            queue_db, continuous=True, poll_interval=60, shutdown_event=shutdown,
+            work_signal=signal, verbose=False)))
+        thread.start()
+        try:
+            time.sleep(0.5)  # Worker finds nothing and goes idle
+
+            start = time.time()
+            queue_db.execute("UPDATE build_queue SET status = 'pending' WHERE build_id = 8")
+            queue_db.commit()
+            signal.notify()
+            while _status(queue_db).get('completed') != 10 and time.time() - start < 10:
+                time.sleep(0.01)
+            assert time.time() - start < 5
+        finally:
+            shutdown.set()
+            signal.notify()
+            thread.join(10)
+
+        assert not thread.is_alive()
+        assert results['completed'] == 1
+
+    def test_notify_before_wait_is_kept(self):
+        """A notify that lands while the worker is busy is not lost."""
+        signal = WorkSignal()
+        signal.notify()
+        assert signal.wait(5) is True
+        assert signal.wait(0.01) is False
+
+
+class TestDeferredFts:
+    """defer_fts=True rebuilds symbols_fts/refs_fts once at the end."""
+
+    def _fts_count(self, conn, table: str, term: str) -> int:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE {table} MATCH ?", (term,)
+        ).fetchone()[0]
+
+    def _triggers(self, conn) -> set:
+        return {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_a_'")}
+
+    def test_fts_rebuilt_after_run(self, queue_db):
+        """Symbols and refs are searchable after a deferred run."""
+        triggers = self._triggers(queue_db)
+        run_build_worker(queue_db, continuous=False, batch_size=4, verbose=False, defer_fts=True)
+
+        assert self._fts_count(queue_db, "symbols_fts", '"effect_0_1"') == 1
+        assert self._fts_count(queue_db, "refs_fts", "brave") == 27
+        assert self._triggers(queue_db) == triggers
+
+    def test_crashed_deferral_is_restored(self, queue_db):
+        """A deferral left behind by a crash is finished by the next run."""
+        from ck3raven.db.schema import defer_fts_sync, get_deferred_fts
+
+        defer_fts_sync(queue_db)
+        assert "symbols_ai" not in self._triggers(queue_db)
+
+        run_build_worker(queue_db, continuous=False, verbose=False)
+        assert get_deferred_fts(queue_db) == []
+        assert "symbols_ai" in self._triggers(queue_db)
+        assert self._fts_count(queue_db, "symbols_fts", '"effect_3_2"') == 1
+
+
+class TestConflictIndex:
+    """Playset conflict index (ck3raven.db.conflicts) kept current by the worker."""
+
+    def _add_patch(self, conn, tmp_path, text: str) -> int:
+        """Second content version with one file, queued for building."""
+        root = tmp_path / "patch"
+        (root / "common" / "scripted_effects").mkdir(parents=True)
+        relpath = "common/scripted_effects/patch.txt"
+        (root / relpath).write_text(text, encoding="utf-8")
+        content_hash = hashlib.sha256(text.encode()).hexdigest()
+
+        cvid = conn.execute("""
+            INSERT INTO content_versions (name, source_path, content_root_hash)
+            VALUES ('patch', ?, 'patch_root')
+        """, (str(root),)).lastrowid
+        conn.execute("""
+            INSERT INTO file_contents (content_hash, content_blob, size) VALUES (?, ?, ?)
+        """, (content_hash, text.encode(), len(text)))
+        file_id = conn.execute("""
+            INSERT INTO files (content_version_id, relpath, content_hash) VALUES (?, ?, ?)
+        """, (cvid, relpath, content_hash)).lastrowid
+        conn.execute("""
+            INSERT INTO asts (content_hash, parser_version_id, ast_blob, ast_format, parse_ok)
+            VALUES (?, 1, ?, 'json', 1)
+        """, (content_hash, serialize_ast(parse_source(text))))
+        conn.execute("""
+            INSERT INTO build_queue (file_id, envelope, priority, work_file_mtime,
+                                     work_file_size, work_file_hash, created_at)
+            VALUES (?, 'E_SCRIPT', 0, 0, ?, ?, 0)
+        """, (file_id, len(text), content_hash))
+        conn.commit()
+        return file_id
+
+    def _conflicts(self, conn, playset_id, **filters) -> dict:
+        from ck3raven.db.conflicts import query_playset_conflicts
+
+        return {
+            c["name"]: [(s["content_version_id"], s["relpath"]) for s in c["sources"]]
+            for c in query_playset_conflicts(conn, playset_id, **filters)
+        }
+
+    def _rows(self, conn, playset_id) -> list:
+        return conn.execute("""
+            SELECT symbol_type, name, content_version_id, relpath, content_hash, line_number
+            FROM playset_symbol_conflicts WHERE playset_id = ? ORDER BY 1, 2, 3, 4
+        """, (playset_id,)).fetchall()
+
+    def test_index_follows_builds_and_file_changes(self, queue_db, tmp_path):
+        """Built symbols and remapped files update only the affected names."""
+        from ck3raven.db.conflicts import (
+            find_conflict_playset, refresh_playset_conflicts, register_conflict_playset)
+
+        patch_file = self._add_patch(queue_db, tmp_path, "effect_0_0 = { }\neffect_1_1 = { }\n")
+        playset_id = register_conflict_playset(queue_db, [2, 1])
+        assert find_conflict_playset(queue_db, {1, 2}) == playset_id
+        assert find_conflict_playset(queue_db, {1}) is None
+        assert self._conflicts(queue_db, playset_id) == {}
+
+        # Refreshed when the queue drains
+        run_build_worker(queue_db, continuous=False, batch_size=4, verbose=False)
+        assert self._conflicts(queue_db, playset_id) == {
+            "effect_0_0": [(1, "common/scripted_effects/effects_0.txt"),
+                           (2, "common/scripted_effects/patch.txt")],
+            "effect_1_1": [(1, "common/scripted_effects/effects_1.txt"),
+                           (2, "common/scripted_effects/patch.txt")],
+        }
+        assert self._conflicts(queue_db, playset_id, game_folder="events/") == {}
+
+        # The patch now has effects_0's content: no new symbols, only a remap
+        effects_0_hash = queue_db.execute(
+            "SELECT content_hash FROM files WHERE relpath LIKE '%effects_0.txt'").fetchone()[0]
+        queue_db.execute("UPDATE files SET content_hash = ? WHERE file_id = ?",
+                         (effects_0_hash, patch_file))
+        queue_db.commit()
+        assert refresh_playset_conflicts(queue_db) == {playset_id: 4}
+        assert sorted(self._conflicts(queue_db, playset_id)) == [
+            "effect_0_0", "effect_0_1", "effect_0_2"]
+        assert queue_db.execute("SELECT COUNT(*) FROM conflict_changes").fetchone()[0] == 0
+
+        # Incremental rows match a full build of the same playset
+        incremental = self._rows(queue_db, playset_id)
+        queue_db.execute("DELETE FROM conflict_playsets")
+        queue_db.execute("DELETE FROM playset_symbol_conflicts")
+        assert self._rows(queue_db, register_conflict_playset(queue_db, [1, 2])) == incremental
+
+
+    def test_full_rebuild_waits_for_drain(self, queue_db, tmp_path, monkeypatch):
+        """Mid-build refreshes skip a playset that needs a full rebuild."""
+        from ck3raven.db.conflicts import register_conflict_playset
+        from qbuilder import worker as worker_module
+        # The module the worker refreshes through
+        from src.ck3raven.db import conflicts
+
+        self._add_patch(queue_db, tmp_path, "effect_0_0 = { }\n")
+        playset_id = register_conflict_playset(queue_db, [1, 2])
+
+        rebuild_playset = conflicts._rebuild_playset
+        rebuilds = []
+
+        def record_rebuild(conn, pid, cvids):
+            rebuilds.append(pid)
+            rebuild_playset(conn, pid, cvids)
+
+        monkeypatch.setattr(conflicts, "_rebuild_playset", record_rebuild)
+        monkeypatch.setattr(conflicts, "FULL_REBUILD_THRESHOLD", 0)
+        monkeypatch.setattr(worker_module, "CONFLICT_REFRESH_INTERVAL", 0.0)
+
+        run_build_worker(queue_db, continuous=False, batch_size=2, verbose=False)
+
+        assert rebuilds == [playset_id]
+        assert self._conflicts(queue_db, playset_id) == {
+            "effect_0_0": [(1, "common/scripted_effects/effects_0.txt"),
+                           (2, "common/scripted_effects/patch.txt")],
+        }
+
+def _built_rows(conn) -> tuple:
+    """ASTs, symbols and refs by content, independent of ast_id/build order."""
+    # The root node records the absolute path, which differs per database
+    asts = sorted(
+        (content_hash, repr({**json.loads(blob), 'filename': None}), node_count)
+        for content_hash, blob, node_count in conn.execute(
+            "SELECT content_hash, ast_blob, node_count FROM asts")
+    )
+    symbols = sorted(map(tuple, conn.execute("""
+        SELECT a.content_hash, s.name, s.symbol_type, s.line_number, s.column_number,
+               s.node_hash_norm, s.node_start_offset, s.node_end_offset
+        FROM symbols s JOIN asts a ON s.ast_id = a.ast_id
+    """)))
+    refs = sorted(map(tuple, conn.execute("""
+        SELECT a.content_hash, r.name, r.ref_type, r.line_number, r.context
+        FROM refs r JOIN asts a ON r.ast_id = a.ast_id
+    """)))
+    return asts, symbols, refs
+
+
+class TestBuildPipeline:
+    """run_build_worker(processes=N) parses in N processes, writes in one."""
+
+    def test_matches_single_process_build(self, tmp_path):
+        """Pipeline output is row-for-row what the subprocess parser path writes."""
+        # Duplicate content and a syntax error alongside normal files
+        sources = [_source(i) for i in range(6)] + [_source(0), "a = }"]
+        serial = _make_queue_db(tmp_path / "serial", sources, with_asts=False)
+        piped = _make_queue_db(tmp_path / "piped", sources, with_asts=False)
+
+        run_build_worker(serial, continuous=False, batch_size=4, verbose=False)
+        result = run_build_worker(piped, continuous=False, verbose=False, processes=2)
+
+        assert result['processes'] == 2
+        assert result['completed'] == 7
+        assert _status(piped) == _status(serial) == {'completed': 7, 'error': 1}
+        assert _built_rows(piped) == _built_rows(serial)
+        assert "ParseError" in piped.execute(
+            "SELECT error_message FROM build_queue WHERE status = 'error'").fetchone()[0]
+        close_all_connections()
+
+    def test_compute_item_translates_newlines(self, tmp_path):
+        """Lone \\r line endings give the line numbers of a text-mode read."""
+        source = "first = { a = 1 }\r\rsecond = { b = 2 }\r\nthird = { c = 3 }\r"
+        path = tmp_path / "common" / "traits" / "cr.txt"
+        path.parent.mkdir(parents=True)
+        path.write_bytes(source.encode('utf-8'))
+
+        result = compute_item({'abspath': str(path), 'relpath': 'common/traits/cr.txt',
+                               'work_hash': 'x', 'ast_format': 'json', 'extract': True})
+
+        assert result['ok']
+        assert [(row[2], row[0]) for row in result['symbol_rows']] == [
+            ('first', 1), ('second', 3), ('third', 4)]
+        with open(path, encoding='utf-8-sig') as f:
+            assert result['ast_blob'] == serialize_ast(parse_source(f.read(), str(path)))
+
+    def test_timeout_replaces_process(self, tmp_path):
+        """A hung parse fails permanently; a fresh process builds the rest."""
+        # Pathological input the parser never finishes on
+        conn = _make_queue_db(tmp_path, [_source(0), "broken = { { {", _source(1)],
+                              with_asts=False)
+        worker = BuildWorker(conn)
+
+        with BuildPipeline(1, timeout=2) as pipeline:
+            results = worker.process_batch(worker.claim_batch(3), pipeline=pipeline)
+            assert pipeline.get_stats()['timeouts'] == 1
+            assert pipeline.get_stats()['alive'] == 1
+
+        errors = [r['error'] for r in results if r['status'] == 'error']
+        assert len(errors) == 1 and errors[0].startswith("ParseTimeoutError")
+        assert _status(conn) == {'completed': 2, 'error': 1}
+        assert conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0] == 6
+        close_all_connections()
@@ -71,5 +71,66 @@ class TestContentTypeConfig:
         assert config is None
 
 
+class TestResolveAllParallel:
+    """Resolver.resolve_all(processes=N) matches the serial run."""
+    
+    def _make_playset(self, root):
+        from ck3raven.resolver.resolver import Resolver
+        
+        files = {
+            "vanilla/common/culture/traditions/00_traditions.txt":
+                "tradition_a = { cost = 1 }\ntradition_b = { cost = 2 }\n",
+            "vanilla/common/on_action/00_on_actions.txt":
+                "on_birth = { events = { birth.1 } effect = { add_gold = 1 } }\n",
+            "vanilla/events/birth.txt": "birth.1 = { type = character_event }\n" * 20,
+            "mod/common/culture/traditions/zz_mod.txt": "tradition_b = { cost = 5 }\n",
+            "mod/common/on_action/mod_on_actions.txt":
+                "on_birth = { events = { mod.1 } effect = { add_gold = 2 } }\n",
+            "mod/events/mod.txt": "mod.1 = { type = character_event }\n",
+        }
+        for relpath, text in files.items():
+            path = root / relpath
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding="utf-8")
+        
+        return Resolver().add_source(root / "vanilla", "vanilla").add_source(root / "mod", "mod")
+    
+    def test_matches_serial(self, tmp_path):
+        """Same folders, order, winners and conflicts; progress per folder."""
+        serial = self._make_playset(tmp_path)
+        parallel = self._make_playset(tmp_path)
+        
+        progress = []
+        serial_results = serial.resolve_all()
+        parallel_results = parallel.resolve_all(
+            progress_callback=lambda folder, i, total: progress.append((folder, i, total)),
+            processes=2,
+        )
+        
+        assert list(parallel_results) == list(serial_results) == [
+            "common/culture/traditions", "common/on_action", "events"]
+        traditions = parallel_results["common/culture/traditions"]
+        assert {k: d.source.source_name for k, d in traditions.definitions.items()} == {
+            "tradition_a": "vanilla", "tradition_b": "mod"}
+        parallel_summary = parallel.get_conflict_summary()
+        serial_summary = serial.get_conflict_summary()
+        assert parallel_summary == serial_summary
+        assert list(parallel_summary["conflicts_by_folder"]) == list(
+            serial_summary["conflicts_by_folder"]) == [
+            "common/culture/traditions", "common/on_action", "events"]
+        assert list(parallel._results) == list(serial._results)
+        assert sorted(folder for folder, _, _ in progress) == list(serial_results)
+        assert [(i, total) for _, i, total in progress] == [(0, 3), (1, 3), (2, 3)]
+    
+    def test_largest_folders_first(self, tmp_path):
+        """Folders are scheduled by total source bytes, largest first."""
+        from ck3raven.resolver.resolver import folder_source_size
+        
+        resolver = self._make_playset(tmp_path)
+        base_paths = resolver.get_base_paths()
+        folders = resolver.get_all_content_folders()
+        assert max(folders, key=lambda f: folder_source_size(base_paths, f)) == "events"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -309,3 +309,73 @@ class TestContainerMergeTotalCounts:
         
         with_trigger_conflict = [m for m in resolved.values() if m.has_trigger_conflict]
         assert len(with_trigger_conflict) == 1  # only birthday
+
+
+class TestContainerMergeFromDb:
+    """The DB-backed emulator must agree with the merge above."""
+    
+    @pytest.fixture(params=["json", "binary"])
+    def db_state(self, request, on_actions_dir, tmp_path, monkeypatch):
+        """Each fixture file as its own content version, in load order."""
+        from ck3raven.db import init_database, get_or_create_parser_version, store_ast
+        from ck3raven.db.content import store_file_content, store_file_record
+        from ck3raven.db.schema import close_all_connections
+        from ck3raven.emulator import resolve_folder_from_db
+        
+        monkeypatch.setenv("QBUILDER_AST_FORMAT", request.param)
+        conn = init_database(tmp_path / "test.db")
+        pv = get_or_create_parser_version(conn)
+        
+        cvids = []
+        for file_path in sorted(on_actions_dir.glob("*.txt")):
+            cursor = conn.execute(
+                "INSERT INTO content_versions (name, content_root_hash) VALUES (?, ?)",
+                (file_path.name, file_path.name),
+            )
+            cvids.append(cursor.lastrowid)
+            content_hash = store_file_content(conn, file_path.read_bytes())
+            store_file_record(conn, cursor.lastrowid, f"common/on_action/{file_path.name}", content_hash)
+            store_ast(conn, content_hash, parse_file(str(file_path)), pv.parser_version_id)
+        conn.commit()
+        
+        yield resolve_folder_from_db(conn, "common/on_action", cvids)
+        close_all_connections()
+    
+    def test_matches_file_merge(self, db_state, parsed_on_actions):
+        """Keys, sources, appended lists and slot winners match."""
+        expected = resolve_container_merge(parsed_on_actions)
+        
+        assert db_state.policy == MergePolicy.CONTAINER_MERGE
+        assert list(db_state.containers) == list(expected)
+        for key, merged in expected.items():
+            container = db_state.get_container(key)
+            assert [s.source_name for s in container.sources] == merged.sources
+            assert container.events == merged.events
+            assert container.on_actions == merged.on_actions
+            assert len(container.random_events) == len(merged.random_events)
+            assert [s.source_name for s in container.trigger_sources] == merged.trigger_sources
+            assert [s.source_name for s in container.effect_sources] == merged.effect_sources
+        
+        birthday = db_state.get_container("on_birthday")
+        assert birthday.random_events == ["100=mod_b_birthday.random_gift",
+                                          "50=mod_b_birthday.random_visitor"]
+        assert birthday.effect_block["line"] == 14
+    
+    def test_slot_conflicts_recorded(self, db_state):
+        """Only multiply-defined trigger/effect slots are conflicts."""
+        conflicts = {(c.key, c.slot): c for c in db_state.conflicts}
+        assert set(conflicts) == {("on_birthday", "trigger"), ("on_birthday", "effect")}
+        
+        effect = conflicts[("on_birthday", "effect")]
+        assert effect.winner.source_name == "03_mod_b_on_actions.txt"
+        assert len(effect.losers) == 2
+    
+    def test_merged_definition(self, db_state):
+        """The definition is the merged block, credited to the last source."""
+        definition = db_state.get_definition("on_birthday")
+        assert definition.source.source_name == "03_mod_b_on_actions.txt"
+        
+        children = {c["name"]: c for c in definition.ast_dict["children"]}
+        assert list(children) == ["trigger", "events", "effect", "random_events"]
+        assert len(children["events"]["children"]) == 6
+        assert children["effect"] is db_state.get_container("on_birthday").effect_block
@@ -279,6 +279,18 @@ class DaemonClient:
         """
         return self._send_request("await_idle", {"timeout_ms": timeout_ms})
     
+    def register_conflict_playset(self, cvids: list[int]) -> dict:
+        """
+        Request the daemon to maintain a conflict index for a playset.
+        
+        Args:
+            cvids: Content version IDs of the playset (order is irrelevant)
+        
+        Returns:
+            Dict with playset_id and conflict_rows
+        """
+        return self._send_request("register_conflict_playset", {"cvids": sorted(cvids)})
+    
     def shutdown(self, graceful: bool = True) -> dict:
         """
         Request daemon shutdown.
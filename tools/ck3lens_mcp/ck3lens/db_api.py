@@ -230,6 +230,25 @@ class DatabaseAPI:
         except Exception as e:
             return {"error": f"Symbol search failed: {e}"}
     
+    def grep_path(self, path: Path, query: str, **kwargs) -> Optional[dict]:
+        """Index-backed grep of a path inside a content root (None if not in one)."""
+        if self._check_available():
+            return None
+        try:
+            return self._get_db()._grep_path_internal(path, query, **kwargs)
+        except Exception:
+            return None
+    
+    def storage_stats(self) -> dict:
+        """File content storage and database size."""
+        if err := self._check_available():
+            return err
+        try:
+            from ck3raven.db.content import get_content_storage_stats
+            return get_content_storage_stats(self._get_db().conn)
+        except Exception as e:
+            return {"error": f"Storage stats failed: {e}"}
+    
     def get_cvids(self, mods: list, normalize_func=None) -> dict:
         """Get content version IDs for mods."""
         if err := self._check_available():
@@ -31,15 +31,20 @@ import re
 import sqlite3
 import sys
 from dataclasses import dataclass, field
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Optional, Any, FrozenSet
+from typing import Optional, Any, FrozenSet, Iterator
 
 # Add ck3raven to path if not installed
 CK3RAVEN_PATH = Path(__file__).parent.parent.parent.parent / "src"
 if CK3RAVEN_PATH.exists():
     sys.path.insert(0, str(CK3RAVEN_PATH))
 
+from ck3raven.db.conflicts import find_conflict_playset, query_playset_conflicts
+from ck3raven.db.content import get_line_starts, register_content_functions
+from ck3raven.db.search import find_term_matches, fts_substring_query, grep_content
 from ck3raven.db.schema import get_connection
+from ck3raven.db.symbol_index import NAME_BATCH_SIZE, SymbolNameIndex
 from ck3raven.resolver.policies import MergePolicy, get_policy_for_folder as _get_policy_for_path
 
 
@@ -131,7 +136,7 @@ def dedupe_results(results: list[SymbolHit]) -> list[SymbolHit]:
     """Remove duplicate symbols, keeping best match_type."""
     seen = {}
     priority = {"exact": 0, "prefix": 1, "stem": 2, "suffix": 3, "contains": 4, 
-                "suffix_tokens": 5, "flex_underscore": 6}
+                "suffix_tokens": 5, "flex_underscore": 6, "fuzzy": 7}
     
     for hit in results:
         key = (hit.symbol_id, hit.name)
@@ -169,10 +174,15 @@ class DBQueries:
             # This enforces read-only at the SQLite level
             db_uri = f"file:{db_path}?mode=ro"
             self.conn = sqlite3.connect(db_uri, uri=True, check_same_thread=False, timeout=5.0)
+            register_content_functions(self.conn)
         else:
             self.conn = get_connection(db_path)
         
         self.conn.row_factory = sqlite3.Row
+        
+        # Symbol names for adjacency search; built on first search, then
+        # topped up with symbols the builder writes (see _symbol_name_index)
+        self._name_index = SymbolNameIndex()
     
     # =========================================================================
     # INTERNAL: CV FILTER BUILDER (inline, not a method)
@@ -302,6 +312,16 @@ class DBQueries:
     # SYMBOL SEARCH - INTERNAL
     # =========================================================================
     
+    def _symbol_name_index(self) -> SymbolNameIndex:
+        """
+        The symbol name index, current with the database.
+        
+        The first call indexes every symbol name; later calls add only
+        symbols written since (one MAX(symbol_id) lookup when nothing changed).
+        """
+        self._name_index.refresh(self.conn)
+        return self._name_index
+    
     def _search_symbols_internal(
         self,
         query: str,
@@ -362,40 +382,58 @@ class DBQueries:
         else:
             patterns = expand_query_patterns(query)
         
-        for pattern, match_type in patterns:
+        # Patterns are matched against the in-memory name index; SQL only
+        # fetches rows for the matched names (idx_symbols_name)
+        name_index = self._symbol_name_index()
+        searches = [(pattern, match_type, name_index.match_like(pattern))
+                    for pattern, match_type in patterns]
+        if adjacency == "fuzzy":
+            # Misspellings: names within a small edit distance of the query
+            query_lower = query.lower().strip()
+            searches.append((f"~{query_lower}", "fuzzy", name_index.match_fuzzy(query_lower)))
+        
+        for pattern, match_type, keys in searches:
             patterns_searched.append(pattern)
+            names = name_index.variants(keys)
             
-            # CORRECT GOLDEN JOIN: symbols → asts → files (via content_hash, NOT file_id)
-            # ASTs are content-identity objects; a.file_id is vestigial/provenance only
-            # The canonical association is: files.content_hash = asts.content_hash
-            sql = f"""
-                SELECT DISTINCT
-                    s.symbol_id,
-                    s.name,
-                    s.symbol_type,
-                    f.file_id,
-                    f.relpath,
-                    cv.name as mod_name,
-                    s.line_number,
-                    f.content_version_id
-                FROM symbols s
-                JOIN asts a ON s.ast_id = a.ast_id
-                JOIN files f ON f.content_hash = a.content_hash
-                JOIN content_versions cv ON f.content_version_id = cv.content_version_id
-                WHERE LOWER(s.name) LIKE ?
-                {cv_filter}
-                {file_pattern_filter}
-            """
-            params: list = [pattern] + file_pattern_param
-            
-            if symbol_type:
-                sql += " AND s.symbol_type = ?"
-                params.append(symbol_type)
-            
-            sql += " ORDER BY s.name LIMIT ?"
-            params.append(limit)
-            
-            rows = self.conn.execute(sql, params).fetchall()
+            rows = []
+            for start in range(0, len(names), NAME_BATCH_SIZE):
+                if len(rows) >= limit:
+                    break
+                batch = names[start:start + NAME_BATCH_SIZE]
+                
+                # CORRECT GOLDEN JOIN: symbols → asts → files (via content_hash, NOT file_id)
+                # ASTs are content-identity objects; a.file_id is vestigial/provenance only
+                # The canonical association is: files.content_hash = asts.content_hash
+                sql = f"""
+                    SELECT DISTINCT
+                        s.symbol_id,
+                        s.name,
+                        s.symbol_type,
+                        f.file_id,
+                        f.relpath,
+                        cv.name as mod_name,
+                        s.line_number,
+                        f.content_version_id
+                    FROM symbols s
+                    JOIN asts a ON s.ast_id = a.ast_id
+                    JOIN files f ON f.content_hash = a.content_hash
+                    JOIN content_versions cv ON f.content_version_id = cv.content_version_id
+                    WHERE s.name IN ({",".join("?" * len(batch))})
+                    {cv_filter}
+                    {file_pattern_filter}
+                """
+                params: list = batch + file_pattern_param
+                
+                if symbol_type:
+                    sql += " AND s.symbol_type = ?"
+                    params.append(symbol_type)
+                
+                # Batches are in name order, so this is ORDER BY s.name overall
+                sql += " ORDER BY s.name LIMIT ?"
+                params.append(limit - len(rows))
+                
+                rows.extend(self.conn.execute(sql, params).fetchall())
             
             for row in rows:
                 hit = SymbolHit(
@@ -533,7 +571,7 @@ class DBQueries:
         row = self.conn.execute("""
             SELECT fc.content_text 
             FROM files f
-            JOIN file_contents fc ON f.content_hash = fc.content_hash
+            JOIN file_content_text fc ON f.content_hash = fc.content_hash
             WHERE f.file_id = ?
         """, (file_id,)).fetchone()
         
@@ -621,7 +659,7 @@ class DBQueries:
                 cv.name as mod_name,
                 fc.size as file_size
             FROM files f
-            JOIN file_contents fc ON f.content_hash = fc.content_hash
+            JOIN file_content_text fc ON f.content_hash = fc.content_hash
             JOIN content_versions cv ON f.content_version_id = cv.content_version_id
             WHERE 1=1 {cv_filter}
         """
@@ -665,8 +703,8 @@ class DBQueries:
             
             if ast_row and ast_row["ast_blob"]:
                 try:
-                    import json
-                    result["ast"] = json.loads(ast_row["ast_blob"])
+                    from ck3raven.parser.ast_serde import deserialize_ast
+                    result["ast"] = deserialize_ast(ast_row["ast_blob"])
                 except Exception:
                     result["ast"] = None
             else:
@@ -761,9 +799,12 @@ class DBQueries:
         Supports multiple search terms:
         - Space-separated words are treated as AND (all must appear in file)
         - Quoted strings search for exact phrases
-        - Single words search for that word anywhere
+        - Single words search for that word anywhere it starts a word
+          ('brave' finds trait_brave, 'rave' does not) - candidates come
+          from file_content_fts, not a scan
         
-        Returns line numbers and snippets for EACH match.
+        Returns line numbers and snippets for EACH match, located through
+        the persisted line index (content_line_index).
         
         Args:
             query: Text to search for (case-insensitive). Space = AND, quotes = exact phrase
@@ -782,25 +823,38 @@ class DBQueries:
         
         cv_filter = self._cv_filter_sql(visible_cvids, "f.content_version_id")
         
-        # Build SQL with AND for all terms
-        term_conditions = []
+        # Candidates from file_content_fts; every candidate is verified
+        # against the text below. Queries with no word characters cannot
+        # use the index and fall back to a LIKE scan of all content.
+        fts_query = fts_substring_query(terms)
         params = []
-        for term in terms:
-            term_conditions.append("LOWER(fc.content_text) LIKE LOWER(?)")
-            params.append(f"%{term}%")
-        
-        term_sql = " AND ".join(term_conditions)
+        if fts_query is not None:
+            source_sql = """
+                FROM file_content_fts fts
+                JOIN file_content_text fc ON fc.rowid = fts.rowid
+                JOIN files f ON f.content_hash = fc.content_hash
+                JOIN content_versions cv ON f.content_version_id = cv.content_version_id
+                WHERE file_content_fts MATCH ?
+            """
+            params.append(fts_query)
+        else:
+            term_sql = " AND ".join("LOWER(fc.content_text) LIKE LOWER(?)" for _ in terms)
+            source_sql = f"""
+                FROM files f
+                JOIN content_versions cv ON f.content_version_id = cv.content_version_id
+                JOIN file_content_text fc ON f.content_hash = fc.content_hash
+                WHERE {term_sql}
+            """
+            params.extend(f"%{term}%" for term in terms)
         
         sql = f"""
             SELECT 
                 f.file_id,
                 f.relpath,
                 cv.name as source_name,
+                fc.content_hash,
                 fc.content_text
-            FROM files f
-            JOIN content_versions cv ON f.content_version_id = cv.content_version_id
-            JOIN file_contents fc ON f.content_hash = fc.content_hash
-            WHERE {term_sql}
+            {source_sql}
             {cv_filter}
         """
         
@@ -813,32 +867,164 @@ class DBQueries:
             sql += " AND LOWER(cv.name) LIKE LOWER(?)"
             params.append(f"%{source_filter}%")
         
-        sql += " LIMIT ?"
-        params.append(limit)
-        
         max_matches = 1000 if verbose else matches_per_file
         
+        # No SQL LIMIT: candidates that fail verification do not count
         results = []
-        for row in self.conn.execute(sql, params).fetchall():
-            content = row["content_text"] if row["content_text"] else ""
+        for row in self.conn.execute(sql, params):
+            content = row["content_text"] or ""
             
             # Find ALL matches with line numbers (pass parsed terms)
-            matches = self._find_all_matches(content, terms, max_matches)
+            line_starts = get_line_starts(self.conn, row["content_hash"], content)
+            matches, term_counts = find_term_matches(content, line_starts, terms, max_matches)
             
-            if not matches:
+            # All terms must appear in the file
+            if not all(term_counts):
                 continue
             
             results.append({
                 "file_id": row["file_id"],
                 "relpath": row["relpath"],
                 "source_name": row["source_name"],
-                "match_count": self._count_matches(content, terms),
+                "match_count": sum(term_counts),
                 "matches": matches,
                 "truncated": len(matches) >= max_matches
             })
+            if len(results) >= limit:
+                break
         
         return results
     
+    def _grep_path_internal(
+        self,
+        path: Path,
+        query: str,
+        *,
+        is_regex: bool = False,
+        include_pattern: Optional[str] = None,
+        max_matches: int = 50,
+    ) -> Optional[dict]:
+        """
+        Substring/regex search of an on-disk path through the database.
+        
+        INTERNAL: Called by ck3_grep_raw via db_api.grep_path()
+        
+        The path must be a content root in content_versions, or a file or
+        folder inside one. Searches the stored contents of that root
+        (trigram-indexed when schema.create_trigram_index() has been run),
+        with no cap on the number of files.
+        
+        The stored contents are only used when they are exactly what is on
+        disk: every file in scope must have a live files row whose
+        content_hash matches the file and whose text is in file_contents,
+        and no live row may be missing from disk. qbuilder does not store
+        file_contents, so on a qbuilder-built database this falls back.
+        
+        Returns:
+            None if no content root contains the path, or its stored contents
+            are incomplete or stale (caller searches the file system), else
+            grep_content()'s result with absolute "file" paths added to the
+            matches
+        """
+        def normalize(p: str) -> str:
+            return p.replace("\\", "/").rstrip("/")
+        
+        target = normalize(str(Path(path).resolve()))
+        best = None
+        for row in self.conn.execute(
+            "SELECT content_version_id, source_path FROM content_versions WHERE source_path IS NOT NULL"
+        ):
+            root = normalize(str(Path(row["source_path"]).resolve()))
+            if target.lower() == root.lower() or target.lower().startswith(root.lower() + "/"):
+                # Nested roots: the innermost one owns the path
+                if best is None or len(root) > len(best[1]):
+                    best = (row["content_version_id"], root, row["source_path"])
+        if best is None:
+            return None
+        
+        cvid, root, source_path = best
+        relpath = target[len(root) + 1:]
+        if Path(path).is_dir():
+            relpath = relpath + "/" if relpath else None
+            include = include_pattern
+        else:
+            include = None
+        
+        if not self._stored_contents_current(cvid, Path(source_path), relpath, include):
+            return None
+        
+        result = grep_content(
+            self.conn, query, is_regex=is_regex,
+            content_version_ids=[cvid], relpath_prefix=relpath,
+            include_pattern=include, max_matches=max_matches,
+        )
+        for match in result["matches"]:
+            match["file"] = str(Path(source_path) / match["relpath"])
+        return result
+    
+    def _stored_contents_current(
+        self,
+        cvid: int,
+        root: Path,
+        relpath: Optional[str],
+        include_pattern: Optional[str],
+    ) -> bool:
+        """
+        True if the stored contents in scope match the files on disk.
+        
+        Scope is what grep_content() searches for the same arguments: one
+        file, or the files under a folder (relpath ending in '/', or None for
+        the whole root) filtered by include_pattern. Files are compared by
+        the (mtime, size) discovery recorded for them, so nothing is read.
+        """
+        def in_scope(rel: str) -> bool:
+            if relpath is not None:
+                if relpath.endswith("/"):
+                    if not rel.lower().startswith(relpath.lower()):
+                        return False
+                elif rel.lower() != relpath.lower():
+                    return False
+            if include_pattern:
+                target = rel if "/" in include_pattern else rel.rsplit("/", 1)[-1]
+                return fnmatch(target, include_pattern)
+            return True
+        
+        stored = {}
+        try:
+            rows = self.conn.execute("""
+                SELECT f.relpath, f.file_mtime, f.file_size,
+                       fc.content_hash IS NOT NULL AS has_content
+                FROM files f
+                LEFT JOIN file_contents fc ON fc.content_hash = f.content_hash
+                WHERE f.content_version_id = ? AND f.deleted = 0
+            """, (cvid,)).fetchall()
+        except sqlite3.OperationalError:
+            return False  # No discovery fingerprints to compare against
+        for row in rows:
+            if in_scope(row["relpath"]):
+                if not row["has_content"] or row["file_mtime"] is None:
+                    return False
+                stored[row["relpath"].lower()] = (row["file_mtime"], row["file_size"])
+        
+        base = root / relpath if relpath else root
+        on_disk = [base] if base.is_file() else [p for p in base.rglob("*") if p.is_file()]
+        seen = 0
+        for file_path in on_disk:
+            rel = file_path.relative_to(root).as_posix()
+            if not in_scope(rel):
+                continue
+            fingerprint = stored.get(rel.lower())
+            if fingerprint is None:
+                return False
+            try:
+                stat = file_path.stat()
+            except OSError:
+                return False
+            if (stat.st_mtime, stat.st_size) != fingerprint:
+                return False
+            seen += 1
+        return seen == len(stored)
+    
     def _parse_search_terms(self, query: str) -> list[str]:
         """
         Parse search query into terms.
@@ -871,56 +1057,6 @@ class DBQueries:
         
         return terms if terms else [query]  # Fallback to original if parsing fails
     
-    def _find_all_matches(self, content: str, terms: list[str], max_matches: int) -> list[dict]:
-        """Find all lines containing ANY search term, with line numbers and snippets."""
-        matches = []
-        lines = content.split("\n")
-        terms_lower = [t.lower() for t in terms]
-        
-        for line_num, line in enumerate(lines, start=1):
-            line_lower = line.lower()
-            
-            # Check if any term matches this line
-            matched_term = None
-            for term in terms_lower:
-                if term in line_lower:
-                    matched_term = term
-                    break
-            
-            if not matched_term:
-                continue
-            
-            # Find position of matched term for highlighting
-            pos = line_lower.find(matched_term)
-            
-            # Build snippet with context
-            start = max(0, pos - 30)
-            end = min(len(line), pos + len(matched_term) + 50)
-            snippet = line[start:end].strip()
-            
-            if start > 0:
-                snippet = "..." + snippet
-            if end < len(line):
-                snippet = snippet + "..."
-            
-            matches.append({
-                "line": line_num,
-                "snippet": snippet
-            })
-            
-            if len(matches) >= max_matches:
-                break
-        
-        return matches
-    
-    def _count_matches(self, content: str, terms: list[str]) -> int:
-        """Count total occurrences of all search terms in content."""
-        content_lower = content.lower()
-        total = 0
-        for term in terms:
-            total += content_lower.count(term.lower())
-        return total
-    
     # =========================================================================
     # UNIFIED SEARCH - INTERNAL
     # =========================================================================
@@ -1192,10 +1328,11 @@ class DBQueries:
         
         INTERNAL: Called by DbHandle.get_symbol_conflicts()
         
-        Uses Golden Join pattern: symbols → asts → files → content_versions
-        This is INSTANT compared to contribution_units extraction.
-        Uses GROUP BY to find symbols defined in multiple mods.
-        
+        Reads the playset conflict index when the builder maintains one for
+        visible_cvids (ck3raven.db.conflicts, registered via the daemon).
+        Otherwise uses Golden Join pattern: symbols → asts → files → content_versions
+        with GROUP BY to find symbols defined in multiple mods.
+
         Args:
             load_order_map: Optional CVID → load_order mapping from session.mods[].
                 When provided, each conflict source gets load_order and is_last_loaded fields,
@@ -1210,6 +1347,124 @@ class DBQueries:
         if not visible_cvids:
             return {"conflict_count": 0, "conflicts": [], "compatch_conflicts_hidden": 0}
         
+        indexed_playset = find_conflict_playset(self.conn, visible_cvids)
+        if indexed_playset is not None:
+            # Materialized by the builder (ck3raven.db.conflicts): keyed reads
+            candidates = self._indexed_symbol_conflicts(
+                indexed_playset, visible_cvids, symbol_type, game_folder, limit * 2)
+        else:
+            candidates = self._scan_symbol_conflicts(
+                visible_cvids, symbol_type, game_folder, limit * 2)
+        
+        conflicts = []
+        compatch_hidden = 0
+        
+        for symbol_type_val, name, source_count, source_rows in candidates:
+            if len(conflicts) >= limit:
+                break
+            
+            sources = []
+            is_compatch_conflict = False
+            first_relpath = None
+            
+            for cv_id, mod_name, relpath, line_number in source_rows:
+                if self._is_compatch_mod(mod_name):
+                    is_compatch_conflict = True
+                source_entry: dict = {
+                    "mod": mod_name,
+                    "file": relpath,
+                    "line": line_number,
+                }
+                if load_order_map is not None:
+                    source_entry["load_order"] = load_order_map.get(cv_id, -1)
+                if first_relpath is None:
+                    first_relpath = relpath
+                sources.append(source_entry)
+            
+            # Filter out compatch conflicts if requested
+            if is_compatch_conflict and not include_compatch:
+                compatch_hidden += 1
+                continue
+            
+            # Determine winner using merge policy if load_order_map provided
+            conflict_entry: dict = {
+                "name": name,
+                "symbol_type": symbol_type_val,
+                "source_count": source_count,
+                "sources": sources,
+                "is_compatch_conflict": is_compatch_conflict,
+            }
+            
+            if load_order_map is not None and sources:
+                # Determine policy from file path
+                policy = _get_policy_for_folder(first_relpath or "")
+                conflict_entry["policy"] = policy.name
+                
+                # FIOS: lowest load_order wins. All others (LIOS): highest wins.
+                if policy == MergePolicy.FIOS:
+                    winner_order = min(s.get("load_order", 999999) for s in sources)
+                else:
+                    winner_order = max(s.get("load_order", -1) for s in sources)
+                
+                for s in sources:
+                    s["is_last_loaded"] = (s.get("load_order") == winner_order)
+                
+                # Tag the last-loaded mod (approximate winner for OVERRIDE/FIOS)
+                last_loaded = [s for s in sources if s.get("is_last_loaded")]
+                if last_loaded:
+                    conflict_entry["last_loaded"] = last_loaded[0]["mod"]
+            
+            conflicts.append(conflict_entry)
+        
+        return {
+            "conflict_count": len(conflicts),
+            "conflicts": conflicts,
+            "compatch_conflicts_hidden": compatch_hidden,
+            "playset": playset_name if playset_name else "ACTIVE PLAYSET",
+            "indexed": indexed_playset is not None,
+        }
+    
+    def _indexed_symbol_conflicts(
+        self,
+        playset_id: int,
+        visible_cvids: FrozenSet[int],
+        symbol_type: Optional[str],
+        game_folder: Optional[str],
+        limit: int,
+    ) -> list[tuple]:
+        """Conflicts from the materialized playset index, as (type, name, count, sources)."""
+        mod_names = {
+            row["content_version_id"]: row["name"]
+            for row in self.conn.execute(f"""
+                SELECT cv.content_version_id, cv.name
+                FROM content_versions cv
+                WHERE 1=1 {self._cv_filter_sql(visible_cvids, "cv.content_version_id")}
+            """)
+        }
+        return [
+            (c["symbol_type"], c["name"], c["source_count"], [
+                (s["content_version_id"], mod_names.get(s["content_version_id"], "unknown"),
+                 s["relpath"], s["line_number"])
+                for s in c["sources"]
+            ])
+            for c in query_playset_conflicts(
+                self.conn, playset_id,
+                symbol_type=symbol_type, game_folder=game_folder, limit=limit)
+        ]
+    
+    def _scan_symbol_conflicts(
+        self,
+        visible_cvids: FrozenSet[int],
+        symbol_type: Optional[str],
+        game_folder: Optional[str],
+        limit: int,
+    ) -> Iterator[tuple]:
+        """
+        Conflicts aggregated from the symbols table, as (type, name, count, sources).
+        
+        Used when the playset has no materialized conflict index. Sources are
+        looked up as conflicts are consumed.
+        """
         cv_filter = self._cv_filter_sql(visible_cvids, "cv.content_version_id")
         
         # Build query to find symbols with multiple definitions
@@ -1243,26 +1498,17 @@ class DBQueries:
             ORDER BY source_count DESC
             LIMIT ?
         """
-        params.append(limit * 2)  # Get extra for compatch filtering
+        params.append(limit)
         
         rows = self.conn.execute(sql, params).fetchall()
         
-        conflicts = []
-        compatch_hidden = 0
-        
         for row in rows:
-            if len(conflicts) >= limit:
-                break
-                
             symbol_type_val = row["symbol_type"]
             name = row["name"]
             cv_ids_found = [int(cv) for cv in row["cv_ids"].split(",")]
             
             # Get details for each source using Golden Join
             sources = []
-            is_compatch_conflict = False
-            first_relpath = None
-            
             for cv_id in cv_ids_found:
                 detail_row = self.conn.execute("""
                     SELECT 
@@ -1278,61 +1524,10 @@ class DBQueries:
                 """, (cv_id, symbol_type_val, name)).fetchone()
                 
                 if detail_row:
-                    mod_name = detail_row["mod_name"]
-                    if self._is_compatch_mod(mod_name):
-                        is_compatch_conflict = True
-                    source_entry: dict = {
-                        "mod": mod_name,
-                        "file": detail_row["relpath"],
-                        "line": detail_row["line_number"],
-                    }
-                    if load_order_map is not None:
-                        source_entry["load_order"] = load_order_map.get(cv_id, -1)
-                    if first_relpath is None:
-                        first_relpath = detail_row["relpath"]
-                    sources.append(source_entry)
-            
-            # Filter out compatch conflicts if requested
-            if is_compatch_conflict and not include_compatch:
-                compatch_hidden += 1
-                continue
-            
-            # Determine winner using merge policy if load_order_map provided
-            conflict_entry: dict = {
-                "name": name,
-                "symbol_type": symbol_type_val,
-                "source_count": row["source_count"],
-                "sources": sources,
-                "is_compatch_conflict": is_compatch_conflict,
-            }
-            
-            if load_order_map is not None and sources:
-                # Determine policy from file path
-                policy = _get_policy_for_folder(first_relpath or "")
-                conflict_entry["policy"] = policy.name
-                
-                # FIOS: lowest load_order wins. All others (LIOS): highest wins.
-                if policy == MergePolicy.FIOS:
-                    winner_order = min(s.get("load_order", 999999) for s in sources)
-                else:
-                    winner_order = max(s.get("load_order", -1) for s in sources)
-                
-                for s in sources:
-                    s["is_last_loaded"] = (s.get("load_order") == winner_order)
-                
-                # Tag the last-loaded mod (approximate winner for OVERRIDE/FIOS)
-                last_loaded = [s for s in sources if s.get("is_last_loaded")]
-                if last_loaded:
-                    conflict_entry["last_loaded"] = last_loaded[0]["mod"]
+                    sources.append((cv_id, detail_row["mod_name"],
+                                    detail_row["relpath"], detail_row["line_number"]))
             
-            conflicts.append(conflict_entry)
-        
-        return {
-            "conflict_count": len(conflicts),
-            "conflicts": conflicts,
-            "compatch_conflicts_hidden": compatch_hidden,
-            "playset": playset_name if playset_name else "ACTIVE PLAYSET"
-        }
+            yield symbol_type_val, name, row["source_count"], sources
     
     # =========================================================================
     # HELPERS
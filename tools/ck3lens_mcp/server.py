@@ -915,7 +915,7 @@ def ck3_close_db() -> Reply:
 @mcp.tool()
 @mcp_safe_tool
 def ck3_db(
-    command: Literal["status", "disable", "enable"] = "status",
+    command: Literal["status", "stats", "disable", "enable"] = "status",
 ) -> Reply:
     """
     Manage database connection for maintenance operations.
@@ -923,6 +923,7 @@ def ck3_db(
     Commands:
     
     command=status   → Check if database is enabled/connected
+    command=stats    → Database size and file content storage (bytes saved by compression)
     command=disable  → Close connection and block reconnection (for file operations)
     command=enable   → Re-enable database access
     
@@ -937,6 +938,7 @@ def ck3_db(
         
     Examples:
         ck3_db(command="status")   # Check current state
+        ck3_db(command="stats")    # DB size, content storage savings
         ck3_db(command="disable")  # Close and block for file deletion
         ck3_db(command="enable")   # Restore normal operation
     """
@@ -948,6 +950,14 @@ def ck3_db(
     if command == "status":
         result = db_api.status()
         return rb.success("WA-DB-S-001", data=result, message="Database status retrieved.")
+    
+    elif command == "stats":
+        result = db_api.storage_stats()
+        if "error" in result:
+            return rb.error("MCP-SYS-E-001", data=result, message=result["error"])
+        saved_mb = result["saved_bytes"] / (1024 * 1024)
+        return rb.success("WA-DB-S-001", data=result,
+                          message=f"Database storage retrieved ({saved_mb:.1f} MB saved by compression).")
         
     elif command == "disable":
         # Use db_api to disable (handles WAL mode, close, blocks reconnect)
@@ -1477,6 +1487,26 @@ def ck3_logs(
 
 ConflictCommand = Literal["symbols", "files", "summary"]
 
+
+def _ensure_conflict_index(db, cvids: frozenset[int]) -> None:
+    """
+    Ask the daemon to index this playset's symbol conflicts, once.
+    
+    The daemon (single writer) builds the index and keeps it current as it
+    builds. Best-effort: without a daemon, conflicts are aggregated from
+    the symbols table on every call.
+    """
+    from ck3raven.db.conflicts import find_conflict_playset
+    from ck3lens.daemon_client import daemon, DaemonError, DaemonNotAvailableError
+    
+    if find_conflict_playset(db.conn, cvids) is not None:
+        return
+    try:
+        if daemon.is_available():
+            daemon.register_conflict_playset(list(cvids))
+    except (DaemonNotAvailableError, DaemonError):
+        pass
+
 @mcp.tool()
 @mcp_safe_tool
 def ck3_conflicts(
@@ -1579,6 +1609,9 @@ def ck3_conflicts(
         )
     
     if command == "symbols":
+        # Load order is applied per call, so one index serves every order
+        _ensure_conflict_index(db, cvids)
+        
         # Use the internal method that was powering the deleted tools
         result = db._get_symbol_conflicts_internal(
             visible_cvids=cvids,
@@ -4681,7 +4714,8 @@ def ck3_grep_raw(
     path: str,
     query: str,
     is_regex: bool = False,
-    include_pattern: Optional[str] = None
+    include_pattern: Optional[str] = None,
+    use_index: bool = False
 ) -> Reply:
     """
     Search for text in files with tracing.
@@ -4689,6 +4723,12 @@ def ck3_grep_raw(
     USE THIS instead of VS Code's grep_search when you need to search files
     outside the ck3raven database. Every search is logged for policy validation.
     
+    Files are read from disk (first 100 files). With use_index=True, a path
+    inside a content root (vanilla or a mod) is searched in the database
+    instead - trigram-index backed when built, with no file cap - but only
+    if the stored contents of every file in scope match the disk; otherwise
+    the disk walk is used.
+    
     In ck3lens mode: Only paths within the active playset (vanilla + mods) are searchable.
     In ck3raven-dev mode: Broader access for infrastructure testing.
     
@@ -4697,6 +4737,7 @@ def ck3_grep_raw(
         query: Text or regex pattern to search for
         is_regex: If True, treat query as regex
         include_pattern: Glob pattern to filter files (e.g., "*.txt")
+        use_index: If True, search the database when it is current for the path
     
     Returns:
         {"success": bool, "matches": [{"file": str, "line": int, "content": str}]}
@@ -4741,6 +4782,31 @@ def ck3_grep_raw(
         return rb.invalid('WA-RES-I-001', data={"path": path}, message=f"Path not found: {path}")
     
     try:
+        # Content roots in the database: index-backed, whole root
+        indexed = None
+        if use_index:
+            indexed = db_api.grep_path(
+                search_path, query, is_regex=is_regex,
+                include_pattern=include_pattern or "*.txt", max_matches=50,
+            )
+        if indexed is not None:
+            matches = [
+                {"file": m["file"], "line": m["line"], "content": m["content"]}
+                for m in indexed["matches"]
+            ]
+            trace.log("mcp.tool", {
+                "path": str(search_path),
+                "query": query,
+            }, {"match_count": len(matches), "indexed": indexed["indexed"]})
+            return rb.success('WA-READ-S-001', data={
+                "success": True,
+                "matches": matches,
+                "count": len(matches),
+                "truncated": indexed["truncated"],
+                "files_searched": indexed["files_searched"],
+                "source": "database",
+            }, message=f"Found {len(matches)} matches.")
+        
         matches = []
         
         # Compile pattern
@@ -184,7 +184,13 @@ class LearnerDb:
         ast = None
         if row["ast_blob"]:
             try:
-                ast = json.loads(row["ast_blob"])
+                blob = row["ast_blob"]
+                if bytes(blob[:4]) == b"CK3B":
+                    # Binary ast_format - only decodable via ck3raven's ast_serde
+                    from ck3raven.parser.ast_serde import deserialize_ast
+                    ast = deserialize_ast(blob)
+                else:
+                    ast = json.loads(blob)
             except Exception:
                 pass
         